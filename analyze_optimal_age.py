@@ -4,94 +4,88 @@
 
 Цель: Определить при каком возрасте автомобиля пошлина минимальна,
 и найти критерии "проходной" машины.
+
+Пошлина считается движком (`calculate_grid`) по config/duties.yml и
+статическим курсам config/rates.yml - теми же формулами, что и /api/calculate.
+Требует numpy: `poetry install --extras analysis`.
 """
 
-import yaml
+from __future__ import annotations
+
 from decimal import Decimal
-from typing import Dict, List, Tuple
-from datetime import datetime
-
-# Текущий год
-CURRENT_YEAR = 2025
-
-# Курс EUR/RUB для расчётов
-EUR_TO_RUB = 100.0
-
-def load_duties():
-    """Загрузка таблицы пошлин из YAML"""
-    with open('/Users/admin/PycharmProjects/car_calculator/config/duties.yml', 'r', encoding='utf-8') as f:
-        data = yaml.safe_load(f)
-    return data['age_categories']
-
-def calculate_age_category(year: int) -> str:
-    """Определить категорию возраста автомобиля"""
-    age = CURRENT_YEAR - year
-    if age <= 3:
-        return 'lt3'
-    elif 3 < age <= 5:
-        return '3_5'
-    else:
-        return 'gt5'
-
-def calculate_duty_lt3(customs_value_eur: float, engine_cc: int, duties: dict) -> float:
-    """
-    Расчёт пошлины для авто <= 3 лет.
-    Формула: MAX(customs_value × percent, engine_cc × min_rate_eur_per_cc)
-    """
-    brackets = duties['lt3']['value_brackets']
-
-    # Найти подходящий брэкет
-    bracket = None
-    for b in brackets:
-        max_val = b.get('max_customs_value_eur')
-        if max_val is None or customs_value_eur <= max_val:
-            bracket = b
-            break
-
-    if not bracket:
-        bracket = brackets[-1]  # Последний брэкет для больших стоимостей
-
-    # Расчёт по двум формулам
-    duty_by_percent = customs_value_eur * bracket['percent']
-    duty_by_cc = engine_cc * bracket['min_rate_eur_per_cc']
-
-    # Берём максимум
-    duty_eur = max(duty_by_percent, duty_by_cc)
-
-    return duty_eur
-
-def calculate_duty_3_5_or_gt5(engine_cc: int, age_category: str, duties: dict) -> float:
-    """
-    Расчёт пошлины для авто 3-5 лет или > 5 лет.
-    Формула: engine_cc × rate_eur_per_cc
-    """
-    bands = duties[age_category]['bands']
-
-    # Найти подходящий диапазон
-    rate = None
-    for band in bands:
-        max_cc = band.get('max_cc')
-        if max_cc is None or engine_cc <= max_cc:
-            rate = band['rate_eur_per_cc']
-            break
-
-    if rate is None:
-        rate = bands[-1]['rate_eur_per_cc']
-
-    duty_eur = engine_cc * rate
-    return duty_eur
-
-def analyze_optimal_age():
-    """Главный анализ оптимального возраста"""
 
-    duties = load_duties()
+import numpy as np
+
+from app.calculation.engine import resolve_context
+from app.calculation.vectorized import AGE_CATEGORY_CODES, calculate_grid
+from app.core.clock import utc_year
+from app.core.settings import get_configs
+
+
+# Страна влияет только на расходы, не на пошлину
+COUNTRY = "japan"
+# Мощность влияет только на утильсбор, не на пошлину
+ENGINE_POWER_HP = 150
+
+# Возраст автомобиля (лет) для анализа
+AGES_TO_TEST = [
+    0,  # новый
+    1,
+    2,
+    3,  # граница lt3/3_5
+    4,
+    5,  # граница 3_5/gt5
+    6,
+    7,
+    10,
+    15,
+]
+
+AGE_LABELS = {
+    "lt3": "≤ 3 лет (новые и свежие)",
+    "3_5": "3-5 лет (средний возраст)",
+    "gt5": "> 5 лет (старые)",
+}
+AGE_LABELS_SHORT = {"lt3": "≤3 лет", "3_5": "3-5 лет", "gt5": ">5 лет"}
+
+
+def _rub(value: float) -> str:
+    return f"{value:,.0f}".replace(",", " ")
+
+
+def _age_label(age: int) -> str:
+    return f"{age} {'год' if age == 1 else 'года' if age < 5 else 'лет'}"
+
+
+def duty_grid(
+    purchase_price_eur: int, engine_cc: np.ndarray, years: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Пошлина (RUB) и код категории возраста для сетки (год x объём)."""
+    ctx = resolve_context(rates_conf=get_configs().rates)  # без live-курсов ЦБ
+    res = calculate_grid(
+        COUNTRY,
+        "EUR",
+        year=years,
+        engine_cc=engine_cc,
+        engine_power_hp=ENGINE_POWER_HP,
+        purchase_price=purchase_price_eur,
+        ctx=ctx,
+    )
+    return res.duties_rub.astype(float), res.age_category
+
+
+def analyze_optimal_age() -> None:
+    """Главный анализ оптимального возраста"""
+    current_year = utc_year()
+    eur_to_rub = float(Decimal(str(get_configs().rates["currencies"]["EUR_RUB"])))
+    years = np.array([current_year - age for age in AGES_TO_TEST])
 
     print("=" * 90)
     print("ИССЛЕДОВАНИЕ ОПТИМАЛЬНОГО ВОЗРАСТА АВТОМОБИЛЯ ДЛЯ МИНИМАЛЬНОЙ ПОШЛИНЫ")
     print("=" * 90)
     print()
-    print(f"Текущий год: {CURRENT_YEAR}")
-    print(f"Курс EUR/RUB: {EUR_TO_RUB:.0f}")
+    print(f"Текущий год: {current_year}")
+    print(f"Курс EUR/RUB: {eur_to_rub:.0f}")
     print()
 
     # Тестовые сценарии: различные комбинации цены и объёма
@@ -104,76 +98,76 @@ def analyze_optimal_age():
         ("Спорткар", 60000, 3500),
     ]
 
-    # Годы выпуска для анализа
-    years_to_test = [
-        2025,  # 0 лет (новый)
-        2024,  # 1 год
-        2023,  # 2 года
-        2022,  # 3 года (граница lt3/3_5)
-        2021,  # 4 года
-        2020,  # 5 лет (граница 3_5/gt5)
-        2019,  # 6 лет
-        2018,  # 7 лет
-        2015,  # 10 лет
-        2010,  # 15 лет
-    ]
-
     results = []
 
     for scenario_name, purchase_price_eur, engine_cc in test_scenarios:
         print("=" * 90)
         print(f"СЦЕНАРИЙ: {scenario_name}")
-        print(f"Закупочная цена: {purchase_price_eur:,} EUR ({purchase_price_eur * EUR_TO_RUB:,.0f} ₽)".replace(',', ' '))
-        print(f"Объём двигателя: {engine_cc:,} см³".replace(',', ' '))
+        print(
+            f"Закупочная цена: {_rub(purchase_price_eur)} EUR "
+            f"({_rub(purchase_price_eur * eur_to_rub)} ₽)"
+        )
+        print(f"Объём двигателя: {_rub(engine_cc)} см³")
         print("=" * 90)
         print()
 
-        print(f"{'Год':<8} {'Возраст':<10} {'Категория':<12} {'Пошлина EUR':<15} {'Пошлина RUB':<20} {'% от цены':<12}")
+        print(
+            f"{'Год':<8} {'Возраст':<10} {'Категория':<12} "
+            f"{'Пошлина EUR':<15} {'Пошлина RUB':<20} {'% от цены':<12}"
+        )
         print("-" * 90)
 
+        duties_rub, categories = duty_grid(purchase_price_eur, np.array(engine_cc), years)
         scenario_results = []
 
-        for year in years_to_test:
-            age = CURRENT_YEAR - year
-            age_category = calculate_age_category(year)
-
-            # Расчёт пошлины в зависимости от категории
-            if age_category == 'lt3':
-                duty_eur = calculate_duty_lt3(purchase_price_eur, engine_cc, duties)
-            else:
-                duty_eur = calculate_duty_3_5_or_gt5(engine_cc, age_category, duties)
-
-            duty_rub = duty_eur * EUR_TO_RUB
+        for age, year, duty_rub, code in zip(
+            AGES_TO_TEST, years, duties_rub, categories, strict=True
+        ):
+            age_category = AGE_CATEGORY_CODES[code]
+            duty_eur = duty_rub / eur_to_rub
             duty_percent = (duty_eur / purchase_price_eur) * 100
 
-            # Форматирование для вывода
-            age_label = f"{age} {'год' if age == 1 else 'года' if age < 5 else 'лет'}"
-
-            print(f"{year:<8} {age_label:<10} {age_category:<12} {duty_eur:>13,.0f} {duty_rub:>18,.0f} ₽ {duty_percent:>10.1f}%".replace(',', ' '))
-
-            scenario_results.append({
-                'scenario': scenario_name,
-                'year': year,
-                'age': age,
-                'age_category': age_category,
-                'purchase_price_eur': purchase_price_eur,
-                'engine_cc': engine_cc,
-                'duty_eur': duty_eur,
-                'duty_rub': duty_rub,
-                'duty_percent': duty_percent
-            })
+            print(
+                f"{year:<8} {_age_label(age):<10} {age_category:<12} {_rub(duty_eur):>13} "
+                f"{_rub(duty_rub):>18} ₽ {duty_percent:>10.1f}%"
+            )
+
+            scenario_results.append(
+                {
+                    "scenario": scenario_name,
+                    "year": int(year),
+                    "age": age,
+                    "age_category": age_category,
+                    "purchase_price_eur": purchase_price_eur,
+                    "engine_cc": engine_cc,
+                    "duty_eur": duty_eur,
+                    "duty_rub": duty_rub,
+                    "duty_percent": duty_percent,
+                }
+            )
 
         results.extend(scenario_results)
 
         # Найти минимальную пошлину для этого сценария
-        min_duty = min(scenario_results, key=lambda x: x['duty_eur'])
-        max_duty = max(scenario_results, key=lambda x: x['duty_eur'])
+        min_duty = min(scenario_results, key=lambda x: x["duty_eur"])
+        max_duty = max(scenario_results, key=lambda x: x["duty_eur"])
 
         print()
         print(f"📊 АНАЛИЗ ДЛЯ {scenario_name.upper()}:")
-        print(f"   Минимальная пошлина: {min_duty['duty_rub']:,.0f} ₽ ({min_duty['duty_percent']:.1f}%) при возрасте {min_duty['age']} лет (год {min_duty['year']})".replace(',', ' '))
-        print(f"   Максимальная пошлина: {max_duty['duty_rub']:,.0f} ₽ ({max_duty['duty_percent']:.1f}%) при возрасте {max_duty['age']} лет (год {max_duty['year']})".replace(',', ' '))
-        print(f"   Разница: {(max_duty['duty_rub'] - min_duty['duty_rub']):,.0f} ₽ ({((max_duty['duty_percent'] - min_duty['duty_percent'])):.1f} п.п.)".replace(',', ' '))
+        print(
+            f"   Минимальная пошлина: {_rub(min_duty['duty_rub'])} ₽ "
+            f"({min_duty['duty_percent']:.1f}%) при возрасте {min_duty['age']} лет "
+            f"(год {min_duty['year']})"
+        )
+        print(
+            f"   Максимальная пошлина: {_rub(max_duty['duty_rub'])} ₽ "
+            f"({max_duty['duty_percent']:.1f}%) при возрасте {max_duty['age']} лет "
+            f"(год {max_duty['year']})"
+        )
+        print(
+            f"   Разница: {_rub(max_duty['duty_rub'] - min_duty['duty_rub'])} ₽ "
+            f"({(max_duty['duty_percent'] - min_duty['duty_percent']):.1f} п.п.)"
+        )
         print()
 
     # СВОДНЫЙ АНАЛИЗ
@@ -183,22 +177,16 @@ def analyze_optimal_age():
     print()
 
     # Группировка по категориям возраста
-    for age_cat in ['lt3', '3_5', 'gt5']:
-        cat_results = [r for r in results if r['age_category'] == age_cat]
+    for age_cat in AGE_CATEGORY_CODES:
+        cat_results = [r for r in results if r["age_category"] == age_cat]
         if not cat_results:
             continue
 
-        avg_duty_percent = sum(r['duty_percent'] for r in cat_results) / len(cat_results)
-        min_duty = min(cat_results, key=lambda x: x['duty_percent'])
-        max_duty = max(cat_results, key=lambda x: x['duty_percent'])
-
-        age_label = {
-            'lt3': '≤ 3 лет (новые и свежие)',
-            '3_5': '3-5 лет (средний возраст)',
-            'gt5': '> 5 лет (старые)'
-        }[age_cat]
+        avg_duty_percent = sum(r["duty_percent"] for r in cat_results) / len(cat_results)
+        min_duty = min(cat_results, key=lambda x: x["duty_percent"])
+        max_duty = max(cat_results, key=lambda x: x["duty_percent"])
 
-        print(f"📌 {age_label}:")
+        print(f"📌 {AGE_LABELS[age_cat]}:")
         print(f"   Средняя доля пошлины: {avg_duty_percent:.1f}% от цены")
         print(f"   Диапазон: {min_duty['duty_percent']:.1f}% - {max_duty['duty_percent']:.1f}%")
         print()
@@ -213,35 +201,34 @@ def analyze_optimal_age():
     print("1️⃣ ПО ОБЪЁМУ ДВИГАТЕЛЯ:")
     print()
 
-    for engine_label, engine_cc in [("≤ 1000 см³ (малолитражка)", 1000),
-                                      ("1001-1500 см³ (компакт)", 1500),
-                                      ("1501-1800 см³ (средний)", 1800),
-                                      ("1801-2300 см³ (крупный)", 2300),
-                                      ("2301-3000 см³ (премиум)", 3000),
-                                      ("> 3000 см³ (большой)", 3500)]:
+    engine_bands = [
+        ("≤ 1000 см³ (малолитражка)", 1000),
+        ("1001-1500 см³ (компакт)", 1500),
+        ("1501-1800 см³ (средний)", 1800),
+        ("1801-2300 см³ (крупный)", 2300),
+        ("2301-3000 см³ (премиум)", 3000),
+        ("> 3000 см³ (большой)", 3500),
+    ]
+    # Типичная цена (15 000 EUR); по одному году на категорию возраста
+    typical_price = 15000
+    category_years = np.array([current_year - 1, current_year - 4, current_year - 7])
+    ccs = np.array([cc for _, cc in engine_bands])
+    duties_rub, categories = duty_grid(typical_price, ccs[:, None], category_years[None, :])
 
+    for row, (engine_label, _) in enumerate(engine_bands):
         print(f"   {engine_label}:")
 
-        # Расчёт пошлины для типичной цены (15,000 EUR)
-        typical_price = 15000
-
-        for age_cat in ['lt3', '3_5', 'gt5']:
-            if age_cat == 'lt3':
-                duty = calculate_duty_lt3(typical_price, engine_cc, duties)
-            else:
-                duty = calculate_duty_3_5_or_gt5(engine_cc, age_cat, duties)
-
+        for col in range(len(category_years)):
+            age_cat = AGE_CATEGORY_CODES[categories[row, col]]
+            duty = duties_rub[row, col] / eur_to_rub
             duty_percent = (duty / typical_price) * 100
 
-            age_label_short = {
-                'lt3': '≤3 лет',
-                '3_5': '3-5 лет',
-                'gt5': '>5 лет'
-            }[age_cat]
-
             status = "✅" if duty_percent < 30 else "⚠️" if duty_percent < 50 else "🔴"
 
-            print(f"      {age_label_short:8} → {duty:>8,.0f} EUR ({duty_percent:>5.1f}%) {status}".replace(',', ' '))
+            print(
+                f"      {AGE_LABELS_SHORT[age_cat]:8} → {_rub(duty):>8} EUR "
+                f"({duty_percent:>5.1f}%) {status}"
+            )
 
         print()
 
@@ -293,6 +280,6 @@ def analyze_optimal_age():
 
     print("=" * 90)
 
+
 if __name__ == "__main__":
     analyze_optimal_age()
-
@@ -9,78 +9,78 @@
 - Утильсбор > 50% закупочной цены = ВЫСОКИЙ
 - Утильсбор > 100% закупочной цены = ЗАПРЕТИТЕЛЬНЫЙ
 - Утильсбор > 200% закупочной цены = ЭКСТРЕМАЛЬНЫЙ
+
+Утильсбор считается движком (`calculate_grid`) по таблице
+`utilization_m1_personal` из config/rates.yml - одной сеткой
+объём x мощность x возраст, теми же формулами, что и /api/calculate.
+Требует numpy: `poetry install --extras analysis`.
 """
 
-import yaml
-from decimal import Decimal
-from typing import Dict, List, Tuple
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+from app.calculation.engine import resolve_context
+from app.calculation.vectorized import calculate_grid
+from app.core.clock import utc_year
+from app.core.settings import get_configs
+
 
 # Конвертация кВт в л.с.
 KW_TO_HP = 1.35962
 
-# Базовая ставка утильсбора
-BASE_RATE_RUB = 20_000
-
 # Типичные закупочные цены для анализа (в рублях)
 TYPICAL_PRICES = {
-    "бюджетный": 500_000,      # ~5,000 USD
-    "средний": 1_500_000,      # ~15,000 USD
-    "премиум": 3_000_000,      # ~30,000 USD
-    "люкс": 6_000_000,         # ~60,000 USD
+    "бюджетный": 500_000,  # ~5,000 USD
+    "средний": 1_500_000,  # ~15,000 USD
+    "премиум": 3_000_000,  # ~30,000 USD
+    "люкс": 6_000_000,  # ~60,000 USD
 }
 
-def load_utilization_table():
-    """Загрузка таблицы утилизационного сбора из YAML"""
-    with open('/Users/admin/PycharmProjects/car_calculator/config/utilization_2025.yml', 'r', encoding='utf-8') as f:
-        data = yaml.safe_load(f)
-    return data['utilization_m1_personal']
-
-def find_coefficient(volume_cc: int, power_kw: float, age_lt3: bool, table: dict) -> float:
-    """
-    Найти коэффициент утилизационного сбора для заданных параметров.
-
-    Args:
-        volume_cc: Объём двигателя в см³
-        power_kw: Мощность в кВт
-        age_lt3: True если авто < 3 лет, False если >= 3 лет
-        table: Данные из utilization_2025.yml
-
-    Returns:
-        Коэффициент утилизационного сбора
-    """
-    # Найти диапазон объёма
-    volume_band = None
-    for band in table['volume_bands']:
-        vol_min, vol_max = band['volume_range']
-        if vol_min <= volume_cc <= vol_max:
-            volume_band = band
-            break
-
-    if not volume_band:
-        # Если не нашли, используем последний диапазон (> 3500 см³)
-        volume_band = table['volume_bands'][-1]
-
-    # Найти брэкет мощности
-    coefficient_key = 'coefficient_lt3' if age_lt3 else 'coefficient_gt3'
-
-    for bracket in volume_band['power_brackets']:
-        power_max = bracket.get('power_kw_max')
-        if power_max is None or power_kw <= power_max:
-            return bracket[coefficient_key]
-
-    # Если не нашли, используем последний брэкет
-    return volume_band['power_brackets'][-1][coefficient_key]
-
-def analyze_prohibitive_power():
-    """Анализ запретительных значений мощности"""
+# Цена и страна на утильсбор не влияют
+COUNTRY, CURRENCY, PURCHASE_PRICE = "japan", "JPY", 2_500_000
+
+
+def _rub(value: float) -> str:
+    return f"{value:,.0f}".replace(",", " ")
+
 
+def load_utilization_table() -> dict[str, Any]:
+    """Таблица утилизационного сбора, по которой считает движок"""
+    table: dict[str, Any] = get_configs().rates["utilization_m1_personal"]
+    return table
+
+
+def utilization_grid(volumes: np.ndarray, powers_hp: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Утильсбор (RUB) для авто < 3 лет и >= 3 лет на сетке (объём x мощность)."""
+    current_year = utc_year()
+    ctx = resolve_context(rates_conf=get_configs().rates)  # без live-курсов ЦБ
+    res = calculate_grid(
+        COUNTRY,
+        CURRENCY,
+        # Ось возраста: 1 год (lt3) и 4 года (3_5, коэффициент gt3)
+        year=np.array([current_year - 1, current_year - 4])[None, None, :],
+        engine_cc=volumes[:, None, None],
+        engine_power_hp=powers_hp[None, :, None],
+        purchase_price=PURCHASE_PRICE,
+        ctx=ctx,
+    )
+    fees = res.utilization_fee_rub.astype(float)
+    return fees[..., 0], fees[..., 1]
+
+
+def analyze_prohibitive_power() -> None:
+    """Анализ запретительных значений мощности"""
     table = load_utilization_table()
+    base_rate_rub = float(table["base_rate_rub"])
 
     print("=" * 80)
     print("АНАЛИЗ ЗАПРЕТИТЕЛЬНЫХ КОЭФФИЦИЕНТОВ УТИЛИЗАЦИОННОГО СБОРА")
     print("=" * 80)
     print()
-    print(f"Базовая ставка утильсбора: {BASE_RATE_RUB:,} ₽".replace(',', ' '))
+    print(f"Базовая ставка утильсбора: {_rub(base_rate_rub)} ₽")
     print()
 
     # Диапазоны объёмов для анализа
@@ -92,28 +92,33 @@ def analyze_prohibitive_power():
     ]
 
     # Диапазоны мощности для тестирования (в л.с.)
-    power_hp_tests = list(range(50, 551, 50))  # От 50 до 550 л.с. с шагом 50
+    power_hp_tests = np.arange(50, 551, 50)  # От 50 до 550 л.с. с шагом 50
+
+    volumes = np.array([volume_cc for volume_cc, _ in volume_ranges])
+    fees_lt3, fees_gt3 = utilization_grid(volumes, power_hp_tests)
 
     results = []
 
-    for volume_cc, volume_label in volume_ranges:
+    for row, (volume_cc, volume_label) in enumerate(volume_ranges):
         print(f"\n{'=' * 80}")
         print(f"ОБЪЁМ ДВИГАТЕЛЯ: {volume_label}")
         print(f"{'=' * 80}\n")
 
-        print(f"{'Мощность':<15} {'Утильсбор':<20} {'Коэфф. <3л':<12} {'Коэфф. >=3л':<12} {'Статус':<20}")
+        print(
+            f"{'Мощность':<15} {'Утильсбор':<20} {'Коэфф. <3л':<12} "
+            f"{'Коэфф. >=3л':<12} {'Статус':<20}"
+        )
         print("-" * 80)
 
-        for power_hp in power_hp_tests:
+        for col, power_hp in enumerate(power_hp_tests):
             power_kw = power_hp / KW_TO_HP
 
-            # Получить коэффициенты для обоих возрастов
-            coef_lt3 = find_coefficient(volume_cc, power_kw, True, table)
-            coef_gt3 = find_coefficient(volume_cc, power_kw, False, table)
+            # Коэффициенты для обоих возрастов (сбор / базовая ставка)
+            coef_lt3 = round(fees_lt3[row, col] / base_rate_rub, 2)
+            coef_gt3 = round(fees_gt3[row, col] / base_rate_rub, 2)
 
-            # Рассчитать утильсбор (используем максимальный коэффициент)
-            coef_max = max(coef_lt3, coef_gt3)
-            utilization_fee = BASE_RATE_RUB * coef_max
+            # Утильсбор по максимальному коэффициенту
+            utilization_fee = max(fees_lt3[row, col], fees_gt3[row, col])
 
             # Определить статус запретительности
             status = "✅ Нормальный"
@@ -126,33 +131,35 @@ def analyze_prohibitive_power():
                     status = f"🔴 ЭКСТРЕМАЛЬНЫЙ ({ratio:.0f}% от {price_category})"
                     is_prohibitive = True
                     break
-                elif ratio > 100:
+                if ratio > 100:
                     status = f"🟠 ЗАПРЕТИТЕЛЬНЫЙ ({ratio:.0f}% от {price_category})"
                     is_prohibitive = True
                     break
-                elif ratio > 50:
+                if ratio > 50:
                     status = f"🟡 ВЫСОКИЙ ({ratio:.0f}% от {price_category})"
                     is_prohibitive = True
                     break
 
             print(f"{power_hp} л.с. ({power_kw:.1f} кВт)".ljust(15), end=" ")
-            print(f"{utilization_fee:,.0f} ₽".replace(',', ' ').ljust(20), end=" ")
+            print(f"{_rub(utilization_fee)} ₽".ljust(20), end=" ")
             print(f"{coef_lt3}".ljust(12), end=" ")
             print(f"{coef_gt3}".ljust(12), end=" ")
             print(status)
 
             # Сохранить критические точки
             if is_prohibitive:
-                results.append({
-                    'volume_cc': volume_cc,
-                    'volume_label': volume_label,
-                    'power_hp': power_hp,
-                    'power_kw': power_kw,
-                    'coef_lt3': coef_lt3,
-                    'coef_gt3': coef_gt3,
-                    'utilization_fee': utilization_fee,
-                    'status': status
-                })
+                results.append(
+                    {
+                        "volume_cc": volume_cc,
+                        "volume_label": volume_label,
+                        "power_hp": int(power_hp),
+                        "power_kw": power_kw,
+                        "coef_lt3": coef_lt3,
+                        "coef_gt3": coef_gt3,
+                        "utilization_fee": utilization_fee,
+                        "status": status,
+                    }
+                )
 
     # Сводка критических точек
     print("\n" + "=" * 80)
@@ -164,15 +171,15 @@ def analyze_prohibitive_power():
         # Группировка по объёму
         current_volume = None
         for r in results:
-            if r['volume_cc'] != current_volume:
-                current_volume = r['volume_cc']
+            if r["volume_cc"] != current_volume:
+                current_volume = r["volume_cc"]
                 print(f"\n{r['volume_label']}:")
                 print("-" * 80)
 
             # Показать только первую запретительную точку для каждого объёма
-            if "ЗАПРЕТИТЕЛЬНЫЙ" in r['status'] or "ЭКСТРЕМАЛЬНЫЙ" in r['status']:
+            if "ЗАПРЕТИТЕЛЬНЫЙ" in r["status"] or "ЭКСТРЕМАЛЬНЫЙ" in r["status"]:
                 print(f"  ⚠️  При {r['power_hp']} л.с. ({r['power_kw']:.1f} кВт):")
-                print(f"      Утильсбор: {r['utilization_fee']:,.0f} ₽".replace(',', ' '))
+                print(f"      Утильсбор: {_rub(r['utilization_fee'])} ₽")
                 print(f"      Коэффициенты: {r['coef_lt3']} (<3 лет) / {r['coef_gt3']} (>=3 лет)")
                 print(f"      Статус: {r['status']}")
                 break  # Показать только первую критическую точку
@@ -186,43 +193,43 @@ def analyze_prohibitive_power():
     print()
 
     max_coefs = []
-    for band in table['volume_bands']:
-        vol_min, vol_max = band['volume_range']
+    for band in table["volume_bands"]:
+        vol_min, vol_max = band["volume_range"]
         vol_label = f"{vol_min}-{vol_max if vol_max < 999999 else '∞'} см³"
 
-        last_bracket = band['power_brackets'][-1]
-        power_threshold_kw = last_bracket.get('power_kw_max', 367.76)
+        last_bracket = band["power_brackets"][-1]
+        power_threshold_kw = last_bracket.get("power_kw_max", 367.76)
         power_threshold_hp = power_threshold_kw * KW_TO_HP if power_threshold_kw else 500
 
-        coef_lt3 = last_bracket['coefficient_lt3']
-        coef_gt3 = last_bracket['coefficient_gt3']
-
-        max_fee_lt3 = BASE_RATE_RUB * coef_lt3
-        max_fee_gt3 = BASE_RATE_RUB * coef_gt3
+        coef_lt3 = last_bracket["coefficient_lt3"]
+        coef_gt3 = last_bracket["coefficient_gt3"]
 
-        max_coefs.append({
-            'volume': vol_label,
-            'power_threshold_hp': power_threshold_hp,
-            'coef_lt3': coef_lt3,
-            'coef_gt3': coef_gt3,
-            'fee_lt3': max_fee_lt3,
-            'fee_gt3': max_fee_gt3
-        })
+        max_coefs.append(
+            {
+                "volume": vol_label,
+                "power_threshold_hp": power_threshold_hp,
+                "coef_lt3": coef_lt3,
+                "coef_gt3": coef_gt3,
+                "fee_lt3": base_rate_rub * coef_lt3,
+                "fee_gt3": base_rate_rub * coef_gt3,
+            }
+        )
 
     for mc in max_coefs:
         print(f"{mc['volume']:20} | Мощность >= {mc['power_threshold_hp']:.0f} л.с.")
         print(f"  Коэффициенты: {mc['coef_lt3']} (<3 лет) / {mc['coef_gt3']} (>=3 лет)")
-        print(f"  Утильсбор: {mc['fee_lt3']:,.0f} ₽ / {mc['fee_gt3']:,.0f} ₽".replace(',', ' '))
+        print(f"  Утильсбор: {_rub(mc['fee_lt3'])} ₽ / {_rub(mc['fee_gt3'])} ₽")
 
         # Оценка запретительности для типичных цен
         for price_category, price_rub in TYPICAL_PRICES.items():
-            ratio_lt3 = (mc['fee_lt3'] / price_rub) * 100
-            ratio_gt3 = (mc['fee_gt3'] / price_rub) * 100
+            ratio_gt3 = (mc["fee_gt3"] / price_rub) * 100
 
             if ratio_gt3 > 100:
-                print(f"    🔴 ЗАПРЕТИТЕЛЬНЫЙ для {price_category} авто (>= 3 лет): {ratio_gt3:.0f}%")
+                print(
+                    f"    🔴 ЗАПРЕТИТЕЛЬНЫЙ для {price_category} авто (>= 3 лет): {ratio_gt3:.0f}%"
+                )
                 break
-            elif ratio_gt3 > 50:
+            if ratio_gt3 > 50:
                 print(f"    🟡 ВЫСОКИЙ для {price_category} авто (>= 3 лет): {ratio_gt3:.0f}%")
                 break
         print()
@@ -250,6 +257,6 @@ def analyze_prohibitive_power():
     print()
     print("=" * 80)
 
+
 if __name__ == "__main__":
     analyze_prohibitive_power()
-
@@ -0,0 +1,108 @@
+"""Request bodies validated straight from the raw JSON bytes.
+
+FastAPI's body parameters go JSON -> `json.loads` -> dict -> model. For the
+calculation endpoints the body is read as bytes and validated with
+`model_validate_json`, one pydantic-core pass with no intermediate dict.
+Errors keep FastAPI's shape (422, `loc` starting with "body"), and
+`json_body_openapi()` keeps the request schema in the OpenAPI document.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Any
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+
+if TYPE_CHECKING:
+    from fastapi import Request
+
+
+def _body_error(ve: ValidationError, body: bytes) -> RequestValidationError:
+    errors = ve.errors(include_url=False)
+    return RequestValidationError([{**e, "loc": ("body", *e["loc"])} for e in errors], body=body)
+
+
+def _json_decode_error(body: bytes) -> RequestValidationError | None:
+    """FastAPI's error for a body `json.loads` rejects (None if it parses)."""
+    try:
+        json.loads(body)
+    except json.JSONDecodeError as e:
+        return RequestValidationError(
+            [
+                {
+                    "type": "json_invalid",
+                    "loc": ("body", e.pos),
+                    "msg": "JSON decode error",
+                    "input": {},
+                    "ctx": {"error": e.msg},
+                }
+            ],
+            body=e.doc,
+        )
+    return None
+
+
+async def _read_body(request: Request, max_bytes: int | None) -> bytes:
+    """The raw body; 413 as soon as it exceeds `max_bytes`, before it is parsed."""
+    if max_bytes is None:
+        return await request.body()
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise _too_large(max_bytes)
+    chunks: list[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise _too_large(max_bytes)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Request body too large (max {max_bytes} bytes)")
+
+
+async def read_model[ModelT: BaseModel](
+    request: Request, model: type[ModelT], *, max_bytes: int | None = None
+) -> ModelT:
+    """Validate the request body against `model`; 422 like a FastAPI body parameter.
+
+    With `max_bytes` a larger body is rejected with 413 while it is still being read.
+    """
+    body = await _read_body(request, max_bytes)
+    if not body:
+        raise RequestValidationError(
+            [{"type": "missing", "loc": ("body",), "msg": "Field required", "input": None}]
+        )
+    try:
+        return model.model_validate_json(body)
+    except ValidationError as ve:
+        if ve.errors()[0]["type"] != "json_invalid":
+            raise _body_error(ve, body) from None
+    # Rare: let the stdlib decoder report (or accept) what pydantic-core rejected
+    error = _json_decode_error(body)
+    if error is not None:
+        raise error
+    try:
+        return model.model_validate(json.loads(body))
+    except ValidationError as ve:
+        raise _body_error(ve, body) from None
+
+
+def json_body_openapi(model: type[BaseModel]) -> dict[str, Any]:
+    """`openapi_extra` documenting `model` as the required JSON request body."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": model.model_json_schema(ref_template="#/components/schemas/{model}")
+                }
+            },
+        }
+    }
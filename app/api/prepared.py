@@ -0,0 +1,148 @@
+"""Ready-to-send bodies for read-mostly endpoints (`/api/rates`, `/api/meta`).
+
+The WebApp fetches both on every open, and their content only changes with
+the config version, the rates version or the allowed countries. A payload is
+built once per such key and kept as encoded JSON plus its gzip form with a
+strong ETag (sha256 of the JSON). Later requests reuse the bytes, and a
+client that sends the current ETag in `If-None-Match` gets `304 Not Modified`
+with no body.
+
+`Cache-Control: no-cache` makes browsers revalidate on every open, so a new
+config or rates version is picked up right away.
+
+`model_response()` is the per-request counterpart for computed results
+(`/api/calculate`): the model is serialized once, straight to JSON bytes.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import gzip
+import hashlib
+import json
+from threading import Lock
+from typing import TYPE_CHECKING, Any
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from pydantic_core import to_json
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable
+
+    from fastapi import Request
+    from pydantic import BaseModel
+
+
+PREPARED_KEEP = 16
+GZIP_LEVEL = 6
+CACHE_CONTROL = "no-cache"
+
+
+def _etag_matches(header: str | None, etags: tuple[str, ...]) -> bool:
+    """`If-None-Match` check (weak comparison, as RFC 9110 prescribes for it)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+def _accepts_gzip(header: str | None) -> bool:
+    for part in (header or "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip() in {"gzip", "*"}:
+            return params.replace(" ", "") not in {"q=0", "q=0.0", "q=0.00", "q=0.000"}
+    return False
+
+
+@dataclass(frozen=True, slots=True)
+class PreparedResponse:
+    body: bytes
+    gzip_body: bytes
+    etag: str
+
+    @property
+    def gzip_etag(self) -> str:
+        # Another representation of the same content: a different strong ETag
+        return self.etag[:-1] + '-gzip"'
+
+    def to_response(self, request: Request) -> Response:
+        """200 with the (possibly gzipped) body, or 304 if the client has it."""
+        gzipped = _accepts_gzip(request.headers.get("accept-encoding"))
+        headers = {
+            "ETag": self.gzip_etag if gzipped else self.etag,
+            "Cache-Control": CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if _etag_matches(request.headers.get("if-none-match"), (self.etag, self.gzip_etag)):
+            return Response(status_code=304, headers=headers)
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzip_body, media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+def model_response(model: BaseModel) -> Response:
+    """JSON bytes of an already validated model in one pydantic-core pass.
+
+    Returning a `Response` bypasses FastAPI's `response_model` round trip
+    (re-validation of the engine's result, dump to Python objects, `json.dumps`).
+    The bytes are the same; `response_model` on the route still documents the schema.
+    """
+    return Response(to_json(model), media_type="application/json")
+
+
+def prepare(payload: dict[str, Any]) -> PreparedResponse:
+    """Encode like `JSONResponse` once; compress and hash the result."""
+    body = json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+    return PreparedResponse(
+        body=body,
+        gzip_body=gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+    )
+
+
+@dataclass
+class PreparedPayloads:
+    """Prepared responses by (endpoint, version key); the oldest are evicted."""
+
+    keep: int = PREPARED_KEEP
+    hits: int = field(default=0, init=False)
+    builds: int = field(default=0, init=False)
+    _entries: OrderedDict[Hashable, PreparedResponse] = field(
+        default_factory=OrderedDict, init=False
+    )
+    _lock: Lock = field(default_factory=Lock, init=False)
+
+    def get(self, key: Hashable, build: Callable[[], dict[str, Any]]) -> PreparedResponse:
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return prepared
+        # Built outside the lock: concurrent misses build the same bytes
+        prepared = prepare(build())
+        with self._lock:
+            self.builds += 1
+            self._entries[key] = prepared
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.keep:
+                self._entries.popitem(last=False)
+        return prepared
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "builds": self.builds}
+
+
+prepared_payloads = PreparedPayloads()
@@ -0,0 +1,346 @@
+"""Per-client token buckets for the calculation endpoints.
+
+Each (route budget, client IP) pair owns a bucket of `per_minute` tokens
+refilled continuously at `per_minute / 60` per second; a request takes one
+token. Updates are O(1) and an idle bucket is dropped once it is full
+again, since a full bucket means the same as no bucket:
+
+* `MemoryBuckets` (default) - per process; buckets sit on a one-second time
+  wheel by the tick they become full, and each tick evicts its slot. At most
+  `RATE_LIMIT_MAX_KEYS` buckets are kept; beyond that the soonest-full
+  bucket gives way.
+* `SharedBuckets` (`RATE_LIMIT_SHARED_PATH`) - a fixed table of
+  `RATE_LIMIT_MAX_KEYS` slots in a memory-mapped file, updated under `flock`,
+  so all uvicorn workers of a host draw from the same budget. A key probes a
+  few slots; a full (expired) bucket is reused, else the stalest one. The
+  file starts with a header holding the slot count; a file of another size is
+  never resized (workers that mapped it would fault), a table of that size
+  gets its own file next to it instead.
+
+The client is the peer address, or - when the peer is a trusted proxy
+(`RATE_LIMIT_TRUSTED_PROXIES`: loopback by default, the proxy's `web` network
+in docker-compose) - the last `X-Forwarded-For` hop that is not one. A
+rejected request gets `Retry-After` with the seconds until a token is
+available.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+import hashlib
+import ipaddress
+import math
+import mmap
+import os
+from pathlib import Path
+import struct
+import time
+from typing import TYPE_CHECKING
+
+from app.core.settings import BASE_DIR, get_settings
+from app.struct_logger import logger
+
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None  # type: ignore[assignment]
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from fastapi import Request
+
+
+# Budgets are per minute: an idle bucket is full again within 60 s
+WINDOW_SECONDS = 60
+WHEEL_SLOTS = WINDOW_SECONDS + 4
+SHARED_PROBES = 8
+# magic, slot count
+SHARED_HEADER = struct.Struct("<8sQ")
+SHARED_MAGIC = b"ccratelm"
+# key hash (0 = empty slot), tokens, updated_at
+SHARED_SLOT = struct.Struct("<Qdd")
+
+IPNetwork = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+@dataclass(frozen=True, slots=True)
+class RateBudget:
+    name: str
+    path: str
+    per_minute: int
+
+    @property
+    def rate(self) -> float:
+        """Tokens per second."""
+        return self.per_minute / WINDOW_SECONDS
+
+
+@dataclass(frozen=True, slots=True)
+class RateDecision:
+    allowed: bool
+    remaining: int
+    retry_after: int = 0
+
+
+def _take(tokens: float, budget: RateBudget) -> tuple[float, RateDecision]:
+    """Spend one token from a refilled bucket; the new token count and the decision."""
+    if tokens >= 1:
+        return tokens - 1, RateDecision(allowed=True, remaining=int(tokens - 1))
+    wait = math.ceil((1 - tokens) / budget.rate)
+    return tokens, RateDecision(allowed=False, remaining=0, retry_after=max(1, wait))
+
+
+def _refill(tokens: float, updated_at: float, now: float, budget: RateBudget) -> float:
+    # A wall clock stepped backwards refills nothing
+    return min(float(budget.per_minute), tokens + max(0.0, now - updated_at) * budget.rate)
+
+
+@dataclass(slots=True)
+class _Bucket:
+    tokens: float
+    updated_at: float
+    full_at: int  # wheel tick at which the bucket is full again
+
+
+@dataclass
+class MemoryBuckets:
+    max_keys: int = 65536
+    evictions: int = field(default=0, init=False)
+    _buckets: dict[str, _Bucket] = field(default_factory=dict, init=False)
+    _wheel: list[set[str]] = field(
+        default_factory=lambda: [set() for _ in range(WHEEL_SLOTS)], init=False
+    )
+    _tick: int | None = field(default=None, init=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _advance(self, tick: int) -> None:
+        """Drop buckets that became full in the ticks since the last call."""
+        if self._tick is None:
+            self._tick = tick
+            return
+        # After a full turn every slot has been visited once
+        for t in range(max(self._tick + 1, tick - WHEEL_SLOTS + 1), tick + 1):
+            slot = self._wheel[t % WHEEL_SLOTS]
+            for key in [k for k in slot if self._buckets[k].full_at <= tick]:
+                slot.discard(key)
+                del self._buckets[key]
+        self._tick = max(self._tick, tick)
+
+    def _evict_one(self, tick: int) -> None:
+        for offset in range(WHEEL_SLOTS):
+            slot = self._wheel[(tick + offset) % WHEEL_SLOTS]
+            if slot:
+                del self._buckets[slot.pop()]
+                self.evictions += 1
+                return
+
+    def acquire(self, key: str, budget: RateBudget, now: float | None = None) -> RateDecision:
+        now = time.time() if now is None else now
+        tick = int(now)
+        self._advance(tick)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict_one(tick)
+            bucket = _Bucket(tokens=float(budget.per_minute), updated_at=now, full_at=tick)
+            self._buckets[key] = bucket
+        else:
+            self._wheel[bucket.full_at % WHEEL_SLOTS].discard(key)
+            bucket.tokens = _refill(bucket.tokens, bucket.updated_at, now, budget)
+            bucket.updated_at = now
+        bucket.tokens, decision = _take(bucket.tokens, budget)
+        refill_seconds = (budget.per_minute - bucket.tokens) / budget.rate
+        bucket.full_at = tick + min(math.ceil(refill_seconds), WINDOW_SECONDS) + 1
+        self._wheel[bucket.full_at % WHEEL_SLOTS].add(key)
+        return decision
+
+
+def _key_hash(key: str) -> int:
+    # Stable across processes (unlike hash()); 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+
+class SharedTableMismatchError(ValueError):
+    """The file at the path is not a rate limit table of the configured size."""
+
+
+@contextmanager
+def _flocked(fd: int) -> Iterator[None]:
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _open_table(path: Path, slots: int) -> int | None:
+    """Descriptor of the table file at `path`, created if empty; None if it holds another table."""
+    header = SHARED_HEADER.pack(SHARED_MAGIC, slots)
+    size = SHARED_HEADER.size + slots * SHARED_SLOT.size
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    with _flocked(fd):
+        current = os.fstat(fd).st_size
+        if current == 0:
+            os.ftruncate(fd, size)
+            os.pwrite(fd, header, 0)
+            return fd
+        if current == size and os.pread(fd, SHARED_HEADER.size, 0) == header:
+            return fd
+    os.close(fd)
+    return None
+
+
+@dataclass
+class SharedBuckets:
+    path: Path
+    slots: int = 65536
+    evictions: int = field(default=0, init=False)
+    _fd: int = field(default=-1, init=False)
+    _map: mmap.mmap = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = _open_table(self.path, self.slots)
+        if fd is None:
+            # Workers still using the old table keep it; this size gets its own file
+            alternate = self.path.with_name(f"{self.path.stem}.{self.slots}{self.path.suffix}")
+            fd = _open_table(alternate, self.slots)
+            if fd is None:
+                raise SharedTableMismatchError(str(alternate))
+            logger.warning(
+                "rate_limit_shared_size_mismatch", path=str(self.path), using=str(alternate)
+            )
+            self.path = alternate
+        self._fd = fd
+        self._map = mmap.mmap(fd, SHARED_HEADER.size + self.slots * SHARED_SLOT.size)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with _flocked(self._fd):
+            yield
+
+    def acquire(self, key: str, budget: RateBudget, now: float | None = None) -> RateDecision:
+        now = time.time() if now is None else now
+        key_hash = _key_hash(key)
+        start = key_hash % self.slots
+        table = self._map
+        with self._locked():
+            target: int | None = None
+            free: int | None = None
+            # Evicting the home slot is the last resort: a slot is always chosen
+            stalest = SHARED_HEADER.size + start * SHARED_SLOT.size
+            tokens, stalest_at = float(budget.per_minute), math.inf
+            for probe in range(SHARED_PROBES):
+                offset = SHARED_HEADER.size + (start + probe) % self.slots * SHARED_SLOT.size
+                slot_hash, slot_tokens, updated_at = SHARED_SLOT.unpack_from(table, offset)
+                if slot_hash == key_hash:
+                    target = offset
+                    tokens = _refill(slot_tokens, updated_at, now, budget)
+                    break
+                if slot_hash == 0 or now - updated_at >= WINDOW_SECONDS:
+                    # Empty, or a bucket that is full again
+                    free = offset if free is None else free
+                elif updated_at < stalest_at:
+                    stalest, stalest_at = offset, updated_at
+            if target is None:
+                target = free if free is not None else stalest
+                self.evictions += free is None
+            tokens, decision = _take(tokens, budget)
+            SHARED_SLOT.pack_into(table, target, key_hash, tokens, now)
+        return decision
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.close()
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _parse_networks(raw: str) -> tuple[IPNetwork, ...]:
+    networks = []
+    for item in raw.split(","):
+        if item.strip():
+            try:
+                networks.append(ipaddress.ip_network(item.strip(), strict=False))
+            except ValueError:
+                logger.warning("rate_limit_bad_trusted_proxy", value=item.strip())
+    return tuple(networks)
+
+
+@dataclass
+class RateLimiter:
+    budgets: tuple[RateBudget, ...]
+    buckets: MemoryBuckets | SharedBuckets
+    trusted_proxies: tuple[IPNetwork, ...] = ()
+    rejected: int = field(default=0, init=False)
+
+    @classmethod
+    def from_settings(cls) -> RateLimiter:
+        settings = get_settings()
+        budgets = tuple(
+            budget
+            for budget in (
+                # Longest prefix first
+                RateBudget("batch", "/api/calculate/batch", settings.rate_limit_batch_per_minute),
+                RateBudget("calculate", "/api/calculate", settings.rate_limit_per_minute),
+            )
+            if budget.per_minute > 0
+        )
+        buckets: MemoryBuckets | SharedBuckets = MemoryBuckets(settings.rate_limit_max_keys)
+        raw_path = settings.rate_limit_shared_path
+        if raw_path and fcntl is not None:
+            path = Path(raw_path)
+            path = path if path.is_absolute() else BASE_DIR / path
+            try:
+                buckets = SharedBuckets(path, settings.rate_limit_max_keys)
+            except (OSError, SharedTableMismatchError) as e:
+                logger.warning("rate_limit_shared_unavailable", path=str(path), error=str(e))
+        return cls(budgets, buckets, _parse_networks(settings.rate_limit_trusted_proxies))
+
+    def budget_for(self, path: str) -> RateBudget | None:
+        for budget in self.budgets:
+            if path == budget.path or path.startswith(budget.path + "/"):
+                return budget
+        return None
+
+    def _trusted(self, host: str) -> bool:
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_proxies)
+
+    def client_ip(self, request: Request) -> str:
+        peer = request.client.host if request.client else "unknown"
+        forwarded = request.headers.get("x-forwarded-for")
+        if not forwarded or not self._trusted(peer):
+            return peer
+        # Walk back from the nearest hop; the first untrusted address is the client
+        for hop in reversed([h.strip() for h in forwarded.split(",") if h.strip()]):
+            peer = hop
+            if not self._trusted(hop):
+                break
+        return peer
+
+    def check(self, request: Request) -> tuple[RateBudget, str, RateDecision] | None:
+        """Spend a token for `request`; None for routes without a budget."""
+        budget = self.budget_for(request.url.path)
+        if budget is None:
+            return None
+        ip = self.client_ip(request)
+        decision = self.buckets.acquire(f"{budget.name}|{ip}", budget)
+        if not decision.allowed:
+            self.rejected += 1
+        return budget, ip, decision
+
+    def close(self) -> None:
+        if isinstance(self.buckets, SharedBuckets):
+            with suppress(OSError):
+                self.buckets.close()
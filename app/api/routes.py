@@ -1,23 +1,63 @@
 from __future__ import annotations
 
-from datetime import UTC, datetime
+import asyncio
+from contextlib import contextmanager
+from datetime import UTC, date, datetime
+from typing import TYPE_CHECKING
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from pydantic import ValidationError
 
-from app.calculation.engine import calculate
-from app.calculation.models import CalculationRequest, CalculationResult
+from app.api.bodies import json_body_openapi, read_model
+from app.api.prepared import model_response, prepared_payloads
+from app.calculation.cache import result_cache
+from app.calculation.engine import (
+    ConfigVersionUnavailableError,
+    RatesVersionUnavailableError,
+    acalculate,
+    acalculate_many,
+)
+from app.calculation.executor import (
+    EngineDeadlineError,
+    EngineOverloadedError,
+    engine_executor,
+)
+from app.calculation.models import (
+    BatchCalculationRequest,
+    BatchCalculationResponse,
+    BatchItemError,
+    BatchItemResult,
+    CalculationRequest,
+    CalculationResult,
+)
 from app.calculation.tariff_tables import get_passing_category
-from app.core.settings import get_configs, get_settings
-from app.services.cbr import cbr_service, get_effective_rates
+from app.core.clock import utc_year
+from app.core.settings import config_versions, get_configs, get_settings
+from app.services.cbr import aget_effective_rates, cbr_service
+from app.services.cbr_archive import get_rates_archive
+from app.services.config_sync import config_sync
+from app.services.config_watcher import config_watcher
+from app.services.effective_rates import rates_versions
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from app.core.settings import ConfigRegistry
+    from app.services.effective_rates import EffectiveRates
 
 
 router = APIRouter(prefix="/api")
 
+# Body size allowed per batch item: the body is refused (413) before parsing once
+# it exceeds BATCH_MAX_ITEMS of these; a typical item is ~200 bytes
+BATCH_ITEM_MAX_BYTES = 4096
+
 
 @router.get("/health")
 async def health() -> dict[str, object]:
     cfg = get_configs()
-    effective_rates = get_effective_rates(cfg.rates)
+    effective_rates = await aget_effective_rates(cfg.rates)
     eur_rate = effective_rates.get("currencies", {}).get("EUR_RUB")
     cache_info = cbr_service.get_cache_info()
     return {
@@ -25,31 +65,137 @@ async def health() -> dict[str, object]:
         "generated_at": datetime.now(UTC).isoformat(),
         "config_hash": cfg.hash,
         "config_loaded_at": cfg.loaded_at,
+        "config_versions": [c.hash for c in config_versions()],
+        "config_watch": config_watcher.get_stats(),
+        "config_sync": config_sync.get_stats(),
         "live_source": effective_rates.get("live_source"),
         "eur_rate_rub": eur_rate,
+        "rates_version": effective_rates.version,
+        "rates_versions": rates_versions.get_stats(),
         "cbr_cache": cache_info,
+        "rates_snapshot": cbr_service.get_snapshot_info(),
+        "result_cache": result_cache.get_stats(),
+        "engine_executor": engine_executor.get_stats(),
+        "prepared_payloads": prepared_payloads.get_stats(),
     }
 
 
-@router.post("/calculate", response_model=CalculationResult)
-async def calculate_endpoint(payload: CalculationRequest) -> CalculationResult:
-    return calculate(payload)
+# Seconds a client should wait after 503 (engine executor queue full)
+ENGINE_RETRY_AFTER_SECONDS = 1
 
 
-@router.get("/rates")
-async def get_rates() -> dict[str, object]:
-    """Return current currency rates, commissions thresholds, utilization coefficients,
-    duties table and other numeric tariff data for the frontend.
-    Structure is intentionally verbose but stable for WebApp consumption.
+@contextmanager
+def _engine_errors_as_http() -> Iterator[None]:
+    """Executor back-pressure as HTTP: queue full -> 503 + Retry-After, deadline -> 504."""
+    try:
+        yield
+    except EngineOverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(ENGINE_RETRY_AFTER_SECONDS)},
+        ) from e
+    except EngineDeadlineError as e:
+        raise HTTPException(status_code=504, detail=str(e)) from e
+
+
+@router.post(
+    "/calculate",
+    response_model=CalculationResult,
+    openapi_extra=json_body_openapi(CalculationRequest),
+)
+async def calculate_endpoint(request: Request) -> Response:
+    payload = await read_model(request, CalculationRequest)
+    try:
+        with _engine_errors_as_http():
+            return model_response(await acalculate(payload))
+    except (ConfigVersionUnavailableError, RatesVersionUnavailableError) as e:
+        raise HTTPException(status_code=410, detail=str(e)) from e
+
+
+@router.post(
+    "/calculate/batch",
+    response_model=BatchCalculationResponse,
+    openapi_extra=json_body_openapi(BatchCalculationRequest),
+)
+async def calculate_batch_endpoint(request: Request) -> Response:
+    """Calculate many cars in one round trip.
+
+    Config and rates are resolved once for the whole batch. Results are returned
+    in input order; invalid items get an error entry instead of failing the batch.
     """
-    cfg = get_configs()
+    settings = get_settings()
+    payload = await read_model(
+        request,
+        BatchCalculationRequest,
+        max_bytes=settings.batch_max_items * BATCH_ITEM_MAX_BYTES,
+    )
+    if len(payload.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(payload.items)} items (max {settings.batch_max_items})",
+        )
+
+    results: list[BatchItemResult | None] = [None] * len(payload.items)
+    valid: list[tuple[int, CalculationRequest]] = []
+    for index, item in enumerate(payload.items):
+        try:
+            valid.append((index, CalculationRequest.model_validate(item)))
+        except ValidationError as ve:
+            results[index] = BatchItemResult(
+                index=index,
+                ok=False,
+                error=BatchItemError(
+                    code="validation_error",
+                    message="Request validation failed",
+                    details=[
+                        {"loc": list(e["loc"]), "msg": e["msg"], "type": e["type"]}
+                        for e in ve.errors()
+                    ],
+                ),
+            )
+
+    with _engine_errors_as_http():
+        outcomes = await acalculate_many(req for _, req in valid)
+    for (index, _), outcome in zip(valid, outcomes, strict=True):
+        if isinstance(outcome, CalculationResult):
+            results[index] = BatchItemResult(index=index, ok=True, result=outcome)
+        else:
+            results[index] = BatchItemResult(
+                index=index,
+                ok=False,
+                error=BatchItemError(code="calculation_error", message=str(outcome)),
+            )
+
+    items = [r for r in results if r is not None]
+    succeeded = sum(1 for r in items if r.ok)
+    return model_response(
+        BatchCalculationResponse(
+            count=len(items),
+            succeeded=succeeded,
+            failed=len(items) - succeeded,
+            results=items,
+        )
+    )
+
+
+# cbr_cache fields that only change together with the rates version; the live
+# cache state (ages, counters) is reported by /api/health
+RATES_CACHE_SUMMARY_KEYS = ("cached", "source", "rates_count", "ttl_seconds")
+
+
+def _allowed_countries() -> tuple[str, ...] | None:
+    countries = get_settings().countries_list
+    return tuple(sorted(set(countries))) if countries else None
+
+
+def _build_rates_payload(
+    cfg: ConfigRegistry, effective_rates: EffectiveRates, allowed: tuple[str, ...] | None
+) -> dict[str, object]:
     rates_conf = cfg.rates
     duties_conf = cfg.duties
     commissions_conf = cfg.commissions
     fees_conf = cfg.fees
-
-    settings = get_settings()
-    allowed = set(settings.countries_list) if settings.countries_list else None
     if allowed is not None:
         fees_conf = {k: v for k, v in fees_conf.items() if k in allowed}
 
@@ -61,12 +207,12 @@ async def get_rates() -> dict[str, object]:
         for t in japan_fees.get("tiers", [])
     ]
 
-    effective_rates = get_effective_rates(rates_conf)
     cache_info = cbr_service.get_cache_info()
     return {
         "generated_at": datetime.now(UTC).isoformat(),
-        "currencies": effective_rates.get("currencies", {}),
-        "live_source": effective_rates.get("live_source"),
+        "currencies": dict(effective_rates.currencies),
+        "live_source": effective_rates.live_source,
+        "rates_version": effective_rates.version,
         "commissions": commissions_conf.get("thresholds", []),
         "commissions_by_country": commissions_conf.get("by_country", {}),
         "utilization": rates_conf.get("utilization", {}),
@@ -75,14 +221,33 @@ async def get_rates() -> dict[str, object]:
         "era_glonass_rub": rates_conf.get("era_glonass_rub"),
         "japan_expense_tiers": japan_tiers,
         "countries_active": sorted(fees_conf.keys()),
-        "cbr_cache": cache_info,
+        "cbr_cache": {k: cache_info.get(k) for k in RATES_CACHE_SUMMARY_KEYS},
     }
 
 
+@router.get("/rates")
+async def get_rates(request: Request) -> Response:
+    """Return current currency rates, commissions thresholds, utilization coefficients,
+    duties table and other numeric tariff data for the frontend.
+    Structure is intentionally verbose but stable for WebApp consumption.
+
+    Built once per (config hash, rates version, allowed countries) and served as
+    prepared bytes with an ETag (`If-None-Match` -> 304).
+    """
+    cfg = get_configs()
+    effective_rates = await aget_effective_rates(cfg.rates)
+    allowed = _allowed_countries()
+    prepared = prepared_payloads.get(
+        ("rates", cfg.hash, effective_rates.version, allowed),
+        lambda: _build_rates_payload(cfg, effective_rates, allowed),
+    )
+    return prepared.to_response(request)
+
+
 @router.post("/rates/refresh")
 async def refresh_rates() -> dict[str, object]:
     """Force refresh of live CBR rates (if enabled) and return updated cache info."""
-    fetched = cbr_service.fetch_rates(force=True)
+    fetched = await cbr_service.afetch_rates(force=True)
     cache_info = cbr_service.get_cache_info()
     return {
         "refreshed_at": datetime.now(UTC).isoformat(),
@@ -91,47 +256,64 @@ async def refresh_rates() -> dict[str, object]:
     }
 
 
-@router.get("/meta")
-async def get_meta() -> dict[str, object]:
-    """
-    Метаданные калькулятора для инициализации UI.
+@router.get("/rates/at")
+async def get_rates_at(day: date = Query(alias="date")) -> dict[str, object]:
+    """Archived CBR rates in force on `date` (latest archived date on or before it)."""
+    # Topping up from the file is disk I/O: keep it off the event loop
+    archive = await asyncio.to_thread(get_rates_archive)
+    found = archive.rates_at(day)
+    if found is None:
+        raise HTTPException(status_code=404, detail="No archived rates on or before this date")
+    return {
+        "requested_date": day.isoformat(),
+        "effective_date": found.day.isoformat(),
+        "currencies": {k: str(v) for k, v in sorted(found.rates.items())},
+    }
 
-    Returns:
-        dict: Справочные данные и ограничения валидации
-            - countries: список стран с emoji и labels
-            - freight_types: типы фрахта
-            - age_categories: возрастные категории авто
-            - constraints: лимиты полей формы (NEW: engine_power_hp)
-            - conversion_factors: коэффициенты конвертации (NEW: hp_to_kw)
-            - currencies_supported: поддерживаемые валюты
 
-    Changelog:
-        - 2025-12-08: Добавлены engine_power_hp constraints и conversion_factors
-        - 2025-12-04: Добавлена страна Georgia
-    """
-    cfg = get_configs()
+@router.get("/rates/history")
+async def get_rates_history(
+    pair: str,
+    start: date,
+    end: date,
+    max_points: int | None = Query(default=None, ge=2, le=5000),
+) -> dict[str, object]:
+    """Time series of one archived rate (e.g. `USD_RUB`), optionally downsampled."""
+    if end < start:
+        raise HTTPException(status_code=422, detail="end must not be earlier than start")
+    archive = await asyncio.to_thread(get_rates_archive)
+    points = archive.series(pair.upper(), start, end, max_points)
+    return {
+        "pair": pair.upper(),
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "count": len(points),
+        "points": [{"date": d.isoformat(), "rate": str(v)} for d, v in points],
+    }
+
+
+# Country code -> (label, emoji) for the UI
+COUNTRY_LABELS: dict[str, tuple[str, str]] = {
+    "japan": ("Япония", "🇯🇵"),
+    "korea": ("Корея", "🇰🇷"),
+    "uae": ("ОАЭ", "🇦🇪"),
+    "china": ("Китай", "🇨🇳"),
+    "georgia": ("Грузия", "🇬🇪"),
+}
+
+
+def _build_meta_payload(
+    cfg: ConfigRegistry, allowed: tuple[str, ...] | None, current_year: int
+) -> dict[str, object]:
     fees_conf = cfg.fees
     rates_conf = cfg.rates
-
-    settings = get_settings()
-    allowed = set(settings.countries_list) if settings.countries_list else None
     if allowed is not None:
         fees_conf = {k: v for k, v in fees_conf.items() if k in allowed}
 
-    current_year = datetime.now(UTC).year
-
     # Collect countries meta
-    country_labels: dict[str, tuple[str, str]] = {
-        "japan": ("Япония", "🇯🇵"),
-        "korea": ("Корея", "🇰🇷"),
-        "uae": ("ОАЭ", "🇦🇪"),
-        "china": ("Китай", "🇨🇳"),
-        "georgia": ("Грузия", "🇬🇪"),
-    }
-
     countries: list[dict[str, object]] = []
     for code, data in fees_conf.items():
-        label, emoji = country_labels.get(code, (code.title(), ""))
+        label, emoji = COUNTRY_LABELS.get(code, (code.title(), ""))
         freight_types = list((data.get("freight") or {}).keys())
         if not freight_types:
             # Provide at least one placeholder if absent
@@ -165,15 +347,15 @@ async def get_meta() -> dict[str, object]:
         "min_year": 1990,
         "max_year": current_year,
         "max_engine_cc": 10000,
-        "engine_power_hp_min": 1,       # NEW: Синхронизировано с models.py Field(gt=0)
-        "engine_power_hp_max": 1500,    # NEW: Синхронизировано с models.py Field(le=1500)
+        "engine_power_hp_min": 1,       # NEW: Как в models.py Field(gt=0)
+        "engine_power_hp_max": 1500,    # NEW: Как в models.py Field(le=1500)
         "purchase_price_min": 1000,
         "purchase_price_max": 100000000,
     }
 
     conversion_factors = {
-        "hp_to_kw": 0.7355,    # NEW: Коэффициент конвертации л.с. → кВт
-        "kw_to_hp": 1.35962,   # NEW: Обратная конвертация кВт → л.с.
+        "hp_to_kw": 0.7355,    # NEW: Коэффициент конвертации hp → кВт
+        "kw_to_hp": 1.35962,   # NEW: Обратная конвертация кВт → hp
     }
 
     notes = [
@@ -193,3 +375,34 @@ async def get_meta() -> dict[str, object]:
         "conversion_factors": conversion_factors,  # NEW
         "notes": notes,
     }
+
+
+@router.get("/meta")
+async def get_meta(request: Request) -> Response:
+    """
+    Метаданные калькулятора для инициализации UI.
+
+    Returns:
+        dict: Справочные данные и ограничения валидации
+            - countries: список стран (emoji и labels)
+            - freight_types: типы фрахта
+            - age_categories: возрастные категории авто
+            - constraints: лимиты полей формы (NEW: engine_power_hp)
+            - conversion_factors: коэффициенты конвертации (NEW: hp_to_kw)
+            - currencies_supported: поддерживаемые валюты
+
+    Собирается один раз на (config hash, allowed countries, текущий год);
+    ответ - готовые байты и ETag (`If-None-Match` -> 304).
+
+    Changelog:
+        - 2025-12-08: Добавлены engine_power_hp constraints и conversion_factors
+        - 2025-12-04: Добавлена страна Georgia
+    """
+    cfg = get_configs()
+    allowed = _allowed_countries()
+    current_year = utc_year()
+    prepared = prepared_payloads.get(
+        ("meta", cfg.hash, allowed, current_year),
+        lambda: _build_meta_payload(cfg, allowed, current_year),
+    )
+    return prepared.to_response(request)
@@ -12,8 +12,11 @@
 Команды:
 - /get_{config}: Скачать файл
 - /set_{config}: Загрузить новый файл (с FSM и валидацией)
+- /confirm: Заменить конфиг загруженным файлом (после сводки влияния)
 - /reload_configs: Перезагрузить все конфиги в памяти
-- /cancel: Прервать текущую операцию загрузки
+- /config_versions: Версии конфигов, сохранённые в памяти
+- /rollback_config [hash]: Мгновенный откат на одну из них
+- /cancel: Прервать текущую операцию загрузки (неподтверждённый файл удаляется)
 
 Безопасность:
 - Доступ только для администраторов (через middleware)
@@ -33,7 +36,6 @@ from __future__ import annotations
 import asyncio
 from datetime import UTC, datetime
 from enum import Enum
-import hashlib
 import html
 from pathlib import Path
 import shutil
@@ -45,12 +47,29 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import Document, FSInputFile, Message
 import yaml
 
-from app.core.settings import _dict_hash, _read_yaml, get_configs, reload_configs
+from app.bot.keyboards import confirm_upload_menu, remove_menu
+from app.calculation.compiled import ConfigSchemaError, validate_tariffs
+from app.core.config_diff import config_file_cache, diff_values
+from app.core.settings import (
+    CONFIG_SECTIONS,
+    ConfigRegistry,
+    config_files_hash,
+    config_versions,
+    get_configs,
+    get_settings,
+    reload_configs,
+    rollback_configs,
+)
+from app.services.config_impact import analyze_config_change
+from app.services.config_sync import config_sync
+from app.struct_logger import logger
 
 
 if TYPE_CHECKING:
     from aiogram.fsm.context import FSMContext
 
+    from app.core.config_diff import ParsedFile
+
 
 # ============================================================================
 # CONSTANTS
@@ -61,6 +80,11 @@ CONFIG_DIR = Path("config")
 MAX_CONFIG_SIZE_MB = 1
 MAX_CONFIG_SIZE_BYTES = MAX_CONFIG_SIZE_MB * 1024 * 1024
 
+# /config_diff: длина сообщения Telegram, запас под заголовок страницы, лимит строк на файл
+TELEGRAM_MESSAGE_LIMIT = 4096
+PAGE_HEADER_RESERVE = 96
+MAX_DIFF_CHANGES = 300
+
 # Locks для предотвращения одновременной загрузки одного и того же конфига
 # Каждый тип конфига имеет свой Lock, чтобы разные конфиги можно было загружать параллельно
 _CONFIG_LOCKS: dict[ConfigFile, asyncio.Lock] = {}
@@ -111,6 +135,7 @@ class ConfigUploadStates(StatesGroup):
     waiting_for_commissions = State()
     waiting_for_rates = State()
     waiting_for_duties = State()
+    waiting_for_confirm = State()
 
 
 # ============================================================================
@@ -313,6 +338,93 @@ async def download_and_validate_config(  # noqa: PLR0911 - Multiple returns for
     return True, "", temp_path
 
 
+def paginate_lines(lines: list[str], limit: int) -> list[str]:
+    """
+    Склеить строки в страницы не длиннее `limit` символов (по границам строк).
+
+    Строка длиннее `limit` обрезается.
+    """
+    pages: list[str] = []
+    current: list[str] = []
+    size = 0
+    for raw_line in lines:
+        line = raw_line if len(raw_line) <= limit else raw_line[: limit - 1] + "…"
+        added = len(line) + (1 if current else 0)
+        if current and size + added > limit:
+            pages.append("\n".join(current))
+            current, size = [], 0
+            added = len(line)
+        current.append(line)
+        size += added
+    if current:
+        pages.append("\n".join(current))
+    return pages
+
+
+def _config_diff_lines(
+    memory_configs: ConfigRegistry, disk_files: dict[ConfigFile, ParsedFile | None]
+) -> list[str]:
+    """Строки структурного diff по каждому файлу (не больше MAX_DIFF_CHANGES на файл)."""
+    lines: list[str] = []
+    for config_type, parsed in disk_files.items():
+        filename = CONFIG_METADATA[config_type]["filename"]
+        memory = getattr(memory_configs, config_type.value)
+        changes = diff_values(memory, parsed.data if parsed is not None else {})
+        if not changes:
+            continue
+        lines.append(f"\n📄 `{filename}`: {len(changes)} change(s)")
+        lines.extend(
+            f"• {html.escape(change.describe(), quote=False)}"
+            for change in changes[:MAX_DIFF_CHANGES]
+        )
+        if len(changes) > MAX_DIFF_CHANGES:
+            lines.append(f"… and {len(changes) - MAX_DIFF_CHANGES} more")
+    if not lines:
+        lines.append("📝 Same values - only formatting or comments differ")
+    return lines
+
+
+def _load_candidate(config_type: ConfigFile, temp_path: Path) -> Any:
+    """Разобрать загруженный файл и проверить его схемой тарифов вместе с текущими."""
+    with temp_path.open(encoding="utf-8") as f:
+        candidate = yaml.safe_load(f)
+    current = get_configs()
+    sections = {name: getattr(current, name) for name in CONFIG_SECTIONS}
+    sections[config_type.value] = candidate
+    validate_tariffs(ConfigRegistry(**sections, hash="candidate", loaded_at=""))
+    return candidate
+
+
+async def summarize_config_impact(config_type: ConfigFile, temp_path: Path) -> str:
+    """
+    Сводка влияния загруженного файла на расчёты (до замены файла).
+
+    Кандидат сначала проверяется строгой схемой тарифов (в потоке: разбор YAML
+    и компиляция не блокируют event loop); затем корпус запросов пересчитывается
+    на текущих и новых конфигах.
+    Никогда не бросает исключений: анализ информирует, но не блокирует загрузку.
+    """
+    try:
+        candidate = await asyncio.to_thread(_load_candidate, config_type, temp_path)
+        report = await analyze_config_change(config_type.value, candidate)
+    except ConfigSchemaError as e:
+        return (
+            f"⚠️ **Schema check failed**, impact not analyzed:\n`{html.escape(str(e), quote=False)}`"
+        )
+    except Exception as e:
+        logger.warning("config_impact_failed", config=config_type.value, error=str(e))
+        return f"⚠️ Impact analysis failed: {html.escape(str(e), quote=False)}"
+    return report.format()
+
+
+async def _pending_upload(state: FSMContext) -> tuple[ConfigFile, Path] | None:
+    """Загруженный файл, ожидающий /confirm: (тип конфига, временный путь)."""
+    data = await state.get_data()
+    if "temp_path" not in data:
+        return None
+    return ConfigFile(data["config_type"]), Path(data["temp_path"])
+
+
 def backup_config_file(config_type: ConfigFile) -> Path | None:
     """
     Создать бэкап конфигурационного файла.
@@ -443,8 +555,13 @@ async def cmd_cancel(message: Message, state: FSMContext):
         await message.answer("❌ No active operation to cancel.")
         return
 
+    if current_state == ConfigUploadStates.waiting_for_confirm.state:
+        # Загруженный, но не подтверждённый файл не должен остаться в /tmp
+        pending = await _pending_upload(state)
+        if pending is not None:
+            pending[1].unlink(missing_ok=True)
     await state.clear()
-    await message.answer("✅ Operation cancelled.")
+    await message.answer("✅ Operation cancelled.", reply_markup=remove_menu())
 
 
 # ============================================================================
@@ -462,17 +579,11 @@ async def process_config_upload(
 
     Workflow:
     1. Download and validate file (без lock - может идти параллельно)
-    2. Acquire lock для данного config_type
-    3. Backup old config (под lock)
-    4. Replace with new config (под lock)
-    5. Release lock
-    6. Clear FSM state
+    2. Impact analysis: дельты расчётов по странам и статьям (без lock)
+    3. Ожидание /confirm: файл лежит во временном пути, живой конфиг не тронут
+       (watcher применил бы его сразу после замены). /cancel удаляет файл.
 
-    Race Condition Protection:
-    - Использует asyncio.Lock для каждого типа конфига
-    - Разные конфиги можно загружать параллельно
-    - Один и тот же конфиг загружается последовательно
-    - Предотвращает потерю данных при одновременной загрузке
+    Замена файла - в apply_config_upload (после /confirm).
     """
     document = message.document
     if not document:
@@ -488,42 +599,88 @@ async def process_config_upload(
         document, message.bot, config_type
     )
 
-    if not success:
+    if not success or temp_path is None:
         await message.answer(f"❌ **Validation failed:**\n\n{error_msg}")
         await state.clear()
         return
 
-    # 2-4. Получаем lock перед модификацией файловой системы
+    # 2. Влияние на расчёты - админ видит сводку до замены файла
+    await message.answer("📊 Analyzing impact on quotes...")
+    await message.answer(await summarize_config_impact(config_type, temp_path))
+
+    # 3. Файл заменяется только после подтверждения
+    await state.set_state(ConfigUploadStates.waiting_for_confirm)
+    await state.update_data(config_type=config_type.value, temp_path=str(temp_path))
+    await message.answer(
+        f"❓ Replace `{metadata['filename']}` with the uploaded file?\n\n"
+        "/confirm - apply, /cancel - discard the upload.",
+        reply_markup=confirm_upload_menu(),
+    )
+
+
+async def apply_config_upload(message: Message, config_type: ConfigFile, temp_path: Path) -> None:
+    """
+    Заменить конфиг подтверждённым файлом.
+
+    Race Condition Protection:
+    - Использует asyncio.Lock для каждого типа конфига
+    - Разные конфиги можно загружать параллельно
+    - Один и тот же конфиг загружается последовательно
+    - Предотвращает потерю данных при одновременной загрузке
+    """
+    metadata = CONFIG_METADATA[config_type]
     lock = _get_config_lock(config_type)
 
     async with lock:
-        await message.answer("🔒 Acquiring lock and saving...")
+        await message.answer("🔒 Acquiring lock and saving...", reply_markup=remove_menu())
 
-        # 2. Бэкап старого файла
+        # Бэкап старого файла
         backup_path = backup_config_file(config_type)
         backup_info = ""
         if backup_path:
             backup_info = f"📦 Backup: `{backup_path.name}`\n"
 
-        # 3. Замена файла
+        # Замена файла
         target_path = get_config_path(config_type)
         try:
             shutil.move(str(temp_path), str(target_path))
         except Exception as e:
-            temp_path.unlink(missing_ok=True)
-            await message.answer(f"❌ **Failed to save config:**\n\n{e!s}")
-            await state.clear()
+            await asyncio.to_thread(temp_path.unlink, missing_ok=True)
+            await message.answer(f"❌ **Failed to save config:**\n\n{html.escape(str(e))}")
             return
 
     # Lock released - файл успешно сохранен
-
-    # 5. Успех
+    settings = get_settings()
+    if settings.config_watch_enabled:
+        apply_info = (
+            "🔄 The file watcher applies it in the API and the bot within "
+            f"~{settings.config_watch_interval_seconds:g}s."
+        )
+    else:
+        apply_info = "⚠️ Use /reload_configs to apply changes in runtime."
     await message.answer(
-        f"✅ **{metadata['filename']} updated successfully!**\n\n"
-        f"{backup_info}"
-        f"⚠️ Use /reload_configs to apply changes in runtime."
+        f"✅ **{metadata['filename']} updated successfully!**\n\n{backup_info}{apply_info}"
     )
+
+
+@router.message(Command("confirm"))
+async def cmd_confirm_upload(message: Message, state: FSMContext) -> None:
+    """Применить загруженный файл после сводки влияния."""
+    if await state.get_state() != ConfigUploadStates.waiting_for_confirm.state:
+        await message.answer("❌ No upload waiting for confirmation.")
+        return
+    pending = await _pending_upload(state)
     await state.clear()
+    if pending is None:
+        await message.answer("❌ No upload waiting for confirmation.")
+        return
+    config_type, temp_path = pending
+    if not temp_path.exists():
+        await message.answer(
+            "❌ The uploaded file is gone, please upload it again.", reply_markup=remove_menu()
+        )
+        return
+    await apply_config_upload(message, config_type, temp_path)
 
 
 @router.message(ConfigUploadStates.waiting_for_fees)
@@ -591,25 +748,84 @@ async def cmd_whoami(message: Message):
 # ============================================================================
 
 
+def _sync_tip(generation: int | None) -> str:
+    """Подсказка о том, когда новые конфиги увидят другие процессы."""
+    if generation is None:
+        return (
+            "⚠️ **Config sync is disabled** (`CONFIG_SYNC_PATH`): other processes (API) "
+            "keep their configs until they reload on their own."
+        )
+    interval = get_settings().config_sync_interval_seconds
+    return (
+        f"💡 **Tip:** Published as generation `{generation}` - API and other processes "
+        f"switch within ~{interval:g}s.\nNo server restart required!"
+    )
+
+
 @router.message(Command("reload_configs"))
 async def cmd_reload_configs(message: Message):
     """
     Перезагрузить все конфигурационные файлы в памяти.
 
     Очищает кэш ConfigRegistry и принудительно загружает конфиги из файлов.
-    Валидирует загруженные конфиги и обновляет hash/timestamp.
+    Валидирует загруженные конфиги по схеме тарифов (validate_tariffs) и
+    обновляет hash/timestamp; невалидные конфиги не применяются.
+
+    Новый hash публикуется в файл поколений (config_sync): остальные
+    процессы (API) переключаются на него в течение CONFIG_SYNC_INTERVAL_SECONDS.
     """
     await message.answer("⏳ **Reloading configs...**")
 
-    success, msg, metrics = reload_configs()
+    success, msg, metrics = reload_configs(validate=validate_tariffs)
 
     await message.answer(msg)
 
+    if success:
+        generation = config_sync.publish(metrics["new_hash"])
+        if metrics.get("hash_changed"):
+            await message.answer(_sync_tip(generation))
+
+
+@router.message(Command("config_versions"))
+async def cmd_config_versions(message: Message) -> None:
+    """
+    Показать версии конфигов, сохранённые в памяти (для /rollback_config).
+
+    Каждая версия хранится вместе со скомпилированными тарифами, поэтому
+    откат и расчёты с `config_hash` ничего не читают с диска.
+    """
+    current = get_configs()
+    lines = []
+    for configs in config_versions():
+        marker = "▶️" if configs is current else "▫️"
+        lines.append(f"{marker} `{configs.hash[:12]}` - {configs.loaded_at}")
+
+    await message.answer(
+        "🗂 **Config versions in memory** (newest first)\n\n"
+        + "\n".join(lines)
+        + "\n\n💡 `/rollback_config <hash>` switches to a version; "
+        "without a hash - to the previous one."
+    )
+
+
+@router.message(Command("rollback_config"))
+async def cmd_rollback_config(message: Message) -> None:
+    """
+    Откатиться на сохранённую в памяти версию конфигов.
+
+    `/rollback_config` - на предыдущую версию, `/rollback_config <hash>` - на
+    указанную (полный hash или префикс от 8 символов). Это подмена ссылки:
+    без чтения файлов и перекомпиляции тарифов. Другие процессы получают
+    откат через config_sync.
+    """
+    parts = (message.text or "").split(maxsplit=1)
+    config_hash = parts[1].strip() if len(parts) > 1 else None
+
+    success, msg, metrics = rollback_configs(config_hash)
+    await message.answer(msg)
+
     if success and metrics.get("hash_changed"):
-        await message.answer(
-            "💡 **Tip:** All API endpoints will use the new configs immediately.\n"
-            "No server restart required!"
-        )
+        await message.answer(_sync_tip(config_sync.publish(metrics["new_hash"])))
 
 
 @router.message(Command("config_status"))
@@ -668,39 +884,34 @@ async def cmd_config_diff(message: Message):
     Показать различия между конфигами на диске и в памяти.
 
     Полезно после загрузки нового файла, чтобы проверить,
-    нужен ли reload.
+    нужен ли reload. При расхождении показывает структурный diff:
+    каждый изменённый путь (`age_categories.3_5.bands[2].rate_eur_per_cc: 2.5 → 2.7`).
+    Длинный diff разбивается на несколько сообщений.
+
+    Разбор файлов кэшируется по (mtime, size, inode): повторная проверка
+    без изменений на диске не читает и не парсит YAML.
     """
     try:
         # Текущий hash в памяти
         memory_configs = get_configs()
         memory_hash = memory_configs.hash
 
-        # Вычислить hash файлов на диске
-        disk_hashes = {}
-        for config_type in ConfigFile:
-            file_path = get_config_path(config_type)
-            if file_path.exists():
-                content = file_path.read_bytes()
-                file_hash = hashlib.sha256(content).hexdigest()[:8]
-                disk_hashes[config_type.value] = file_hash
-
-        # Объединить в общий hash (используем тот же метод что и _dict_hash)
-        disk_aggregate = {
-            "fees": _read_yaml("fees.yml"),
-            "commissions": _read_yaml("commissions.yml"),
-            "rates": _read_yaml("rates.yml"),
-            "duties": _read_yaml("duties.yml"),
+        # Файлы на диске (разбор из кэша, если файл не менялся)
+        disk_files = {
+            config_type: config_file_cache.read(get_config_path(config_type))
+            for config_type in ConfigFile
         }
 
-        disk_hash = _dict_hash(disk_aggregate)
+        # Общий hash по байтам файлов (тот же, что ConfigRegistry.hash)
+        disk_hash = config_files_hash(
+            {ct.value: parsed.raw for ct, parsed in disk_files.items() if parsed is not None}
+        )
 
         files_info = []
-        for config_type in ConfigFile:
+        for config_type, parsed in disk_files.items():
             metadata = CONFIG_METADATA[config_type]
-            if config_type.value in disk_hashes:
-                files_info.append(
-                    f"📄 `{metadata['filename']}`: `{disk_hashes[config_type.value]}`"
-                )
+            if parsed is not None:
+                files_info.append(f"📄 `{metadata['filename']}`: `{parsed.digest[:8]}`")
 
         files_list = "\n".join(files_info)
 
@@ -717,7 +928,18 @@ async def cmd_config_diff(message: Message):
             f"**Disk files:**\n{files_list}"
         )
 
-        await message.answer(message_text)
+        if memory_hash == disk_hash:
+            await message.answer(message_text)
+            return
+
+        lines = [message_text, "", "**Changes (memory → disk):**"]
+        lines.extend(_config_diff_lines(memory_configs, disk_files))
+        pages = paginate_lines(lines, TELEGRAM_MESSAGE_LIMIT - PAGE_HEADER_RESERVE)
+        await message.answer(pages[0])
+        for number, page in enumerate(pages[1:], start=2):
+            await message.answer(
+                f"🔄 **Config Diff Check** · ⚠️ Out of sync · page {number}/{len(pages)}\n\n{page}"
+            )
 
     except Exception as e:
         await message.answer(f"❌ **Failed to check diff:**\n\n`{type(e).__name__}: {e!s}`")
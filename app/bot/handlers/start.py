@@ -18,7 +18,8 @@ from aiogram.filters import Command
 from pydantic import ValidationError
 
 from app.bot.keyboards import main_menu
-from app.calculation.engine import calculate
+from app.calculation.engine import acalculate
+from app.calculation.executor import EngineDeadlineError, EngineOverloadedError
 from app.calculation.models import CalculationRequest, CalculationResult
 from app.core.messages import WARN_WEBAPP_HTTP_URL
 from app.core.settings import get_settings
@@ -30,6 +31,9 @@ if TYPE_CHECKING:  # pragma: no cover
 
 router = Router()
 
+# Очередь расчётов заполнена или расчёт не уложился в ENGINE_DEADLINE_SECONDS
+ENGINE_BUSY_TEXT = "⏳ Калькулятор сейчас перегружен. Попробуйте ещё раз через минуту."
+
 
 def _format_rate_line(meta, req):
     """Сформировать строку курса для Telegram на основе meta.detailed_rates_used.
@@ -108,7 +112,7 @@ def _format_result(result: CalculationResult, req: CalculationRequest) -> str:
     Форматирование результата расчёта для Telegram.
 
     Args:
-        result: Результат расчёта из engine.calculate()
+        result: Результат расчёта из engine.acalculate()
         req: Исходный запрос (для отображения входных параметров)
 
     Returns:
@@ -213,13 +217,16 @@ async def cmd_calc(message: Message) -> None:
         )
 
         # Расчёт
-        result = calculate(req)
+        result = await acalculate(req)
 
         # Форматирование результата
         response = _format_result(result, req)
 
         await message.answer(response, parse_mode="HTML")
 
+    except (EngineOverloadedError, EngineDeadlineError) as e:
+        logger.warning("calc_engine_busy", error=str(e))
+        await message.answer(ENGINE_BUSY_TEXT)
     except Exception as e:
         logger.error("calc_command_error", error=str(e), exc_info=True)
         await message.answer("❌ Ошибка при расчёте. Попробуйте позже.")
@@ -263,7 +270,7 @@ async def on_webapp_data(message: Message) -> None:
         )
 
         # Расчёт
-        result = calculate(req)
+        result = await acalculate(req)
 
         # Форматирование
         response = _format_result(result, req)
@@ -274,6 +281,9 @@ async def on_webapp_data(message: Message) -> None:
         logger.warning("webapp_validation_error", errors=ve.errors())
         error_msgs = "\n".join([f"• {e['msg']}" for e in ve.errors()])
         await message.answer(f"❌ <b>Ошибка валидации:</b>\n{error_msgs}", parse_mode="HTML")
+    except (EngineOverloadedError, EngineDeadlineError) as e:
+        logger.warning("webapp_engine_busy", error=str(e))
+        await message.answer(ENGINE_BUSY_TEXT)
     except Exception as e:
         logger.error("webapp_data_error", error=str(e), exc_info=True)
         await message.answer("❌ Ошибка при обработке данных. Попробуйте ещё раз.")
@@ -3,6 +3,7 @@ from __future__ import annotations
 from aiogram.types import (
     KeyboardButton,
     ReplyKeyboardMarkup,
+    ReplyKeyboardRemove,
     WebAppInfo,
 )
 
@@ -14,3 +15,15 @@ def main_menu(url: str) -> ReplyKeyboardMarkup:
         ],
         resize_keyboard=True,
     )
+
+
+def confirm_upload_menu() -> ReplyKeyboardMarkup:
+    return ReplyKeyboardMarkup(
+        keyboard=[[KeyboardButton(text="/confirm"), KeyboardButton(text="/cancel")]],
+        resize_keyboard=True,
+        one_time_keyboard=True,
+    )
+
+
+def remove_menu() -> ReplyKeyboardRemove:
+    return ReplyKeyboardRemove()
@@ -4,8 +4,8 @@ Telegram Bot для расчёта таможенных платежей.
 Features:
 - Публичные команды: /start, /help
 - Административные команды (требуют ADMIN_USER_IDS):
-  - Config management: /get_*, /set_*, /reload_configs
-  - Status: /config_status, /config_diff, /whoami, /list_configs
+  - Config management: /get_*, /set_*, /reload_configs, /rollback_config
+  - Status: /config_status, /config_diff, /config_versions, /whoami, /list_configs
 """
 
 from __future__ import annotations
@@ -22,6 +22,7 @@ from aiogram.types import BotCommand
 from app.bot.handlers import config as config_handler
 from app.bot.handlers.start import register as register_start
 from app.bot.middlewares import AdminOnlyMiddleware
+from app.calculation.executor import engine_executor
 from app.core.messages import (
     ERR_BAD_BOT_TOKEN,
     ERR_INVALID_BOT_TOKEN,
@@ -30,6 +31,12 @@ from app.core.messages import (
     INFO_BOT_STOPPED,
 )
 from app.core.settings import get_settings
+from app.services.cbr import cbr_service
+from app.services.cbr_refresher import cbr_refresher
+from app.services.config_impact import impact_pool
+from app.services.config_sync import config_sync
+from app.services.config_watcher import config_watcher
+from app.services.rates_snapshot import default_snapshot_path
 from app.struct_logger import logger, setup_logging
 
 
@@ -135,6 +142,10 @@ async def main_async() -> None:
             parse_mode="HTML",
         )
         started = True
+        cbr_service.load_snapshot(default_snapshot_path())  # warm start
+        cbr_refresher.start()
+        config_watcher.start()
+        config_sync.start()
 
         # Запустить long polling
         logger.info("polling_started")
@@ -153,6 +164,12 @@ async def main_async() -> None:
             logger.info(INFO_BOT_STOPPED)
         if bot is not None:
             await bot.session.close()
+        await config_sync.stop()
+        await config_watcher.stop()
+        await cbr_refresher.stop()
+        await asyncio.to_thread(impact_pool.shutdown)
+        await asyncio.to_thread(engine_executor.shutdown)
+        await cbr_service.aclose()
 
 
 def run_bot() -> None:
@@ -0,0 +1,151 @@
+"""Bounded LRU/TTL memoization of calculation results.
+
+Entries are keyed on a canonical request fingerprint and grouped under a
+*generation*: the fingerprint of everything else a result depends on
+(config hash, effective rates, bank commission, calendar date). A lookup
+only sees the bucket of its own generation, so after configs are reloaded,
+CBR rates change or the day rolls over stale results are never served.
+
+Buckets of the last `max_generations` generations are kept (LRU): requests
+pinned to another `rates_version` / `config_hash` interleaved with current
+ones do not empty each other's results. `maxsize` bounds the entries of all
+buckets together; the least recently used generation gives way first.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock
+import time
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from app.core.settings import get_settings
+
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable
+
+    from .models import CalculationMeta, CostBreakdown
+
+
+class CachedResult(NamedTuple):
+    meta: CalculationMeta
+    breakdown: CostBreakdown
+    expires_at: float
+
+
+@dataclass
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL. `maxsize <= 0` disables it."""
+
+    maxsize: int = 4096
+    ttl_seconds: float = 3600.0
+    max_generations: int = 4
+    _buckets: OrderedDict[Hashable, OrderedDict[Hashable, CachedResult]] = field(
+        default_factory=OrderedDict, init=False
+    )
+    _size: int = field(default=0, init=False)
+    _lock: Lock = field(default_factory=Lock, init=False)
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    evictions: int = field(default=0, init=False)
+    invalidations: int = field(default=0, init=False)
+
+    @classmethod
+    def from_settings(cls) -> ResultCache:
+        settings = get_settings()
+        return cls(
+            maxsize=settings.result_cache_size,
+            ttl_seconds=settings.result_cache_ttl_seconds,
+            max_generations=settings.result_cache_generations,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def _bucket(self, generation: Hashable) -> OrderedDict[Hashable, CachedResult]:
+        """Bucket of `generation`, created if new. MUST be called within a lock!"""
+        bucket = self._buckets.get(generation)
+        if bucket is None:
+            bucket = self._buckets[generation] = OrderedDict()
+            while len(self._buckets) > max(1, self.max_generations):
+                _, dropped = self._buckets.popitem(last=False)
+                self._size -= len(dropped)
+                self.invalidations += 1
+        self._buckets.move_to_end(generation)
+        return bucket
+
+    def _evict_overflow(self) -> None:
+        """Drop LRU entries of the LRU generations. MUST be called within a lock!"""
+        while self._size > self.maxsize:
+            generation, bucket = next(iter(self._buckets.items()))
+            bucket.popitem(last=False)
+            self._size -= 1
+            self.evictions += 1
+            if not bucket:
+                del self._buckets[generation]
+
+    def get(self, key: Hashable, generation: Hashable) -> CachedResult | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(generation)
+            if bucket is None:
+                self.misses += 1
+                return None
+            entry = bucket.get(key)
+            if entry is None or entry.expires_at <= time.monotonic():
+                if entry is not None:
+                    del bucket[key]
+                    self._size -= 1
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._buckets.move_to_end(generation)
+            bucket.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        key: Hashable,
+        generation: Hashable,
+        meta: CalculationMeta,
+        breakdown: CostBreakdown,
+    ) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            bucket = self._bucket(generation)
+            self._size += key not in bucket
+            bucket[key] = CachedResult(meta, breakdown, expires_at)
+            bucket.move_to_end(key)
+            self._evict_overflow()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._size = 0
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": self._size,
+                "maxsize": self.maxsize,
+                "generations": len(self._buckets),
+                "max_generations": self.max_generations,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+result_cache = ResultCache.from_settings()
@@ -0,0 +1,506 @@
+"""Compiled tariff plan.
+
+`ConfigRegistry` keeps the raw YAML dicts. Walking them on every
+`calculate()` call means repeated `.get()` chains, linear bracket scans and
+`str -> Decimal` conversions. `CompiledTariffs` does that work once per
+loaded config (kept on the `ConfigRegistry` it was built from) and exposes
+bisect-indexed lookups that the engine uses on the hot path.
+
+Lookup semantics are identical to the linear "first matching bracket"
+scans in `tariff_tables.py` / `engine.py`: brackets that can never be the
+first match (their upper bound does not exceed an earlier one) are dropped
+at compile time, which leaves strictly increasing bounds suitable for
+`bisect`.
+
+`validate_tariffs` compiles the same plan in strict mode - the schema check
+run once when configs are (re)loaded: brackets must have strictly increasing
+upper bounds, amounts must be numbers, commissions and the bank percent must
+be in range. A config that fails it is rejected before it goes live, so the
+engine never meets a half-valid table at request time.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any
+
+from .rounding import quantize4, to_decimal
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    from app.core.settings import ConfigRegistry
+
+
+HP_TO_KW = 0.7355
+DEFAULT_UTILIZATION_BASE_RATE_RUB = 20000
+DEFAULT_ERA_GLONASS_RUB = 45000
+VALUE_BRACKETS_MARKER = "value_brackets"
+DEFAULT_COMMISSION_USD = 1000
+MAX_BANK_COMMISSION_PERCENT = 100
+BANK_PERCENT_PATH = "commissions.bank_commission.percent"
+
+
+SCHEMA_AFTER_TAIL = "bracket after the open-ended one"
+SCHEMA_NOT_INCREASING = "bounds must increase ({bound} after {previous})"
+SCHEMA_BAD_RANGE = "volume_range must be [min, max] with min <= max"
+SCHEMA_OVERLAP = "volume_range overlaps the previous band"
+SCHEMA_NEGATIVE = "must not be negative"
+SCHEMA_NOT_MAPPING = "expected a mapping"
+SCHEMA_PERCENT_RANGE = "must be a number in [0, {limit})"
+SCHEMA_BAD_VALUE = "invalid value ({error!r})"
+
+
+class ConfigSchemaError(ValueError):
+    """Config does not match the tariff schema (raised by strict compilation)."""
+
+    def __init__(self, where: str, problem: str) -> None:
+        super().__init__(f"{where}: {problem}")
+        self.where = where
+
+
+@dataclass(frozen=True, slots=True)
+class Brackets[T]:
+    """Upper-bound brackets: first bracket with `x <= bound` wins.
+
+    `tail` is the open-ended bracket (bound is `None` in YAML), if any.
+    """
+
+    bounds: tuple[Any, ...] = ()
+    values: tuple[T, ...] = ()
+    tail: T | None = None
+
+    @classmethod
+    def build(cls, items: Iterable[tuple[Any, T]], where: str | None = None) -> Brackets[T]:
+        """Build from (bound, value) pairs in config order.
+
+        With `where` (strict mode, the config path for the message) a bracket
+        that could never be the first match is a `ConfigSchemaError` instead
+        of being dropped.
+        """
+        bounds: list[Any] = []
+        values: list[T] = []
+        tail: T | None = None
+        closed = False  # an open-ended bracket was seen; nothing after it can match
+        for bound, value in items:
+            if closed:
+                if where is None:
+                    break
+                raise ConfigSchemaError(where, SCHEMA_AFTER_TAIL)
+            if bound is None:
+                tail, closed = value, True
+                continue
+            if bounds and bound <= bounds[-1]:
+                if where is not None:
+                    raise ConfigSchemaError(
+                        where, SCHEMA_NOT_INCREASING.format(bound=bound, previous=bounds[-1])
+                    )
+                # Shadowed by an earlier bracket: never the first match
+                continue
+            bounds.append(bound)
+            values.append(value)
+        return cls(bounds=tuple(bounds), values=tuple(values), tail=tail)
+
+    def lookup(self, x: Any) -> T | None:
+        i = bisect_left(self.bounds, x)
+        if i < len(self.bounds):
+            return self.values[i]
+        return self.tail
+
+
+@dataclass(frozen=True, slots=True)
+class DutyBand:
+    rate: Decimal | None
+    rate_float: float | None
+    label: str
+
+
+@dataclass(frozen=True, slots=True)
+class Lt3ValueBracket:
+    percent: Decimal
+    min_rate_eur_per_cc: Decimal
+    percent_float: float
+    min_rate_float: float
+    max_customs_value_eur: float | None
+
+
+@dataclass(frozen=True, slots=True)
+class DutyCategory:
+    bands: Brackets[DutyBand]
+    # An empty bracket ({} in YAML) compiles to None: no duty, as in the linear scan
+    value_brackets: Brackets[Lt3ValueBracket | None] | None = None
+
+    @classmethod
+    def from_config(cls, node: dict[str, Any], where: str | None = None) -> DutyCategory:
+        bands = Brackets.build(
+            ((band.get("max_cc"), _duty_band(band)) for band in node.get("bands", [])),
+            where and f"{where}.bands",
+        )
+        value_brackets = None
+        if node.get("value_brackets"):
+            value_brackets = Brackets.build(
+                (
+                    (br.get("max_customs_value_eur"), _lt3_bracket(br) if br else None)
+                    for br in node["value_brackets"]
+                ),
+                where and f"{where}.value_brackets",
+            )
+        return cls(bands=bands, value_brackets=value_brackets)
+
+
+def _duty_band(band: dict[str, Any]) -> DutyBand:
+    max_cc = band.get("max_cc")
+    rate = band.get("rate_eur_per_cc")
+    upper = f"<= {max_cc}" if max_cc is not None else "> last"
+    return DutyBand(
+        rate=to_decimal(rate) if rate is not None else None,
+        rate_float=float(rate) if rate is not None else None,
+        label=f"{upper} @ {rate} €/cc",
+    )
+
+
+def _lt3_bracket(br: dict[str, Any]) -> Lt3ValueBracket:
+    percent = to_decimal(br.get("percent", 0))
+    min_rate = to_decimal(br.get("min_rate_eur_per_cc", 0))
+    max_val = br.get("max_customs_value_eur")
+    return Lt3ValueBracket(
+        percent=percent,
+        min_rate_eur_per_cc=min_rate,
+        percent_float=float(percent),
+        min_rate_float=float(min_rate),
+        max_customs_value_eur=float(max_val) if max_val is not None else None,
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class DutyTables:
+    categories: dict[str, DutyCategory] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, duties_conf: dict[str, Any], strict: bool = False) -> DutyTables:
+        return cls(
+            categories={
+                code: DutyCategory.from_config(
+                    node or {}, f"duties.age_categories.{code}" if strict else None
+                )
+                for code, node in duties_conf.get("age_categories", {}).items()
+            }
+        )
+
+    def band(self, age_category: str, engine_cc: int) -> DutyBand | None:
+        category = self.categories.get(age_category)
+        if category is None:
+            return None
+        return category.bands.lookup(engine_cc)
+
+    def lt3_bracket(self, customs_value_eur: float) -> Lt3ValueBracket | None:
+        category = self.categories.get("lt3")
+        if category is None or category.value_brackets is None:
+            return None
+        return category.value_brackets.lookup(customs_value_eur)
+
+    def volume_band_label(self, age_category: str, engine_cc: int) -> str:
+        category = self.categories.get(age_category)
+        if category is None:
+            return "n/a"
+        if age_category == "lt3" and category.value_brackets is not None:
+            return VALUE_BRACKETS_MARKER
+        band = category.bands.lookup(engine_cc)
+        return band.label if band is not None else "n/a"
+
+
+@dataclass(frozen=True, slots=True)
+class UtilizationCell:
+    fee_lt3: Decimal
+    coefficient_lt3: float
+    fee_gt3: Decimal
+    coefficient_gt3: float
+
+
+@dataclass(frozen=True, slots=True)
+class UtilizationGrid:
+    """Volume x power grid with pre-multiplied fees (base_rate x coefficient)."""
+
+    volume_lows: tuple[int, ...] = ()
+    volume_highs: tuple[int, ...] = ()
+    power: tuple[Brackets[UtilizationCell], ...] = ()
+
+    @classmethod
+    def from_config(cls, rates_conf: Mapping[str, Any], strict: bool = False) -> UtilizationGrid:
+        util = rates_conf.get("utilization_m1_personal", {})
+        base_rate = to_decimal(util.get("base_rate_rub", DEFAULT_UTILIZATION_BASE_RATE_RUB))
+
+        # Resolve first-match semantics for possibly overlapping or unordered
+        # ranges: each band only owns the cc values no earlier band claimed.
+        pieces: list[tuple[int, int, Brackets[UtilizationCell]]] = []
+        for i, band in enumerate(util.get("volume_bands", [])):
+            where = f"rates.utilization_m1_personal.volume_bands[{i}]" if strict else None
+            vol_range = band.get("volume_range", [])
+            if where is not None and (len(vol_range) < 2 or vol_range[0] > vol_range[1]):
+                raise ConfigSchemaError(where, SCHEMA_BAD_RANGE)
+            if len(vol_range) < 2:
+                continue
+            if where is not None and pieces and vol_range[0] <= pieces[-1][1]:
+                raise ConfigSchemaError(where, SCHEMA_OVERLAP)
+            power = Brackets.build(
+                (
+                    (br.get("power_kw_max"), _utilization_cell(br, base_rate))
+                    for br in band.get("power_brackets", [])
+                ),
+                where and f"{where}.power_brackets",
+            )
+            segments = [(vol_range[0], vol_range[1])]
+            for lo, hi, _ in pieces:
+                remaining = []
+                for a, b in segments:
+                    if b < lo or a > hi:
+                        remaining.append((a, b))
+                        continue
+                    if a < lo:
+                        remaining.append((a, lo - 1))
+                    if b > hi:
+                        remaining.append((hi + 1, b))
+                segments = remaining
+            pieces.extend((a, b, power) for a, b in segments if a <= b)
+
+        pieces.sort(key=lambda p: p[0])
+        return cls(
+            volume_lows=tuple(p[0] for p in pieces),
+            volume_highs=tuple(p[1] for p in pieces),
+            power=tuple(p[2] for p in pieces),
+        )
+
+    def power_brackets(self, engine_cc: int) -> Brackets[UtilizationCell] | None:
+        i = bisect_right(self.volume_lows, engine_cc) - 1
+        if i < 0 or engine_cc > self.volume_highs[i]:
+            return None
+        return self.power[i]
+
+
+def _utilization_cell(bracket: dict[str, Any], base_rate: Decimal) -> UtilizationCell:
+    coef_lt3 = bracket.get("coefficient_lt3", 0)
+    coef_gt3 = bracket.get("coefficient_gt3", 0)
+    return UtilizationCell(
+        fee_lt3=quantize4(base_rate * to_decimal(coef_lt3)),
+        coefficient_lt3=float(coef_lt3),
+        fee_gt3=quantize4(base_rate * to_decimal(coef_gt3)),
+        coefficient_gt3=float(coef_gt3),
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class Freight:
+    amount: Decimal
+    freight_type: str
+    currency: str
+
+
+NO_FREIGHT = Freight(amount=Decimal("0"), freight_type="none", currency="RUB")
+
+
+@dataclass(frozen=True, slots=True)
+class CountryTariff:
+    country_currency: str | None = None
+    tiers: Brackets[Decimal] = field(default_factory=Brackets)
+    base_expenses_total: Decimal = Decimal("0")
+    freight: dict[str, Freight] = field(default_factory=dict)
+    default_freight: Freight = NO_FREIGHT
+
+    @classmethod
+    def from_config(cls, fees: dict[str, Any], where: str | None = None) -> CountryTariff:
+        tiers = Brackets.build(
+            (
+                (
+                    to_decimal(t["max_price"]) if t.get("max_price") is not None else None,
+                    to_decimal(t.get("expenses", 0)),
+                )
+                for t in fees.get("tiers", [])
+            ),
+            where and f"{where}.tiers",
+        )
+        total = Decimal("0")
+        for v in fees.get("base_expenses", {}).values():
+            total += to_decimal(v)
+        freight = {
+            k: Freight(
+                amount=to_decimal(v.get("amount", 0.0)),
+                freight_type=k,
+                currency=v.get("currency", "USD"),
+            )
+            for k, v in (fees.get("freight") or {}).items()
+        }
+        return cls(
+            country_currency=fees.get("country_currency"),
+            tiers=tiers,
+            base_expenses_total=total,
+            freight=freight,
+            default_freight=next(iter(freight.values()), NO_FREIGHT),
+        )
+
+    def tier_expenses(self, purchase_price: Decimal) -> Decimal:
+        value = self.tiers.lookup(purchase_price)
+        return value if value is not None else Decimal("0")
+
+    def select_freight(self, freight_type: str | None) -> Freight:
+        if freight_type and freight_type in self.freight:
+            return self.freight[freight_type]
+        return self.default_freight
+
+
+EMPTY_COUNTRY = CountryTariff()
+
+
+@dataclass(frozen=True, slots=True)
+class CountryCommission:
+    """`by_country` override: USD amount, or a fixed RUB amount (legacy list shape)."""
+
+    usd: Decimal | None = None
+    fixed_rub: Decimal | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class CommissionSchedule:
+    """commissions.yml: company commission per country and the bank percent."""
+
+    default_usd: Decimal = Decimal(DEFAULT_COMMISSION_USD)
+    by_country: dict[str, CountryCommission] = field(default_factory=dict)
+    bank_percent: float = 0.0
+
+    @classmethod
+    def from_config(cls, conf: dict[str, Any], strict: bool = False) -> CommissionSchedule:
+        by_country: dict[str, CountryCommission] = {}
+        for code, node in (conf.get("by_country") or {}).items():
+            if isinstance(node, dict) and "commission_usd" in node:
+                usd = to_decimal(node["commission_usd"])
+                if strict and usd < 0:
+                    where = f"commissions.by_country.{code}.commission_usd"
+                    raise ConfigSchemaError(where, SCHEMA_NEGATIVE)
+                by_country[code] = CountryCommission(usd=usd)
+            elif isinstance(node, list) and node:
+                by_country[code] = CountryCommission(fixed_rub=to_decimal(node[0].get("amount", 0)))
+            elif strict and not isinstance(node, dict | list | None):
+                raise ConfigSchemaError(f"commissions.by_country.{code}", SCHEMA_NOT_MAPPING)
+        default_usd = to_decimal(conf.get("default_commission_usd", DEFAULT_COMMISSION_USD))
+        bank_percent = bank_commission_percent(conf, strict)
+        if strict and default_usd < 0:
+            raise ConfigSchemaError("commissions.default_commission_usd", SCHEMA_NEGATIVE)
+        if strict and not 0 <= bank_percent < MAX_BANK_COMMISSION_PERCENT:
+            raise ConfigSchemaError(
+                BANK_PERCENT_PATH, SCHEMA_PERCENT_RANGE.format(limit=MAX_BANK_COMMISSION_PERCENT)
+            )
+        return cls(default_usd=default_usd, by_country=by_country, bank_percent=bank_percent)
+
+    def country(self, code: str | None) -> CountryCommission:
+        """Override for `code`, else the default USD commission."""
+        override = self.by_country.get(code) if code else None
+        return override if override is not None else CountryCommission(usd=self.default_usd)
+
+
+def bank_commission_percent(conf: dict[str, Any], strict: bool = False) -> float:
+    """Effective bank commission percent from commissions config.
+
+    Behaviour (per sprint1 spec):
+    - If `bank_commission` section is missing -> 0.0
+    - If `enabled` is explicitly False -> 0.0
+    - If `percent` is missing -> use `meta.default_percent` or 0.0
+    - Otherwise return `percent` as float.
+
+    A value that is not a number falls back to 0.0, or raises
+    `ConfigSchemaError` when `strict`.
+    """
+    bank_conf = conf.get("bank_commission")
+    if not isinstance(bank_conf, dict) or bank_conf.get("enabled") is False:
+        return 0.0
+
+    percent = bank_conf.get("percent")
+    if percent is None:
+        percent = (bank_conf.get("meta") or {}).get("default_percent", 0.0)
+    try:
+        return float(percent)
+    except (TypeError, ValueError) as e:
+        if strict:
+            raise ConfigSchemaError(
+                BANK_PERCENT_PATH, SCHEMA_PERCENT_RANGE.format(limit=MAX_BANK_COMMISSION_PERCENT)
+            ) from e
+        return 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTariffs:
+    config_hash: str
+    duties: DutyTables
+    utilization: UtilizationGrid
+    countries: dict[str, CountryTariff]
+    customs_services: dict[str, Decimal]
+    era_glonass_rub: Decimal
+    commissions: CommissionSchedule = field(default_factory=CommissionSchedule)
+    # Raw config sections this plan was built from (identity-checked on reuse)
+    sources: tuple[Any, ...] = field(default=(), repr=False, compare=False)
+
+    @classmethod
+    def from_configs(cls, configs: ConfigRegistry, strict: bool = False) -> CompiledTariffs:
+        rates = configs.rates
+        return cls(
+            config_hash=configs.hash,
+            duties=DutyTables.from_config(configs.duties, strict),
+            utilization=UtilizationGrid.from_config(rates, strict),
+            countries={
+                code: CountryTariff.from_config(fees or {}, f"fees.{code}" if strict else None)
+                for code, fees in configs.fees.items()
+            },
+            customs_services={
+                code: to_decimal(v) for code, v in rates.get("customs_services", {}).items()
+            },
+            era_glonass_rub=to_decimal(rates.get("era_glonass_rub", DEFAULT_ERA_GLONASS_RUB)),
+            commissions=CommissionSchedule.from_config(configs.commissions, strict),
+            sources=_sources(configs),
+        )
+
+    def country(self, code: str) -> CountryTariff:
+        return self.countries.get(code, EMPTY_COUNTRY)
+
+
+def _sources(configs: ConfigRegistry) -> tuple[Any, ...]:
+    return (configs.fees, configs.rates, configs.duties, configs.commissions)
+
+
+def _same_sources(plan: CompiledTariffs, configs: ConfigRegistry) -> bool:
+    return all(a is b for a, b in zip(plan.sources, _sources(configs), strict=True))
+
+
+def get_compiled_tariffs(configs: ConfigRegistry) -> CompiledTariffs:
+    """Return the compiled plan for `configs`, building it once per registry.
+
+    The plan is kept on the registry itself, so every config version held in
+    memory (rollback, requests pinned to a config hash) carries its own plan
+    for as long as it is kept. Reuse additionally requires the plan to have
+    been built from the very same section objects, so a registry whose
+    sections were swapped never gets a stale plan.
+    """
+    cached: CompiledTariffs | None = configs._tariffs
+    if cached is not None and _same_sources(cached, configs):
+        return cached
+    return _remember(configs, CompiledTariffs.from_configs(configs))
+
+
+def validate_tariffs(configs: ConfigRegistry) -> CompiledTariffs:
+    """Strictly compile `configs` (the load-time schema check) and cache the plan.
+
+    Raises `ConfigSchemaError` naming the offending config path; used as the
+    `validate` hook of `reload_configs`, so a bad config never goes live.
+    """
+    try:
+        plan = CompiledTariffs.from_configs(configs, strict=True)
+    except ConfigSchemaError:
+        raise
+    except (ArithmeticError, AttributeError, KeyError, TypeError, ValueError) as e:
+        raise ConfigSchemaError("tariffs", SCHEMA_BAD_VALUE.format(error=e)) from e
+    return _remember(configs, plan)
+
+
+def _remember(configs: ConfigRegistry, plan: CompiledTariffs) -> CompiledTariffs:
+    configs._tariffs = plan
+    return plan
@@ -1,18 +1,35 @@
 from __future__ import annotations
 
-from datetime import UTC, datetime
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 from decimal import Decimal, getcontext
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
+from app.core.clock import utc_today
 from app.core.messages import (
+    ERR_CONFIG_VERSION_UNAVAILABLE,
     ERR_MISSING_CURRENCY_RATE,
+    ERR_RATES_VERSION_UNAVAILABLE,
     WARN_JAPAN_TIER_CURRENCY,
     WARN_NO_DUTY_RATE,
 )
-from app.core.settings import get_configs
+from app.core.settings import CONFIG_SECTIONS, ConfigRegistry, get_config_version, get_configs
 from app.struct_logger import logger
 
-from ..services.cbr import get_effective_rates
+from ..services.cbr import aget_effective_rates, get_effective_rates
+from ..services.effective_rates import EffectiveRates, rates_versions, thaw
+from .cache import result_cache
+from .compiled import (
+    HP_TO_KW,
+    CommissionSchedule,
+    CountryCommission,
+    CountryTariff,
+    DutyTables,
+    UtilizationGrid,
+    bank_commission_percent,
+    get_compiled_tariffs,
+)
+from .executor import engine_executor
 from .models import (
     CalculationMeta,
     CalculationRequest,
@@ -22,13 +39,14 @@ from .models import (
     WarningItem,
 )
 from .rounding import quantize4, round_rub, to_decimal
-from .tariff_tables import (
-    find_duty_rate,
-    find_lt3_value_bracket,
-    format_volume_band,
-    get_age_category,
-    get_passing_category,
-)
+from .tariff_tables import get_age_category, get_passing_category
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+    from datetime import date
+
+    from .compiled import CompiledTariffs
 
 
 # Set high precision to avoid intermediate rounding issues
@@ -43,7 +61,15 @@ class CalculationError(Exception):
         return cls(ERR_MISSING_CURRENCY_RATE.format(key=key))
 
 
-def _currency_rate(rates_conf: dict[str, Any], code: str) -> Decimal:
+class RatesVersionUnavailableError(CalculationError):
+    """Pinned `rates_version` was evicted from (or never was in) the rates history."""
+
+
+class ConfigVersionUnavailableError(CalculationError):
+    """Pinned `config_hash` is not among the config versions kept in memory."""
+
+
+def _currency_rate(rates_conf: Mapping[str, Any], code: str) -> Decimal:
     key = f"{code.upper()}_RUB"
     try:
         return to_decimal(rates_conf["currencies"][key])
@@ -54,37 +80,14 @@ def _currency_rate(rates_conf: dict[str, Any], code: str) -> Decimal:
 def _get_bank_commission_percent(commissions_conf: dict[str, Any]) -> float:
     """Extract effective bank commission percent from commissions config.
 
-    Behaviour (per sprint1 spec):
-    - If `bank_commission` section is missing -> 0.0
-    - If `enabled` is explicitly False -> 0.0
-    - If `percent` is missing -> use `meta.default_percent` or 0.0
-    - Otherwise return `percent` as float.
+    The hot path reads the value compiled at load time
+    (`CompiledTariffs.commissions.bank_percent`); see `bank_commission_percent`.
     """
-
-    bank_conf = commissions_conf.get("bank_commission")
-    if not isinstance(bank_conf, dict):
-        return 0.0
-
-    if bank_conf.get("enabled") is False:
-        return 0.0
-
-    percent = bank_conf.get("percent")
-    if percent is None:
-        meta = bank_conf.get("meta") or {}
-        default_percent = meta.get("default_percent", 0.0)
-        try:
-            return float(default_percent)
-        except (TypeError, ValueError):
-            return 0.0
-
-    try:
-        return float(percent)
-    except (TypeError, ValueError):  # pragma: no cover - defensive
-        return 0.0
+    return bank_commission_percent(commissions_conf)
 
 
 def _effective_currency_rate(
-    rates_conf: dict[str, Any],
+    rates_conf: Mapping[str, Any],
     code: str,
     bank_commission_percent: float,
 ) -> Decimal:
@@ -103,7 +106,7 @@ def _effective_currency_rate(
 def _convert(
     amount: Decimal,
     currency: str,
-    rates_conf: dict[str, Any],
+    rates_conf: Mapping[str, Any],
     bank_commission_percent: float | None = None,
 ) -> Decimal:
     """Convert from VALUTA to RUB using effective rate and bank commission.
@@ -122,7 +125,7 @@ def _convert(
 # Safe utility for internal use (e.g., normalize Japan tiers input)
 
 
-def _convert_from_rub(amount_rub: Decimal, currency: str, rates_conf: dict[str, Any]) -> Decimal:
+def _convert_from_rub(amount_rub: Decimal, currency: str, rates_conf: Mapping[str, Any]) -> Decimal:
     rate = _currency_rate(rates_conf, currency)
     if rate == 0:
         return Decimal("0")
@@ -130,60 +133,60 @@ def _convert_from_rub(amount_rub: Decimal, currency: str, rates_conf: dict[str,
 
 
 def _japan_country_expenses(fees: dict[str, Any], purchase_price: Decimal) -> Decimal:
-    tiers = fees.get("tiers", [])
-    for tier in tiers:
-        max_price = tier.get("max_price")
-        max_price_dec = to_decimal(max_price) if max_price is not None else None
-        if max_price_dec is None or purchase_price <= max_price_dec:
-            return to_decimal(tier.get("expenses", 0))
-    return Decimal("0")
+    return CountryTariff.from_config(fees).tier_expenses(purchase_price)
 
 
 def _other_country_expenses(fees: dict[str, Any]) -> Decimal:
-    base = fees.get("base_expenses", {})
-    total = Decimal("0")
-    for v in base.values():
-        total += to_decimal(v)
-    return total
+    return CountryTariff.from_config(fees).base_expenses_total
 
 
 def _select_freight(fees: dict[str, Any], freight_type: str | None) -> tuple[Decimal, str, str]:
-    freight_conf = fees.get("freight", {})
-    if not freight_conf:
-        return Decimal("0"), "none", "RUB"
-    if freight_type and freight_type in freight_conf:
-        f = freight_conf[freight_type]
-        return to_decimal(f.get("amount", 0.0)), freight_type, f.get("currency", "USD")
-    k, v = next(iter(freight_conf.items()))
-    return to_decimal(v.get("amount", 0.0)), k, v.get("currency", "USD")
+    freight = CountryTariff.from_config(fees).select_freight(freight_type)
+    return freight.amount, freight.freight_type, freight.currency
 
 
 def _compute_duty(
     engine_cc: int,
     age_category: str,
     duties_conf: dict[str, Any],
-    rates_conf: dict[str, Any],
+    rates_conf: Mapping[str, Any],
     warnings: list[WarningItem],
     purchase_price_rub: Decimal,
 ) -> tuple[Decimal, str | None, dict[str, Any]]:
     eur_rub = _currency_rate(rates_conf, "EUR")
+    return _duty(
+        engine_cc,
+        age_category,
+        duties=DutyTables.from_config(duties_conf),
+        eur_rub=eur_rub,
+        warnings=warnings,
+        purchase_price_rub=purchase_price_rub,
+    )
+
+
+def _duty(
+    engine_cc: int,
+    age_category: str,
+    *,
+    duties: DutyTables,
+    eur_rub: Decimal,
+    warnings: list[WarningItem],
+    purchase_price_rub: Decimal,
+) -> tuple[Decimal, str | None, dict[str, Any]]:
     details: dict[str, Any] = {}
     if age_category == "lt3":
         customs_value_eur = quantize4(purchase_price_rub / eur_rub)
         details["customs_value_eur"] = float(customs_value_eur)
-        bracket = find_lt3_value_bracket(duties_conf, float(customs_value_eur))
+        bracket = duties.lt3_bracket(float(customs_value_eur))
         if not bracket:
             warnings.append(WarningItem(code="NO_DUTY", message=WARN_NO_DUTY_RATE))
             return Decimal("0"), None, details
-        percent = to_decimal(bracket.get("percent", 0))
-        min_rate = to_decimal(bracket.get("min_rate_eur_per_cc", 0))
-        details["duty_percent"] = float(percent)
-        details["duty_min_rate_eur_per_cc"] = float(min_rate)
-        max_val = bracket.get("max_customs_value_eur")
-        if max_val is not None:
-            details["duty_value_bracket_max_eur"] = float(max_val)
-        duty_eur_percent = quantize4(customs_value_eur * percent)
-        duty_eur_min = quantize4(min_rate * to_decimal(engine_cc))
+        details["duty_percent"] = bracket.percent_float
+        details["duty_min_rate_eur_per_cc"] = bracket.min_rate_float
+        if bracket.max_customs_value_eur is not None:
+            details["duty_value_bracket_max_eur"] = bracket.max_customs_value_eur
+        duty_eur_percent = quantize4(customs_value_eur * bracket.percent)
+        duty_eur_min = quantize4(bracket.min_rate_eur_per_cc * to_decimal(engine_cc))
         if duty_eur_percent >= duty_eur_min:
             mode = "percent"
             duty_eur = duty_eur_percent
@@ -192,17 +195,17 @@ def _compute_duty(
             duty_eur = duty_eur_min
         return quantize4(duty_eur * eur_rub), mode, details
     # 3_5 / gt5
-    rate_eur_per_cc = find_duty_rate(duties_conf, age_category, engine_cc)
-    if rate_eur_per_cc is None:
+    band = duties.band(age_category, engine_cc)
+    if band is None or band.rate is None:
         warnings.append(WarningItem(code="NO_DUTY", message=WARN_NO_DUTY_RATE))
         return Decimal("0"), None, details
-    details["duty_rate_eur_per_cc"] = float(rate_eur_per_cc)
-    duty_rub = quantize4(to_decimal(engine_cc) * to_decimal(rate_eur_per_cc) * eur_rub)
+    details["duty_rate_eur_per_cc"] = band.rate_float
+    duty_rub = quantize4(to_decimal(engine_cc) * band.rate * eur_rub)
     return duty_rub, "per_cc", details
 
 
 def _utilization_fee_v2(
-    age_category: str, engine_cc: int, engine_power_hp: int, rates_conf: dict[str, Any]
+    age_category: str, engine_cc: int, engine_power_hp: int, rates_conf: Mapping[str, Any]
 ) -> tuple[Decimal, float]:
     """
     Новая система утильсбора (2025): 2D-таблица по объёму и мощности.
@@ -216,57 +219,44 @@ def _utilization_fee_v2(
     Returns:
         (fee_rub, coefficient): Сумма сбора и использованный коэффициент
     """
-    util = rates_conf.get("utilization_m1_personal", {})
-    base_rate = to_decimal(util.get("base_rate_rub", 20000))
+    return _utilization_fee(
+        UtilizationGrid.from_config(rates_conf), age_category, engine_cc, engine_power_hp
+    )
 
+
+def _utilization_fee(
+    grid: UtilizationGrid, age_category: str, engine_cc: int, engine_power_hp: int
+) -> tuple[Decimal, float]:
+    """Lookup utilization fee in the compiled volume x power grid (base_rate x coefficient)."""
     # 1. Конвертация л.с. → кВт
-    HP_TO_KW = 0.7355
     engine_power_kw = engine_power_hp * HP_TO_KW
 
     # 2. Поиск диапазона объёма
-    volume_bands = util.get("volume_bands", [])
-    volume_band = None
-    for band in volume_bands:
-        vol_range = band.get("volume_range", [])
-        if len(vol_range) >= 2 and vol_range[0] <= engine_cc <= vol_range[1]:
-            volume_band = band
-            break
-
-    if not volume_band:
+    power_brackets = grid.power_brackets(engine_cc)
+    if power_brackets is None:
         logger.warning(f"Volume band not found for {engine_cc} cc, returning 0")
         return Decimal("0"), 0.0
 
-    # 3. Поиск диапазона мощности
-    power_brackets = volume_band.get("power_brackets", [])
-    coefficient = None
-    for bracket in power_brackets:
-        max_kw = bracket.get("power_kw_max")
-        # Если max_kw is None — это последний диапазон (без верхней границы)
-        if max_kw is None or engine_power_kw <= max_kw:
-            # Выбираем коэффициент по возрасту: lt3 или gt3
-            coef_key = "coefficient_lt3" if age_category == "lt3" else "coefficient_gt3"
-            coefficient = bracket.get(coef_key, 0)
-            break
-
-    if coefficient is None:
+    # 3. Поиск диапазона мощности (None в power_kw_max — последний диапазон без верхней границы)
+    cell = power_brackets.lookup(engine_power_kw)
+    if cell is None:
         logger.warning(
             f"Power bracket not found for {engine_power_kw:.2f} kW "
             f"({engine_power_hp} hp) in volume band {engine_cc} cc, returning 0"
         )
         return Decimal("0"), 0.0
 
-    # 4. Расчёт: base_rate × coefficient
-    coefficient_dec = to_decimal(coefficient)
-    fee = quantize4(base_rate * coefficient_dec)
-
-    return fee, float(coefficient)
+    # 4. Коэффициент по возрасту: lt3 или gt3 (сумма предрассчитана при компиляции)
+    if age_category == "lt3":
+        return cell.fee_lt3, cell.coefficient_lt3
+    return cell.fee_gt3, cell.coefficient_gt3
 
 
 def _commission(
     amount_rub: Decimal,
     commissions_conf: dict[str, Any],
     country: str | None,
-    rates_conf: dict[str, Any] | None = None,
+    rates_conf: Mapping[str, Any] | None = None,
     bank_commission_percent: float | None = None,
 ) -> Decimal:
     """Return commission in RUB (NEW 2025: fixed 1000 USD or country override).
@@ -279,57 +269,304 @@ def _commission(
     конвертации комиссии компании (1000 USD → RUB), если задан
     bank_commission_percent.
     """
-    # Check for country-specific override (e.g., UAE = 0)
-    if country:
-        by_country = commissions_conf.get("by_country") or {}
-        country_config = by_country.get(country)
-        if country_config is not None:
-            # New structure: commission_usd key directly in country config
-            if isinstance(country_config, dict) and "commission_usd" in country_config:
-                commission_usd = to_decimal(country_config["commission_usd"])
-                if rates_conf:
-                    # Apply bank commission via effective rate
-                    return _convert(
-                        commission_usd,
-                        "USD",
-                        rates_conf,
-                        bank_commission_percent,
-                    )
-                return Decimal("0")
-            # Legacy structure: list with amount
-            elif isinstance(country_config, list) and country_config:
-                return to_decimal(country_config[0].get("amount", 0))
-
-    # Default: 1000 USD converted to RUB
-    default_usd = commissions_conf.get("default_commission_usd", 1000)
-    if rates_conf:
-        commission_usd = to_decimal(default_usd)
-        return _convert(
-            commission_usd,
-            "USD",
-            rates_conf,
-            bank_commission_percent,
-        )
+    schedule = CommissionSchedule.from_config(commissions_conf)
+    return _company_commission(schedule.country(country), rates_conf, bank_commission_percent)
 
+
+def _company_commission(
+    commission: CountryCommission,
+    rates_conf: Mapping[str, Any] | None,
+    bank_commission_percent: float | None,
+) -> Decimal:
+    """Commission in RUB from the compiled `CommissionSchedule` entry."""
+    if commission.fixed_rub is not None:
+        # Legacy structure: fixed RUB amount
+        return commission.fixed_rub
+    if rates_conf and commission.usd is not None:
+        # Apply bank commission via effective rate
+        return _convert(commission.usd, "USD", rates_conf, bank_commission_percent)
     # Fallback if no rates (shouldn't happen in practice)
     return Decimal("0")
 
 
-def calculate(req: CalculationRequest) -> CalculationResult:
+@dataclass(frozen=True, slots=True)
+class CalculationContext:
+    """Config and rates snapshot shared by one or more calculations."""
+
+    configs: ConfigRegistry
+    rates_conf: Mapping[str, Any]
+    tariffs: CompiledTariffs
+    bank_commission_percent: float
+    today: date
+    rates_version: int | None = None
+
+
+def resolve_context(
+    configs: ConfigRegistry | None = None,
+    rates_conf: Mapping[str, Any] | None = None,
+) -> CalculationContext:
+    """Resolve configs, effective rates and compiled tariffs once.
+
+    Passing `rates_conf` skips the (blocking) live rates lookup.
+    """
+    if configs is None:
+        configs = get_configs()
+    if rates_conf is None:
+        rates_conf = get_effective_rates(configs.rates)
+    tariffs = get_compiled_tariffs(configs)
+    return CalculationContext(
+        configs=configs,
+        rates_conf=rates_conf,
+        tariffs=tariffs,
+        # Bank commission percent from config (global for now), compiled at load
+        bank_commission_percent=tariffs.commissions.bank_percent,
+        today=utc_today(),
+        rates_version=rates_conf.version if isinstance(rates_conf, EffectiveRates) else None,
+    )
+
+
+def _pin_versions(req: CalculationRequest, ctx: CalculationContext) -> CalculationContext:
+    """Swap in the config / rates versions the request pins (reproducible re-quotes).
+
+    `config_hash` selects a kept config version with its compiled tariffs;
+    currency rates come from `rates_version`, or stay current if not pinned.
+    """
+    config_hash = req.config_hash
+    if config_hash is not None and not ctx.configs.hash.startswith(config_hash):
+        pinned_configs = get_config_version(config_hash)
+        if pinned_configs is None:
+            raise ConfigVersionUnavailableError(
+                ERR_CONFIG_VERSION_UNAVAILABLE.format(config_hash=config_hash)
+            )
+        tariffs = get_compiled_tariffs(pinned_configs)
+        ctx = replace(
+            ctx,
+            configs=pinned_configs,
+            tariffs=tariffs,
+            bank_commission_percent=tariffs.commissions.bank_percent,
+        )
+    version = req.rates_version
+    if version is None or version == ctx.rates_version:
+        return ctx
+    pinned = rates_versions.get(version)
+    if pinned is None:
+        raise RatesVersionUnavailableError(ERR_RATES_VERSION_UNAVAILABLE.format(version=version))
+    return replace(ctx, rates_conf=pinned, rates_version=version)
+
+
+def _context_fingerprint(ctx: CalculationContext) -> tuple[Any, ...]:
+    """Everything besides the request that a result depends on (cache generation)."""
+    if ctx.rates_version is not None:
+        # A version always denotes the same rates
+        rates_key: tuple[Any, ...] = (ctx.rates_version,)
+    else:
+        currencies = ctx.rates_conf.get("currencies", {})
+        rates_key = (ctx.rates_conf.get("live_source"), tuple(sorted(currencies.items())))
+    return (
+        ctx.configs.hash,
+        id(ctx.tariffs),
+        *rates_key,
+        ctx.bank_commission_percent,
+        ctx.today,
+    )
+
+
+def _request_fingerprint(req: CalculationRequest) -> tuple[Any, ...]:
+    return (
+        req.country,
+        req.year,
+        req.engine_cc,
+        req.engine_power_hp,
+        req.purchase_price.normalize(),
+        req.currency,
+        req.freight_type,
+        req.sanctions_unknown,
+        req.vehicle_type,
+    )
+
+
+def _from_cache(req: CalculationRequest, ctx: CalculationContext) -> CalculationResult | None:
+    """A hit re-wraps the cached meta/breakdown around the caller's own request."""
+    cached = result_cache.get(_request_fingerprint(req), _context_fingerprint(ctx))
+    if cached is None:
+        return None
+    return CalculationResult.model_construct(
+        request=req, meta=cached.meta, breakdown=cached.breakdown
+    )
+
+
+def _to_cache(req: CalculationRequest, ctx: CalculationContext, result: CalculationResult) -> None:
+    result_cache.put(
+        _request_fingerprint(req), _context_fingerprint(ctx), result.meta, result.breakdown
+    )
+
+
+def _calculate_cached(req: CalculationRequest, ctx: CalculationContext) -> CalculationResult:
+    """`calculate_with_context` memoized in `result_cache`."""
+    ctx = _pin_versions(req, ctx)
+    cached = _from_cache(req, ctx)
+    if cached is not None:
+        return cached
+    result = calculate_with_context(req, ctx)
+    _to_cache(req, ctx, result)
+    return result
+
+
+async def aresolve_context() -> CalculationContext:
+    """`resolve_context` for async callers: live rates never block the event loop."""
     configs = get_configs()
+    return resolve_context(configs, await aget_effective_rates(configs.rates))
+
+
+def calculate(req: CalculationRequest) -> CalculationResult:
+    return _calculate_cached(req, resolve_context())
+
 
-    rates_conf = get_effective_rates(configs.rates)
-    fees_conf = configs.fees.get(req.country, {})
-    commissions_conf = configs.commissions
-    duties_conf = configs.duties
+async def acalculate(req: CalculationRequest) -> CalculationResult:
+    """`calculate` for API/bot handlers.
 
-    # Bank commission percent from config (global for now)
-    bank_commission_percent = _get_bank_commission_percent(commissions_conf)
+    No blocking network I/O; a result cache hit is answered on the loop, a miss
+    runs on `engine_executor` (bounded, with a deadline).
+    """
+    ctx = _pin_versions(req, await aresolve_context())
+    cached = _from_cache(req, ctx)
+    if cached is not None:
+        return cached
+    if engine_executor.uses_processes:
+        (outcome,) = await _aoffload_many(ctx, [req])
+        if isinstance(outcome, CalculationError):
+            raise outcome
+        result = outcome
+    else:
+        result = await engine_executor.run(calculate_with_context, req, ctx)
+    _to_cache(req, ctx, result)
+    return result
+
+
+def calculate_many(
+    requests: Iterable[CalculationRequest],
+) -> list[CalculationResult | CalculationError]:
+    """Calculate a batch of requests against a single config/rates snapshot.
+
+    Results keep input order. A failing item yields a `CalculationError` in its
+    slot instead of aborting the whole batch.
+    """
+    return _calculate_many_with_context(requests, resolve_context())
+
+
+async def acalculate_many(
+    requests: Iterable[CalculationRequest],
+) -> list[CalculationResult | CalculationError]:
+    """`calculate_many` for async handlers.
+
+    Versions are pinned and the result cache is consulted on the loop; the
+    misses run as one `engine_executor` job per config/rates context.
+    """
+    ctx = await aresolve_context()
+    results: list[CalculationResult | CalculationError | None] = []
+    misses: dict[tuple[Any, ...], tuple[CalculationContext, list[int]]] = {}
+    items: list[CalculationRequest] = []
+    for index, req in enumerate(requests):
+        items.append(req)
+        try:
+            pinned = _pin_versions(req, ctx)
+        except CalculationError as e:
+            results.append(e)
+            continue
+        cached = _from_cache(req, pinned)
+        results.append(cached)
+        if cached is None:
+            misses.setdefault(_context_fingerprint(pinned), (pinned, []))[1].append(index)
+    for pinned, indexes in misses.values():
+        outcomes = await _aoffload_many(pinned, [items[i] for i in indexes])
+        for index, outcome in zip(indexes, outcomes, strict=True):
+            if isinstance(outcome, CalculationResult):
+                _to_cache(items[index], pinned, outcome)
+            results[index] = outcome
+    return [r for r in results if r is not None]
+
+
+async def _aoffload_many(
+    ctx: CalculationContext, requests: list[CalculationRequest]
+) -> list[CalculationResult | CalculationError]:
+    """Requests already pinned to `ctx`, calculated on `engine_executor`."""
+    if not engine_executor.uses_processes:
+        return await engine_executor.run(_calculate_many_with_context, requests, ctx, False)
+    # Compiled tariffs do not pickle: a worker rebuilds the context once per
+    # version and keeps it; the config sections travel only to a worker without it
+    key = _context_fingerprint(ctx)
+    try:
+        return await engine_executor.run(_worker_calculate_many, key, None, requests)
+    except _WorkerContextMissingError:
+        source = (
+            {name: getattr(ctx.configs, name) for name in CONFIG_SECTIONS},
+            thaw(ctx.rates_conf),
+            ctx.today,
+            ctx.rates_version,
+        )
+        return await engine_executor.run(_worker_calculate_many, key, source, requests)
+
+
+class _WorkerContextMissingError(Exception):
+    """The pool worker has no context for the key; resend it with its source."""
+
+
+WORKER_CONTEXTS_KEEP = 4
+_worker_contexts: OrderedDict[tuple[Any, ...], CalculationContext] = OrderedDict()
+
+
+def _worker_calculate_many(
+    key: tuple[Any, ...],
+    source: tuple[dict[str, Any], dict[str, Any], date, int | None] | None,
+    requests: list[CalculationRequest],
+) -> list[CalculationResult | CalculationError]:
+    """Process pool entry point (`ENGINE_EXECUTOR=process`)."""
+    ctx = _worker_contexts.get(key)
+    if ctx is None:
+        if source is None:
+            raise _WorkerContextMissingError
+        sections, rates_conf, today, rates_version = source
+        configs = ConfigRegistry(**sections, hash=key[0], loaded_at="")
+        ctx = replace(
+            resolve_context(configs, rates_conf), today=today, rates_version=rates_version
+        )
+        _worker_contexts[key] = ctx
+        while len(_worker_contexts) > WORKER_CONTEXTS_KEEP:
+            _worker_contexts.popitem(last=False)
+    return _calculate_many_with_context(requests, ctx, False)
+
+
+def _calculate_many_with_context(
+    requests: Iterable[CalculationRequest], ctx: CalculationContext, cached: bool = True
+) -> list[CalculationResult | CalculationError]:
+    """`cached=False`: requests are already pinned to `ctx` and looked up by the caller."""
+    calculate_one = _calculate_cached if cached else calculate_with_context
+    results: list[CalculationResult | CalculationError] = []
+    for index, req in enumerate(requests):
+        try:
+            results.append(calculate_one(req, ctx))
+        except CalculationError as e:
+            results.append(e)
+        except Exception as e:
+            logger.warning(
+                "batch_item_failed", index=index, error=str(e), error_type=type(e).__name__
+            )
+            err = CalculationError(f"{type(e).__name__}: {e}")
+            err.__cause__ = e
+            results.append(err)
+    return results
+
+
+def calculate_with_context(req: CalculationRequest, ctx: CalculationContext) -> CalculationResult:
+    rates_conf = ctx.rates_conf
+    tariffs = ctx.tariffs
+    country_tariff = tariffs.country(req.country)
+    bank_commission_percent = ctx.bank_commission_percent
 
     # Track which currency rates were used in this calculation
     used_currency_codes: set[str] = set()
 
-    today = datetime.now(UTC).date()
+    today = ctx.today
     age_years = today.year - req.year
     age_category = get_age_category(age_years)
     passing_category = get_passing_category(age_category)
@@ -368,18 +605,18 @@ def calculate(req: CalculationRequest) -> CalculationResult:
             )
         )
 
-    duties_rub_dec, duty_mode, duty_details = _compute_duty(
+    duties_rub_dec, duty_mode, duty_details = _duty(
         req.engine_cc,
         age_category,
-        duties_conf,
-        rates_conf,
-        warnings,
-        purchase_price_for_customs,  # Use customs value without bank commission
+        duties=tariffs.duties,
+        eur_rub=_currency_rate(rates_conf, "EUR"),
+        warnings=warnings,
+        purchase_price_rub=purchase_price_for_customs,  # Customs value without bank commission
     )
     # Duty always uses EUR
     used_currency_codes.add("EUR")
 
-    volume_band = format_volume_band(duties_conf, age_category, req.engine_cc)
+    volume_band = tariffs.duties.volume_band_label(age_category, req.engine_cc)
 
     # Country expenses
     if req.country == "japan":
@@ -393,11 +630,11 @@ def calculate(req: CalculationRequest) -> CalculationResult:
         if req.currency.upper() != "JPY":
             # Keep soft warning for UX, but compute tiers correctly
             warnings.append(WarningItem(code="JAPAN_CURRENCY", message=WARN_JAPAN_TIER_CURRENCY))
-        expenses_val = _japan_country_expenses(fees_conf, purchase_price_jpy)
-        expenses_currency = fees_conf.get("country_currency", "JPY")
+        expenses_val = country_tariff.tier_expenses(purchase_price_jpy)
+        expenses_currency = country_tariff.country_currency or "JPY"
     else:
-        expenses_val = _other_country_expenses(fees_conf)
-        expenses_currency = fees_conf.get("country_currency", req.currency)
+        expenses_val = country_tariff.base_expenses_total
+        expenses_currency = country_tariff.country_currency or req.currency
 
     used_currency_codes.add(expenses_currency.upper())
     # Country expenses also should not be affected by bank commission when comparing
@@ -409,23 +646,20 @@ def calculate(req: CalculationRequest) -> CalculationResult:
         bank_commission_percent=None,
     )
 
-    freight_amount, _freight_type_used, freight_currency = _select_freight(
-        fees_conf, req.freight_type
-    )
-    used_currency_codes.add(freight_currency.upper())
+    freight = country_tariff.select_freight(req.freight_type)
+    used_currency_codes.add(freight.currency.upper())
     # Freight is also converted without extra bank commission in current regression.
     freight_rub_dec = _convert(
-        freight_amount,
-        freight_currency,
+        freight.amount,
+        freight.currency,
         rates_conf,
         bank_commission_percent=None,
     )
 
-    customs_services_map = rates_conf.get("customs_services", {})
-    customs_services_rub_dec = to_decimal(customs_services_map.get(req.country, 0))
+    customs_services_rub_dec = tariffs.customs_services.get(req.country, Decimal("0"))
 
     # ERA-GLONASS: NEW 2025 - configurable value (default 45000 RUB)
-    era_glonass_rub_dec = to_decimal(rates_conf.get("era_glonass_rub", 45000))
+    era_glonass_rub_dec = tariffs.era_glonass_rub
 
     # Utilization fee — only for M1. For other vehicle types, set 0 and warn to contact support.
     utilization_coefficient = None
@@ -442,19 +676,15 @@ def calculate(req: CalculationRequest) -> CalculationResult:
         )
     else:
         # NEW: Call v2 function with engine_power_hp
-        utilization_fee_rub_dec, utilization_coefficient = _utilization_fee_v2(
-            age_category, req.engine_cc, req.engine_power_hp, rates_conf
+        utilization_fee_rub_dec, utilization_coefficient = _utilization_fee(
+            tariffs.utilization, age_category, req.engine_cc, req.engine_power_hp
         )
 
     # Commission: NEW 2025 - fixed 1000 USD (or 0 for UAE)
     # Here bank commission percent is applied to conversion of commission itself,
     # which matches business expectation that bank fee is paid on company commission.
-    commission_rub_dec = _commission(
-        purchase_price_rub,
-        commissions_conf,
-        req.country,
-        rates_conf,
-        bank_commission_percent,
+    commission_rub_dec = _company_commission(
+        tariffs.commissions.country(req.country), rates_conf, bank_commission_percent
     )
     if commission_rub_dec > 0:
         used_currency_codes.add("USD")  # Commission uses USD
@@ -529,7 +759,6 @@ def calculate(req: CalculationRequest) -> CalculationResult:
     purchase_rate_val = rates_used.get(purchase_rate_key)
 
     # Calculate engine_power_kw for display
-    HP_TO_KW = 0.7355
     engine_power_kw = round(req.engine_power_hp * HP_TO_KW, 2)
 
     meta = CalculationMeta(
@@ -551,6 +780,8 @@ def calculate(req: CalculationRequest) -> CalculationResult:
         utilization_coefficient=utilization_coefficient,
         rates_used=rates_used,
         detailed_rates_used=detailed_rates_used,
+        rates_version=ctx.rates_version,
+        config_hash=ctx.configs.hash,
     )
 
     # For backward compatibility, keep purchase_rate_val implicitly available via
@@ -0,0 +1,141 @@
+"""Bounded executor for engine calculations awaited by async handlers.
+
+`/api/calculate`, `/api/calculate/batch` and the bot handlers used to run the
+engine inline on the event loop, so one slow calculation delayed every other
+connection of that worker. They now await `engine_executor.run()`:
+
+* `ENGINE_EXECUTOR` selects a thread pool (default), a process pool (spawned
+  workers; arguments and results must pickle) or `inline` on the loop;
+* at most `ENGINE_MAX_PENDING` calculations are queued or running per
+  process - beyond that `run()` fails fast with `EngineOverloadedError`
+  instead of growing an unbounded backlog;
+* every call has a deadline (`ENGINE_DEADLINE_SECONDS`, covering queue wait
+  and execution): a call still queued is dropped, one already running is
+  abandoned, and the caller gets `EngineDeadlineError`. An abandoned call
+  keeps its slot until it actually finishes, so the bound stays real.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+import contextvars
+from dataclasses import dataclass, field
+from functools import partial
+import multiprocessing
+from threading import Lock
+from typing import TYPE_CHECKING, Any
+
+from app.core.messages import ERR_ENGINE_DEADLINE, ERR_ENGINE_OVERLOADED
+from app.core.settings import get_settings
+from app.struct_logger import logger
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+class EngineOverloadedError(RuntimeError):
+    """More calculations queued than `ENGINE_MAX_PENDING`; retry later."""
+
+
+class EngineDeadlineError(TimeoutError):
+    """A calculation did not finish within its deadline."""
+
+
+@dataclass
+class EngineExecutor:
+    submitted: int = field(default=0, init=False)
+    rejected: int = field(default=0, init=False)
+    timed_out: int = field(default=0, init=False)
+    pending: int = field(default=0, init=False)
+    _executor: Executor | None = field(default=None, init=False)
+    _pool_key: tuple[str, int] | None = field(default=None, init=False)
+    _lock: Lock = field(default_factory=Lock, init=False)
+
+    @property
+    def uses_processes(self) -> bool:
+        return get_settings().engine_executor == "process"
+
+    def _pool(self, mode: str, workers: int) -> Executor:
+        with self._lock:
+            if self._executor is None or self._pool_key != (mode, workers):
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                if mode == "process":
+                    # spawn: the API and bot processes run an event loop and threads
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix="engine"
+                    )
+                self._pool_key = (mode, workers)
+                logger.info("engine_executor_started", mode=mode, workers=workers)
+            return self._executor
+
+    def _release(self, _: Future[Any] | None = None) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    async def run[T](self, fn: Callable[..., T], *args: Any, deadline: float | None = None) -> T:
+        """`fn(*args)` on the configured pool; `deadline` overrides the setting (0 = none)."""
+        settings = get_settings()
+        mode = settings.engine_executor
+        if mode == "inline":
+            return fn(*args)
+        with self._lock:
+            if self.pending >= settings.engine_max_pending:
+                self.rejected += 1
+                raise EngineOverloadedError(
+                    ERR_ENGINE_OVERLOADED.format(
+                        pending=self.pending, limit=settings.engine_max_pending
+                    )
+                )
+            self.pending += 1
+            self.submitted += 1
+        try:
+            # Threads keep the request's context variables (structlog)
+            call = (
+                partial(fn, *args)
+                if mode == "process"
+                else partial(contextvars.copy_context().run, fn, *args)
+            )
+            future = self._pool(mode, max(1, settings.engine_workers)).submit(call)
+        except BaseException:
+            self._release()
+            raise
+        # Called when the work really ends: completed, failed, or cancelled while queued
+        future.add_done_callback(self._release)
+        timeout = settings.engine_deadline_seconds if deadline is None else deadline
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout or None)
+        except TimeoutError as e:
+            with self._lock:
+                self.timed_out += 1
+            logger.warning("engine_deadline_exceeded", deadline_seconds=timeout, mode=mode)
+            raise EngineDeadlineError(ERR_ENGINE_DEADLINE.format(deadline=timeout)) from e
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor, self._pool_key = self._executor, None, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+            logger.info("engine_executor_stopped")
+
+    def get_stats(self) -> dict[str, Any]:
+        settings = get_settings()
+        return {
+            "mode": settings.engine_executor,
+            "workers": settings.engine_workers,
+            "max_pending": settings.engine_max_pending,
+            "deadline_seconds": settings.engine_deadline_seconds,
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+engine_executor = EngineExecutor()
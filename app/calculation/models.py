@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-from datetime import UTC, datetime
 from decimal import Decimal  # noqa: TC003
-from typing import Literal
+from typing import Any, Literal
 
 from pydantic import BaseModel, Field, field_validator
 
+from app.core.clock import utc_year
 from app.core.messages import ERR_YEAR_FUTURE, ERR_YEAR_TOO_OLD
 
 
@@ -24,12 +24,25 @@ class CalculationRequest(BaseModel):
     freight_type: FreightType | None = None
     sanctions_unknown: bool = False
     vehicle_type: VehicleType = Field(default="M1")
+    rates_version: int | None = Field(
+        default=None,
+        ge=1,
+        description=(
+            "Pin the rates version of an earlier quote (meta.rates_version). "
+            "An opaque identifier (content hash): equal or not, never older/newer"
+        ),
+    )
+    config_hash: str | None = Field(
+        default=None,
+        min_length=8,
+        max_length=64,
+        description="Pin the config version of an earlier quote (meta.config_hash or a prefix)",
+    )
 
     @field_validator("year")
     @classmethod
     def validate_year(cls, v: int) -> int:
-        current_year = datetime.now(UTC).year
-        if v > current_year:
+        if v > utc_year():
             raise ValueError(ERR_YEAR_FUTURE)
         if v < 1990:
             raise ValueError(ERR_YEAR_TOO_OLD)
@@ -94,6 +107,11 @@ class CalculationMeta(BaseModel):
     # Old: Map of currency rates used in this calculation, preserved for
     # backward compatibility (keys like "USD_RUB": 90.0).
     rates_used: dict[str, float] = Field(default_factory=dict)
+    # Version of the effective rates used; pass it back as request.rates_version.
+    # Opaque content hash: compare for equality only, it carries no ordering
+    rates_version: int | None = None
+    # Config version (ConfigRegistry.hash) used; pass it back as request.config_hash
+    config_hash: str | None = None
     # New: Detailed rates information per source currency code (e.g. "USD").
     detailed_rates_used: dict[str, RateUsage] = Field(default_factory=dict)
 
@@ -104,6 +122,37 @@ class CalculationResult(BaseModel):
     breakdown: CostBreakdown
 
 
+class BatchCalculationRequest(BaseModel):
+    """Batch of raw calculation requests.
+
+    Items are validated one by one so that a single invalid item (including one
+    that is not a JSON object) is reported in its own result slot instead of
+    rejecting the whole batch.
+    """
+
+    items: list[Any] = Field(min_length=1)
+
+
+class BatchItemError(BaseModel):
+    code: Literal["validation_error", "calculation_error"]
+    message: str
+    details: list[dict[str, Any]] = Field(default_factory=list)
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    ok: bool
+    result: CalculationResult | None = None
+    error: BatchItemError | None = None
+
+
+class BatchCalculationResponse(BaseModel):
+    count: int
+    succeeded: int
+    failed: int
+    results: list[BatchItemResult]
+
+
 # Explicit rebuild to avoid Pydantic lazy resolution issues under some import orders
 CalculationRequest.model_rebuild()
 CostBreakdown.model_rebuild()
@@ -111,3 +160,7 @@ WarningItem.model_rebuild()
 RateUsage.model_rebuild()
 CalculationMeta.model_rebuild()
 CalculationResult.model_rebuild()
+BatchCalculationRequest.model_rebuild()
+BatchItemError.model_rebuild()
+BatchItemResult.model_rebuild()
+BatchCalculationResponse.model_rebuild()
@@ -0,0 +1,380 @@
+"""Vectorized grid engine for tariff studies.
+
+Evaluates the same formulas as `engine.calculate()` over NumPy arrays of
+`year`, `engine_cc`, `engine_power_hp` and `purchase_price` (broadcast
+against each other), for one country / currency / freight choice:
+duty (lt3 percent-vs-min and per-cc bands), utilization v2, conversions,
+fixed fees, commission and totals.
+
+Results match the scalar engine to the ruble. Instead of float math, every
+monetary value is carried as an integer number of 1e-4 units, and each
+`quantize4` step of the engine is reproduced with exact integer
+half-even rounding; the final ruble rounding is HALF_UP like `round_rub`.
+Arrays are int64 and switch to Python-int object arrays when a product
+could overflow.
+
+Purchase prices must have at most 4 decimal places (whole numbers in
+practice). Requires the optional `numpy` dependency.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import ROUND_FLOOR, Decimal
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from .compiled import HP_TO_KW, Brackets
+from .engine import (
+    CalculationError,
+    _company_commission,
+    _convert,
+    _currency_rate,
+    _effective_currency_rate,
+    resolve_context,
+)
+
+
+if TYPE_CHECKING:
+    from numpy.typing import ArrayLike, NDArray
+
+    from .engine import CalculationContext
+
+
+UNIT_EXP = 4  # values are carried as integer multiples of 1e-4
+UNIT = 10**UNIT_EXP
+_INT64_LIMIT = 2**62
+
+AGE_LT3, AGE_3_5, AGE_GT5 = 0, 1, 2
+AGE_CATEGORY_CODES = ("lt3", "3_5", "gt5")
+
+
+@dataclass(frozen=True, slots=True)
+class GridResult:
+    """Per-point breakdown in integer RUB (same fields as `CostBreakdown`)."""
+
+    age_years: NDArray[Any]
+    age_category: NDArray[Any]  # codes into AGE_CATEGORY_CODES
+    purchase_price_rub: NDArray[Any]
+    duties_rub: NDArray[Any]
+    utilization_fee_rub: NDArray[Any]
+    customs_services_rub: NDArray[Any]
+    era_glonass_rub: NDArray[Any]
+    freight_rub: NDArray[Any]
+    country_expenses_rub: NDArray[Any]
+    company_commission_rub: NDArray[Any]
+    total_rub: NDArray[Any]
+
+
+# ---- Exact fixed-point helpers -----------------------------------------------------------------
+
+
+def _split(value: Decimal) -> tuple[int, int]:
+    """Return (numerator, exponent) with value == numerator / 10**exponent."""
+    sign, digits, exp = value.as_tuple()
+    num = int("".join(map(str, digits)) or "0")
+    if sign:
+        num = -num
+    if exp >= 0:  # type: ignore[operator]
+        return num * 10**exp, 0  # type: ignore[operator]
+    return num, -exp  # type: ignore[operator]
+
+
+def _split_many(values: list[Decimal]) -> tuple[NDArray[Any], int]:
+    """Common-exponent numerators for a list of Decimals."""
+    parts = [_split(v) for v in values]
+    exp = max((e for _, e in parts), default=0)
+    nums = [n * 10 ** (exp - e) for n, e in parts]
+    return _array(nums), exp
+
+
+def _array(values: Any) -> NDArray[Any]:
+    arr = np.asarray(values)
+    if arr.dtype == object:
+        return arr
+    if arr.size and int(np.abs(arr).max()) >= _INT64_LIMIT:
+        return arr.astype(object)
+    return arr.astype(np.int64)
+
+
+def _mul(a: NDArray[Any], b: NDArray[Any] | int) -> NDArray[Any]:
+    """Overflow-safe elementwise integer product."""
+    a_max = int(np.abs(a).max()) if np.size(a) else 0
+    b_max = int(np.abs(b).max()) if np.size(b) else 0
+    if a_max * b_max >= _INT64_LIMIT:
+        a = np.asarray(a).astype(object)
+        if isinstance(b, np.ndarray):
+            b = b.astype(object)
+    return a * b
+
+
+def _div_half_even(num: NDArray[Any], den: int | NDArray[Any]) -> NDArray[Any]:
+    """Integer division of non-negative values with ROUND_HALF_EVEN."""
+    q, r = np.divmod(num, den)
+    twice = r * 2
+    rounded: NDArray[Any] = q + ((twice > den) | ((twice == den) & (q % 2 == 1)))
+    return rounded
+
+
+def _to_units(num: NDArray[Any], exp: int) -> NDArray[Any]:
+    """Round num / 10**exp to 1e-4 units (quantize4, half-even)."""
+    if exp <= UNIT_EXP:
+        return _mul(num, 10 ** (UNIT_EXP - exp))
+    return _div_half_even(num, 10 ** (exp - UNIT_EXP))
+
+
+def _mul_q4(units: NDArray[Any], value: Decimal) -> NDArray[Any]:
+    """quantize4(x * value) for x given in 1e-4 units."""
+    num, exp = _split(value)
+    return _to_units(_mul(units, num), exp + UNIT_EXP)
+
+
+def _div_q4(units: NDArray[Any], value: Decimal) -> NDArray[Any]:
+    """quantize4(x / value) for x given in 1e-4 units (value > 0)."""
+    num, exp = _split(value)
+    return _div_half_even(_mul(units, 10**exp), num)
+
+
+def _units(value: Decimal) -> int:
+    num, exp = _split(value)
+    return int(_to_units(np.asarray([num], dtype=object), exp)[0])
+
+
+def _round_rub(units: NDArray[Any]) -> NDArray[Any]:
+    """HALF_UP rounding of non-negative 1e-4 units to whole rubles (like `round_rub`)."""
+    rubles: NDArray[Any] = (units + UNIT // 2) // UNIT
+    return rubles
+
+
+def _bracket_index(brackets: Brackets[Any], x: NDArray[Any]) -> NDArray[Any]:
+    """Index into brackets.values for each x; len(values) means tail, -1 means no match."""
+    bounds = np.asarray(brackets.bounds, dtype=float)
+    idx = np.searchsorted(bounds, x, side="left")
+    if brackets.tail is None:
+        idx = np.where(idx == len(bounds), -1, idx)
+    return idx
+
+
+def _bracket_values(brackets: Brackets[Any]) -> list[Any]:
+    values = list(brackets.values)
+    if brackets.tail is not None:
+        values.append(brackets.tail)
+    return values
+
+
+# ---- Components --------------------------------------------------------------------------------
+
+
+def _duty_units(
+    ctx: CalculationContext,
+    age_category: NDArray[Any],
+    engine_cc: NDArray[Any],
+    customs_units: NDArray[Any],
+) -> NDArray[Any]:
+    duties = ctx.tariffs.duties
+    eur_rub = _currency_rate(ctx.rates_conf, "EUR")
+    out = np.zeros(age_category.shape, dtype=np.int64).astype(customs_units.dtype)
+
+    # lt3: max(customs_value_eur * percent, min_rate * cc), bracket by customs value
+    lt3 = age_category == AGE_LT3
+    category = duties.categories.get("lt3")
+    if lt3.any() and category is not None and category.value_brackets is not None:
+        cv = _div_q4(customs_units[lt3], eur_rub)
+        idx = _bracket_index(category.value_brackets, cv / UNIT)
+        values = _bracket_values(category.value_brackets)
+        found = idx >= 0
+        if values and found.any():
+            pct_num, pct_exp = _split_many([v.percent for v in values])
+            min_num, min_exp = _split_many([v.min_rate_eur_per_cc for v in values])
+            sel = idx[found]
+            by_percent = _to_units(_mul(cv[found], pct_num[sel]), pct_exp + UNIT_EXP)
+            by_min = _to_units(_mul(engine_cc[lt3][found], min_num[sel]), min_exp)
+            duty_eur = np.where(by_percent >= by_min, by_percent, by_min)
+            lt3_out = np.zeros(cv.shape, dtype=out.dtype)
+            lt3_out[found] = _mul_q4(duty_eur, eur_rub)
+            out[lt3] = lt3_out
+
+    # 3_5 / gt5: cc * rate_eur_per_cc * EUR, rounded once
+    eur_num, eur_exp = _split(eur_rub)
+    for code, name in ((AGE_3_5, "3_5"), (AGE_GT5, "gt5")):
+        mask = age_category == code
+        category = duties.categories.get(name)
+        if not mask.any() or category is None:
+            continue
+        idx = _bracket_index(category.bands, engine_cc[mask])
+        values = _bracket_values(category.bands)
+        rates = [v.rate if v.rate is not None else Decimal("0") for v in values]
+        if not rates:
+            continue
+        rate_num, rate_exp = _split_many(rates)
+        found = idx >= 0
+        cat_out = np.zeros(idx.shape, dtype=out.dtype)
+        cat_out[found] = _to_units(
+            _mul(_mul(engine_cc[mask][found], rate_num[idx[found]]), eur_num),
+            rate_exp + eur_exp,
+        )
+        out[mask] = cat_out
+    return out
+
+
+def _utilization_units(
+    ctx: CalculationContext,
+    age_category: NDArray[Any],
+    engine_cc: NDArray[Any],
+    engine_power_hp: NDArray[Any],
+) -> NDArray[Any]:
+    grid = ctx.tariffs.utilization
+    out = np.zeros(age_category.shape, dtype=np.int64)
+    engine_power_kw = engine_power_hp * HP_TO_KW
+    is_lt3 = age_category == AGE_LT3
+    for lo, hi, power in zip(grid.volume_lows, grid.volume_highs, grid.power, strict=True):
+        mask = (engine_cc >= lo) & (engine_cc <= hi)
+        if not mask.any():
+            continue
+        idx = _bracket_index(power, engine_power_kw[mask])
+        cells = _bracket_values(power)
+        if not cells:
+            continue
+        fee_lt3 = _array([_units(c.fee_lt3) for c in cells])
+        fee_gt3 = _array([_units(c.fee_gt3) for c in cells])
+        found = idx >= 0
+        fees = np.zeros(idx.shape, dtype=np.int64)
+        sel = idx[found]
+        fees[found] = np.where(is_lt3[mask][found], fee_lt3[sel], fee_gt3[sel])
+        out[mask] = fees
+    return out
+
+
+def _country_expenses_units(
+    ctx: CalculationContext,
+    country: str,
+    currency: str,
+    price_units: NDArray[Any],
+    purchase_units: NDArray[Any],
+) -> NDArray[Any]:
+    tariff = ctx.tariffs.country(country)
+    if country != "japan":
+        expenses_currency = tariff.country_currency or currency
+        value = _convert(tariff.base_expenses_total, expenses_currency, ctx.rates_conf, None)
+        return np.full(price_units.shape, _units(value), dtype=np.int64)
+
+    expenses_currency = tariff.country_currency or "JPY"
+    try:
+        jpy_rate = _currency_rate(ctx.rates_conf, "JPY")
+    except CalculationError:
+        jpy_units = price_units  # same fallback as the engine: raw purchase price
+    else:
+        if jpy_rate == 0:
+            jpy_units = np.zeros(price_units.shape, dtype=np.int64)
+        else:
+            jpy_units = _div_q4(purchase_units, jpy_rate)
+
+    # Tier bounds in 1e-4 units: x <= bound  <=>  units <= floor(bound * 1e4)
+    tiers = tariff.tiers
+    bounds = [int((b * UNIT).to_integral_value(rounding=ROUND_FLOOR)) for b in tiers.bounds]
+    idx = np.searchsorted(_array(bounds), jpy_units, side="left")
+    # One converted amount per bracket; past the last bound -> tail, or 0 without a tail
+    converted = [_units(_convert(v, expenses_currency, ctx.rates_conf, None)) for v in tiers.values]
+    converted.append(
+        _units(_convert(tiers.tail, expenses_currency, ctx.rates_conf, None))
+        if tiers.tail is not None
+        else 0
+    )
+    return _array(converted)[idx]
+
+
+# ---- Public API --------------------------------------------------------------------------------
+
+
+def calculate_grid(
+    country: str,
+    currency: str,
+    *,
+    year: ArrayLike,
+    engine_cc: ArrayLike,
+    engine_power_hp: ArrayLike,
+    purchase_price: ArrayLike,
+    freight_type: str | None = None,
+    vehicle_type: str = "M1",
+    ctx: CalculationContext | None = None,
+) -> GridResult:
+    """Evaluate the calculation over broadcast arrays of inputs.
+
+    Scalar arguments (country, currency, freight, vehicle type) and the
+    config/rates snapshot are shared by every point; the array inputs are
+    keyword-only. Inputs are not validated like `CalculationRequest`;
+    callers pass sane ranges.
+
+    Example:
+        >>> years = np.arange(2015, 2026)[:, None]
+        >>> ccs = np.arange(1000, 4001, 100)[None, :]
+        >>> res = calculate_grid(
+        ...     "japan",
+        ...     "JPY",
+        ...     year=years,
+        ...     engine_cc=ccs,
+        ...     engine_power_hp=150,
+        ...     purchase_price=2_500_000,
+        ... )
+        >>> res.total_rub.shape
+        (11, 31)
+    """
+    ctx = ctx or resolve_context()
+    currency = currency.upper().strip()
+    year_arr, cc_arr, hp_arr, price_arr = np.broadcast_arrays(
+        np.asarray(year, dtype=np.int64),
+        np.asarray(engine_cc, dtype=np.int64),
+        np.asarray(engine_power_hp, dtype=np.int64),
+        np.asarray(purchase_price),
+    )
+    shape = year_arr.shape
+    price_units = _array(np.rint(np.asarray(price_arr, dtype=float) * UNIT))
+
+    age_years = ctx.today.year - year_arr
+    age_category = np.where(age_years < 3, AGE_LT3, np.where(age_years <= 5, AGE_3_5, AGE_GT5))
+
+    rates_conf = ctx.rates_conf
+    base_rate = _currency_rate(rates_conf, currency)
+    effective_rate = _effective_currency_rate(rates_conf, currency, ctx.bank_commission_percent)
+    purchase_units = _mul_q4(price_units, effective_rate)
+    customs_units = _mul_q4(price_units, base_rate)
+
+    duty_units = _duty_units(ctx, age_category, cc_arr, customs_units)
+
+    if vehicle_type == "M1":
+        utilization_units = _utilization_units(ctx, age_category, cc_arr, hp_arr)
+    else:
+        utilization_units = np.zeros(shape, dtype=np.int64)
+
+    expenses_units = _country_expenses_units(ctx, country, currency, price_units, purchase_units)
+
+    freight = ctx.tariffs.country(country).select_freight(freight_type)
+    freight_units = _units(_convert(freight.amount, freight.currency, rates_conf, None))
+    customs_services_units = _units(ctx.tariffs.customs_services.get(country, Decimal("0")))
+    era_units = _units(ctx.tariffs.era_glonass_rub)
+    commission_units = _units(
+        _company_commission(
+            ctx.tariffs.commissions.country(country), rates_conf, ctx.bank_commission_percent
+        )
+    )
+
+    fixed_units = freight_units + customs_services_units + era_units + commission_units
+    total_units = purchase_units + duty_units + utilization_units + expenses_units + fixed_units
+
+    def _full(units: int) -> NDArray[Any]:
+        return np.full(shape, (units + UNIT // 2) // UNIT, dtype=np.int64)
+
+    return GridResult(
+        age_years=age_years,
+        age_category=age_category,
+        purchase_price_rub=_round_rub(purchase_units),
+        duties_rub=_round_rub(duty_units),
+        utilization_fee_rub=_round_rub(utilization_units),
+        customs_services_rub=_full(customs_services_units),
+        era_glonass_rub=_full(era_units),
+        freight_rub=_full(freight_units),
+        country_expenses_rub=_round_rub(expenses_units),
+        company_commission_rub=_full(commission_units),
+        total_rub=_round_rub(total_units),
+    )
@@ -0,0 +1,62 @@
+"""UTC calendar date cached until the next midnight.
+
+Request validation (`CalculationRequest.validate_year`), the engine context
+and `/api/meta` only need today's UTC date, yet each called
+`datetime.now(UTC)` and built a datetime per request. `DayClock` keeps the
+current date with the epoch bounds of that day; a call is a float read
+(`time.time()`, served by the vDSO on Linux) and two comparisons, and the
+date is recomputed only when the clock leaves the cached day - at midnight,
+or if the wall clock is stepped backwards.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+import time
+
+
+@dataclass(frozen=True, slots=True)
+class _Day:
+    today: date
+    starts_at: float
+    ends_at: float
+
+
+def _day_of(now: float) -> _Day:
+    start = datetime.fromtimestamp(now, UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+    return _Day(
+        today=start.date(),
+        starts_at=start.timestamp(),
+        ends_at=(start + timedelta(days=1)).timestamp(),
+    )
+
+
+@dataclass
+class DayClock:
+    rollovers: int = field(default=0, init=False)
+    _day: _Day | None = field(default=None, init=False)
+
+    def today(self) -> date:
+        now = time.time()
+        day = self._day
+        if day is None or not day.starts_at <= now < day.ends_at:
+            # One immutable object is swapped in: concurrent readers see either day
+            day = self._day = _day_of(now)
+            self.rollovers += 1
+        return day.today
+
+    def reset(self) -> None:
+        """Forget the cached day (tests that move the clock)."""
+        self._day = None
+
+
+day_clock = DayClock()
+
+
+def utc_today() -> date:
+    return day_clock.today()
+
+
+def utc_year() -> int:
+    return day_clock.today().year
@@ -0,0 +1,119 @@
+"""Content-addressed cache of parsed config YAML.
+
+`ConfigRegistry.load` hashes the raw bytes of the config files; that hash
+names a JSON file of the parsed sections in `CONFIG_CACHE_DIR`. Process
+start and reloads with unchanged files parse one small JSON file instead of
+YAML. JSON, not pickle: the directory is writable (a bind-mounted volume in
+docker-compose), and reading an entry must never run code. Sections JSON
+cannot hold as they are (non-string keys, dates) are simply not cached.
+
+Any change to a file changes the hash, so entries never go stale and are
+never invalidated - old ones are simply pruned.
+
+The cache is an optimization only: a missing, unreadable or foreign entry
+is a miss, and write errors are logged and ignored.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import Any
+
+import structlog
+
+
+logger = structlog.get_logger()
+
+CACHE_FORMAT = 2
+CACHE_SUFFIX = ".configcache.json"
+CACHE_KEEP = 8
+
+
+@dataclass
+class ConfigCache:
+    directory: Path | None
+    keep: int = CACHE_KEEP
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f"{key}{CACHE_SUFFIX}"
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Parsed sections stored under `key`, or None on a miss."""
+        if self.directory is None:
+            return None
+        try:
+            payload = json.loads(self._path(key).read_bytes())
+        except FileNotFoundError:
+            payload = None
+        except Exception as e:  # a corrupt entry is just a miss
+            logger.warning("config_cache_read_failed", key=key, error=str(e))
+            payload = None
+        if (
+            not isinstance(payload, dict)
+            or payload.get("format") != CACHE_FORMAT
+            or payload.get("key") != key
+        ):
+            self.misses += 1
+            return None
+        sections: dict[str, Any] = payload["sections"]
+        self.hits += 1
+        return sections
+
+    def put(self, key: str, sections: dict[str, Any]) -> bool:
+        """Atomically store `sections` under `key`. Never raises."""
+        if self.directory is None:
+            return False
+        payload = {"format": CACHE_FORMAT, "key": key, "sections": sections}
+        try:
+            encoded = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+            if json.loads(encoded)["sections"] != sections:
+                # e.g. int keys or dates: a hit would hand out different sections
+                logger.info("config_cache_skipped", key=key, reason="not_json_exact")
+                return False
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(encoded)
+                Path(tmp).replace(self._path(key))
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+        except Exception as e:  # cache write is best effort
+            logger.warning("config_cache_write_failed", key=key, error=str(e))
+            return False
+        self._prune()
+        return True
+
+    def _prune(self) -> None:
+        """Keep the `keep` most recently written entries."""
+        assert self.directory is not None
+        try:
+            entries = sorted(
+                self.directory.glob(f"*{CACHE_SUFFIX}"),
+                key=lambda p: p.stat().st_mtime_ns,
+                reverse=True,
+            )
+            for stale in entries[self.keep :]:
+                stale.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("config_cache_prune_failed", error=str(e))
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": str(self.directory) if self.directory is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
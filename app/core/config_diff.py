@@ -0,0 +1,147 @@
+"""Structural diff of config sections for `/config_diff`.
+
+`diff_values` walks two parsed YAML trees and reports every leaf that was
+added, removed or changed with its full path, e.g.
+`age_categories.3_5.bands[2].rate_eur_per_cc: 2.5 → 2.7`.
+
+`config_file_cache` keeps the last parse of each config file keyed by its
+(mtime, size, inode), so repeated diff checks only `stat` unchanged files
+instead of reading, hashing and parsing them again.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import hashlib
+import json
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Literal
+
+import yaml
+
+from app.core.settings import YamlLoader
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+VALUE_PREVIEW_CHARS = 60
+
+ChangeKind = Literal["added", "removed", "changed"]
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigChange:
+    path: str
+    kind: ChangeKind
+    old: Any = None
+    new: Any = None
+
+    def describe(self) -> str:
+        if self.kind == "added":
+            return f"+ {self.path}: {format_value(self.new)}"
+        if self.kind == "removed":
+            return f"- {self.path}: {format_value(self.old)}"
+        return f"{self.path}: {format_value(self.old)} → {format_value(self.new)}"
+
+
+def format_value(value: Any) -> str:
+    """Compact one-line rendering of a YAML value (long values are cut)."""
+    text = json.dumps(value, ensure_ascii=False, default=str)
+    if len(text) > VALUE_PREVIEW_CHARS:
+        text = text[: VALUE_PREVIEW_CHARS - 1] + "…"
+    return text
+
+
+def _join(path: str, key: Any) -> str:
+    return f"{path}.{key}" if path else str(key)
+
+
+def _same_scalar(old: Any, new: Any) -> bool:
+    # 2 == 2.0 is not a change, True -> 1 is
+    return old == new and isinstance(old, bool) == isinstance(new, bool)
+
+
+def _diff(old: Any, new: Any, path: str, out: list[ConfigChange]) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in old.items():
+            if key in new:
+                _diff(value, new[key], _join(path, key), out)
+            else:
+                out.append(ConfigChange(_join(path, key), "removed", old=value))
+        out.extend(
+            ConfigChange(_join(path, key), "added", new=value)
+            for key, value in new.items()
+            if key not in old
+        )
+    elif isinstance(old, list) and isinstance(new, list):
+        for index, (a, b) in enumerate(zip(old, new, strict=False)):
+            _diff(a, b, f"{path}[{index}]", out)
+        out.extend(
+            ConfigChange(f"{path}[{i}]", "removed", old=old[i]) for i in range(len(new), len(old))
+        )
+        out.extend(
+            ConfigChange(f"{path}[{i}]", "added", new=new[i]) for i in range(len(old), len(new))
+        )
+    elif not _same_scalar(old, new):
+        out.append(ConfigChange(path, "changed", old=old, new=new))
+
+
+def diff_values(old: Any, new: Any, path: str = "") -> list[ConfigChange]:
+    """Leaf-level changes from `old` to `new` in document order."""
+    changes: list[ConfigChange] = []
+    _diff(old, new, path, changes)
+    return changes
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedFile:
+    raw: bytes
+    data: dict[str, Any]
+    digest: str  # sha256 of `raw`
+
+
+@dataclass
+class ConfigFileCache:
+    """Last parse of each file, reused while its (mtime, size, inode) is unchanged."""
+
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    _entries: dict[Path, tuple[tuple[int, int, int], ParsedFile]] = field(
+        default_factory=dict, init=False
+    )
+    _lock: Lock = field(default_factory=Lock, init=False)
+
+    def read(self, path: Path) -> ParsedFile | None:
+        """Parsed file (None if it does not exist). Raises on invalid YAML."""
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is not None and cached[0] == signature:
+                self.hits += 1
+                return cached[1]
+        raw = path.read_bytes()
+        parsed = ParsedFile(
+            raw=raw,
+            data=yaml.load(raw, Loader=YamlLoader) or {},  # safe loader (C or pure Python)
+            digest=hashlib.sha256(raw).hexdigest(),
+        )
+        with self._lock:
+            self.misses += 1
+            self._entries[path] = (signature, parsed)
+        return parsed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        return {"files": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+config_file_cache = ConfigFileCache()
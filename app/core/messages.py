@@ -8,6 +8,10 @@ ERR_BAD_BOT_TOKEN="Telegram API responded Not Found (check BOT_TOKEN)"
 ERR_INVALID_BOT_TOKEN = "invalid bot token format"
 ERR_YEAR_FUTURE = "year cannot be in the future"
 ERR_YEAR_TOO_OLD = "year too old for calculation baseline"
+ERR_RATES_VERSION_UNAVAILABLE = "rates version {version} is unknown or no longer available"
+ERR_CONFIG_VERSION_UNAVAILABLE = "config version {config_hash} is no longer available"
+ERR_ENGINE_OVERLOADED = "engine busy: {pending} calculations pending (max {limit})"
+ERR_ENGINE_DEADLINE = "calculation exceeded its {deadline:g}s deadline"
 
 # Warning / info messages (still constants for consistency)
 WARN_NO_DUTY_RATE = "No duty rate for age category; duty set to 0"
@@ -1,42 +1,83 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from datetime import UTC, datetime
 from functools import lru_cache
 import hashlib
-import json
 import os
 from pathlib import Path
+from threading import Lock
 import time
-from typing import Any
+from typing import TYPE_CHECKING, Any, ClassVar, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import structlog
 import yaml
 
+from app.core.config_cache import ConfigCache
+
+
+try:  # LibYAML bindings: several times faster than the pure-Python loader
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # pragma: no cover - PyYAML built without libyaml
+    from yaml import SafeLoader as YamlLoader  # type: ignore[assignment]
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+
 
 logger = structlog.get_logger()
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 CONFIG_DIR = BASE_DIR / "config"
+CONFIG_SECTIONS = ("fees", "commissions", "rates", "duties")
+CONFIG_HASH_MIN_PREFIX = 8
 
 _raw_env = os.getenv("ENVIRONMENT", "dev").lower()
 _env_file = ".env" if _raw_env in {"prod", "production"} else ".env.dev"
 
 
+class ConfigRefreshError(RuntimeError):
+    """The reloaded configs were rejected; the live registry is unchanged."""
+
+
+def _read_config_bytes(name: str) -> bytes:
+    """Raw file content; a missing file reads as empty (an empty section)."""
+    try:
+        return (CONFIG_DIR / name).read_bytes()
+    except FileNotFoundError:
+        return b""
+
+
+def _parse_yaml(raw: bytes) -> dict[str, Any]:
+    return yaml.load(raw, Loader=YamlLoader) or {}  # safe loader (C or pure Python)
+
+
 def _read_yaml(name: str) -> dict[str, Any]:
-    path = CONFIG_DIR / name
-    if not path.exists():
-        return {}
-    with path.open("r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    return _parse_yaml(_read_config_bytes(name))
+
+
+def _files_hash(raw: dict[str, bytes]) -> str:
+    """Config hash over the raw file bytes (no parsing or re-serialization)."""
+    digest = hashlib.sha256()
+    for section in sorted(raw):
+        content = raw[section]
+        digest.update(f"{section}:{len(content)}:".encode())
+        digest.update(content)
+    return digest.hexdigest()
+
 
+def config_files_hash(raw: Mapping[str, bytes] | None = None) -> str:
+    """Hash of the config files currently on disk (same as `ConfigRegistry.hash`).
 
-def _dict_hash(data: dict[str, Any]) -> str:
-    # Stable JSON dump with sorted keys for deterministic hash
-    dumped = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
-    return hashlib.sha256(dumped.encode("utf-8")).hexdigest()
+    `raw` (section -> file bytes) skips reading files the caller already has.
+    """
+    if raw is None:
+        raw = {s: _read_config_bytes(f"{s}.yml") for s in CONFIG_SECTIONS}
+    return _files_hash({s: raw.get(s, b"") for s in CONFIG_SECTIONS})
 
 
 class AppSettings(BaseSettings):
@@ -49,8 +90,50 @@ class AppSettings(BaseSettings):
     enable_live_cbr: bool = Field(default=False, alias="ENABLE_LIVE_CBR")
     cbr_cache_ttl_seconds: int = Field(default=1800, alias="CBR_CACHE_TTL_SECONDS")
     cbr_url: str = Field(default="https://www.cbr.ru/scripts/XML_daily.asp", alias="CBR_URL")
+    cbr_timeout_seconds: float = Field(default=10.0, alias="CBR_TIMEOUT_SECONDS")
+    cbr_fetch_deadline_seconds: float = Field(default=15.0, alias="CBR_FETCH_DEADLINE_SECONDS")
+    cbr_refresh_ahead_ratio: float = Field(default=0.8, alias="CBR_REFRESH_AHEAD_RATIO")
+    cbr_refresh_backoff_max_seconds: float = Field(
+        default=600.0, alias="CBR_REFRESH_BACKOFF_MAX_SECONDS"
+    )
+    cbr_max_stale_seconds: int = Field(default=86400, alias="CBR_MAX_STALE_SECONDS")
+    cbr_snapshot_path: str = Field(default="data/cbr_rates.json", alias="CBR_SNAPSHOT_PATH")
+    cbr_archive_path: str = Field(default="data/cbr_archive.jsonl", alias="CBR_ARCHIVE_PATH")
     available_countries: str | None = Field(default=None, alias="AVAILABLE_COUNTRIES")
+    # Per-client budgets (0 disables): /api/calculate and /api/calculate/batch
     rate_limit_per_minute: int = Field(default=60, alias="RATE_LIMIT_PER_MINUTE")
+    rate_limit_batch_per_minute: int = Field(default=10, alias="RATE_LIMIT_BATCH_PER_MINUTE")
+    # Empty: counters per process; a file path: shared by the workers of this host
+    rate_limit_shared_path: str = Field(default="", alias="RATE_LIMIT_SHARED_PATH")
+    rate_limit_max_keys: int = Field(default=65536, alias="RATE_LIMIT_MAX_KEYS")
+    # Peers whose X-Forwarded-For is trusted: loopback only; docker-compose sets
+    # the subnet of its `web` network, where the reverse proxy connects from
+    rate_limit_trusted_proxies: str = Field(
+        default="127.0.0.1/32,::1/128", alias="RATE_LIMIT_TRUSTED_PROXIES"
+    )
+    batch_max_items: int = Field(default=500, alias="BATCH_MAX_ITEMS")
+    result_cache_size: int = Field(default=4096, alias="RESULT_CACHE_SIZE")
+    result_cache_ttl_seconds: float = Field(default=3600.0, alias="RESULT_CACHE_TTL_SECONDS")
+    # Generations (config/rates/day) whose results are kept side by side, e.g. pinned versions
+    result_cache_generations: int = Field(default=4, alias="RESULT_CACHE_GENERATIONS")
+    # Where async handlers run calculations: "thread" / "process" pool, or "inline" on the loop
+    engine_executor: Literal["inline", "thread", "process"] = Field(
+        default="thread", alias="ENGINE_EXECUTOR"
+    )
+    engine_workers: int = Field(default=4, alias="ENGINE_WORKERS")
+    engine_max_pending: int = Field(default=64, alias="ENGINE_MAX_PENDING")
+    engine_deadline_seconds: float = Field(default=10.0, alias="ENGINE_DEADLINE_SECONDS")
+    config_watch_enabled: bool = Field(default=True, alias="CONFIG_WATCH_ENABLED")
+    config_watch_interval_seconds: float = Field(default=2.0, alias="CONFIG_WATCH_INTERVAL_SECONDS")
+    config_cache_dir: str = Field(default="data/config_cache", alias="CONFIG_CACHE_DIR")
+    config_history: int = Field(default=8, alias="CONFIG_HISTORY")
+    config_sync_path: str = Field(default="data/config_generation.json", alias="CONFIG_SYNC_PATH")
+    config_sync_interval_seconds: float = Field(default=1.0, alias="CONFIG_SYNC_INTERVAL_SECONDS")
+    config_impact_cases_path: str = Field(
+        default="tests/test_data/cases.yml", alias="CONFIG_IMPACT_CASES_PATH"
+    )
+    config_impact_sample_size: int = Field(default=2000, alias="CONFIG_IMPACT_SAMPLE_SIZE")
+    config_impact_workers: int = Field(default=4, alias="CONFIG_IMPACT_WORKERS")
     admin_user_ids: str = Field(
         default="",
         alias="ADMIN_USER_IDS",
@@ -107,23 +190,46 @@ class ConfigRegistry(BaseModel):
     duties: dict[str, Any]
     hash: str
     loaded_at: str
+    # Timings of the load that built this registry (see `load`)
+    _load_stats: dict[str, Any] = PrivateAttr(default_factory=dict)
+    # Compiled tariff plan, attached by `get_compiled_tariffs`
+    _tariffs: Any = PrivateAttr(default=None)
 
     @classmethod
     def load(cls) -> ConfigRegistry:
-        fees = _read_yaml("fees.yml")
-        commissions = _read_yaml("commissions.yml")
-        rates = _read_yaml("rates.yml")
-        duties = _read_yaml("duties.yml")
-        aggregate = {"fees": fees, "commissions": commissions, "rates": rates, "duties": duties}
-        cfg_hash = _dict_hash(aggregate)
-        return cls(
-            fees=fees,
-            commissions=commissions,
-            rates=rates,
-            duties=duties,
+        """Read the config files; YAML is parsed only if no cache entry matches.
+
+        `hash` is computed over the raw file bytes and doubles as the key of
+        the parsed-config cache (`CONFIG_CACHE_DIR`).
+        """
+        started = time.perf_counter()
+        raw = {section: _read_config_bytes(f"{section}.yml") for section in CONFIG_SECTIONS}
+        cfg_hash = _files_hash(raw)
+        read_done = time.perf_counter()
+
+        cache = _config_cache()
+        sections = cache.get(cfg_hash)
+        cache_hit = sections is not None
+        if sections is None:
+            sections = {section: _parse_yaml(content) for section, content in raw.items()}
+            cache.put(cfg_hash, sections)
+        registry = cls(
+            **sections,
             hash=cfg_hash,
             loaded_at=datetime.now(UTC).isoformat(),
         )
+        done = time.perf_counter()
+        registry._load_stats = {
+            "read_ms": round((read_done - started) * 1000, 2),
+            "parse_ms": round((done - read_done) * 1000, 2),
+            "total_ms": round((done - started) * 1000, 2),
+            "cache_hit": cache_hit,
+        }
+        return registry
+
+    @property
+    def load_stats(self) -> dict[str, Any]:
+        return dict(self._load_stats)
 
 
 @lru_cache(maxsize=1)
@@ -132,28 +238,207 @@ def get_settings() -> AppSettings:
 
 
 @lru_cache(maxsize=1)
+def _config_cache() -> ConfigCache:
+    """`CONFIG_CACHE_DIR` resolved against the project root; empty disables."""
+    raw = get_settings().config_cache_dir.strip()
+    if not raw:
+        return ConfigCache(None)
+    path = Path(raw)
+    return ConfigCache(path if path.is_absolute() else BASE_DIR / path)
+
+
+class _LiveConfigs:
+    """Holder of the live registry.
+
+    The registry is replaced as a whole by a single reference assignment
+    (read-copy-update); it is never mutated or emptied while the process serves.
+    """
+
+    current: ConfigRegistry | None = None
+    # Last CONFIG_HISTORY published registries by hash, oldest first; each keeps
+    # its compiled tariff plan, so a rollback or a pinned request recompiles nothing
+    history: ClassVar[OrderedDict[str, ConfigRegistry]] = OrderedDict()
+    history_lock = Lock()
+    # load_stats of the cold-start load (process startup)
+    startup_stats: dict[str, Any] | None = None
+    load_lock = Lock()
+    # Serializes reloads (file watcher vs. /reload_configs); readers never take it
+    reload_lock = Lock()
+    # Called after every swap: caches derived from the registry (see on_configs_swap)
+    swap_hooks: ClassVar[list[Callable[[], object]]] = []
+
+    @classmethod
+    def remember(cls, configs: ConfigRegistry) -> None:
+        with cls.history_lock:
+            cls.history.pop(configs.hash, None)
+            cls.history[configs.hash] = configs
+            while len(cls.history) > max(get_settings().config_history, 1):
+                cls.history.popitem(last=False)
+
+
 def get_configs() -> ConfigRegistry:
-    return ConfigRegistry.load()
+    configs = _LiveConfigs.current
+    if configs is not None:
+        return configs
+    # Cold start only: one thread loads, the others wait for it
+    with _LiveConfigs.load_lock:
+        if _LiveConfigs.current is None:
+            configs = ConfigRegistry.load()
+            _LiveConfigs.startup_stats = configs.load_stats
+            logger.info("configs_loaded", hash=configs.hash, **_LiveConfigs.startup_stats)
+            _LiveConfigs.remember(configs)
+            _LiveConfigs.current = configs
+        return _LiveConfigs.current
+
+
+def on_configs_swap(hook: Callable[[], object]) -> None:
+    """Register `hook` to run after each registry swap (and `reset_configs`).
+
+    For caches derived from the live configs in modules this one cannot import,
+    e.g. the live currency codes in `app.services.cbr`.
+    """
+    if hook not in _LiveConfigs.swap_hooks:
+        _LiveConfigs.swap_hooks.append(hook)
+
+
+def _run_swap_hooks() -> None:
+    for hook in _LiveConfigs.swap_hooks:
+        hook()
+
+
+def reset_configs() -> None:
+    """Forget the live registry and its history (tests only).
 
+    The next `get_configs()` performs a cold-start load again.
+    """
+    with _LiveConfigs.reload_lock:
+        _LiveConfigs.current = None
+        _LiveConfigs.startup_stats = None
+        with _LiveConfigs.history_lock:
+            _LiveConfigs.history.clear()
+        _run_swap_hooks()
+
+
+def refresh_configs() -> ConfigRegistry:
+    """Load the files again and publish the result; readers never see a gap.
+
+    Goes through the `reload_configs` path with the strict tariff schema, like
+    every other swap; raises `ConfigRefreshError` if the files are rejected.
+    """
+    from app.calculation.compiled import validate_tariffs  # noqa: PLC0415 - calculation sits above core
+
+    with _LiveConfigs.reload_lock:
+        success, _, metrics = _reload_configs_locked(time.time(), False, validate_tariffs)
+        if not success:
+            raise ConfigRefreshError(metrics["error"])
+        configs = _LiveConfigs.current
+        assert configs is not None
+        return configs
+
+
+def swap_configs(new: ConfigRegistry) -> ConfigRegistry | None:
+    """Atomically publish `new` as the live registry; returns the previous one."""
+    _LiveConfigs.remember(new)
+    old, _LiveConfigs.current = _LiveConfigs.current, new
+    _run_swap_hooks()
+    return old
+
+
+def get_config_version(config_hash: str) -> ConfigRegistry | None:
+    """A kept registry by full hash or unique prefix (>= 8 chars), else None."""
+    with _LiveConfigs.history_lock:
+        configs = _LiveConfigs.history.get(config_hash)
+        if configs is not None or len(config_hash) < CONFIG_HASH_MIN_PREFIX:
+            return configs
+        matches = [c for h, c in _LiveConfigs.history.items() if h.startswith(config_hash)]
+    return matches[0] if len(matches) == 1 else None
 
-def refresh_configs() -> None:
-    get_configs.cache_clear()  # type: ignore[attr-defined]
+
+def config_versions() -> list[ConfigRegistry]:
+    """Kept registries, newest published first."""
+    with _LiveConfigs.history_lock:
+        return list(reversed(_LiveConfigs.history.values()))
+
+
+def rollback_configs(config_hash: str | None = None) -> tuple[bool, str, dict[str, Any]]:
+    """
+    Вернуть в работу одну из сохранённых в памяти версий конфигов.
+
+    Без `config_hash` - версию, опубликованную перед текущей. Это подмена
+    одной ссылки (swap_configs): файлы не читаются, тарифы не компилируются.
+    Файлы на диске не меняются, поэтому после рестарта или /reload_configs
+    снова загрузится то, что лежит на диске.
+
+    Returns:
+        (success: bool, message: str, metrics: dict)
+    """
+    with _LiveConfigs.reload_lock:
+        current = _LiveConfigs.current
+        if config_hash is None:
+            older = [c for c in config_versions() if current is None or c.hash != current.hash]
+            target = older[0] if older else None
+        else:
+            target = get_config_version(config_hash)
+        if target is None:
+            message = (
+                "❌ **Rollback failed!**\n\n"
+                f"Config version `{config_hash or 'previous'}` is not kept in memory.\n"
+                "Use /config_versions to list available versions."
+            )
+            return False, message, {"error": "unknown config version"}
+        swap_configs(target)
+
+    metrics = {
+        "old_hash": current.hash if current is not None else None,
+        "new_hash": target.hash,
+        "loaded_at": target.loaded_at,
+        "hash_changed": current is not target,
+    }
+    logger.info("configs_rolled_back", **metrics)
+    message = (
+        "✅ **Configs rolled back!**\n\n"
+        f"🔑 Old hash: `{metrics['old_hash'] or 'N/A'}`\n"
+        f"🔑 New hash: `{target.hash}`\n"
+        f"📊 Loaded at: `{target.loaded_at}`\n\n"
+        "⚠️ Files on disk are unchanged: /reload_configs loads them again."
+    )
+    return True, message, metrics
+
+
+def build_configs(validate: Callable[[ConfigRegistry], object] | None = None) -> ConfigRegistry:
+    """Load a registry off to the side (the live one is untouched).
+
+    `validate` may reject it by raising, e.g. by compiling the tariffs; its
+    duration is added to `load_stats` as `validate_ms`.
+    """
+    configs = ConfigRegistry.load()
+    if validate is not None:
+        started = time.perf_counter()
+        validate(configs)
+        configs._load_stats["validate_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return configs
 
 
 def refresh_settings() -> None:
     get_settings.cache_clear()  # type: ignore[attr-defined]
 
 
-def reload_configs() -> tuple[bool, str, dict[str, Any]]:
+def reload_configs(
+    only_if_changed: bool = False,
+    validate: Callable[[ConfigRegistry], object] | None = None,
+) -> tuple[bool, str, dict[str, Any]]:
     """
     Принудительно перезагрузить все конфигурационные файлы.
 
     Workflow:
-    1. Очистить кэш get_configs()
-    2. Попытаться загрузить новые конфиги
-    3. При ошибке - откатиться к старым (если возможно)
+    1. Загрузить и проверить новые конфиги в стороне (build_configs)
+    2. Атомарно подменить ими текущие (swap_configs)
+    3. При ошибке - текущие конфиги остаются в памяти без изменений
     4. Вернуть статус и метрики
 
+    Читатели get_configs() всё время видят либо старый, либо новый реестр.
+    При `only_if_changed=True` реестр, hash которого не изменился, не подменяется.
+
     Returns:
         (success: bool, message: str, metrics: dict)
 
@@ -164,58 +449,32 @@ def reload_configs() -> tuple[bool, str, dict[str, Any]]:
     """
     start_time = time.time()
 
-    # Сохранить текущие конфиги для rollback
-    old_configs = None
-    old_hash = None
-    try:
-        old_configs = get_configs()
-        old_hash = old_configs.hash
-    except Exception:
-        pass
+    with _LiveConfigs.reload_lock:
+        return _reload_configs_locked(start_time, only_if_changed, validate)
 
-    # Очистить кэш
-    get_configs.cache_clear()  # type: ignore[attr-defined]
-    logger.info("config_cache_cleared", old_hash=old_hash)
 
-    # Попытаться загрузить новые конфиги
-    try:
-        new_configs = get_configs()
-        new_hash = new_configs.hash
-
-        # Метрики
-        load_time = time.time() - start_time
-        metrics = {
-            "config_count": 4,  # fees, commissions, rates, duties
-            "old_hash": old_hash,
-            "new_hash": new_hash,
-            "loaded_at": new_configs.loaded_at,
-            "load_time_ms": round(load_time * 1000, 2),
-            "hash_changed": old_hash != new_hash,
-        }
+def _reload_configs_locked(
+    start_time: float,
+    only_if_changed: bool,
+    validate: Callable[[ConfigRegistry], object] | None,
+) -> tuple[bool, str, dict[str, Any]]:
+    old_configs = _LiveConfigs.current
+    old_hash = old_configs.hash if old_configs is not None else None
 
-        logger.info("configs_reloaded_successfully", **metrics)
-
-        message = (
-            "✅ **Configs reloaded successfully!**\n\n"
-            f"🔑 Old hash: `{old_hash or 'N/A'}`\n"
-            f"🔑 New hash: `{new_hash}`\n"
-            f"📊 Timestamp: `{new_configs.loaded_at}`\n"
-            f"⚡ Load time: `{metrics['load_time_ms']}ms`\n"
-            f"🔄 Changed: `{'Yes' if metrics['hash_changed'] else 'No'}`"
-        )
-
-        return True, message, metrics
+    # Собрать новые конфиги, не трогая текущие
+    try:
+        new_configs = build_configs(validate)
+        unchanged = only_if_changed and new_configs.hash == old_hash
+        if not unchanged:
+            swap_configs(new_configs)
     except Exception as e:
-        # Rollback: восстановить кэш (если возможно)
+        # Подмены не было: в памяти остаются прежние конфиги
         logger.exception(
             "config_reload_failed",
             error=str(e),
             error_type=type(e).__name__,
         )
 
-        # Если были старые конфиги, кэш остался пустым
-        # При следующем вызове get_configs() будет повторная попытка загрузки
-
         message = (
             "❌ **Config reload failed!**\n\n"
             f"🔥 Error: `{type(e).__name__}`\n"
@@ -225,3 +484,41 @@ def reload_configs() -> tuple[bool, str, dict[str, Any]]:
         )
 
         return False, message, {"error": str(e)}
+
+    new_hash = new_configs.hash
+    if unchanged:
+        return (
+            True,
+            "Configs unchanged",
+            {"old_hash": old_hash, "hash_changed": False, "load": new_configs.load_stats},
+        )
+
+    # Метрики
+    load_time = time.time() - start_time
+    load_stats = new_configs.load_stats
+    metrics = {
+        "config_count": len(CONFIG_SECTIONS),  # fees, commissions, rates, duties
+        "old_hash": old_hash,
+        "new_hash": new_hash,
+        "loaded_at": new_configs.loaded_at,
+        "load_time_ms": round(load_time * 1000, 2),
+        "hash_changed": old_hash != new_hash,
+        # read/parse/validate breakdown, cache_hit: YAML parsing was skipped
+        "load": load_stats,
+        "startup": _LiveConfigs.startup_stats,
+    }
+
+    logger.info("configs_reloaded_successfully", **metrics)
+
+    message = (
+        "✅ **Configs reloaded successfully!**\n\n"
+        f"🔑 Old hash: `{old_hash or 'N/A'}`\n"
+        f"🔑 New hash: `{new_hash}`\n"
+        f"📊 Timestamp: `{new_configs.loaded_at}`\n"
+        f"⚡ Load time: `{metrics['load_time_ms']}ms` "
+        f"(parse `{load_stats.get('parse_ms')}ms`, "
+        f"cache `{'hit' if load_stats.get('cache_hit') else 'miss'}`)\n"
+        f"🔄 Changed: `{'Yes' if metrics['hash_changed'] else 'No'}`"
+    )
+
+    return True, message, metrics
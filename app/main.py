@@ -1,8 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
-import time
 from typing import TYPE_CHECKING
 
 from fastapi import FastAPI, Request
@@ -11,8 +11,15 @@ from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
+from app.api.rate_limit import RateLimiter
 from app.api.routes import router as api_router
-from app.core.settings import get_configs, get_settings
+from app.calculation.executor import engine_executor
+from app.core.settings import get_configs
+from app.services.cbr import cbr_service
+from app.services.cbr_refresher import cbr_refresher
+from app.services.config_sync import config_sync
+from app.services.config_watcher import config_watcher
+from app.services.rates_snapshot import default_snapshot_path
 from app.struct_logger import logger, setup_logging
 
 
@@ -25,29 +32,22 @@ TESTS_DIR = Path(__file__).parent.parent / "tests"
 
 
 def rate_limit_middleware(app: FastAPI) -> Callable:
-    settings = get_settings()
-    limit = settings.rate_limit_per_minute
-    counters: dict[tuple[str, int], int] = {}
-    last_cleanup: float = time.time()
+    limiter = RateLimiter.from_settings()
+    app.state.rate_limiter = limiter
 
     async def _middleware(request: Request, call_next):
-        nonlocal last_cleanup
-        if request.url.path.startswith("/api/calculate"):
-            ip = request.client.host if request.client else "unknown"
-            now_minute = int(time.time() // 60)
-            key = (ip, now_minute)
-            counters[key] = counters.get(key, 0) + 1
-            if time.time() - last_cleanup > 300:
-                stale_threshold = now_minute - 2
-                for k in list(counters.keys()):
-                    if k[1] < stale_threshold:
-                        counters.pop(k, None)
-                last_cleanup = time.time()
-            if counters[key] > limit:
-                logger.warning("rate_limited", ip=ip, limit=limit)
+        checked = limiter.check(request)
+        if checked is not None:
+            budget, ip, decision = checked
+            if not decision.allowed:
+                logger.warning("rate_limited", ip=ip, route=budget.name, limit=budget.per_minute)
                 return JSONResponse(
                     status_code=429,
-                    content={"detail": "Rate limit exceeded", "limit_per_minute": limit},
+                    content={
+                        "detail": "Rate limit exceeded",
+                        "limit_per_minute": budget.per_minute,
+                    },
+                    headers={"Retry-After": str(decision.retry_after)},
                 )
         return await call_next(request)
 
@@ -60,9 +60,20 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("app_starting", web_dir=str(WEB_DIR))
     get_configs()  # Force load configs on startup
+    cbr_service.load_snapshot(default_snapshot_path())  # warm start
+    cbr_refresher.start()
+    config_watcher.start()
+    config_sync.start()
     yield
     # Shutdown
     logger.info("app_stopping")
+    await config_sync.stop()
+    await config_watcher.stop()
+    await cbr_refresher.stop()
+    await asyncio.to_thread(engine_executor.shutdown)
+    if limiter := getattr(app.state, "rate_limiter", None):
+        limiter.close()
+    await cbr_service.aclose()
 
 
 def create_app() -> FastAPI:
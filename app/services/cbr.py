@@ -1,19 +1,40 @@
 from __future__ import annotations
 
+import asyncio
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import nullcontext
 from dataclasses import dataclass, field
 from functools import lru_cache
+import hashlib
 import os
 from threading import Lock
 import time
-from typing import Any, NamedTuple
-import xml.etree.ElementTree as ET
+from typing import TYPE_CHECKING, Any, NamedTuple
 
 import httpx
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
-
-from app.core.settings import get_configs, get_settings
+from tenacity import (
+    AsyncRetrying,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
+
+from app.core.settings import get_configs, get_settings, on_configs_swap
 from app.struct_logger import logger
 
+from .cbr_parser import parse_cbr_rates
+from .effective_rates import rates_versions
+from .shared_rates import SharedRatesStore
+
+
+if TYPE_CHECKING:
+    from contextlib import AbstractAsyncContextManager, AbstractContextManager
+    from pathlib import Path
+
+    from .cbr_refresher import CBRRatesRefresher
+    from .effective_rates import EffectiveRates
+
 
 @lru_cache(maxsize=1)
 def _load_currency_codes() -> set[str]:
@@ -25,99 +46,535 @@ def _load_currency_codes() -> set[str]:
     return result
 
 
-def reset_currency_codes_cache() -> None:  # helper if configs refreshed dynamically
-    _load_currency_codes.cache_clear()  # type: ignore[attr-defined]
+def reset_currency_codes_cache() -> None:
+    _load_currency_codes.cache_clear()
+
+
+# A reloaded or rolled back rates.yml may list other live currencies
+on_configs_swap(reset_currency_codes_cache)
 
 
 class CacheEntry(NamedTuple):
     rates: dict[str, float]
     fetched_at: float
+    source: str = "cbr"
+    # Rates version; shared by all processes using the same snapshot file
+    generation: int = 0
+
+
+class Validators(NamedTuple):
+    """What identifies the document behind the cached rates (for conditional GETs)."""
+
+    etag: str | None
+    last_modified: str | None
+    body_hash: str
+    size: int
 
 
 class CBRFetchError(Exception):
     pass
 
 
+FETCH_ATTEMPTS = 3
+ASYNC_POOL_LIMITS = httpx.Limits(max_connections=4, max_keepalive_connections=2)
+
+
+def live_fetch_allowed(force: bool) -> bool:
+    # Deterministic tests: never fetch live inside pytest unless force=True
+    if os.getenv("PYTEST_CURRENT_TEST") and not force:
+        return False
+    return get_settings().enable_live_cbr or force
+
+
 @dataclass
 class CBRRatesService:
-    """Thread-safe service for CBR exchange rates."""
+    """Thread-safe service for CBR exchange rates.
+
+    `fetch_rates` is the blocking client for sync callers (scripts, tests);
+    `afetch_rates` is its event-loop friendly twin built on a pooled
+    `httpx.AsyncClient`. Both share the same cache and the same single-flight
+    slot: while one fetch is in progress, other threads and coroutines wait
+    for its result instead of starting their own.
+    """
 
     _cache: CacheEntry | None = field(default=None, init=False)
     _lock: Lock = field(default_factory=Lock, init=False)
-
-    def _parse_xml(self, xml_text: str) -> dict[str, float]:
+    _async_client: httpx.AsyncClient | None = field(default=None, init=False)
+    _async_client_loop: asyncio.AbstractEventLoop | None = field(default=None, init=False)
+    _refresher: CBRRatesRefresher | None = field(default=None, init=False)
+    # Single-flight: the one fetch in progress, shared by threads and coroutines
+    _inflight: Future[dict[str, float] | None] | None = field(default=None, init=False)
+    fetches_started: int = field(default=0, init=False)
+    fetches_coalesced: int = field(default=0, init=False)
+    fetches_adopted: int = field(default=0, init=False)
+    fetch_lock_timeouts: int = field(default=0, init=False)
+    # Conditional fetches: 304 answers, identical bodies, work skipped thanks to them
+    _validators: Validators | None = field(default=None, init=False)
+    not_modified: int = field(default=0, init=False)
+    unchanged_bodies: int = field(default=0, init=False)
+    parses_avoided: int = field(default=0, init=False)
+    bytes_saved: int = field(default=0, init=False)
+    # Snapshot file shared with sibling processes (see `load_snapshot`)
+    _shared: SharedRatesStore | None = field(default=None, init=False)
+    _snapshot_saved_at: float | None = field(default=None, init=False)
+
+    def _parse_xml(self, document: bytes | str) -> dict[str, float]:
         """Parse XML response from the Central Bank of the Russian Federation."""
-        rates: dict[str, float] = {}
-        root = ET.fromstring(xml_text)
-        interested = _load_currency_codes()
-        for valute in root.findall("Valute"):
-            code_el = valute.find("CharCode")
-            vunit_el = valute.find("VunitRate")
-            if code_el is None or vunit_el is None:
-                continue
-            code = (code_el.text or "").strip().upper()
-            if code not in interested:
-                continue
-            raw_val = (vunit_el.text or "").strip().replace(",", ".")
-            try:
-                value = float(raw_val)
-                rates[f"{code}_RUB"] = value
-            except ValueError:  # pragma: no cover
-                logger.warning("cbr_parse_failed", code=code, raw=raw_val)
-                continue
-        return rates
+        parsed = parse_cbr_rates(document, _load_currency_codes())
+        # The cache, snapshot and rates config all carry floats
+        return {key: float(value) for key, value in parsed.items()}
+
+    def _fresh_cache(self, ttl_seconds: int) -> CacheEntry | None:
+        """The cached entry while younger than `ttl_seconds`. MUST be called within a lock!"""
+        entry = self._cache
+        if entry is None or (time.time() - entry.fetched_at) >= ttl_seconds:
+            return None
+        return entry
 
-    def _is_cache_valid(self, ttl_seconds: int) -> bool:
-        """Check cache validity. MUST be called within a lock!"""
-        if not self._cache:
+    def _begin_fetch(
+        self, force: bool
+    ) -> tuple[dict[str, float] | None, Future[dict[str, float] | None] | None, bool]:
+        """Return `(fresh cached rates, in-flight future, is_leader)`.
+
+        Either the cache was filled meanwhile (first item is set), or the caller
+        joins the fetch already in flight, or becomes the leader of a new one.
+        """
+        self._sync_shared()
+        with self._lock:
+            fresh = None if force else self._fresh_cache(get_settings().cbr_cache_ttl_seconds)
+            if fresh is not None:
+                return dict(fresh.rates), None, False
+            if self._inflight is not None:
+                self.fetches_coalesced += 1
+                return None, self._inflight, False
+            self._inflight = Future()
+            self.fetches_started += 1
+            return None, self._inflight, True
+
+    def _finish_fetch(
+        self, future: Future[dict[str, float] | None], rates: dict[str, float] | None
+    ) -> None:
+        with self._lock:
+            if self._inflight is future:
+                self._inflight = None
+        if not future.done():
+            future.set_result(rates)
+
+    @property
+    def snapshot_path(self) -> Path | None:
+        return self._shared.path if self._shared is not None else None
+
+    def load_snapshot(self, path: Path | None) -> bool:
+        """Warm the cache from the on-disk snapshot and share it with sibling processes.
+
+        Every later fetch is published to `path`, and rates published there by
+        another process (API or bot) are picked up on the next lookup. The
+        snapshot keeps its original `fetched_at`, so TTL/staleness rules
+        apply to it exactly as to rates fetched by this process.
+        """
+        self._shared = SharedRatesStore(path) if path is not None else None
+        if not self._sync_shared():
+            return False
+        entry = self._cache
+        assert entry is not None  # set by the sync above
+        logger.info(
+            "cbr_snapshot_loaded",
+            path=str(path),
+            count=len(entry.rates),
+            age_seconds=round(time.time() - entry.fetched_at, 1),
+        )
+        return True
+
+    def _sync_shared(self) -> bool:
+        """Adopt rates another process published since our last look (one `stat()` if none)."""
+        store = self._shared
+        if store is None:
+            return False
+        snapshot = store.read()
+        if snapshot is None:
             return False
-        return (time.time() - self._cache.fetched_at) < ttl_seconds
+        with self._lock:
+            current = self._cache
+            if current is not None and (
+                current.fetched_at >= snapshot.fetched_at
+                and current.generation >= snapshot.generation
+            ):
+                return False
+            self._cache = CacheEntry(
+                rates=snapshot.rates,
+                fetched_at=snapshot.fetched_at,
+                source="snapshot",
+                generation=snapshot.generation,
+            )
+            self._snapshot_saved_at = snapshot.saved_at
+        return True
+
+    def _fetch_lock(self) -> AbstractContextManager[bool]:
+        """Cross-process fetch lock; yields False if a sibling held it past the deadline."""
+        store = self._shared
+        if store is None:
+            return nullcontext(True)
+        return store.fetch_lock(get_settings().cbr_fetch_deadline_seconds)
+
+    def _afetch_lock(self) -> AbstractAsyncContextManager[bool]:
+        store = self._shared
+        if store is None:
+            return nullcontext(True)
+        return store.afetch_lock(get_settings().cbr_fetch_deadline_seconds)
+
+    def _cache_mark(self) -> tuple[int, float] | None:
+        """Generation and fetch time of the cached rates (what a caller has seen)."""
+        with self._lock:
+            entry = self._cache
+            return (entry.generation, entry.fetched_at) if entry is not None else None
+
+    def _fetched_elsewhere(self, seen: tuple[int, float] | None) -> dict[str, float] | None:
+        """Fresh rates another process published since the caller looked (`seen`).
+
+        `seen` is taken before the first sync with the shared file, so rates a
+        sibling published before the lock was taken count as well - e.g. the
+        refresher of the other process got there first.
+        """
+        self._sync_shared()
+        with self._lock:
+            entry = self._cache
+            if entry is None or (entry.generation, entry.fetched_at) == seen:
+                return None
+            if self._fresh_cache(get_settings().cbr_cache_ttl_seconds) is None:
+                return None
+            self.fetches_adopted += 1
+            return dict(entry.rates)
+
+    def _lock_timed_out(self) -> dict[str, float] | None:
+        """Another process holds the fetch lock past the deadline: serve the snapshot."""
+        self._sync_shared()
+        with self._lock:
+            self.fetch_lock_timeouts += 1
+        logger.warning(
+            "cbr_fetch_lock_timeout", wait_seconds=get_settings().cbr_fetch_deadline_seconds
+        )
+        return self._last_good()
+
+    def _store_fetched(self, parsed: dict[str, float]) -> dict[str, float]:
+        """Cache freshly fetched rates under a new generation and publish them."""
+        fetched_at = time.time()
+        generation = None
+        if self._shared is not None:
+            generation = self._shared.publish(parsed, fetched_at, source=get_settings().cbr_url)
+        with self._lock:
+            if generation is None:
+                generation = (self._cache.generation if self._cache else 0) + 1
+            else:
+                self._snapshot_saved_at = time.time()
+            self._cache = CacheEntry(
+                rates=parsed, fetched_at=fetched_at, source="cbr", generation=generation
+            )
+        return dict(parsed)
+
+    def _store_unchanged(self) -> dict[str, float]:
+        """CBR document unchanged: restart the TTL of cached rates, keep their generation."""
+        with self._lock:
+            entry = self._cache
+            if entry is None:
+                raise CBRFetchError("not_modified_without_cached_rates")
+            entry = self._cache = entry._replace(fetched_at=time.time(), source="cbr")
+        store = self._shared
+        if store is not None:
+            published = store.publish(
+                entry.rates,
+                entry.fetched_at,
+                source=get_settings().cbr_url,
+                generation=entry.generation,
+            )
+            if published is not None:
+                self._snapshot_saved_at = time.time()
+        return dict(entry.rates)
+
+    def _conditional_headers(self) -> dict[str, str]:
+        """Validators of the cached document; empty when there is nothing to fall back on."""
+        with self._lock:
+            validators = self._validators if self._cache is not None else None
+        headers: dict[str, str] = {}
+        if validators is not None:
+            if validators.etag:
+                headers["If-None-Match"] = validators.etag
+            if validators.last_modified:
+                headers["If-Modified-Since"] = validators.last_modified
+        return headers
+
+    def _read_response(self, resp: httpx.Response) -> dict[str, float] | None:
+        """Parse a CBR response; None if it is the document already cached (304 / same body)."""
+        if resp.status_code == httpx.codes.NOT_MODIFIED:
+            with self._lock:
+                self.not_modified += 1
+                self.parses_avoided += 1
+                self.bytes_saved += self._validators.size if self._validators else 0
+            return None
+        body = resp.content
+        body_hash = hashlib.blake2b(body, digest_size=16).hexdigest()
+        validators = Validators(
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+            body_hash=body_hash,
+            size=len(body),
+        )
+        with self._lock:
+            previous = self._validators if self._cache is not None else None
+            if previous is not None and previous.body_hash == body_hash:
+                self._validators = validators
+                self.unchanged_bodies += 1
+                self.parses_avoided += 1
+                return None
+        parsed = self._parse_xml(body)
+        if not parsed:
+            raise CBRFetchError("empty_or_unparsed_response")
+        with self._lock:
+            self._validators = validators
+        return parsed
+
+    def _last_good(self) -> dict[str, float] | None:
+        """Previously fetched rates after a failed fetch, unless older than max staleness."""
+        with self._lock:
+            if self._cache is None:
+                return None
+            age = time.time() - self._cache.fetched_at
+            if age >= get_settings().cbr_max_stale_seconds:
+                return None
+            rates = dict(self._cache.rates)
+        logger.info("cbr_serving_last_good", age_seconds=round(age, 1))
+        return rates
+
+    def attach_refresher(self, refresher: CBRRatesRefresher | None) -> None:
+        """Hand cache revalidation over to a background refresher (or take it back)."""
+        self._refresher = refresher
+
+    def fetched_at(self) -> float | None:
+        """Fetch time of the newest rates, including ones a sibling process published."""
+        self._sync_shared()
+        with self._lock:
+            return self._cache.fetched_at if self._cache else None
+
+    def _lookup_cache(self) -> tuple[dict[str, float] | None, bool]:
+        """Return `(rates to serve, whether the caller should fetch inline)`.
+
+        With a background refresher running callers never fetch themselves:
+        stale rates are served (stale-while-revalidate) up to
+        `CBR_MAX_STALE_SECONDS`, after that static rates apply until the
+        refresher succeeds.
+        """
+        self._sync_shared()
+        settings = get_settings()
+        refresher = self._refresher
+        background = refresher if refresher is not None and refresher.running else None
+        with self._lock:
+            fresh = self._fresh_cache(settings.cbr_cache_ttl_seconds)
+            if fresh is not None:
+                # Return a copy of the data for safety
+                return dict(fresh.rates), False
+            if background is None:
+                return None, True
+            stale = None
+            max_stale = settings.cbr_max_stale_seconds
+            if self._cache and time.time() - self._cache.fetched_at < max_stale:
+                stale = dict(self._cache.rates)
+        background.wake()
+        return stale, False
 
     @retry(
         reraise=True,
-        stop=stop_after_attempt(3),
+        stop=stop_after_attempt(FETCH_ATTEMPTS),
         wait=wait_exponential(multiplier=1, min=1, max=5),
         retry=retry_if_exception_type(CBRFetchError),
     )
-    def _do_fetch(self, url: str) -> dict[str, float]:
+    def _do_fetch(self, url: str) -> dict[str, float] | None:
+        """Fetched rates, or None if the document has not changed since the cached one."""
         try:
-            resp = httpx.get(url, timeout=10.0)
-            resp.raise_for_status()
+            resp = httpx.get(
+                url,
+                headers=self._conditional_headers(),
+                timeout=get_settings().cbr_timeout_seconds,
+            )
+            if resp.status_code != httpx.codes.NOT_MODIFIED:
+                resp.raise_for_status()
         except Exception as e:  # pragma: no cover
             raise CBRFetchError(str(e)) from e
-        parsed = self._parse_xml(resp.text)
-        if not parsed:
-            raise CBRFetchError("empty_or_unparsed_response")
-        return parsed
+        return self._read_response(resp)
 
     def fetch_rates(self, force: bool = False) -> dict[str, float] | None:
-        """Thread-safe fetch of CBR exchange rates."""
-        settings = get_settings()
-
-        # Deterministic tests: never fetch live inside pytest unless force=True
-        if os.getenv("PYTEST_CURRENT_TEST") and not force:
-            return None
-        if not settings.enable_live_cbr and not force:
+        """Thread-safe fetch of CBR exchange rates (blocking)."""
+        if not live_fetch_allowed(force):
             return None
+        seen = self._cache_mark()
+
+        if not force:
+            cached, fetch_inline = self._lookup_cache()
+            if not fetch_inline:
+                return cached
+
+        cached, future, leader = self._begin_fetch(force)
+        if cached is not None:
+            return cached
+        assert future is not None
+        rates = self._lead_fetch(future, seen) if leader else self._wait_inflight(future)
+        if rates is None and not force:
+            # cbr.ru is unreachable: keep working on the last good rates
+            return self._last_good()
+        return rates
 
-        # Quick cache check under read lock
-        with self._lock:
-            if not force and self._is_cache_valid(settings.cbr_cache_ttl_seconds):
-                # Return a copy of the data for safety
-                return dict(self._cache.rates)
+    def _wait_inflight(self, future: Future[dict[str, float] | None]) -> dict[str, float] | None:
+        try:
+            rates = future.result(timeout=get_settings().cbr_fetch_deadline_seconds)
+        except FutureTimeoutError:
+            logger.warning("cbr_coalesced_fetch_timeout")
+            return None
+        return dict(rates) if rates else None
 
-        # Cache is invalid, load new data
+    def _lead_fetch(
+        self, future: Future[dict[str, float] | None], seen: tuple[int, float] | None
+    ) -> dict[str, float] | None:
+        # Cache is invalid, load new data (unless a sibling process just did)
+        rates = None
         try:
-            parsed = self._do_fetch(settings.cbr_url)
-            # Update cache under lock
-            with self._lock:
-                self._cache = CacheEntry(rates=parsed, fetched_at=time.time())
-            logger.info("cbr_rates_fetched", count=len(parsed), retries="ok")
+            with self._fetch_lock() as locked:
+                if not locked:
+                    rates = self._lock_timed_out()
+                    return rates
+                rates = self._fetched_elsewhere(seen)
+                if rates is None:
+                    parsed = self._do_fetch(get_settings().cbr_url)
+                    changed = parsed is not None
+                    if parsed is None:
+                        rates = self._store_unchanged()
+                    else:
+                        rates = self._store_fetched(parsed)
+                    logger.info(
+                        "cbr_rates_fetched", count=len(rates), changed=changed, retries="ok"
+                    )
         except Exception as e:  # pragma: no cover
             logger.warning("cbr_fetch_failed", error=str(e))
             return None
         else:
-            return parsed
+            return dict(rates)
+        finally:
+            self._finish_fetch(future, rates)
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Shared connection pool, (re)created per running event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._async_client
+        if client is None or client.is_closed or self._async_client_loop is not loop:
+            client = httpx.AsyncClient(
+                timeout=get_settings().cbr_timeout_seconds,
+                limits=ASYNC_POOL_LIMITS,
+            )
+            self._async_client = client
+            self._async_client_loop = loop
+        return client
+
+    async def _ado_fetch(self, url: str) -> dict[str, float] | None:
+        client = self._get_async_client()
+        async for attempt in AsyncRetrying(
+            reraise=True,
+            stop=stop_after_attempt(FETCH_ATTEMPTS),
+            wait=wait_exponential(multiplier=1, min=1, max=5),
+            retry=retry_if_exception_type(CBRFetchError),
+        ):
+            with attempt:
+                try:
+                    resp = await client.get(url, headers=self._conditional_headers())
+                    if resp.status_code != httpx.codes.NOT_MODIFIED:
+                        resp.raise_for_status()
+                except httpx.HTTPError as e:
+                    raise CBRFetchError(str(e)) from e
+                parsed = self._read_response(resp)
+        return parsed
+
+    async def afetch_rates(self, force: bool = False) -> dict[str, float] | None:
+        """Non-blocking fetch of CBR exchange rates.
+
+        Retries and waits never exceed `CBR_FETCH_DEADLINE_SECONDS` in total;
+        on failure or deadline the caller gets `None` (static rates apply).
+        """
+        if not live_fetch_allowed(force):
+            return None
+        seen = self._cache_mark()
+
+        if not force:
+            cached, fetch_inline = self._lookup_cache()
+            if not fetch_inline:
+                return cached
+
+        cached, future, leader = self._begin_fetch(force)
+        if cached is not None:
+            return cached
+        assert future is not None
+        if leader:
+            rates = await self._alead_fetch(future, seen)
+        else:
+            rates = await self._await_inflight(future)
+        if rates is None and not force:
+            # cbr.ru is unreachable: keep working on the last good rates
+            return self._last_good()
+        return rates
+
+    async def _await_inflight(
+        self, future: Future[dict[str, float] | None]
+    ) -> dict[str, float] | None:
+        try:
+            async with asyncio.timeout(get_settings().cbr_fetch_deadline_seconds):
+                # shield: a timed-out waiter must not cancel the shared fetch
+                rates = await asyncio.shield(asyncio.wrap_future(future))
+        except TimeoutError:
+            logger.warning("cbr_coalesced_fetch_timeout", mode="async")
+            return None
+        return dict(rates) if rates else None
+
+    async def _alead_fetch(
+        self, future: Future[dict[str, float] | None], seen: tuple[int, float] | None
+    ) -> dict[str, float] | None:
+        settings = get_settings()
+        rates = None
+        try:
+            async with self._afetch_lock() as locked:
+                if not locked:
+                    rates = self._lock_timed_out()
+                    return rates
+                rates = self._fetched_elsewhere(seen)
+                if rates is None:
+                    async with asyncio.timeout(settings.cbr_fetch_deadline_seconds):
+                        parsed = await self._ado_fetch(settings.cbr_url)
+                    changed = parsed is not None
+                    # publish() writes and fsyncs the shared snapshot: off the event loop
+                    if parsed is None:
+                        rates = await asyncio.to_thread(self._store_unchanged)
+                    else:
+                        rates = await asyncio.to_thread(self._store_fetched, parsed)
+                    logger.info(
+                        "cbr_rates_fetched",
+                        count=len(rates),
+                        changed=changed,
+                        retries="ok",
+                        mode="async",
+                    )
+        except TimeoutError:
+            logger.warning(
+                "cbr_fetch_deadline_exceeded", deadline=settings.cbr_fetch_deadline_seconds
+            )
+            return None
+        except Exception as e:
+            logger.warning("cbr_fetch_failed", error=str(e), mode="async")
+            return None
+        else:
+            return dict(rates)
+        finally:
+            self._finish_fetch(future, rates)
+
+    async def aclose(self) -> None:
+        """Close the pooled async client (application shutdown)."""
+        client, self._async_client = self._async_client, None
+        self._async_client_loop = None
+        if client is not None and not client.is_closed:
+            await client.aclose()
 
     def get_cached_rates(self) -> dict[str, float] | None:
         """Get exchange rates only from the cache without API call."""
@@ -130,31 +587,72 @@ class CBRRatesService:
         """Clear the exchange rates cache."""
         with self._lock:
             self._cache = None
+            self._validators = None
 
     def get_cache_info(self) -> dict[str, Any]:
         """Return cache state information."""
+        refresher = self._refresher
+        background = refresher if refresher is not None and refresher.running else None
+        schedule: dict[str, Any] = {
+            "background_refresh": background is not None,
+            "next_refresh_at": background.next_refresh_at if background else None,
+            "refresh_failures": background.failures if background else 0,
+            "fetches_started": self.fetches_started,
+            "fetches_coalesced": self.fetches_coalesced,
+            "fetches_adopted": self.fetches_adopted,
+            "fetch_lock_timeouts": self.fetch_lock_timeouts,
+            "not_modified": self.not_modified,
+            "unchanged_bodies": self.unchanged_bodies,
+            "parses_avoided": self.parses_avoided,
+            "bytes_saved": self.bytes_saved,
+            "fetch_in_flight": self._inflight is not None,
+        }
         with self._lock:
             if not self._cache:
                 return {
                     "cached": False,
                     "rates_count": 0,
                     "currencies": sorted(_load_currency_codes()),
+                    **schedule,
                 }
 
             settings = get_settings()
             age_seconds = time.time() - self._cache.fetched_at
             is_valid = age_seconds < settings.cbr_cache_ttl_seconds
+            stale_seconds = max(0.0, age_seconds - settings.cbr_cache_ttl_seconds)
 
             return {
                 "cached": True,
                 "rates_count": len(self._cache.rates),
+                "source": self._cache.source,
+                "generation": self._cache.generation,
                 "fetched_at": self._cache.fetched_at,
                 "age_seconds": age_seconds,
                 "is_valid": is_valid,
                 "ttl_seconds": settings.cbr_cache_ttl_seconds,
+                "stale_seconds": stale_seconds,
+                "serving_stale": (
+                    background and not is_valid and age_seconds < settings.cbr_max_stale_seconds
+                ),
                 "currencies": sorted(_load_currency_codes()),
+                **schedule,
             }
 
+    def get_snapshot_info(self) -> dict[str, Any]:
+        """Freshness of the persisted snapshot and of the rates being served."""
+        path = self.snapshot_path
+        with self._lock:
+            entry = self._cache
+        return {
+            "enabled": path is not None,
+            "path": str(path) if path is not None else None,
+            "saved_at": self._snapshot_saved_at,
+            "generation": entry.generation if entry else None,
+            "served_from_snapshot": entry is not None and entry.source == "snapshot",
+            "rates_fetched_at": entry.fetched_at if entry else None,
+            "rates_age_seconds": round(time.time() - entry.fetched_at, 1) if entry else None,
+        }
+
 
 cbr_service = CBRRatesService()
 
@@ -164,7 +662,7 @@ def fetch_cbr_rates(force: bool = False) -> dict[str, float] | None:
     return cbr_service.fetch_rates(force)
 
 
-def parse_cbr_xml(xml_text: str) -> dict[str, float]:
+def parse_cbr_xml(xml_text: bytes | str) -> dict[str, float]:
     """Compatible parser export for tests (wraps service method)."""
     return cbr_service._parse_xml(xml_text)
 
@@ -172,13 +670,34 @@ def parse_cbr_xml(xml_text: str) -> dict[str, float]:
 def get_effective_rates(
     base_rates_conf: dict[str, Any],
     rates_service: CBRRatesService | None = None,
+) -> EffectiveRates:
+    """Return merged exchange rate configuration (static + live).
+
+    The result is shared and read-only; it is rebuilt (with a new version)
+    only when the static config or the live rates change.
+    """
+    live = fetch_cbr_rates() if rates_service is None else rates_service.fetch_rates()
+    return rates_versions.resolve(base_rates_conf, live, merge_live_rates)
+
+
+async def aget_effective_rates(
+    base_rates_conf: dict[str, Any],
+    rates_service: CBRRatesService | None = None,
+) -> EffectiveRates:
+    """Async `get_effective_rates`: live rates come from the pooled async client."""
+    service = cbr_service if rates_service is None else rates_service
+    live = await service.afetch_rates()
+    return rates_versions.resolve(base_rates_conf, live, merge_live_rates)
+
+
+def merge_live_rates(
+    base_rates_conf: dict[str, Any],
+    live: dict[str, float] | None,
 ) -> dict[str, Any]:
-    """Return merged exchange rate configuration (static + live)."""
+    """Overlay live CBR rates (if any) on the static rates config."""
     merged = dict(base_rates_conf)
     currencies = dict(merged.get("currencies", {}))
 
-    live = fetch_cbr_rates() if rates_service is None else rates_service.fetch_rates()
-
     if live:
         currencies.update(live)
         merged["live_source"] = "cbr"
@@ -0,0 +1,308 @@
+"""Historical archive of CBR rates for "as of date" recalculations.
+
+Storage is an append-only JSON Lines file, one line per effective date::
+
+    {"date": "2025-09-06", "rates": {"EUR_RUB": "95.4792", "USD_RUB": "81.5556"}}
+
+Values are kept as decimal strings (no float round-trip). A later line for the
+same date supersedes an earlier one, so corrections are appended as well.
+CBR answers a weekend or holiday with the last business day's document; such
+a requested day is recorded as checked so that backfills do not refetch it::
+
+    {"date": "2025-09-07", "same_as": "2025-09-06"}
+
+In memory the archive is a pair of parallel lists sorted by date: `rates_at`
+is a bisect (O(log n)), range queries bisect both bounds and only touch the
+requested slice.
+
+Ingestion fetches `XML_daily.asp?date_req=DD/MM/YYYY` for a date range through
+one pooled `httpx.AsyncClient` with at most `concurrency` requests in flight.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import lru_cache
+import json
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, NamedTuple
+
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+from app.core.settings import BASE_DIR, get_settings
+from app.struct_logger import logger
+
+from .cbr import FETCH_ATTEMPTS, CBRFetchError, _load_currency_codes
+from .cbr_parser import parse_cbr_date, parse_cbr_rates
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+
+DEFAULT_INGEST_CONCURRENCY = 4
+
+
+class ArchivedRates(NamedTuple):
+    day: date
+    rates: dict[str, Decimal]
+
+
+@dataclass(frozen=True, slots=True)
+class IngestReport:
+    requested: int
+    stored: int
+    unchanged: int
+    failed: list[date] = field(default_factory=list)
+
+
+@dataclass
+class RatesArchive:
+    """Date-indexed, append-only store of daily CBR rates."""
+
+    path: Path | None = None
+    _days: list[date] = field(default_factory=list, init=False)
+    _rates: list[dict[str, Decimal]] = field(default_factory=list, init=False)
+    # Requested days without a document of their own (weekends, holidays)
+    _checked: set[date] = field(default_factory=set, init=False)
+    _offset: int = field(default=0, init=False)
+    _lock: Lock = field(default_factory=Lock, init=False)
+
+    @classmethod
+    def open(cls, path: Path) -> RatesArchive:
+        archive = cls(path=path)
+        archive.refresh()
+        return archive
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    @property
+    def first_day(self) -> date | None:
+        return self._days[0] if self._days else None
+
+    @property
+    def last_day(self) -> date | None:
+        return self._days[-1] if self._days else None
+
+    def refresh(self) -> int:
+        """Read lines appended to the file since the last read (e.g. by an ingest run)."""
+        if self.path is None:
+            return 0
+        with self._lock:
+            try:
+                with self.path.open("rb") as f:
+                    f.seek(self._offset)
+                    chunk = f.read()
+            except FileNotFoundError:
+                return 0
+            # Only complete lines: a concurrent writer may be mid-line
+            end = chunk.rfind(b"\n") + 1
+            loaded = 0
+            for line in chunk[:end].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    day = date.fromisoformat(record["date"])
+                    if "same_as" in record:
+                        self._checked.add(day)
+                        loaded += 1
+                        continue
+                    rates = {k: Decimal(v) for k, v in record["rates"].items()}
+                except (ValueError, KeyError, TypeError, ArithmeticError) as e:
+                    logger.warning("cbr_archive_bad_line", path=str(self.path), error=str(e))
+                    continue
+                self._put(day, rates)
+                loaded += 1
+            self._offset += end
+            return loaded
+
+    def _put(self, day: date, rates: dict[str, Decimal]) -> None:
+        """Insert or replace in memory. MUST be called within a lock!"""
+        i = bisect_left(self._days, day)
+        if i < len(self._days) and self._days[i] == day:
+            self._rates[i] = rates
+        else:
+            self._days.insert(i, day)
+            self._rates.insert(i, rates)
+
+    def add(self, day: date, rates: dict[str, Decimal]) -> bool:
+        """Append rates for `day`; returns False if identical rates are already stored."""
+        with self._lock:
+            i = bisect_left(self._days, day)
+            if i < len(self._days) and self._days[i] == day and self._rates[i] == rates:
+                return False
+            self._append({"date": day.isoformat(), "rates": {k: str(v) for k, v in rates.items()}})
+            self._put(day, dict(rates))
+            return True
+
+    def mark_checked(self, day: date, effective_day: date) -> bool:
+        """Record that `day` has no document of its own (CBR answered with `effective_day`)."""
+        with self._lock:
+            if day in self._checked or day == effective_day:
+                return False
+            self._append({"date": day.isoformat(), "same_as": effective_day.isoformat()})
+            self._checked.add(day)
+            return True
+
+    def _append(self, record: dict[str, object]) -> None:
+        """Append one JSON line to the file. MUST be called within a lock!"""
+        if self.path is None:
+            return
+        line = json.dumps(record, separators=(",", ":"), sort_keys=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Our own line is read back by the next refresh(); re-applying it is a no-op
+        with self.path.open("ab") as f:
+            f.write(line.encode() + b"\n")
+
+    def known_days(self) -> set[date]:
+        """Days a backfill can skip: archived dates and days already checked."""
+        with self._lock:
+            return set(self._days) | self._checked
+
+    def rates_at(self, day: date) -> ArchivedRates | None:
+        """Rates in force on `day`: the latest archived date on or before it."""
+        with self._lock:
+            i = bisect_right(self._days, day) - 1
+            if i < 0:
+                return None
+            return ArchivedRates(self._days[i], dict(self._rates[i]))
+
+    def series(
+        self,
+        pair: str,
+        start: date,
+        end: date,
+        max_points: int | None = None,
+    ) -> list[tuple[date, Decimal]]:
+        """`(date, rate)` points of `pair` (e.g. "USD_RUB") within `[start, end]`.
+
+        With `max_points` the slice is downsampled by a fixed stride; the last
+        point in range is always kept.
+        """
+        with self._lock:
+            lo = bisect_left(self._days, start)
+            hi = bisect_right(self._days, end)
+            count = hi - lo
+            if count <= 0:
+                return []
+            stride = 1
+            if max_points is not None and 0 < max_points < count:
+                stride = -(-count // max_points)
+            indexes = list(range(lo, hi, stride))
+            if indexes[-1] != hi - 1:
+                indexes[-1] = hi - 1
+            return [
+                (self._days[i], self._rates[i][pair]) for i in indexes if pair in self._rates[i]
+            ]
+
+
+def default_archive_path() -> Path:
+    raw = Path(get_settings().cbr_archive_path)
+    return raw if raw.is_absolute() else BASE_DIR / raw
+
+
+@lru_cache(maxsize=1)
+def _archive_singleton() -> RatesArchive:
+    return RatesArchive.open(default_archive_path())
+
+
+def get_rates_archive() -> RatesArchive:
+    """Process-wide archive, topped up with lines appended since the last call."""
+    archive = _archive_singleton()
+    archive.refresh()
+    return archive
+
+
+def _days(start: date, end: date) -> Iterable[date]:
+    for offset in range((end - start).days + 1):
+        yield start + timedelta(days=offset)
+
+
+async def _fetch_day(
+    client: httpx.AsyncClient, url: str, day: date, codes: set[str]
+) -> ArchivedRates:
+    async for attempt in AsyncRetrying(
+        reraise=True,
+        stop=stop_after_attempt(FETCH_ATTEMPTS),
+        wait=wait_exponential(multiplier=1, min=1, max=5),
+        retry=retry_if_exception_type(CBRFetchError),
+    ):
+        with attempt:
+            try:
+                resp = await client.get(url, params={"date_req": day.strftime("%d/%m/%Y")})
+                resp.raise_for_status()
+            except httpx.HTTPError as e:
+                raise CBRFetchError(str(e)) from e
+            rates = parse_cbr_rates(resp.content, codes)
+            if not rates:
+                raise CBRFetchError("empty_or_unparsed_response")
+    # Weekends/holidays come back with the last business day's date
+    return ArchivedRates(parse_cbr_date(resp.content) or day, rates)
+
+
+async def ingest_range(
+    archive: RatesArchive,
+    start: date,
+    end: date,
+    *,
+    concurrency: int = DEFAULT_INGEST_CONCURRENCY,
+    codes: Iterable[str] | None = None,
+    client: httpx.AsyncClient | None = None,
+) -> IngestReport:
+    """Fetch daily rates for `[start, end]` (skipping archived dates) into `archive`."""
+    settings = get_settings()
+    wanted = {c.upper() for c in (codes if codes is not None else _load_currency_codes())}
+    known = archive.known_days()
+    todo = [d for d in _days(start, end) if d not in known]
+    semaphore = asyncio.Semaphore(concurrency)
+    own_client = client is None
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=settings.cbr_timeout_seconds,
+            limits=httpx.Limits(max_connections=concurrency),
+        )
+
+    stored = unchanged = 0
+    failed: list[date] = []
+
+    async def one(day: date) -> None:
+        nonlocal stored, unchanged
+        async with semaphore:
+            try:
+                fetched = await _fetch_day(client, settings.cbr_url, day, wanted)
+            except Exception as e:
+                logger.warning("cbr_archive_fetch_failed", day=day.isoformat(), error=str(e))
+                failed.append(day)
+                return
+        if archive.add(fetched.day, fetched.rates):
+            stored += 1
+        else:
+            unchanged += 1
+        archive.mark_checked(day, fetched.day)
+
+    try:
+        await asyncio.gather(*(one(d) for d in todo))
+    finally:
+        if own_client:
+            await client.aclose()
+
+    report = IngestReport(
+        requested=len(todo), stored=stored, unchanged=unchanged, failed=sorted(failed)
+    )
+    logger.info(
+        "cbr_archive_ingested",
+        start=start.isoformat(),
+        end=end.isoformat(),
+        requested=report.requested,
+        stored=report.stored,
+        failed=len(report.failed),
+    )
+    return report
@@ -0,0 +1,73 @@
+"""Streaming parser for the CBR `XML_daily.asp` document.
+
+`iterparse` walks the raw response bytes (the XML declaration carries the
+windows-1251 encoding), materializes only the `Valute` elements whose
+`CharCode` is requested and stops reading as soon as all requested codes
+have been seen. `VunitRate` values use a decimal comma and go straight to
+`Decimal`, without a float round-trip.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal, InvalidOperation
+import io
+import re
+from typing import TYPE_CHECKING
+import xml.etree.ElementTree as ET
+
+from app.struct_logger import logger
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+
+# `<ValCurs Date="06.09.2025" ...>` sits in the first few dozen bytes
+_VALCURS_DATE = re.compile(rb"<ValCurs[^>]*\bDate=\"(\d{2})\.(\d{2})\.(\d{4})\"")
+_DATE_PROBE_BYTES = 512
+
+
+def parse_cbr_rates(document: bytes | str, codes: Iterable[str]) -> dict[str, Decimal]:
+    """Return `{"<CODE>_RUB": Decimal(VunitRate)}` for the requested currency codes."""
+    remaining = {c.upper() for c in codes}
+    rates: dict[str, Decimal] = {}
+    if not remaining:
+        return rates
+
+    raw = document.encode() if isinstance(document, str) else document
+    code = vunit = None
+    for _, elem in ET.iterparse(io.BytesIO(raw), events=("end",)):
+        tag = elem.tag
+        if tag == "CharCode":
+            code = elem.text
+        elif tag == "VunitRate":
+            vunit = elem.text
+        elif tag == "Valute":
+            normalized = (code or "").strip().upper()
+            if normalized in remaining:
+                remaining.discard(normalized)
+                raw_val = (vunit or "").strip()
+                try:
+                    rates[f"{normalized}_RUB"] = Decimal(raw_val.replace(",", "."))
+                except InvalidOperation:
+                    logger.warning("cbr_parse_failed", code=normalized, raw=raw_val)
+                if not remaining:
+                    break
+            code = vunit = None
+            # Drop the processed subtree: memory stays flat on large documents
+            elem.clear()
+    return rates
+
+
+def parse_cbr_date(document: bytes | str) -> date | None:
+    """Effective date of the rates (`ValCurs/@Date`), read from the document head."""
+    raw = document.encode() if isinstance(document, str) else document
+    match = _VALCURS_DATE.search(raw, 0, _DATE_PROBE_BYTES)
+    if match is None:
+        return None
+    day, month, year = (int(g) for g in match.groups())
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
@@ -0,0 +1,106 @@
+"""Background refresh-ahead scheduler for CBR rates.
+
+Refreshes the `CBRRatesService` cache at `CBR_REFRESH_AHEAD_RATIO` of its TTL,
+so requests never pay the fetch latency. While it runs the service serves
+stale rates instead of fetching inline (stale-while-revalidate). Failed
+refreshes are retried with exponential backoff capped at
+`CBR_REFRESH_BACKOFF_MAX_SECONDS`.
+
+Started from the FastAPI lifespan and from the bot `main_async`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from dataclasses import dataclass, field
+import time
+
+from app.core.settings import get_settings
+from app.struct_logger import logger
+
+from .cbr import CBRRatesService, cbr_service, live_fetch_allowed
+
+
+BACKOFF_BASE_SECONDS = 5.0
+
+
+@dataclass
+class CBRRatesRefresher:
+    service: CBRRatesService
+    failures: int = field(default=0, init=False)
+    next_refresh_at: float | None = field(default=None, init=False)
+    _task: asyncio.Task[None] | None = field(default=None, init=False)
+    _wakeup: asyncio.Event | None = field(default=None, init=False)
+    _loop: asyncio.AbstractEventLoop | None = field(default=None, init=False)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> bool:
+        """Start the refresh loop on the running event loop (no-op if live CBR is off)."""
+        if self.running:
+            return True
+        if not live_fetch_allowed(force=False):
+            logger.info("cbr_refresher_disabled")
+            return False
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.failures = 0
+        self._task = self._loop.create_task(self._run(), name="cbr-rates-refresher")
+        self.service.attach_refresher(self)
+        logger.info("cbr_refresher_started")
+        return True
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        self.service.attach_refresher(None)
+        self.next_refresh_at = None
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+            logger.info("cbr_refresher_stopped")
+
+    def wake(self) -> None:
+        """Ask for an immediate refresh (thread-safe). Ignored while backing off."""
+        loop, event = self._loop, self._wakeup
+        if self.failures or loop is None or event is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(event.set)
+
+    def next_delay(self) -> float:
+        settings = get_settings()
+        if self.failures:
+            backoff = BACKOFF_BASE_SECONDS * 2 ** (self.failures - 1)
+            return float(min(backoff, settings.cbr_refresh_backoff_max_seconds))
+        fetched_at = self.service.fetched_at()
+        if fetched_at is None:
+            return 0.0
+        ahead = settings.cbr_cache_ttl_seconds * settings.cbr_refresh_ahead_ratio
+        return max(0.0, fetched_at + ahead - time.time())
+
+    async def refresh_once(self) -> bool:
+        rates = await self.service.afetch_rates(force=True)
+        if rates is None:
+            self.failures += 1
+            logger.warning("cbr_refresh_failed", failures=self.failures, retry_in=self.next_delay())
+            return False
+        self.failures = 0
+        return True
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            delay = self.next_delay()
+            self.next_refresh_at = time.time() + delay
+            self._wakeup.clear()
+            with suppress(TimeoutError):
+                async with asyncio.timeout(delay):
+                    await self._wakeup.wait()
+            self.next_refresh_at = None
+            await self.refresh_once()
+
+
+cbr_refresher = CBRRatesRefresher(cbr_service)
@@ -0,0 +1,328 @@
+"""Impact of an uploaded config on real quotes, before the file goes live.
+
+`process_config_upload` replays a corpus of requests against the current
+configs and against the candidate (the uploaded section swapped in) and
+reports max / median deltas per country and `CostBreakdown` component, so
+the admin sees what a new `rates.yml` or `duties.yml` does to prices before
+it replaces the old one.
+
+The corpus is the regression suite `tests/test_data/cases.yml`
+(`CONFIG_IMPACT_CASES_PATH`; the image copies the tests to /tests) plus a
+deterministic sample of realistic requests (`CONFIG_IMPACT_SAMPLE_SIZE`); if
+the suite is missing the sample is replayed alone. Chunks are replayed in a
+persistent process pool (`CONFIG_IMPACT_WORKERS`, at most one per CPU;
+small corpora stay in-process). Workers receive plain dicts and compile both plans themselves.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+import multiprocessing
+import os
+from pathlib import Path
+import random
+from statistics import median
+from threading import Lock
+import time
+from typing import Any, get_args
+
+import yaml
+
+from app.calculation import engine
+from app.calculation.models import CalculationRequest, CostBreakdown, Country, FreightType
+from app.core.clock import utc_year
+from app.core.settings import (
+    BASE_DIR,
+    CONFIG_SECTIONS,
+    ConfigRegistry,
+    get_configs,
+    get_settings,
+)
+from app.services.cbr import aget_effective_rates, merge_live_rates
+from app.services.effective_rates import thaw
+from app.struct_logger import logger
+
+
+COMPONENTS = tuple(CostBreakdown.model_fields)
+IMPACT_SEED = 20240101
+# Below this many requests the pool costs more than it saves
+IMPACT_MIN_POOL_REQUESTS = 1000
+IMPACT_CHUNKS_PER_WORKER = 4
+MIN_MODEL_YEAR = 1990
+MAX_SAMPLE_AGE_YEARS = 12
+SAMPLE_ENGINES = (  # (cc, typical hp)
+    (660, 64),
+    (998, 70),
+    (1496, 110),
+    (1798, 140),
+    (1998, 165),
+    (2488, 190),
+    (2996, 250),
+    (3498, 300),
+    (4395, 450),
+)
+SAMPLE_PRICE_USD = (3_000, 80_000)
+ROUBLE = "₽"
+
+_CountryReplay = tuple[str, dict[str, int] | None, dict[str, int] | None]
+
+
+@dataclass(frozen=True, slots=True)
+class ComponentImpact:
+    """Deltas of one breakdown component over the quotes of one country."""
+
+    changed: int
+    max_delta_pct: float
+    median_delta_pct: float
+    max_delta_rub: int
+
+
+@dataclass(frozen=True, slots=True)
+class ImpactReport:
+    quotes: int
+    changed: int
+    # Quotes that worked on the current configs but fail on the candidate
+    errors: int
+    by_country: dict[str, dict[str, ComponentImpact]]
+    elapsed_ms: float
+    workers: int
+
+    def format(self) -> str:
+        """Telegram summary (Markdown)."""
+        lines = [
+            f"📊 **Impact on {self.quotes} quotes:** {self.changed} changed",
+            f"⏱ {self.elapsed_ms:.0f} ms, {max(self.workers, 1)} worker(s)",
+        ]
+        if self.errors:
+            lines.append(f"❌ {self.errors} quote(s) fail with the new config")
+        for country, components in sorted(self.by_country.items()):
+            changed = {name: c for name, c in components.items() if c.changed}
+            if not changed:
+                continue
+            lines.append(f"\n**{country}:**")
+            lines.extend(
+                f"• `{name}`: max {c.max_delta_pct:+.2f}% ({c.max_delta_rub:+,} {ROUBLE}), "
+                f"median {c.median_delta_pct:+.2f}%, changed {c.changed}"
+                for name, c in changed.items()
+            )
+        if not self.changed and not self.errors:
+            lines.append("\n✅ No quote changes.")
+        return "\n".join(lines)
+
+
+def _cases_path() -> Path | None:
+    raw = get_settings().config_impact_cases_path
+    if not raw:
+        return None
+    path = Path(raw)
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+def load_case_requests(year: int | None = None) -> list[CalculationRequest]:
+    """Requests of the regression corpus (`cases.yml`); [] if it is not shipped."""
+    path = _cases_path()
+    if path is None or not path.is_file():
+        return []
+    current_year = year or utc_year()
+    data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+    requests = []
+    for case in data.get("cases", []):
+        payload = dict(case.get("request", {}))
+        if "year" not in payload:
+            payload["year"] = current_year - int(case.get("age_offset") or 1)
+        try:
+            requests.append(CalculationRequest(**payload))
+        except ValueError as e:
+            logger.warning("config_impact_case_skipped", case=case.get("name"), error=str(e))
+    return requests
+
+
+def sample_requests(
+    configs: ConfigRegistry, count: int, seed: int = IMPACT_SEED
+) -> list[CalculationRequest]:
+    """Deterministic grid of realistic requests over the configured countries."""
+    countries = [c for c in get_args(Country) if c in configs.fees]
+    if not countries or count <= 0:
+        return []
+    currencies = configs.rates.get("currencies", {})
+    usd_rub = float(currencies.get("USD_RUB") or 1)
+    freight_types = set(get_args(FreightType))
+    current_year = utc_year()
+    rnd = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        country = rnd.choice(countries)
+        fees = configs.fees.get(country) or {}
+        cc, hp = rnd.choice(SAMPLE_ENGINES)
+        hp = min(max(1, round(hp * rnd.uniform(0.8, 1.25))), 1500)
+        price_usd = rnd.uniform(*SAMPLE_PRICE_USD)
+        currency = "USD"
+        local = str(fees.get("country_currency") or "USD").upper()
+        local_rub = currencies.get(f"{local}_RUB")
+        if local_rub and rnd.random() < 0.5:
+            currency = local
+            price_usd = price_usd * usd_rub / float(local_rub)
+        freights = sorted(freight_types.intersection(fees.get("freight") or {}))
+        requests.append(
+            CalculationRequest(
+                country=country,
+                year=max(MIN_MODEL_YEAR, current_year - rnd.randint(0, MAX_SAMPLE_AGE_YEARS)),
+                engine_cc=cc,
+                engine_power_hp=hp,
+                purchase_price=Decimal(round(price_usd)),
+                currency=currency,
+                freight_type=rnd.choice(freights) if freights else None,
+            )
+        )
+    return requests
+
+
+def _quote(req: CalculationRequest, ctx: engine.CalculationContext) -> dict[str, int] | None:
+    try:
+        return engine.calculate_with_context(req, ctx).breakdown.model_dump()
+    except Exception:  # a failing quote is reported, not raised
+        return None
+
+
+def _replay_chunk(
+    old: tuple[dict[str, Any], dict[str, Any]],
+    new: tuple[dict[str, Any], dict[str, Any]],
+    requests: list[CalculationRequest],
+) -> list[_CountryReplay]:
+    """Quote `requests` on the (sections, rates_conf) pairs `old` and `new`.
+
+    Runs in pool workers: everything it needs comes in as arguments.
+    """
+    contexts = [
+        engine.resolve_context(ConfigRegistry(**sections, hash=label, loaded_at=""), rates_conf)
+        for label, (sections, rates_conf) in (("current", old), ("candidate", new))
+    ]
+    return [(req.country, _quote(req, contexts[0]), _quote(req, contexts[1])) for req in requests]
+
+
+@dataclass
+class ImpactPool:
+    """Process pool kept across uploads (workers start once per process)."""
+
+    _executor: ProcessPoolExecutor | None = field(default=None, init=False)
+    _workers: int = field(default=0, init=False)
+    _lock: Lock = field(default_factory=Lock, init=False)
+
+    def get(self, workers: int) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._workers != workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                # spawn: the bot process runs an event loop and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                self._workers = workers
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+            logger.info("config_impact_pool_stopped")
+
+
+impact_pool = ImpactPool()
+
+
+def _summarize(replays: list[_CountryReplay]) -> tuple[int, int, int, dict]:
+    quotes = changed = errors = 0
+    deltas: dict[str, dict[str, list[tuple[float, int]]]] = defaultdict(
+        lambda: {name: [] for name in COMPONENTS}
+    )
+    for country, before, after in replays:
+        if before is None:
+            continue  # fails on the current configs as well
+        if after is None:
+            errors += 1
+            continue
+        quotes += 1
+        changed += before != after
+        for name in COMPONENTS:
+            old_value, new_value = before[name], after[name]
+            delta = new_value - old_value
+            pct = delta / old_value * 100 if old_value else (100.0 if delta else 0.0)
+            deltas[country][name].append((pct, delta))
+    by_country = {
+        country: {
+            name: ComponentImpact(
+                changed=sum(1 for _, delta in values if delta),
+                max_delta_pct=round(max(values, key=lambda v: abs(v[0]))[0], 2),
+                median_delta_pct=round(median(p for p, _ in values), 2),
+                max_delta_rub=max(values, key=lambda v: abs(v[1]))[1],
+            )
+            for name, values in components.items()
+        }
+        for country, components in deltas.items()
+    }
+    return quotes, changed, errors, by_country
+
+
+def analyze_impact(
+    old: tuple[dict[str, Any], dict[str, Any]],
+    new: tuple[dict[str, Any], dict[str, Any]],
+    requests: list[CalculationRequest],
+    workers: int | None = None,
+) -> ImpactReport:
+    """Replay `requests` on both (sections, rates_conf) pairs; blocking."""
+    started = time.perf_counter()
+    if workers is None:
+        workers = min(get_settings().config_impact_workers, os.cpu_count() or 1)
+    if workers <= 1 or len(requests) < IMPACT_MIN_POOL_REQUESTS:
+        workers = 0
+        replays = _replay_chunk(old, new, requests)
+    else:
+        size = -(-len(requests) // (workers * IMPACT_CHUNKS_PER_WORKER))
+        chunks = [requests[i : i + size] for i in range(0, len(requests), size)]
+        executor = impact_pool.get(workers)
+        futures = [executor.submit(_replay_chunk, old, new, chunk) for chunk in chunks]
+        replays = [item for future in futures for item in future.result()]
+    quotes, changed, errors, by_country = _summarize(replays)
+    report = ImpactReport(
+        quotes=quotes,
+        changed=changed,
+        errors=errors,
+        by_country=by_country,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        workers=workers,
+    )
+    logger.info(
+        "config_impact_analyzed",
+        quotes=quotes,
+        changed=changed,
+        errors=errors,
+        elapsed_ms=report.elapsed_ms,
+        workers=workers,
+    )
+    return report
+
+
+async def analyze_config_change(section: str, candidate: dict[str, Any]) -> ImpactReport:
+    """Impact of replacing config `section` of the live configs with `candidate`.
+
+    Live CBR rates are overlaid on both sides, so a new `rates.yml` only shows
+    what it changes beyond them.
+    """
+    current = get_configs()
+    effective = await aget_effective_rates(current.rates)
+    old_sections = {name: getattr(current, name) for name in CONFIG_SECTIONS}
+    new_sections = {**old_sections, section: candidate}
+    old_rates = thaw(effective)
+    new_rates = (
+        thaw(merge_live_rates(candidate, effective.live)) if section == "rates" else old_rates
+    )
+    settings = get_settings()
+    requests = load_case_requests() + sample_requests(current, settings.config_impact_sample_size)
+    return await asyncio.to_thread(
+        analyze_impact, (old_sections, old_rates), (new_sections, new_rates), requests
+    )
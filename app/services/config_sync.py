@@ -0,0 +1,240 @@
+"""Config invalidation shared between processes (API and bot).
+
+`/reload_configs` and `/rollback_config` in the bot only swap the bot
+process' registry. After a successful change the bot publishes the new
+config hash to a small generation file (`CONFIG_SYNC_PATH`):
+
+* the writer holds an exclusive `flock` on a sidecar `.lock` file, reads the
+  current generation, and atomically replaces the file with generation + 1;
+* every process polls the file every `CONFIG_SYNC_INTERVAL_SECONDS` - one
+  `stat()` while nothing changed - and, on a newer generation, switches to
+  the published hash: a version it keeps in memory is swapped in
+  (`rollback_configs`), otherwise configs are reloaded from disk with the
+  strict tariff schema (`reload_configs`).
+
+A rolled back version that another process never loaded cannot be
+reproduced there: that process reloads from disk and logs the hash mismatch.
+`/api/health` reports the generation each process is on.
+
+Started from the FastAPI lifespan and from the bot `main_async`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import contextmanager, suppress
+from dataclasses import asdict, dataclass, field
+import json
+import os
+from pathlib import Path
+import tempfile
+from threading import Lock
+import time
+from typing import TYPE_CHECKING, Any
+
+from app.calculation.compiled import validate_tariffs
+from app.core.settings import (
+    BASE_DIR,
+    get_configs,
+    get_settings,
+    reload_configs,
+    rollback_configs,
+)
+from app.struct_logger import logger
+
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None  # type: ignore[assignment]
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigGeneration:
+    generation: int
+    hash: str
+    published_at: float
+    pid: int
+
+
+@dataclass
+class ConfigSync:
+    # Generation of the configs this process serves
+    generation: int = field(default=0, init=False)
+    applied: int = field(default=0, init=False)
+    failures: int = field(default=0, init=False)
+    last_error: str | None = field(default=None, init=False)
+    _stat_key: tuple[int, int, int] | None = field(default=None, init=False)
+    _record: ConfigGeneration | None = field(default=None, init=False)
+    _failed_generation: int | None = field(default=None, init=False)
+    _lock: Lock = field(default_factory=Lock, init=False)
+    _task: asyncio.Task[None] | None = field(default=None, init=False)
+
+    @property
+    def path(self) -> Path | None:
+        raw = get_settings().config_sync_path
+        if not raw:
+            return None
+        path = Path(raw)
+        return path if path.is_absolute() else BASE_DIR / path
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def read(self) -> ConfigGeneration | None:
+        """Published generation; the file is reparsed only if it changed since last read."""
+        path = self.path
+        if path is None:
+            return None
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if key == self._stat_key:
+                return self._record
+        try:
+            record: ConfigGeneration | None = ConfigGeneration(
+                **json.loads(path.read_text(encoding="utf-8"))
+            )
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning("config_sync_read_failed", path=str(path), error=str(e))
+            record = None
+        with self._lock:
+            self._stat_key, self._record = key, record
+        return record
+
+    @contextmanager
+    def _publish_lock(self, path: Path) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(path.with_name(path.name + ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            with suppress(OSError):
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def publish(self, config_hash: str) -> int | None:
+        """Announce `config_hash` to the other processes; returns the new generation."""
+        path = self.path
+        if path is None:
+            return None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with self._publish_lock(path):
+                current = self.read()
+                record = ConfigGeneration(
+                    generation=(current.generation if current else 0) + 1,
+                    hash=config_hash,
+                    published_at=time.time(),
+                    pid=os.getpid(),
+                )
+                fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(asdict(record), f)
+                    Path(tmp).replace(path)
+                except BaseException:
+                    Path(tmp).unlink(missing_ok=True)
+                    raise
+        except OSError as e:
+            logger.warning("config_sync_publish_failed", path=str(path), error=str(e))
+            return None
+        # This process already serves the published configs
+        self.generation = record.generation
+        logger.info("config_sync_published", generation=record.generation, hash=config_hash)
+        return record.generation
+
+    def check_once(self) -> bool:
+        """Follow a newer published generation; True if this process switched configs."""
+        record = self.read()
+        if (
+            record is None
+            or record.generation <= self.generation
+            or record.generation == self._failed_generation
+        ):
+            return False
+        if get_configs().hash == record.hash:
+            self.generation = record.generation
+            return False
+        # A version kept in memory is a pointer swap; anything else comes from disk
+        success, _, metrics = rollback_configs(record.hash)
+        if not success:
+            success, _, metrics = reload_configs(validate=validate_tariffs)
+        if not success:
+            self.failures += 1
+            self.last_error = metrics.get("error")
+            self._failed_generation = record.generation
+            logger.warning(
+                "config_sync_apply_failed", generation=record.generation, error=self.last_error
+            )
+            return False
+        if metrics["new_hash"] != record.hash:
+            logger.warning(
+                "config_sync_hash_mismatch", published=record.hash, loaded=metrics["new_hash"]
+            )
+        self.generation = record.generation
+        self.applied += 1
+        self.last_error = None
+        logger.info(
+            "config_sync_applied", generation=record.generation, new_hash=metrics["new_hash"]
+        )
+        return True
+
+    def start(self) -> bool:
+        """Follow published generations on the running event loop (no-op if disabled)."""
+        if self.running:
+            return True
+        if self.path is None:
+            logger.info("config_sync_disabled")
+            return False
+        # Configs were loaded from disk at startup: only later publications apply
+        record = self.read()
+        self.generation = max(self.generation, record.generation if record else 0)
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="config-sync")
+        logger.info("config_sync_started", path=str(self.path), generation=self.generation)
+        return True
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+            logger.info("config_sync_stopped")
+
+    async def _run(self) -> None:
+        interval = get_settings().config_sync_interval_seconds
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.check_once)
+            except Exception as e:  # keep following
+                logger.warning("config_sync_check_failed", error=str(e))
+
+    def get_stats(self) -> dict[str, Any]:
+        record = self._record
+        return {
+            "enabled": self.path is not None,
+            "running": self.running,
+            "pid": os.getpid(),
+            "generation": self.generation,
+            "published_generation": record.generation if record else None,
+            "published_hash": record.hash if record else None,
+            "applied": self.applied,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+config_sync = ConfigSync()
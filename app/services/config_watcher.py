@@ -0,0 +1,153 @@
+"""Automatic config reload when files in `CONFIG_DIR` change.
+
+Changes are picked up through `watchfiles` (inotify on Linux; it ships with
+`uvicorn[standard]`) when it is importable, otherwise by polling the YAML
+files' (name, mtime, size, inode) every `CONFIG_WATCH_INTERVAL_SECONDS`.
+
+A change rebuilds the `ConfigRegistry` off to the side, validates it with the
+strict tariff schema (`validate_tariffs`, which also pre-warms the compiled
+plan) and swaps it in with one reference assignment (`reload_configs`).
+Readers keep using the previous registry until then and never reload
+anything themselves; a broken file is rejected and the current configs stay
+live.
+
+Started from the FastAPI lifespan and from the bot `main_async`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+from dataclasses import dataclass, field
+import os
+import time
+from typing import TYPE_CHECKING, Any
+
+from app.calculation.compiled import validate_tariffs
+from app.core import settings as settings_module
+from app.core.settings import get_settings, reload_configs
+from app.struct_logger import logger
+
+
+try:
+    from watchfiles import awatch
+except ImportError:  # pragma: no cover - optional (uvicorn[standard])
+    awatch = None  # type: ignore[assignment]
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+CONFIG_SUFFIXES = (".yml", ".yaml")
+WATCH_DEBOUNCE_MS = 500
+
+
+@dataclass
+class ConfigWatcher:
+    reloads: int = field(default=0, init=False)
+    failures: int = field(default=0, init=False)
+    last_error: str | None = field(default=None, init=False)
+    last_reload_at: float | None = field(default=None, init=False)
+    _signature: tuple[tuple[str, int, int, int], ...] | None = field(default=None, init=False)
+    _task: asyncio.Task[None] | None = field(default=None, init=False)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def directory(self) -> Path:
+        return settings_module.CONFIG_DIR
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if awatch is not None else "poll"
+
+    def signature(self) -> tuple[tuple[str, int, int, int], ...]:
+        """(name, mtime_ns, size, inode) of every YAML file in the config dir."""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(CONFIG_SUFFIXES) and entry.is_file():
+                        st = entry.stat()
+                        entries.append((entry.name, st.st_mtime_ns, st.st_size, st.st_ino))
+        except FileNotFoundError:
+            return ()
+        return tuple(sorted(entries))
+
+    def check_once(self) -> bool:
+        """Reload if the files changed since the last check; True if new configs went live."""
+        signature = self.signature()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return self.reload()
+
+    def reload(self) -> bool:
+        success, _, metrics = reload_configs(only_if_changed=True, validate=validate_tariffs)
+        if not success:
+            self.failures += 1
+            self.last_error = metrics.get("error")
+            logger.warning("config_watch_reload_rejected", error=self.last_error)
+            return False
+        if not metrics.get("hash_changed"):
+            return False
+        self.reloads += 1
+        self.last_error = None
+        self.last_reload_at = time.time()
+        logger.info(
+            "config_watch_reloaded", old_hash=metrics.get("old_hash"), new_hash=metrics["new_hash"]
+        )
+        return True
+
+    def start(self) -> bool:
+        """Start watching on the running event loop (no-op if disabled)."""
+        if self.running:
+            return True
+        if not get_settings().config_watch_enabled:
+            logger.info("config_watch_disabled")
+            return False
+        # Configs were loaded at startup: only later changes trigger a reload
+        self._signature = self.signature()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="config-watcher")
+        logger.info("config_watch_started", path=str(self.directory), mode=self.mode)
+        return True
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+            logger.info("config_watch_stopped")
+
+    async def _run(self) -> None:
+        if awatch is not None and self.directory.is_dir():
+            async for _ in awatch(self.directory, debounce=WATCH_DEBOUNCE_MS):
+                await self._check()
+            return
+        interval = get_settings().config_watch_interval_seconds
+        while True:
+            await asyncio.sleep(interval)
+            await self._check()
+
+    async def _check(self) -> None:
+        try:
+            await asyncio.to_thread(self.check_once)
+        except Exception as e:  # keep watching
+            logger.warning("config_watch_check_failed", error=str(e))
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "mode": self.mode,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_reload_at": self.last_reload_at,
+        }
+
+
+config_watcher = ConfigWatcher()
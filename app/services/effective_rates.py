@@ -0,0 +1,153 @@
+"""Immutable, versioned effective rates (static config + live CBR overlay).
+
+`get_effective_rates` used to rebuild the merged rates config on every call.
+Now the merge runs only when its inputs change - another `rates.yml` object
+(config reload) or different live rates - and the result is an
+`EffectiveRates` handed out by reference to every caller until then.
+
+The `version` is derived from the merged content, so the API and bot
+processes, every uvicorn worker and a restarted process give the same rates
+the same number. It is an opaque identifier (a hash), not a counter: two
+versions can be compared for equality only, never ordered. The last
+`RATES_HISTORY` versions stay available through `rates_versions.get()`, so
+a quote can be recalculated against the exact rates it was made with
+(`CalculationRequest.rates_version`); a version this process has not built
+is rejected, never resolved to other rates.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+import hashlib
+import json
+from threading import Lock
+import time
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+
+RATES_HISTORY = 32
+# 48 bits: stays an exact integer in JSON clients (< 2**53)
+VERSION_DIGEST_BYTES = 6
+
+
+def content_version(conf: Mapping[str, Any]) -> int:
+    """Stable version of a merged rates config: the same content gives the same number."""
+    canonical = json.dumps(conf, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.blake2b(canonical.encode(), digest_size=VERSION_DIGEST_BYTES).digest()
+    return int.from_bytes(digest, "big") or 1
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class EffectiveRates(Mapping[str, Any]):
+    """Read-only merged rates config; behaves like the `rates_conf` dict it replaces."""
+
+    version: int
+    conf: Mapping[str, Any]
+    built_at: float
+    # Inputs it was built from (compared on the next lookup)
+    base: dict[str, Any] = field(repr=False)
+    live: dict[str, float] | None = field(repr=False)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.conf[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.conf)
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+    @property
+    def currencies(self) -> Mapping[str, float]:
+        currencies: Mapping[str, float] = self.conf.get("currencies", MappingProxyType({}))
+        return currencies
+
+    @property
+    def live_source(self) -> str | None:
+        return self.conf.get("live_source")
+
+
+@dataclass
+class RatesVersions:
+    """Current `EffectiveRates` plus a bounded history of previous versions."""
+
+    history: int = RATES_HISTORY
+    _current: EffectiveRates | None = field(default=None, init=False)
+    _versions: OrderedDict[int, EffectiveRates] = field(default_factory=OrderedDict, init=False)
+    _lock: Lock = field(default_factory=Lock, init=False)
+    rebuilds: int = field(default=0, init=False)
+
+    @staticmethod
+    def _is_current(
+        current: EffectiveRates, base: dict[str, Any], live: dict[str, float] | None
+    ) -> bool:
+        return current.base is base and current.live == live
+
+    def resolve(
+        self,
+        base: dict[str, Any],
+        live: dict[str, float] | None,
+        merge: Callable[[dict[str, Any], dict[str, float] | None], dict[str, Any]],
+    ) -> EffectiveRates:
+        """Current rates for these inputs; `merge` runs only if they changed."""
+        current = self._current
+        if current is not None and self._is_current(current, base, live):
+            return current
+        with self._lock:
+            current = self._current
+            if current is not None and self._is_current(current, base, live):
+                return current
+            merged = merge(base, live)
+            version = content_version(merged)
+            merged["currencies"] = MappingProxyType(merged.get("currencies", {}))
+            current = EffectiveRates(
+                version=version,
+                conf=MappingProxyType(merged),
+                built_at=time.time(),
+                base=base,
+                live=dict(live) if live is not None else None,
+            )
+            self._versions[current.version] = current
+            self._versions.move_to_end(current.version)
+            while len(self._versions) > self.history:
+                self._versions.popitem(last=False)
+            self._current = current
+            self.rebuilds += 1
+            return current
+
+    @property
+    def current(self) -> EffectiveRates | None:
+        return self._current
+
+    def get(self, version: int) -> EffectiveRates | None:
+        """A pinned version; None if this process never built it or it left the history."""
+        with self._lock:
+            return self._versions.get(version)
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            current = self._current
+            return {
+                "version": current.version if current else None,
+                "built_at": current.built_at if current else None,
+                "rebuilds": self.rebuilds,
+                "versions_kept": len(self._versions),
+                "oldest_version": next(iter(self._versions), None),
+            }
+
+
+rates_versions = RatesVersions()
+
+
+def thaw(value: Any) -> Any:
+    """Nested read-only mappings -> dicts (`EffectiveRates` does not pickle)."""
+    if isinstance(value, Mapping):
+        return {k: thaw(v) for k, v in value.items()}
+    return value
@@ -0,0 +1,102 @@
+"""On-disk snapshot of the last good CBR rates.
+
+Every successful fetch is persisted atomically (temp file + fsync +
+rename), so a restarted API or bot process starts with warm rates and
+keeps working through cbr.ru outages instead of falling back to the static
+`rates.yml` values.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import json
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import Any
+
+from app.core.settings import BASE_DIR, get_settings
+from app.struct_logger import logger
+
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class RatesSnapshot:
+    rates: dict[str, float]
+    fetched_at: float
+    source: str
+    saved_at: float
+    # Bumped on every publish; all processes sharing the file agree on it
+    generation: int = 0
+    version: int = SNAPSHOT_VERSION
+
+
+def default_snapshot_path() -> Path | None:
+    """`CBR_SNAPSHOT_PATH` resolved against the project root; empty disables."""
+    raw = get_settings().cbr_snapshot_path.strip()
+    if not raw:
+        return None
+    path = Path(raw)
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+def save_snapshot(
+    path: Path,
+    rates: dict[str, float],
+    fetched_at: float,
+    source: str,
+    generation: int = 0,
+) -> bool:
+    """Atomically replace `path` with a snapshot. Never raises."""
+    snapshot = RatesSnapshot(
+        rates=dict(rates),
+        fetched_at=fetched_at,
+        source=source,
+        saved_at=time.time(),
+        generation=generation,
+    )
+    tmp_name = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=path.parent, prefix=f".{path.name}.", delete=False
+        ) as tmp:
+            tmp_name = tmp.name
+            json.dump(asdict(snapshot), tmp, separators=(",", ":"), sort_keys=True)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        Path(tmp_name).replace(path)
+    except OSError as e:
+        logger.warning("cbr_snapshot_save_failed", path=str(path), error=str(e))
+        if tmp_name is not None:
+            Path(tmp_name).unlink(missing_ok=True)
+        return False
+    return True
+
+
+def load_snapshot(path: Path) -> RatesSnapshot | None:
+    """Read a snapshot; a missing, corrupt or foreign file yields `None`."""
+    try:
+        data: dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("cbr_snapshot_load_failed", path=str(path), error=str(e))
+        return None
+    if data.get("version") != SNAPSHOT_VERSION:
+        logger.warning("cbr_snapshot_version_mismatch", path=str(path), version=data.get("version"))
+        return None
+    try:
+        return RatesSnapshot(
+            rates={str(k): float(v) for k, v in data["rates"].items()},
+            fetched_at=float(data["fetched_at"]),
+            source=str(data.get("source", "cbr")),
+            saved_at=float(data.get("saved_at", data["fetched_at"])),
+            generation=int(data.get("generation", 0)),
+        )
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        logger.warning("cbr_snapshot_load_failed", path=str(path), error=str(e))
+        return None
@@ -0,0 +1,155 @@
+"""Rates cache shared between processes (API and bot) through the snapshot file.
+
+The snapshot written by `rates_snapshot.save_snapshot` doubles as the shared
+cache:
+
+* readers `stat()` the file and reparse it only when (inode, mtime, size)
+  changed - atomic renames give every publish a new inode, so an unchanged
+  file costs one syscall;
+* the fetcher holds an exclusive `flock` on a sidecar `.lock` file while it
+  fetches and publishes, so only one process talks to cbr.ru per refresh;
+  the others find the fresh snapshot once they get the lock and skip their
+  own fetch;
+* every publish bumps `generation`, the rates version all processes report.
+
+On platforms without `fcntl` (or if the lock file cannot be opened) the lock
+degrades to a no-op: each process fetches on its own, the file is still
+shared. Only a sibling holding the lock past the deadline yields False.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager, suppress
+from dataclasses import dataclass, field
+import os
+from threading import Lock
+import time
+from typing import TYPE_CHECKING
+
+from app.struct_logger import logger
+
+from .rates_snapshot import RatesSnapshot, load_snapshot, save_snapshot
+
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None  # type: ignore[assignment]
+
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Iterator
+    from pathlib import Path
+
+
+LOCK_POLL_SECONDS = 0.05
+
+
+@dataclass
+class SharedRatesStore:
+    path: Path
+    _stat_key: tuple[int, int, int] | None = field(default=None, init=False)
+    _snapshot: RatesSnapshot | None = field(default=None, init=False)
+    _lock: Lock = field(default_factory=Lock, init=False)
+
+    @property
+    def lock_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".lock")
+
+    def read(self) -> RatesSnapshot | None:
+        """Current shared snapshot; reparsed only if the file changed since last read."""
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if key == self._stat_key:
+                return self._snapshot
+        snapshot = load_snapshot(self.path)
+        with self._lock:
+            self._stat_key, self._snapshot = key, snapshot
+        return snapshot
+
+    def publish(
+        self,
+        rates: dict[str, float],
+        fetched_at: float,
+        source: str,
+        generation: int | None = None,
+    ) -> int | None:
+        """Write a snapshot (by default with the next generation) while holding the fetch lock."""
+        if generation is None:
+            current = self.read()
+            generation = (current.generation if current else 0) + 1
+        if not save_snapshot(self.path, rates, fetched_at, source, generation=generation):
+            return None
+        return generation
+
+    def _try_lock(self) -> int | None:
+        """Non-blocking exclusive lock; returns the fd to release, or None if busy."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    @staticmethod
+    def _unlock(fd: int) -> None:
+        with suppress(OSError):
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    @contextmanager
+    def fetch_lock(self, wait_seconds: float) -> Iterator[bool]:
+        """Hold the cross-process fetch lock; yields False if a sibling held it past the wait."""
+        if fcntl is None:
+            yield True
+            return
+        deadline = time.monotonic() + wait_seconds
+        fd = None
+        try:
+            fd = self._try_lock()
+            while fd is None and time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_SECONDS)
+                fd = self._try_lock()
+        except OSError as e:
+            logger.warning("shared_rates_lock_failed", path=str(self.lock_path), error=str(e))
+            yield True  # unlocked, as without fcntl
+            return
+        if fd is None:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            self._unlock(fd)
+
+    @asynccontextmanager
+    async def afetch_lock(self, wait_seconds: float) -> AsyncIterator[bool]:
+        """`fetch_lock` that waits with `asyncio.sleep` instead of blocking the loop."""
+        if fcntl is None:
+            yield True
+            return
+        deadline = time.monotonic() + wait_seconds
+        fd = None
+        try:
+            fd = self._try_lock()
+            while fd is None and time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                fd = self._try_lock()
+        except OSError as e:
+            logger.warning("shared_rates_lock_failed", path=str(self.lock_path), error=str(e))
+            yield True  # unlocked, as without fcntl
+            return
+        if fd is None:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            self._unlock(fd)
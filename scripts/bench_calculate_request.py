@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/calculate request decoding, FastAPI body parsing vs. read_model().
+
+The former path is what a `payload: CalculationRequest` body parameter does:
+`json.loads` the bytes into a dict, validate the dict, and `validate_year`
+calls `datetime.now(UTC)`. The new path validates the raw bytes with
+`model_validate_json`, and the year comes from the cached day clock.
+
+Usage:
+    python scripts/bench_calculate_request.py [--number 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import UTC, datetime
+import json
+from pathlib import Path
+import sys
+import timeit
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.calculation.models import CalculationRequest
+from app.core.clock import utc_year
+
+
+BODY = json.dumps(
+    {
+        "country": "japan",
+        "year": 2021,
+        "engine_cc": 1496,
+        "engine_power_hp": 110,
+        "purchase_price": "1500000",
+        "currency": "JPY",
+        "freight_type": "open",
+    }
+).encode("utf-8")
+
+
+def legacy_decode(body: bytes) -> CalculationRequest:
+    """dict round trip plus the per-validation clock read of the former validator."""
+    datetime.now(UTC)
+    return CalculationRequest.model_validate(json.loads(body))
+
+
+def fast_decode(body: bytes) -> CalculationRequest:
+    return CalculationRequest.model_validate_json(body)
+
+
+def _per_call_us(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=5000)
+    args = parser.parse_args()
+
+    assert legacy_decode(BODY) == fast_decode(BODY)
+    t_legacy = _per_call_us(lambda: legacy_decode(BODY), args.number)
+    t_fast = _per_call_us(lambda: fast_decode(BODY), args.number)
+    t_now = _per_call_us(lambda: datetime.now(UTC).year, args.number)
+    t_clock = _per_call_us(utc_year, args.number)
+
+    print(f"{'step':<22} {'legacy us':>10} {'fast us':>9} {'speedup':>8}")
+    print(f"{'decode + validate':<22} {t_legacy:>10.2f} {t_fast:>9.2f} {t_legacy / t_fast:>7.1f}x")
+    print(f"{'current year':<22} {t_now:>10.2f} {t_clock:>9.2f} {t_now / t_clock:>7.1f}x")
+    print(f"requests/s per core spent here: {1e6 / t_legacy:,.0f} -> {1e6 / t_fast:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
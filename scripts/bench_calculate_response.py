@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/calculate response serialization, response_model vs. model_response().
+
+The former path is what FastAPI does with `response_model=CalculationResult`
+when the endpoint returns the model: validate the engine's result against the
+response model, dump it to JSON-compatible Python objects, then `json.dumps`
+in `JSONResponse.render`. The new path is one pydantic-core `to_json` call.
+Both must produce the same bytes.
+
+Usage:
+    python scripts/bench_calculate_response.py [--number 2000] [--batch 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+import timeit
+from typing import Any
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from pydantic import TypeAdapter
+
+from app.api.prepared import model_response
+from app.calculation.engine import calculate
+from app.calculation.models import (
+    BatchCalculationResponse,
+    BatchItemResult,
+    CalculationRequest,
+    CalculationResult,
+)
+
+
+REQUEST = {
+    "country": "japan",
+    "year": 2022,
+    "engine_cc": 1496,
+    "engine_power_hp": 110,
+    "purchase_price": "1500000",
+    "currency": "JPY",
+    "freight_type": "open",
+}
+
+
+def legacy_body(adapter: TypeAdapter[Any], result: Any) -> bytes:
+    """response_model round trip: validate, dump to Python, json.dumps."""
+    content = adapter.dump_python(adapter.validate_python(result), mode="json")
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def fast_body(result: Any) -> bytes:
+    return bytes(model_response(result).body)
+
+
+def _per_call_us(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=50)
+    args = parser.parse_args()
+
+    result = calculate(CalculationRequest.model_validate(REQUEST))
+    batch = BatchCalculationResponse(
+        count=args.batch,
+        succeeded=args.batch,
+        failed=0,
+        results=[BatchItemResult(index=i, ok=True, result=result) for i in range(args.batch)],
+    )
+    cases = [
+        ("calculate", TypeAdapter(CalculationResult), result, args.number),
+        (f"batch x{args.batch}", TypeAdapter(BatchCalculationResponse), batch, args.number // 20),
+    ]
+
+    print(f"{'response':<12} {'bytes':>7} {'legacy us':>10} {'fast us':>9} {'speedup':>8}")
+    for name, adapter, model, number in cases:
+        body = fast_body(model)
+        assert body == legacy_body(adapter, model)
+
+        t_legacy = _per_call_us(lambda a=adapter, m=model: legacy_body(a, m), number)
+        t_fast = _per_call_us(lambda m=model: fast_body(m), number)
+        print(
+            f"{name:<12} {len(body):>7} {t_legacy:>10.1f} {t_fast:>9.1f} "
+            f"{t_legacy / t_fast:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
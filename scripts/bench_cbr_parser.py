@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming CBR parser vs. the former full-tree ElementTree parser.
+
+Builds a large XML_daily.asp-like document (windows-1251, comma decimals) with
+thousands of synthetic Valute entries and the configured live currency codes
+placed at the beginning, the middle or the end, then times both parsers.
+
+Usage:
+    python scripts/bench_cbr_parser.py [--valutes 20000] [--repeat 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+from decimal import Decimal
+from pathlib import Path
+import sys
+import timeit
+import xml.etree.ElementTree as ET
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.cbr_parser import parse_cbr_rates
+
+
+CODES = ("USD", "EUR", "JPY", "CNY", "AED")
+REAL_RATES = {
+    "USD": "81,5556",
+    "EUR": "95,4792",
+    "JPY": "0,550271",
+    "CNY": "11,3884",
+    "AED": "22,2071",
+}
+
+
+def _valute(idx: int, code: str, rate: str) -> str:
+    return (
+        f'<Valute ID="R{idx:05d}"><NumCode>{idx % 1000:03d}</NumCode>'
+        f"<CharCode>{code}</CharCode><Nominal>1</Nominal>"
+        f"<Name>Валюта {idx}</Name><Value>{rate}</Value><VunitRate>{rate}</VunitRate></Valute>"
+    )
+
+
+def build_document(valutes: int, position: str) -> bytes:
+    """XML_daily.asp-like document; `position` is where the wanted codes sit."""
+    filler = [_valute(i, f"X{i:04d}"[-3:] + "Z", f"{i},{i % 97:04d}") for i in range(valutes)]
+    wanted = [_valute(90000 + i, code, REAL_RATES[code]) for i, code in enumerate(CODES)]
+    at = {"start": 0, "middle": valutes // 2, "end": valutes}[position]
+    body = filler[:at] + wanted + filler[at:]
+    xml = (
+        '<?xml version="1.0" encoding="windows-1251"?>'
+        '<ValCurs Date="06.09.2025" name="Foreign Currency Market">'
+        + "".join(body)
+        + "</ValCurs>"
+    )
+    return xml.encode("cp1251")
+
+
+def legacy_parse(document: bytes, codes: set[str]) -> dict[str, float]:
+    """The pre-streaming implementation: full tree, then scan every Valute."""
+    rates: dict[str, float] = {}
+    root = ET.fromstring(document)
+    for valute in root.findall("Valute"):
+        code_el = valute.find("CharCode")
+        vunit_el = valute.find("VunitRate")
+        if code_el is None or vunit_el is None:
+            continue
+        code = (code_el.text or "").strip().upper()
+        if code not in codes:
+            continue
+        rates[f"{code}_RUB"] = float((vunit_el.text or "").strip().replace(",", "."))
+    return rates
+
+
+def _best(parse, document: bytes, codes: set[str], repeat: int) -> float:
+    return min(timeit.repeat(lambda: parse(document, codes), number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--valutes", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    codes = set(CODES)
+    print(f"Valute entries: {args.valutes:,} + {len(CODES)} wanted; repeat={args.repeat}")
+    print(f"{'position':<8} {'size KiB':>9} {'legacy ms':>10} {'stream ms':>10} {'speedup':>8}")
+    for position in ("start", "middle", "end"):
+        document = build_document(args.valutes, position)
+        streamed = parse_cbr_rates(document, codes)
+        legacy = legacy_parse(document, codes)
+        assert streamed == {f"{c}_RUB": Decimal(REAL_RATES[c].replace(",", ".")) for c in CODES}
+        assert {k: float(v) for k, v in streamed.items()} == legacy
+
+        t_legacy = _best(legacy_parse, document, codes, args.repeat)
+        t_stream = _best(parse_cbr_rates, document, codes, args.repeat)
+        print(
+            f"{position:<8} {len(document) / 1024:>9.0f} {t_legacy * 1000:>10.2f} "
+            f"{t_stream * 1000:>10.2f} {t_legacy / t_stream:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Fill the historical CBR rates archive for a date range.
+
+Already archived dates are skipped, so the script can be re-run (e.g. daily
+from cron) to top the archive up.
+
+Usage:
+    python scripts/ingest_cbr_archive.py 2025-01-01 2025-09-30 [--concurrency 4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import date
+from pathlib import Path
+import sys
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.cbr_archive import (
+    DEFAULT_INGEST_CONCURRENCY,
+    RatesArchive,
+    default_archive_path,
+    ingest_range,
+)
+from app.struct_logger import setup_logging
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("start", type=date.fromisoformat)
+    parser.add_argument("end", type=date.fromisoformat)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_INGEST_CONCURRENCY)
+    parser.add_argument("--archive", type=Path, default=None, help="archive file path")
+    args = parser.parse_args()
+
+    setup_logging()
+    archive = RatesArchive.open(args.archive or default_archive_path())
+    report = asyncio.run(
+        ingest_range(archive, args.start, args.end, concurrency=args.concurrency)
+    )
+    print(
+        f"requested={report.requested} stored={report.stored} "
+        f"unchanged={report.unchanged} failed={len(report.failed)} archive_days={len(archive)}"
+    )
+    for day in report.failed:
+        print(f"  failed: {day.isoformat()}")
+    sys.exit(1 if report.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -59,22 +59,20 @@ def _patch_commissions(monkeypatch):
     import copy
 
     cfg = get_configs()
-    # Deep copy to preserve nested structures like bank_commission
-    original_commissions = copy.deepcopy(cfg.commissions)
+    original_commissions = cfg.commissions
 
     def _apply(new_commissions: dict) -> None:
-        """Apply new commissions config by directly mutating the dict."""
-        cfg_inner = get_configs()
-        # Clear the dict and update with deep copy to ensure nested dicts are replaced
-        cfg_inner.commissions.clear()
-        cfg_inner.commissions.update(copy.deepcopy(new_commissions))
+        """Apply new commissions config by replacing the section.
+
+        Commissions are compiled once per section object (CompiledTariffs),
+        so the dict is swapped, not mutated in place.
+        """
+        get_configs().commissions = copy.deepcopy(new_commissions)
 
     yield _apply
 
     # Restore original commissions after test
-    cfg_restore = get_configs()
-    cfg_restore.commissions.clear()
-    cfg_restore.commissions.update(original_commissions)
+    get_configs().commissions = original_commissions
 
 
 def _build_payload() -> dict:
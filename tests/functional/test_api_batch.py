@@ -0,0 +1,130 @@
+"""Функциональные тесты для пакетного расчёта.
+
+Покрытие:
+- calculate_many(): порядок результатов, общий снапшот конфигов/курсов, ошибки по элементам
+- POST /api/calculate/batch: частичные ошибки (и элементы не-объекты) не ломают весь батч,
+  лимит размера (по числу элементов и по байтам тела до разбора)
+"""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+
+from fastapi.testclient import TestClient
+import pytest
+
+from app.calculation import engine as engine_mod
+from app.calculation.engine import CalculationError, calculate, calculate_many
+from app.calculation.models import CalculationRequest, CalculationResult
+from app.core.settings import get_settings
+from app.main import create_app
+
+
+@pytest.fixture(scope="module")
+def batch_client() -> TestClient:
+    """Separate app instance: keeps these calls out of the shared client's rate limit."""
+    return TestClient(create_app())
+
+
+def _payload(**overrides) -> dict:
+    payload = {
+        "country": "japan",
+        "year": datetime.now(UTC).year - 4,
+        "engine_cc": 1500,
+        "engine_power_hp": 110,
+        "purchase_price": 2_500_000,
+        "currency": "JPY",
+        "freight_type": "standard",
+    }
+    payload.update(overrides)
+    return payload
+
+
+class TestCalculateMany:
+    def test_matches_single_calculate_in_order(self) -> None:
+        reqs = [
+            CalculationRequest(**_payload()),
+            CalculationRequest(**_payload(country="korea", currency="USD", purchase_price=20000)),
+            CalculationRequest(**_payload(engine_cc=3500, engine_power_hp=300)),
+        ]
+        results = calculate_many(reqs)
+        assert len(results) == 3
+        for req, res in zip(reqs, results, strict=True):
+            assert isinstance(res, CalculationResult)
+            assert res.request == req
+            assert res.breakdown == calculate(req).breakdown
+
+    def test_context_resolved_once(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        calls = {"n": 0}
+        real = engine_mod.get_effective_rates
+
+        def counting(base_rates):
+            calls["n"] += 1
+            return real(base_rates)
+
+        monkeypatch.setattr(engine_mod, "get_effective_rates", counting)
+        calculate_many([CalculationRequest(**_payload()) for _ in range(5)])
+        assert calls["n"] == 1
+
+    def test_item_error_does_not_fail_batch(self) -> None:
+        reqs = [
+            CalculationRequest(**_payload()),
+            CalculationRequest(**_payload(currency="XXX", country="korea")),
+        ]
+        results = calculate_many(reqs)
+        assert isinstance(results[0], CalculationResult)
+        assert isinstance(results[1], CalculationError)
+
+
+@pytest.mark.functional
+class TestBatchEndpoint:
+    def test_batch_mixed_results(self, batch_client: TestClient) -> None:
+        items = [_payload(), {"country": "japan"}, _payload(country="korea", currency="XXX")]
+        r = batch_client.post("/api/calculate/batch", json={"items": items})
+        assert r.status_code == 200
+        data = r.json()
+        assert data["count"] == 3
+        assert data["succeeded"] == 1
+        assert data["failed"] == 2
+        assert [x["index"] for x in data["results"]] == [0, 1, 2]
+
+        ok, invalid, failed = data["results"]
+        assert ok["ok"] is True
+        assert ok["result"]["breakdown"]["total_rub"] > 0
+        assert invalid["error"]["code"] == "validation_error"
+        assert invalid["error"]["details"]
+        assert failed["error"]["code"] == "calculation_error"
+
+    def test_batch_matches_single_endpoint(self, batch_client: TestClient) -> None:
+        single = batch_client.post("/api/calculate", json=_payload()).json()
+        batch = batch_client.post("/api/calculate/batch", json={"items": [_payload()]}).json()
+        assert batch["results"][0]["result"]["breakdown"] == single["breakdown"]
+
+    def test_batch_empty_rejected(self, batch_client: TestClient) -> None:
+        r = batch_client.post("/api/calculate/batch", json={"items": []})
+        assert r.status_code == 422
+
+    def test_batch_non_object_items(self, batch_client: TestClient) -> None:
+        r = batch_client.post("/api/calculate/batch", json={"items": [_payload(), 5, "x"]})
+        assert r.status_code == 200
+        data = r.json()
+        assert [x["ok"] for x in data["results"]] == [True, False, False]
+        assert data["results"][1]["error"]["code"] == "validation_error"
+
+    def test_batch_too_large(
+        self, batch_client: TestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(get_settings(), "batch_max_items", 2)
+        r = batch_client.post("/api/calculate/batch", json={"items": [_payload()] * 3})
+        assert r.status_code == 413
+
+    def test_batch_body_refused_before_parsing(
+        self, batch_client: TestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(get_settings(), "batch_max_items", 2)
+        r = batch_client.post(
+            "/api/calculate/batch",
+            json={"items": [_payload(note="x" * 10_000)]},
+        )
+        assert r.status_code == 413
+        assert "body too large" in r.json()["detail"]
@@ -0,0 +1,112 @@
+"""Тесты разбора тела запроса из сырых байт и кэшированных часов.
+
+Тестируемый модуль: app/api/bodies.py, app/core/clock.py (+ calculate / calculate/batch)
+
+Покрытие:
+- Ошибки валидации в формате FastAPI: 422, loc начинается с "body"
+- Пустое тело и битый JSON - те же ошибки, что у параметра-тела FastAPI
+- Схема тела запроса осталась в OpenAPI
+- DayClock: дата не пересчитывается внутри суток, пересчитывается после полуночи
+  и при переводе часов назад; validate_year берёт год из часов
+"""
+
+from __future__ import annotations
+
+from datetime import UTC, date, datetime
+
+from fastapi.testclient import TestClient
+import pytest
+
+from app.calculation.models import CalculationRequest
+from app.core import clock as clock_module
+from app.core.clock import DayClock, day_clock
+from app.main import create_app
+
+
+PAYLOAD = {
+    "country": "japan",
+    "year": 2021,
+    "engine_cc": 1496,
+    "engine_power_hp": 110,
+    "purchase_price": "1500000",
+    "currency": "JPY",
+}
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(create_app())
+
+
+def test_field_errors_keep_body_loc(client):
+    response = client.post("/api/calculate", json={**PAYLOAD, "engine_cc": -1, "currency": None})
+
+    assert response.status_code == 422
+    errors = response.json()["detail"]
+    assert [e["loc"] for e in errors] == [["body", "engine_cc"], ["body", "currency"]]
+    assert errors[0]["type"] == "greater_than"
+
+
+@pytest.mark.parametrize("path", ["/api/calculate", "/api/calculate/batch"])
+def test_empty_and_malformed_body(client, path):
+    headers = {"content-type": "application/json"}
+
+    empty = client.post(path, content=b"", headers=headers)
+    broken = client.post(path, content=b'{"country": ', headers=headers)
+
+    assert empty.status_code == 422
+    assert empty.json()["detail"] == [
+        {"type": "missing", "loc": ["body"], "msg": "Field required", "input": None}
+    ]
+    assert broken.status_code == 422
+    error = broken.json()["detail"][0]
+    assert error["type"] == "json_invalid"
+    assert error["loc"] == ["body", 12]
+    assert error["msg"] == "JSON decode error"
+
+
+def test_batch_items_validated_separately(client):
+    response = client.post("/api/calculate/batch", json={"items": [PAYLOAD, {"country": "x"}]})
+
+    assert response.status_code == 200
+    assert [r["ok"] for r in response.json()["results"]] == [True, False]
+
+
+def test_request_schema_documented(client):
+    paths = client.get("/openapi.json").json()["paths"]
+
+    schema = paths["/api/calculate"]["post"]["requestBody"]["content"]["application/json"]
+    assert schema["schema"]["title"] == "CalculationRequest"
+    assert "engine_power_hp" in schema["schema"]["required"]
+    batch = paths["/api/calculate/batch"]["post"]["requestBody"]
+    assert batch["required"] is True
+    assert batch["content"]["application/json"]["schema"]["required"] == ["items"]
+
+
+def test_day_clock_rollover(monkeypatch):
+    now = datetime(2025, 12, 31, 23, 59, 58, tzinfo=UTC).timestamp()
+    monkeypatch.setattr(clock_module.time, "time", lambda: now)
+    clock = DayClock()
+
+    assert clock.today() == date(2025, 12, 31)
+    now += 1
+    assert clock.today() == date(2025, 12, 31)
+    assert clock.rollovers == 1
+
+    now += 1  # полночь
+    assert clock.today() == date(2026, 1, 1)
+    now -= 3600  # часы переведены назад
+    assert clock.today() == date(2025, 12, 31)
+    assert clock.rollovers == 3
+
+
+def test_validate_year_uses_day_clock(monkeypatch):
+    now = datetime(2030, 6, 1, tzinfo=UTC).timestamp()
+    monkeypatch.setattr(clock_module.time, "time", lambda: now)
+    day_clock.reset()
+    try:
+        assert CalculationRequest.model_validate({**PAYLOAD, "year": 2030}).year == 2030
+        with pytest.raises(ValueError, match="future"):
+            CalculationRequest.model_validate({**PAYLOAD, "year": 2031})
+    finally:
+        day_clock.reset()
@@ -0,0 +1,144 @@
+"""Тесты готовых ответов /api/rates и /api/meta (ETag, 304, gzip).
+
+Тестируемый модуль: app/api/prepared.py (+ get_rates / get_meta / calculate в app/api/routes.py)
+
+Покрытие:
+- Повторный запрос отдаёт те же байты без пересборки; If-None-Match -> 304 без тела
+- gzip и identity - разные представления с разными сильными ETag
+- Новая версия конфигов или другой AVAILABLE_COUNTRIES -> новый ETag, старый не даёт 304
+- Разбор заголовков If-None-Match / Accept-Encoding
+- /api/calculate: байты model_response() совпадают с прежним путём response_model, схема в OpenAPI
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+import pytest
+
+from app.api.prepared import _accepts_gzip, _etag_matches, prepared_payloads
+from app.calculation.engine import calculate
+from app.calculation.models import CalculationRequest, CalculationResult
+from app.core.settings import ConfigRegistry, get_configs, get_settings, swap_configs
+from app.main import create_app
+
+
+@pytest.fixture
+def client() -> TestClient:
+    prepared_payloads.clear()
+    return TestClient(create_app())
+
+
+@pytest.mark.parametrize("path", ["/api/rates", "/api/meta"])
+def test_not_modified(client, path):
+    first = client.get(path)
+    builds = prepared_payloads.builds
+    etag = first.headers["etag"]
+
+    again = client.get(path)
+    cached = client.get(path, headers={"If-None-Match": etag})
+
+    assert again.content == first.content
+    assert again.json()["generated_at"] == first.json()["generated_at"]
+    assert prepared_payloads.builds == builds
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert first.headers["cache-control"] == "no-cache"
+
+
+def test_gzip_and_identity_representations(client):
+    gzipped = client.get("/api/meta", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/api/meta", headers={"Accept-Encoding": "identity"})
+
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in plain.headers
+    assert gzipped.json() == plain.json()
+    assert gzipped.headers["etag"] != plain.headers["etag"]
+    assert "Accept-Encoding" in plain.headers["vary"]
+
+    # Любое из двух представлений у клиента -> 304
+    revalidated = client.get(
+        "/api/meta",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["etag"]},
+    )
+    assert revalidated.status_code == 304
+
+
+def test_new_config_version_changes_etag(client):
+    original = get_configs()
+    etag = client.get("/api/rates").headers["etag"]
+    fees = copy.deepcopy(original.fees)
+    fees["japan"]["tiers"][0]["expenses"] = 175000
+    try:
+        swap_configs(
+            ConfigRegistry(
+                fees=fees,
+                commissions=original.commissions,
+                rates=original.rates,
+                duties=original.duties,
+                hash="f" * 64,
+                loaded_at=original.loaded_at,
+            )
+        )
+        response = client.get("/api/rates", headers={"If-None-Match": etag})
+    finally:
+        swap_configs(original)
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["japan_expense_tiers"][0]["expenses"] == 175000
+
+
+def test_allowed_countries_are_part_of_the_key(client, monkeypatch):
+    etag = client.get("/api/meta").headers["etag"]
+    monkeypatch.setattr(get_settings(), "available_countries", "japan,korea")
+
+    response = client.get("/api/meta", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["active_countries"] == ["japan", "korea"]
+
+
+def test_header_parsing():
+    assert _etag_matches('W/"abc", "def"', ('"abc"',))
+    assert _etag_matches("*", ('"abc"',))
+    assert not _etag_matches('"abd"', ('"abc"',))
+    assert not _etag_matches(None, ('"abc"',))
+    assert _accepts_gzip("br, gzip;q=0.8")
+    assert not _accepts_gzip("gzip;q=0, identity")
+    assert not _accepts_gzip("identity")
+
+
+def test_calculate_serialized_once(client):
+    payload = {
+        "country": "japan",
+        "year": 2021,
+        "engine_cc": 1998,
+        "engine_power_hp": 150,
+        "purchase_price": "2500000",
+        "currency": "JPY",
+        "freight_type": "open",
+    }
+
+    response = client.post("/api/calculate", json=payload)
+
+    # Прежний путь FastAPI: валидация по response_model -> dump -> json.dumps
+    adapter = TypeAdapter(CalculationResult)
+    result = calculate(CalculationRequest.model_validate(payload))
+    legacy = json.dumps(
+        adapter.dump_python(adapter.validate_python(result), mode="json"),
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == legacy
+
+    schema = client.get("/openapi.json").json()["paths"]["/api/calculate"]["post"]
+    assert schema["responses"]["200"]["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/CalculationResult"
+    }
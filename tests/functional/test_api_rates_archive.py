@@ -0,0 +1,60 @@
+"""Функциональные тесты эндпоинтов архива курсов.
+
+Покрытие:
+- GET /api/rates/at: курс на дату, 404 до начала архива
+- GET /api/rates/history: временной ряд с прореживанием, проверка диапазона
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+import pytest
+
+from app.api import routes
+from app.main import create_app
+from app.services.cbr_archive import RatesArchive
+
+
+@pytest.fixture
+def archive_client(monkeypatch) -> TestClient:
+    archive = RatesArchive()
+    for day in range(1, 31):
+        archive.add(date(2025, 9, day), {"USD_RUB": Decimal(f"80.{day:02d}")})
+    monkeypatch.setattr(routes, "get_rates_archive", lambda: archive)
+    return TestClient(create_app())
+
+
+def test_rates_at(archive_client: TestClient) -> None:
+    response = archive_client.get("/api/rates/at", params={"date": "2025-10-05"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["effective_date"] == "2025-09-30"
+    assert data["currencies"] == {"USD_RUB": "80.30"}
+
+
+def test_rates_at_before_archive(archive_client: TestClient) -> None:
+    response = archive_client.get("/api/rates/at", params={"date": "2020-01-01"})
+    assert response.status_code == 404
+
+
+def test_rates_history_downsampled(archive_client: TestClient) -> None:
+    response = archive_client.get(
+        "/api/rates/history",
+        params={"pair": "usd_rub", "start": "2025-09-01", "end": "2025-09-30", "max_points": 10},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["pair"] == "USD_RUB"
+    assert 2 <= data["count"] <= 10
+    assert data["points"][-1] == {"date": "2025-09-30", "rate": "80.30"}
+
+
+def test_rates_history_rejects_reversed_range(archive_client: TestClient) -> None:
+    response = archive_client.get(
+        "/api/rates/history",
+        params={"pair": "USD_RUB", "start": "2025-09-30", "end": "2025-09-01"},
+    )
+    assert response.status_code == 422
@@ -0,0 +1,151 @@
+"""Юнит-тесты архива исторических курсов ЦБ РФ.
+
+Тестируемый модуль: app/services/cbr_archive.py
+
+Покрытие:
+- rates_at(): курс на дату = последняя архивная дата не позже запрошенной
+- Хранилище только на дописывание: перечитывание, исправления, дозагрузка хвоста
+- series(): выборка диапазона и прореживание
+- ingest_range(): загрузка диапазона дат с ограничением параллелизма; выходные
+  запоминаются и повторно не запрашиваются
+"""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from app.services.cbr_archive import RatesArchive, ingest_range
+
+
+@pytest.fixture
+def anyio_backend():
+    """Use only asyncio backend (not trio)."""
+    return "asyncio"
+
+
+def _usd(value: str) -> dict[str, Decimal]:
+    return {"USD_RUB": Decimal(value)}
+
+
+def test_rates_at_uses_latest_date_not_after(tmp_path):
+    archive = RatesArchive.open(tmp_path / "archive.jsonl")
+    archive.add(date(2025, 9, 5), _usd("80.1"))
+    archive.add(date(2025, 9, 2), _usd("79.9"))  # порядок добавления не важен
+    archive.add(date(2025, 9, 6), _usd("81.5"))
+
+    assert archive.rates_at(date(2025, 9, 1)) is None
+    assert archive.rates_at(date(2025, 9, 4)).day == date(2025, 9, 2)
+    # Выходные: действуют курсы последнего рабочего дня
+    found = archive.rates_at(date(2025, 9, 8))
+    assert found.day == date(2025, 9, 6)
+    assert found.rates == _usd("81.5")
+
+
+def test_store_is_append_only_and_reloadable(tmp_path):
+    path = tmp_path / "archive.jsonl"
+    archive = RatesArchive.open(path)
+    assert archive.add(date(2025, 9, 5), _usd("80.1")) is True
+    assert archive.add(date(2025, 9, 5), _usd("80.1")) is False  # без изменений
+    assert archive.add(date(2025, 9, 5), _usd("80.2")) is True  # исправление дописывается
+
+    assert len(path.read_text().splitlines()) == 2
+    reopened = RatesArchive.open(path)
+    assert len(reopened) == 1
+    assert reopened.rates_at(date(2025, 9, 5)).rates == _usd("80.2")
+
+
+def test_refresh_reads_only_appended_tail(tmp_path):
+    path = tmp_path / "archive.jsonl"
+    reader = RatesArchive.open(path)
+    writer = RatesArchive.open(path)
+
+    writer.add(date(2025, 9, 5), _usd("80.1"))
+    writer.add(date(2025, 9, 6), _usd("81.5"))
+
+    assert reader.refresh() == 2
+    assert reader.refresh() == 0
+    assert reader.last_day == date(2025, 9, 6)
+
+
+def test_series_range_and_downsampling():
+    archive = RatesArchive()
+    for day in range(1, 31):
+        archive.add(date(2025, 9, day), _usd(f"80.{day:02d}"))
+
+    points = archive.series("USD_RUB", date(2025, 9, 10), date(2025, 9, 19))
+    assert [d.day for d, _ in points] == list(range(10, 20))
+
+    sampled = archive.series("USD_RUB", date(2025, 9, 1), date(2025, 9, 30), max_points=5)
+    assert len(sampled) <= 5
+    assert sampled[0][0] == date(2025, 9, 1)
+    assert sampled[-1] == (date(2025, 9, 30), Decimal("80.30"))
+
+    assert archive.series("EUR_RUB", date(2025, 9, 1), date(2025, 9, 30)) == []
+
+
+@pytest.mark.anyio
+async def test_ingest_range_bounded_concurrency():
+    in_flight = peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        d, m, y = request.url.params["date_req"].split("/")
+        body = (
+            f'<ValCurs Date="{d}.{m}.{y}">'
+            f"<Valute><CharCode>USD</CharCode><VunitRate>80,{d}</VunitRate></Valute>"
+            "</ValCurs>"
+        )
+        return httpx.Response(200, content=body.encode())
+
+    archive = RatesArchive()
+    archive.add(date(2025, 9, 1), _usd("80.01"))
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    report = await ingest_range(
+        archive, date(2025, 9, 1), date(2025, 9, 10), concurrency=3, codes=["USD"], client=client
+    )
+
+    assert report.requested == 9  # 1 сентября уже в архиве
+    assert report.stored == 9
+    assert report.failed == []
+    assert peak <= 3
+    assert archive.rates_at(date(2025, 9, 10)).rates == _usd("80.10")
+
+
+@pytest.mark.anyio
+async def test_ingest_skips_checked_weekends(tmp_path):
+    requested: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.params["date_req"])
+        # Суббота и воскресенье: ЦБ отдаёт документ пятницы 05.09
+        body = (
+            '<ValCurs Date="05.09.2025">'
+            "<Valute><CharCode>USD</CharCode><VunitRate>80,1</VunitRate></Valute>"
+            "</ValCurs>"
+        )
+        return httpx.Response(200, content=body.encode())
+
+    path = tmp_path / "archive.jsonl"
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    first = await ingest_range(
+        RatesArchive.open(path), date(2025, 9, 5), date(2025, 9, 7), codes=["USD"], client=client
+    )
+    assert first.requested == 3
+    assert len(RatesArchive.open(path)) == 1  # выходные не становятся отдельными датами
+
+    requested.clear()
+    second = await ingest_range(
+        RatesArchive.open(path), date(2025, 9, 5), date(2025, 9, 7), codes=["USD"], client=client
+    )
+    assert second.requested == 0
+    assert requested == []
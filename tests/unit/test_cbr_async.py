@@ -0,0 +1,187 @@
+"""Тесты асинхронного клиента ЦБ РФ.
+
+Тестируемый модуль: app/services/cbr.py (afetch_rates, aget_effective_rates)
+
+Сеть подменяется через httpx.MockTransport, чтобы проверить повторы,
+дедлайн, общий кэш и single-flight (один запрос на всех ожидающих)
+без реальных запросов. Запись общего снимка идёт вне event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.core.settings import get_settings
+from app.services.cbr import CBRRatesService, aget_effective_rates
+from app.services.shared_rates import SharedRatesStore
+
+
+CBR_SAMPLE = (
+    "<ValCurs>"
+    "<Valute><CharCode>USD</CharCode><VunitRate>81,5556</VunitRate></Valute>"
+    "<Valute><CharCode>EUR</CharCode><VunitRate>95,4792</VunitRate></Valute>"
+    "</ValCurs>"
+)
+
+
+@pytest.fixture
+def anyio_backend():
+    """Use only asyncio backend (not trio)."""
+    return "asyncio"
+
+
+def _service_with(handler) -> CBRRatesService:
+    service = CBRRatesService()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service._get_async_client = lambda: client  # type: ignore[method-assign]
+    return service
+
+
+@pytest.mark.anyio
+async def test_afetch_rates_fills_shared_cache():
+    service = _service_with(lambda request: httpx.Response(200, text=CBR_SAMPLE))
+
+    rates = await service.afetch_rates(force=True)
+
+    assert rates == {"USD_RUB": 81.5556, "EUR_RUB": 95.4792}
+    assert service.get_cached_rates() == rates
+
+
+@pytest.mark.anyio
+async def test_afetch_rates_retries_transient_errors():
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, text=CBR_SAMPLE)
+
+    service = _service_with(handler)
+
+    rates = await service.afetch_rates(force=True)
+
+    assert calls == 2
+    assert rates is not None
+
+
+@pytest.mark.anyio
+async def test_afetch_rates_respects_deadline(monkeypatch):
+    monkeypatch.setattr(get_settings(), "cbr_fetch_deadline_seconds", 0.05)
+
+    async def slow_handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(1)
+        return httpx.Response(200, text=CBR_SAMPLE)
+
+    service = _service_with(slow_handler)
+
+    assert await service.afetch_rates(force=True) is None
+    assert service.get_cached_rates() is None
+
+
+@pytest.mark.anyio
+async def test_afetch_rates_disabled_in_tests_without_force():
+    service = _service_with(lambda request: pytest.fail("network must not be used"))
+
+    assert await service.afetch_rates() is None
+
+
+@pytest.mark.anyio
+async def test_aget_effective_rates_merges_live(monkeypatch):
+    service = CBRRatesService()
+
+    async def fake_afetch(force: bool = False):
+        return {"USD_RUB": 81.5}
+
+    monkeypatch.setattr(service, "afetch_rates", fake_afetch)
+    base = {"currencies": {"USD_RUB": 90.0, "EUR_RUB": 100.0}}
+
+    merged = await aget_effective_rates(base, service)
+
+    assert merged["currencies"] == {"USD_RUB": 81.5, "EUR_RUB": 100.0}
+    assert merged["live_source"] == "cbr"
+
+
+@pytest.mark.anyio
+async def test_aclose_releases_pool():
+    service = CBRRatesService()
+    client = service._get_async_client()
+
+    await service.aclose()
+
+    assert client.is_closed
+    assert service._async_client is None
+
+
+@pytest.mark.anyio
+async def test_concurrent_async_misses_share_one_fetch():
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, text=CBR_SAMPLE)
+
+    service = _service_with(handler)
+
+    results = await asyncio.gather(*(service.afetch_rates(force=True) for _ in range(5)))
+
+    assert calls == 1
+    assert all(r == results[0] for r in results)
+    info = service.get_cache_info()
+    assert info["fetches_started"] == 1
+    assert info["fetches_coalesced"] == 4
+    assert info["fetch_in_flight"] is False
+
+
+def test_concurrent_thread_misses_share_one_fetch(monkeypatch):
+    service = CBRRatesService()
+    calls = 0
+    release = threading.Event()
+
+    def slow_fetch(url: str) -> dict[str, float]:
+        nonlocal calls
+        calls += 1
+        release.wait(timeout=5)
+        return {"USD_RUB": 81.5}
+
+    monkeypatch.setattr(service, "_do_fetch", slow_fetch)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(service.fetch_rates, True) for _ in range(4)]
+        while service.fetches_coalesced < 3:
+            time.sleep(0.01)
+        release.set()
+        results = [f.result(timeout=5) for f in futures]
+
+    assert calls == 1
+    assert results == [{"USD_RUB": 81.5}] * 4
+    assert service.fetches_started == 1
+
+
+@pytest.mark.anyio
+async def test_afetch_rates_publishes_off_the_event_loop(tmp_path, monkeypatch):
+    store = SharedRatesStore(tmp_path / "cbr_rates.json")
+    publish = store.publish
+    publishers = []
+
+    def recording_publish(*args, **kwargs):
+        publishers.append(threading.current_thread())
+        return publish(*args, **kwargs)
+
+    monkeypatch.setattr(store, "publish", recording_publish)
+    service = _service_with(lambda request: httpx.Response(200, text=CBR_SAMPLE))
+    service._shared = store
+
+    assert await service.afetch_rates(force=True) is not None
+    assert publishers
+    assert threading.current_thread() not in publishers  # снимок пишется в потоке
+    assert store.read() is not None
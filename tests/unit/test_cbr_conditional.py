@@ -0,0 +1,124 @@
+"""Тесты условных запросов к ЦБ РФ (ETag / If-Modified-Since / хэш тела).
+
+Тестируемый модуль: app/services/cbr.py (_conditional_headers, _read_response)
+
+Покрытие:
+- 304 Not Modified: разбор пропускается, TTL кэша продлевается, поколение не меняется
+- Тот же документ без валидаторов: совпадение хэша тела, без повторного разбора
+- Изменившийся документ: новые курсы и новое поколение
+- clear_cache(): валидаторы сбрасываются вместе с кэшем
+"""
+
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from app.services import cbr
+from app.services.cbr import CBRRatesService
+
+
+CBR_SAMPLE = (
+    "<ValCurs>"
+    "<Valute><CharCode>USD</CharCode><VunitRate>81,5556</VunitRate></Valute>"
+    "<Valute><CharCode>EUR</CharCode><VunitRate>95,4792</VunitRate></Valute>"
+    "</ValCurs>"
+)
+CBR_NEXT_DAY = CBR_SAMPLE.replace("81,5556", "82,0000")
+
+
+@pytest.fixture
+def anyio_backend():
+    """Use only asyncio backend (not trio)."""
+    return "asyncio"
+
+
+def _service_with(handler) -> CBRRatesService:
+    service = CBRRatesService()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service._get_async_client = lambda: client  # type: ignore[method-assign]
+    return service
+
+
+def _count_parses(service: CBRRatesService, monkeypatch) -> list[int]:
+    calls = [0]
+    parse = service._parse_xml
+
+    def counting(document):
+        calls[0] += 1
+        return parse(document)
+
+    monkeypatch.setattr(service, "_parse_xml", counting)
+    return calls
+
+
+@pytest.mark.anyio
+async def test_not_modified_extends_cache_without_parsing(monkeypatch):
+    seen: list[httpx.Headers] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            text=CBR_SAMPLE,
+            headers={"ETag": '"v1"', "Last-Modified": "Fri, 05 Sep 2025 12:00:00 GMT"},
+        )
+
+    service = _service_with(handler)
+    parses = _count_parses(service, monkeypatch)
+
+    first = await service.afetch_rates(force=True)
+    info = service.get_cache_info()
+    second = await service.afetch_rates(force=True)
+
+    assert "If-None-Match" not in seen[0]
+    assert seen[1]["If-Modified-Since"] == "Fri, 05 Sep 2025 12:00:00 GMT"
+    assert second == first
+    assert parses[0] == 1
+    after = service.get_cache_info()
+    assert after["fetched_at"] >= info["fetched_at"]
+    assert after["generation"] == info["generation"] == 1
+    assert after["not_modified"] == 1
+    assert after["parses_avoided"] == 1
+    assert after["bytes_saved"] == len(CBR_SAMPLE)
+
+
+@pytest.mark.anyio
+async def test_identical_body_is_not_reparsed(monkeypatch):
+    bodies = [CBR_SAMPLE, CBR_SAMPLE, CBR_NEXT_DAY]
+    service = _service_with(lambda request: httpx.Response(200, text=bodies.pop(0)))
+    parses = _count_parses(service, monkeypatch)
+
+    await service.afetch_rates(force=True)
+    await service.afetch_rates(force=True)
+    assert parses[0] == 1
+    assert service.get_cache_info()["unchanged_bodies"] == 1
+
+    changed = await service.afetch_rates(force=True)
+    assert changed["USD_RUB"] == 82.0
+    assert parses[0] == 2
+    assert service.get_cache_info()["generation"] == 2
+
+
+def test_sync_fetch_sends_validators_and_clear_drops_them(monkeypatch):
+    sent: list[dict[str, str]] = []
+
+    def fake_get(url, headers=None, timeout=None):
+        sent.append(dict(headers or {}))
+        request = httpx.Request("GET", url)
+        if headers and headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, request=request)
+        return httpx.Response(200, text=CBR_SAMPLE, headers={"ETag": '"v1"'}, request=request)
+
+    monkeypatch.setattr(cbr.httpx, "get", fake_get)
+    service = CBRRatesService()
+
+    assert service.fetch_rates(force=True) is not None
+    assert service.fetch_rates(force=True) is not None
+    assert sent[1] == {"If-None-Match": '"v1"'}
+
+    service.clear_cache()
+    assert service.fetch_rates(force=True) is not None
+    assert sent[2] == {}
@@ -0,0 +1,70 @@
+"""Юнит-тесты потокового парсера XML ЦБ РФ.
+
+Тестируемый модуль: app/services/cbr_parser.py
+
+Покрытие:
+- Значения VunitRate с десятичной запятой -> Decimal без потери точности
+- Разбор сырых байтов в windows-1251
+- Только запрошенные коды; ранний выход после нахождения всех кодов
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+
+from app.services.cbr_parser import parse_cbr_rates
+
+
+def _valute(code: str, rate: str, name: str = "Валюта") -> str:
+    return (
+        f"<Valute><NumCode>000</NumCode><CharCode>{code}</CharCode><Nominal>1</Nominal>"
+        f"<Name>{name}</Name><Value>{rate}</Value><VunitRate>{rate}</VunitRate></Valute>"
+    )
+
+
+def _document(*valutes: str, tail: str = "</ValCurs>") -> bytes:
+    xml = (
+        '<?xml version="1.0" encoding="windows-1251"?><ValCurs Date="06.09.2025">'
+        + "".join(valutes)
+        + tail
+    )
+    return xml.encode("cp1251")
+
+
+def test_decimal_values_from_cp1251_bytes():
+    doc = _document(
+        _valute("USD", "81,5556", "Доллар США"),
+        _valute("JPY", "0,550271", "Японская иена"),
+        _valute("GBP", "110,1"),
+    )
+
+    rates = parse_cbr_rates(doc, ["USD", "jpy"])
+
+    assert rates == {"USD_RUB": Decimal("81.5556"), "JPY_RUB": Decimal("0.550271")}
+
+
+def test_missing_codes_are_skipped():
+    rates = parse_cbr_rates(_document(_valute("USD", "81,5")), ["USD", "AED"])
+    assert rates == {"USD_RUB": Decimal("81.5")}
+
+
+def test_stops_reading_after_all_codes_found():
+    # Хвост документа битый: парсер не должен до него дойти
+    doc = _document(
+        _valute("USD", "81,5"),
+        _valute("EUR", "95,4"),
+        tail="<Valute><CharCode>XXX</CharCode>" + "<broken" * 50_000,
+    )
+
+    rates = parse_cbr_rates(doc, ["USD", "EUR"])
+
+    assert rates == {"USD_RUB": Decimal("81.5"), "EUR_RUB": Decimal("95.4")}
+
+
+def test_accepts_text_input():
+    xml = "<ValCurs>" + _valute("CNY", "11,3884") + "</ValCurs>"
+    assert parse_cbr_rates(xml, ["CNY"]) == {"CNY_RUB": Decimal("11.3884")}
+
+
+def test_no_codes_requested():
+    assert parse_cbr_rates(b"not even xml", []) == {}
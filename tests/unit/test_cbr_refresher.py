@@ -0,0 +1,158 @@
+"""Тесты фонового обновления курсов ЦБ РФ (refresh-ahead / stale-while-revalidate).
+
+Тестируемый модуль: app/services/cbr_refresher.py
+
+Покрытие:
+- next_delay(): обновление заранее (до истечения TTL) и экспоненциальный backoff
+- refresh_once(): учёт ошибок
+- fetch_rates(): при работающем планировщике отдаются устаревшие курсы без сетевого запроса
+- get_cache_info(): время следующего обновления и степень устаревания
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.settings import get_settings
+from app.services.cbr import CacheEntry, CBRRatesService
+from app.services.cbr_refresher import BACKOFF_BASE_SECONDS, CBRRatesRefresher
+
+
+RATES = {"USD_RUB": 81.5, "EUR_RUB": 95.4}
+
+
+@pytest.fixture
+def anyio_backend():
+    """Use only asyncio backend (not trio)."""
+    return "asyncio"
+
+
+@pytest.fixture
+def live_settings(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "enable_live_cbr", True)
+    monkeypatch.setattr(settings, "cbr_cache_ttl_seconds", 100)
+    monkeypatch.setattr(settings, "cbr_refresh_ahead_ratio", 0.8)
+    monkeypatch.setattr(settings, "cbr_max_stale_seconds", 1000)
+    return settings
+
+
+class _RunningRefresher:
+    """Stand-in for a started refresher: records wake() calls."""
+
+    running = True
+    next_refresh_at = 123.0
+    failures = 0
+
+    def __init__(self) -> None:
+        self.wakes = 0
+
+    def wake(self) -> None:
+        self.wakes += 1
+
+
+def _service_fetched(seconds_ago: float) -> CBRRatesService:
+    service = CBRRatesService()
+    service._cache = CacheEntry(rates=dict(RATES), fetched_at=time.time() - seconds_ago)
+    return service
+
+
+def test_next_delay_refreshes_ahead_of_ttl(live_settings):
+    refresher = CBRRatesRefresher(_service_fetched(seconds_ago=30))
+    # 0.8 * 100 - 30 = 50 секунд до обновления
+    assert refresher.next_delay() == pytest.approx(50, abs=1)
+
+
+def test_next_delay_without_cache_is_immediate(live_settings):
+    assert CBRRatesRefresher(CBRRatesService()).next_delay() == 0.0
+
+
+def test_next_delay_backs_off_on_failures(live_settings, monkeypatch):
+    monkeypatch.setattr(live_settings, "cbr_refresh_backoff_max_seconds", 30)
+    refresher = CBRRatesRefresher(_service_fetched(seconds_ago=500))
+    refresher.failures = 1
+    assert refresher.next_delay() == BACKOFF_BASE_SECONDS
+    refresher.failures = 2
+    assert refresher.next_delay() == BACKOFF_BASE_SECONDS * 2
+    refresher.failures = 10
+    assert refresher.next_delay() == 30
+
+
+@pytest.mark.anyio
+async def test_refresh_once_counts_failures(monkeypatch):
+    service = CBRRatesService()
+    results = [None, None, RATES]
+
+    async def fake_afetch(force: bool = False):
+        return results.pop(0)
+
+    monkeypatch.setattr(service, "afetch_rates", fake_afetch)
+    refresher = CBRRatesRefresher(service)
+
+    assert await refresher.refresh_once() is False
+    assert await refresher.refresh_once() is False
+    assert refresher.failures == 2
+    assert await refresher.refresh_once() is True
+    assert refresher.failures == 0
+
+
+def test_stale_rates_served_while_revalidating(live_settings, monkeypatch):
+    monkeypatch.delenv("PYTEST_CURRENT_TEST", raising=False)
+    service = _service_fetched(seconds_ago=150)
+    refresher = _RunningRefresher()
+    service.attach_refresher(refresher)  # type: ignore[arg-type]
+    monkeypatch.setattr(service, "_do_fetch", lambda url: pytest.fail("inline fetch"))
+
+    assert service.fetch_rates() == RATES
+    assert refresher.wakes == 1
+
+    info = service.get_cache_info()
+    assert info["serving_stale"] is True
+    assert info["stale_seconds"] == pytest.approx(50, abs=1)
+    assert info["next_refresh_at"] == 123.0
+
+
+def test_too_stale_rates_fall_back_to_static(live_settings, monkeypatch):
+    monkeypatch.delenv("PYTEST_CURRENT_TEST", raising=False)
+    service = _service_fetched(seconds_ago=5000)
+    service.attach_refresher(_RunningRefresher())  # type: ignore[arg-type]
+    monkeypatch.setattr(service, "_do_fetch", lambda url: pytest.fail("inline fetch"))
+
+    assert service.fetch_rates() is None
+
+
+@pytest.mark.anyio
+async def test_start_is_noop_when_live_cbr_disabled():
+    refresher = CBRRatesRefresher(CBRRatesService())
+    assert refresher.start() is False
+    assert refresher.running is False
+
+
+@pytest.mark.anyio
+async def test_start_and_stop(live_settings, monkeypatch):
+    monkeypatch.delenv("PYTEST_CURRENT_TEST", raising=False)
+    service = CBRRatesService()
+    fetched = []
+
+    async def fake_afetch(force: bool = False):
+        service._cache = CacheEntry(rates=dict(RATES), fetched_at=time.time())
+        fetched.append(force)
+        return RATES
+
+    monkeypatch.setattr(service, "afetch_rates", fake_afetch)
+    refresher = CBRRatesRefresher(service)
+
+    assert refresher.start() is True
+    assert service.get_cache_info()["background_refresh"] is True
+    # Пустой кэш: первое обновление сразу
+    for _ in range(10):
+        if fetched:
+            break
+        await asyncio.sleep(0)
+    assert fetched == [True]
+    await refresher.stop()
+    assert refresher.running is False
+    assert service.get_cache_info()["background_refresh"] is False
@@ -0,0 +1,280 @@
+"""Юнит-тесты для скомпилированного тарифного плана.
+
+Тестируемый модуль: app/calculation/compiled.py
+
+Покрытие:
+- Brackets: семантика "первый подходящий брэкет" через bisect
+- DutyTables / UtilizationGrid / CountryTariff: совпадение с линейными поисками
+  из tariff_tables.py и engine.py на реальных конфигах
+- get_compiled_tariffs(): переиспользование плана для одного и того же ConfigRegistry
+- CommissionSchedule: комиссия компании и банковский процент, собранные при загрузке
+- validate_tariffs(): строгая схема (возрастающие границы брэкетов, числа, диапазоны)
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from app.calculation.compiled import (
+    Brackets,
+    CommissionSchedule,
+    ConfigSchemaError,
+    CountryTariff,
+    DutyTables,
+    UtilizationGrid,
+    get_compiled_tariffs,
+    validate_tariffs,
+)
+from app.calculation.tariff_tables import (
+    find_duty_rate,
+    find_lt3_value_bracket,
+    format_volume_band,
+)
+from app.core.settings import ConfigRegistry, get_configs
+
+
+class TestBrackets:
+    def test_first_match_and_tail(self):
+        br = Brackets.build([(10, "a"), (20, "b"), (None, "c")])
+        assert br.lookup(5) == "a"
+        assert br.lookup(10) == "a"
+        assert br.lookup(11) == "b"
+        assert br.lookup(20) == "b"
+        assert br.lookup(21) == "c"
+
+    def test_no_tail_returns_none(self):
+        br = Brackets.build([(10, "a")])
+        assert br.lookup(11) is None
+
+    def test_shadowed_bracket_is_dropped(self):
+        # Второй брэкет никогда не будет первым совпадением
+        br = Brackets.build([(20, "a"), (10, "b"), (30, "c")])
+        assert br.bounds == (20, 30)
+        assert br.lookup(5) == "a"
+        assert br.lookup(25) == "c"
+
+    def test_strict_rejects_shadowed_bracket(self):
+        with pytest.raises(ConfigSchemaError, match=r"fees\.x\.tiers: bounds must increase"):
+            Brackets.build([(20, "a"), (10, "b")], "fees.x.tiers")
+        with pytest.raises(ConfigSchemaError, match="open-ended"):
+            Brackets.build([(None, "a"), (10, "b")], "fees.x.tiers")
+        assert Brackets.build([(10, "a"), (None, "b")], "fees.x.tiers").tail == "b"
+
+    def test_open_bracket_with_empty_value_closes_the_scan(self):
+        # Открытый брэкет без значения всё равно последний, как в линейном поиске
+        br = Brackets.build([(10, "a"), (None, None), (20, "c")])
+        assert br.bounds == (10,)
+        assert br.lookup(15) is None
+
+
+@pytest.fixture(scope="module")
+def duties_conf():
+    """Конфигурация пошлин."""
+    return get_configs().duties
+
+
+class TestDutyTables:
+    @pytest.mark.parametrize("age_category", ["lt3", "3_5", "gt5"])
+    def test_matches_linear_scan(self, duties_conf, age_category):
+        tables = DutyTables.from_config(duties_conf)
+        for engine_cc in range(1, 10001, 7):
+            band = tables.band(age_category, engine_cc)
+            expected = find_duty_rate(duties_conf, age_category, engine_cc)
+            assert (band.rate_float if band else None) == expected
+            assert tables.volume_band_label(age_category, engine_cc) == format_volume_band(
+                duties_conf, age_category, engine_cc
+            )
+
+    @pytest.mark.parametrize(
+        "value_eur", [0.0, 8499.99, 8500.0, 8500.01, 16700.0, 42300.5, 169000.0, 500000.0]
+    )
+    def test_lt3_bracket_matches_linear_scan(self, duties_conf, value_eur):
+        bracket = DutyTables.from_config(duties_conf).lt3_bracket(value_eur)
+        expected = find_lt3_value_bracket(duties_conf, value_eur)
+        assert bracket.percent == Decimal(str(expected["percent"]))
+        assert bracket.min_rate_eur_per_cc == Decimal(str(expected["min_rate_eur_per_cc"]))
+
+    def test_unknown_category(self):
+        tables = DutyTables.from_config({"age_categories": {}})
+        assert tables.band("3_5", 1500) is None
+        assert tables.volume_band_label("3_5", 1500) == "n/a"
+
+    def test_empty_lt3_bracket_means_no_bracket(self):
+        # Пустой брэкет ({} в YAML) линейный поиск считает «нет брэкета»
+        conf = {
+            "age_categories": {
+                "lt3": {
+                    "volume_bands": [],
+                    "value_brackets": [
+                        {"max_customs_value_eur": 8500, "percent": 54, "min_rate_eur_per_cc": 2.5},
+                        {},
+                    ],
+                }
+            }
+        }
+        for strict in (False, True):
+            tables = DutyTables.from_config(conf, strict=strict)
+            assert tables.lt3_bracket(5000).percent == Decimal("54")
+            assert tables.lt3_bracket(9000) is None
+        assert not find_lt3_value_bracket(conf, 9000)
+
+
+class TestUtilizationGrid:
+    def test_volume_band_boundaries(self):
+        grid = UtilizationGrid.from_config(get_configs().rates)
+        assert grid.power_brackets(1000) is not grid.power_brackets(1001)
+        assert grid.power_brackets(2000) is grid.power_brackets(1001)
+        assert grid.power_brackets(1_000_000) is None
+
+    def test_overlapping_ranges_keep_first_match(self):
+        conf = {
+            "utilization_m1_personal": {
+                "base_rate_rub": 100,
+                "volume_bands": [
+                    {
+                        "volume_range": [1000, 2000],
+                        "power_brackets": [{"power_kw_max": None, "coefficient_lt3": 1}],
+                    },
+                    {
+                        "volume_range": [0, 3000],
+                        "power_brackets": [{"power_kw_max": None, "coefficient_lt3": 2}],
+                    },
+                ],
+            }
+        }
+        grid = UtilizationGrid.from_config(conf)
+        assert grid.power_brackets(500).lookup(10.0).fee_lt3 == Decimal("200")
+        assert grid.power_brackets(1500).lookup(10.0).fee_lt3 == Decimal("100")
+        assert grid.power_brackets(2500).lookup(10.0).fee_lt3 == Decimal("200")
+
+
+class TestCountryTariff:
+    def test_japan_tiers(self):
+        tariff = CountryTariff.from_config(get_configs().fees["japan"])
+        assert tariff.tier_expenses(Decimal("3000000")) == Decimal("150000")
+        assert tariff.tier_expenses(Decimal("3000001")) == Decimal("300000")
+        assert tariff.tier_expenses(Decimal("9000000")) == Decimal("400000")
+
+    def test_freight_fallback_to_first(self):
+        tariff = CountryTariff.from_config(get_configs().fees["uae"])
+        assert tariff.select_freight("container").freight_type == "container"
+        assert tariff.select_freight("standard").freight_type == "open"
+        assert CountryTariff.from_config({}).select_freight(None).freight_type == "none"
+
+
+class TestGetCompiledTariffs:
+    def test_reused_for_same_registry(self):
+        cfg = get_configs()
+        assert get_compiled_tariffs(cfg) is get_compiled_tariffs(cfg)
+
+    def test_rebuilt_when_sections_replaced_under_same_hash(self):
+        cfg = get_configs()
+        plan = get_compiled_tariffs(cfg)
+        other = ConfigRegistry(
+            fees={},
+            commissions=cfg.commissions,
+            rates=cfg.rates,
+            duties=cfg.duties,
+            hash=cfg.hash,
+            loaded_at=cfg.loaded_at,
+        )
+        assert get_compiled_tariffs(other) is not plan
+        assert get_compiled_tariffs(other).countries == {}
+        assert get_compiled_tariffs(other).commissions is not plan.commissions
+
+
+class TestCommissionSchedule:
+    def test_overrides_and_default(self):
+        schedule = CommissionSchedule.from_config(
+            {
+                "default_commission_usd": 1000,
+                "by_country": {
+                    "uae": {"commission_usd": 0},
+                    "korea": [{"amount": 50000}],
+                    "china": {"note": "без суммы"},
+                },
+                "bank_commission": {"enabled": True, "percent": 2.5},
+            }
+        )
+        assert schedule.country("uae").usd == Decimal("0")
+        assert schedule.country("korea").fixed_rub == Decimal("50000")
+        assert schedule.country("china").usd == Decimal("1000")
+        assert schedule.country(None).usd == Decimal("1000")
+        assert schedule.bank_percent == 2.5
+
+    @pytest.mark.parametrize(
+        ("bank", "expected"),
+        [
+            (None, 0.0),
+            ({"enabled": False, "percent": 3}, 0.0),
+            ({"meta": {"default_percent": 1.5}}, 1.5),
+            ({"percent": "n/a"}, 0.0),
+        ],
+    )
+    def test_bank_percent_fallbacks(self, bank, expected):
+        assert CommissionSchedule.from_config({"bank_commission": bank}).bank_percent == expected
+
+    def test_empty_country_list_falls_back_to_default(self):
+        conf = {"default_commission_usd": 1000, "by_country": {"uae": []}}
+        for strict in (False, True):
+            schedule = CommissionSchedule.from_config(conf, strict=strict)
+            assert schedule.country("uae").usd == Decimal("1000")
+
+
+def _registry(**sections) -> ConfigRegistry:
+    cfg = get_configs()
+    data = {
+        "fees": cfg.fees,
+        "commissions": cfg.commissions,
+        "rates": cfg.rates,
+        "duties": cfg.duties,
+    }
+    data.update(sections)
+    return ConfigRegistry(**data, hash="strict-test", loaded_at=cfg.loaded_at)
+
+
+class TestValidateTariffs:
+    def test_real_configs_pass_and_warm_cache(self):
+        cfg = get_configs()
+        plan = validate_tariffs(cfg)
+        assert get_compiled_tariffs(cfg) is plan
+
+    def test_unordered_tiers_rejected(self):
+        fees = {"japan": {"tiers": [{"max_price": 6_000_000}, {"max_price": 3_000_000}]}}
+        with pytest.raises(ConfigSchemaError, match=r"fees\.japan\.tiers"):
+            validate_tariffs(_registry(fees=fees))
+        # Нестрогая компиляция (горячий путь) по-прежнему отбрасывает брэкет
+        assert get_compiled_tariffs(_registry(fees=fees)).country("japan").tiers.bounds == (
+            Decimal("6000000"),
+        )
+
+    def test_overlapping_volume_bands_rejected(self):
+        rates = {
+            **get_configs().rates,
+            "utilization_m1_personal": {
+                "volume_bands": [
+                    {"volume_range": [0, 2000], "power_brackets": []},
+                    {"volume_range": [1500, 3000], "power_brackets": []},
+                ]
+            },
+        }
+        with pytest.raises(ConfigSchemaError, match="overlaps"):
+            validate_tariffs(_registry(rates=rates))
+
+    @pytest.mark.parametrize(
+        "commissions",
+        [
+            {"default_commission_usd": -1},
+            {"by_country": {"uae": {"commission_usd": -5}}},
+            {"bank_commission": {"enabled": True, "percent": "много"}},
+            {"bank_commission": {"enabled": True, "percent": 150}},
+        ],
+    )
+    def test_bad_commissions_rejected(self, commissions):
+        with pytest.raises(ConfigSchemaError, match="commissions"):
+            validate_tariffs(_registry(commissions=commissions))
+
+    def test_non_numeric_value_rejected(self):
+        fees = {"japan": {"tiers": [{"max_price": "дорого"}]}}
+        with pytest.raises(ConfigSchemaError, match="tariffs"):
+            validate_tariffs(_registry(fees=fees))
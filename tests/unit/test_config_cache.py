@@ -0,0 +1,137 @@
+"""Тесты JSON-кэша разобранных конфигов.
+
+Тестируемый модуль: app/core/config_cache.py (+ ConfigRegistry.load в app/core/settings.py)
+
+Покрытие:
+- Hash по байтам файлов: совпадает с config_files_hash(), меняется при любой правке
+- Повторная загрузка тех же файлов не разбирает YAML (попадание в кэш)
+- Битая или чужая запись кэша считается промахом
+- Секции, которые JSON не передаёт точно (не строковые ключи, даты), не кэшируются
+- Пустой CONFIG_CACHE_DIR отключает кэш
+- Тайминги загрузки в метриках reload_configs
+"""
+
+from __future__ import annotations
+
+from datetime import date
+import json
+import shutil
+
+import pytest
+
+from app.core import settings as settings_module
+from app.core.config_cache import CACHE_SUFFIX, ConfigCache
+from app.core.settings import (
+    ConfigRegistry,
+    config_files_hash,
+    get_configs,
+    reload_configs,
+    swap_configs,
+)
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    """Копия config/ и пустой кэш во временной папке."""
+    original = get_configs()
+    target = tmp_path / "config"
+    shutil.copytree(settings_module.CONFIG_DIR, target)
+    monkeypatch.setattr(settings_module, "CONFIG_DIR", target)
+    cache = ConfigCache(tmp_path / "cache")
+    monkeypatch.setattr(settings_module, "_config_cache", lambda: cache)
+    yield target
+    swap_configs(original)
+
+
+@pytest.fixture
+def parses(monkeypatch) -> list[int]:
+    calls = [0]
+    parse = settings_module._parse_yaml
+
+    def counting(raw):
+        calls[0] += 1
+        return parse(raw)
+
+    monkeypatch.setattr(settings_module, "_parse_yaml", counting)
+    return calls
+
+
+def test_hash_follows_file_bytes(config_dir):
+    first = ConfigRegistry.load()
+    assert first.hash == config_files_hash()
+
+    path = config_dir / "duties.yml"
+    path.write_text(path.read_text(encoding="utf-8") + "\n# comment\n", encoding="utf-8")
+    assert ConfigRegistry.load().hash != first.hash
+
+
+def test_unchanged_files_skip_parsing(config_dir, parses):
+    first = ConfigRegistry.load()
+    assert parses[0] == 4
+    assert first.load_stats["cache_hit"] is False
+
+    second = ConfigRegistry.load()
+    assert parses[0] == 4
+    assert second.load_stats["cache_hit"] is True
+    assert second.rates == first.rates
+    assert second.rates is not first.rates  # у каждого реестра свои секции
+
+
+def test_corrupt_entry_is_a_miss(config_dir, parses):
+    first = ConfigRegistry.load()
+    cache = settings_module._config_cache()
+    entry = cache.directory / f"{first.hash}{CACHE_SUFFIX}"
+    entry.write_bytes(b"not json")
+
+    again = ConfigRegistry.load()
+    assert again.load_stats["cache_hit"] is False
+    assert again.fees == first.fees
+    assert parses[0] == 8
+    assert cache.get(first.hash) is not None  # запись перезаписана
+
+
+def test_cache_keeps_bounded_entries(tmp_path):
+    cache = ConfigCache(tmp_path, keep=2)
+    for key in ("a", "b", "c"):
+        assert cache.put(key, {"fees": {key: 1}})
+
+    assert len(list(tmp_path.glob(f"*{CACHE_SUFFIX}"))) == 2
+    assert cache.get("c") == {"fees": {"c": 1}}
+
+
+def test_entry_is_plain_json(tmp_path):
+    cache = ConfigCache(tmp_path)
+    assert cache.put("k", {"fees": {"japan": [1, 2.5, None]}})
+
+    entry = json.loads((tmp_path / f"k{CACHE_SUFFIX}").read_text(encoding="utf-8"))
+    assert entry["sections"] == {"fees": {"japan": [1, 2.5, None]}}
+
+
+@pytest.mark.parametrize("section", [{2025: 1.0}, {"since": date(2025, 1, 1)}])
+def test_non_json_sections_are_not_cached(tmp_path, section):
+    cache = ConfigCache(tmp_path)
+
+    assert cache.put("k", {"rates": section}) is False
+    assert cache.get("k") is None
+    assert not list(tmp_path.glob(f"*{CACHE_SUFFIX}"))
+
+
+def test_disabled_cache(monkeypatch):
+    monkeypatch.setattr(settings_module.get_settings(), "config_cache_dir", "")
+    cache = settings_module._config_cache.__wrapped__()
+
+    assert cache.enabled is False
+    assert cache.put("key", {}) is False
+    assert cache.get("key") is None
+
+
+def test_reload_metrics_include_timings(config_dir):
+    success, message, metrics = reload_configs()
+
+    assert success is True
+    assert {"read_ms", "parse_ms", "total_ms", "cache_hit"} <= set(metrics["load"])
+    assert "cache" in message
+
+    success, _, metrics = reload_configs(validate=lambda cfg: None)
+    assert metrics["load"]["cache_hit"] is True
+    assert "validate_ms" in metrics["load"]
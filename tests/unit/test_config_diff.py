@@ -0,0 +1,155 @@
+"""Тесты структурного diff конфигов для /config_diff.
+
+Тестируемый модуль: app/core/config_diff.py (+ cmd_config_diff в app/bot/handlers/config.py)
+
+Покрытие:
+- diff_values(): полные пути с индексами списков, added / removed / changed
+- 2 и 2.0 не изменение, True и 1 - изменение
+- ConfigFileCache: неизменённый файл не перечитывается, правка файла - перечитывается
+- paginate_lines(): страницы не длиннее лимита, порядок строк сохранён
+- /config_diff: изменённые пути в ответе, длинный diff разбит на страницы
+"""
+
+from __future__ import annotations
+
+import copy
+import shutil
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiogram.types import Message
+import pytest
+import yaml
+
+from app.bot.handlers import config as config_handler
+from app.bot.handlers.config import TELEGRAM_MESSAGE_LIMIT, cmd_config_diff, paginate_lines
+from app.core import config_diff as config_diff_module, settings as settings_module
+from app.core.config_diff import ConfigChange, ConfigFileCache, diff_values
+from app.core.settings import ConfigRegistry, get_configs
+
+
+@pytest.fixture
+def anyio_backend():
+    """Use only asyncio backend (not trio)."""
+    return "asyncio"
+
+
+def test_changed_leaf_has_full_path():
+    old = get_configs().duties
+    new = copy.deepcopy(old)
+    new["age_categories"]["3_5"]["bands"][2]["rate_eur_per_cc"] = 2.7
+
+    changes = diff_values(old, new)
+
+    assert [c.describe() for c in changes] == [
+        "age_categories.3_5.bands[2].rate_eur_per_cc: 2.5 → 2.7"
+    ]
+
+
+def test_added_removed_and_types():
+    old = {"a": {"x": 1, "flag": True}, "items": [1, 2, 3], "n": 2}
+    new = {"a": {"flag": 1, "y": "new"}, "items": [1, 5], "n": 2.0}
+
+    changes = diff_values(old, new)
+
+    assert changes == [
+        ConfigChange("a.x", "removed", old=1),
+        ConfigChange("a.flag", "changed", old=True, new=1),
+        ConfigChange("a.y", "added", new="new"),
+        ConfigChange("items[1]", "changed", old=2, new=5),
+        ConfigChange("items[2]", "removed", old=3),
+    ]
+    assert changes[2].describe() == '+ a.y: "new"'
+    assert diff_values({"k": [1]}, {"k": {"0": 1}})[0].kind == "changed"
+
+
+def test_file_cache_skips_unchanged_files(tmp_path, monkeypatch):
+    path = tmp_path / "rates.yml"
+    path.write_text("currencies:\n  USD_RUB: 90.0\n", encoding="utf-8")
+    parses = []
+    real_load = config_diff_module.yaml.load
+    monkeypatch.setattr(
+        config_diff_module.yaml, "load", lambda *a, **kw: parses.append(1) or real_load(*a, **kw)
+    )
+    cache = ConfigFileCache()
+
+    first = cache.read(path)
+    assert cache.read(path) is first
+    assert len(parses) == 1
+
+    path.write_text("currencies:\n  USD_RUB: 95.5\n", encoding="utf-8")
+    assert cache.read(path).data == {"currencies": {"USD_RUB": 95.5}}
+    assert len(parses) == 2
+    assert cache.get_stats() == {"files": 1, "hits": 1, "misses": 2}
+    assert cache.read(tmp_path / "missing.yml") is None
+
+
+def test_paginate_lines():
+    lines = [f"line {i:03d} " + "x" * 40 for i in range(200)]
+
+    pages = paginate_lines(lines, 1000)
+
+    assert len(pages) > 1
+    assert all(len(page) <= 1000 for page in pages)
+    assert "\n".join(pages).split("\n") == lines
+    assert paginate_lines(["y" * 50], 10) == ["y" * 9 + "…"]
+
+
+@pytest.fixture
+def disk_config(tmp_path, monkeypatch):
+    """Копия config/ как «диск» для /config_diff."""
+    target = tmp_path / "config"
+    shutil.copytree(settings_module.CONFIG_DIR, target)
+    monkeypatch.setattr(config_handler, "CONFIG_DIR", target)
+    return target
+
+
+@pytest.mark.anyio
+async def test_config_diff_lists_changed_paths(disk_config):
+    duties = yaml.safe_load((disk_config / "duties.yml").read_text(encoding="utf-8"))
+    duties["age_categories"]["3_5"]["bands"][2]["rate_eur_per_cc"] = 2.7
+    (disk_config / "duties.yml").write_text(yaml.safe_dump(duties), encoding="utf-8")
+    message = MagicMock(spec=Message)
+    message.answer = AsyncMock()
+
+    await cmd_config_diff(message)
+
+    message.answer.assert_called_once()
+    text = message.answer.call_args[0][0]
+    assert "Out of sync" in text
+    assert "`duties.yml`: 1 change(s)" in text
+    assert "age_categories.3_5.bands[2].rate_eur_per_cc: 2.5 → 2.7" in text
+
+
+def _bumped(value):
+    """Все числа увеличены на 1 - diff по каждому листу."""
+    if isinstance(value, dict):
+        return {k: _bumped(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_bumped(v) for v in value]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value + 1
+    return value
+
+
+@pytest.mark.anyio
+async def test_long_diff_is_paginated(disk_config):
+    configs = get_configs()
+    memory = ConfigRegistry(
+        fees=_bumped(configs.fees),
+        commissions=_bumped(configs.commissions),
+        rates=_bumped(configs.rates),
+        duties=_bumped(configs.duties),
+        hash="memory",
+        loaded_at="",
+    )
+    message = MagicMock(spec=Message)
+    message.answer = AsyncMock()
+
+    with patch("app.bot.handlers.config.get_configs", return_value=memory):
+        await cmd_config_diff(message)
+
+    pages = [call[0][0] for call in message.answer.call_args_list]
+    assert len(pages) > 1
+    assert all(len(page) <= TELEGRAM_MESSAGE_LIMIT for page in pages)
+    assert f"page 2/{len(pages)}" in pages[1]
+    assert "age_categories.3_5.bands[2].rate_eur_per_cc: 3.5 → 2.5" in "".join(pages)
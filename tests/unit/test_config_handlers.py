@@ -223,14 +223,14 @@ class TestFSMStates:
         assert len(states) == len(set(states))
 
     def test_config_upload_states_count(self):
-        """Проверка количества states (должно быть 4)."""
+        """Проверка количества states: 4 загрузки + ожидание /confirm."""
         states = [attr for attr in dir(ConfigUploadStates) if not attr.startswith("_")]
         # Отфильтровываем только State объекты
         state_attrs = [
             attr for attr in states
             if attr.startswith("waiting_for_")
         ]
-        assert len(state_attrs) == 4
+        assert len(state_attrs) == 5
 
 
 # ============================================================================
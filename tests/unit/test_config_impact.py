@@ -0,0 +1,202 @@
+"""Тесты анализа влияния загружаемого конфига на расчёты.
+
+Тестируемый модуль: app/services/config_impact.py (+ process_config_upload в боте)
+
+Покрытие:
+- Корпус запросов: cases.yml (отсутствующий файл пропускается) и детерминированная выборка
+- Дельты по странам и статьям расчёта; неизменный конфиг -> изменений нет
+- Пул процессов даёт тот же результат, что и расчёт в текущем процессе
+- Загрузка через бота: сводка до /confirm, файл заменяется только после него; ошибка схемы
+  только предупреждает, текст ошибки экранируется для HTML
+"""
+
+from __future__ import annotations
+
+import copy
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import anyio
+import pytest
+import yaml
+
+from app.bot.handlers.config import (
+    CONFIG_METADATA,
+    ConfigFile,
+    ConfigUploadStates,
+    cmd_confirm_upload,
+    process_config_upload,
+    summarize_config_impact,
+)
+from app.core.settings import CONFIG_SECTIONS, get_configs, get_settings
+from app.services import config_impact
+from app.services.config_impact import (
+    ComponentImpact,
+    ImpactReport,
+    analyze_impact,
+    impact_pool,
+    load_case_requests,
+    sample_requests,
+)
+
+
+@pytest.fixture
+def anyio_backend():
+    """Use only asyncio backend (not trio)."""
+    return "asyncio"
+
+
+def _sides(**changes):
+    configs = get_configs()
+    rates = copy.deepcopy(configs.rates)
+    sections = {name: getattr(configs, name) for name in CONFIG_SECTIONS}
+    candidate = {**sections, **changes}
+    return (sections, rates), (candidate, changes.get("rates", rates))
+
+
+def _cheaper_yen() -> dict:
+    rates = copy.deepcopy(get_configs().rates)
+    rates["currencies"]["JPY_RUB"] = rates["currencies"]["JPY_RUB"] * 1.1
+    return rates
+
+
+def test_corpus_is_deterministic():
+    first = sample_requests(get_configs(), 50)
+    assert first == sample_requests(get_configs(), 50)
+    assert {r.country for r in first} == {"japan", "korea", "uae", "china", "georgia"}
+    assert len(load_case_requests()) >= 40  # cases.yml по умолчанию
+
+
+def test_missing_cases_file_is_skipped(monkeypatch, tmp_path):
+    monkeypatch.setattr(get_settings(), "config_impact_cases_path", str(tmp_path / "none.yml"))
+    assert load_case_requests() == []
+
+
+def test_unchanged_config_has_no_impact():
+    old, new = _sides()
+    report = analyze_impact(old, new, sample_requests(get_configs(), 100), workers=0)
+
+    assert report.quotes == 100
+    assert report.changed == 0
+    assert report.errors == 0
+    assert "No quote changes" in report.format()
+
+
+def test_rate_change_is_attributed_to_country():
+    old, new = _sides(rates=_cheaper_yen())
+    report = analyze_impact(old, new, sample_requests(get_configs(), 200), workers=0)
+
+    japan = report.by_country["japan"]
+    assert japan["total_rub"].changed > 0
+    assert japan["total_rub"].max_delta_pct > 0
+    assert japan["total_rub"].max_delta_rub > 0
+    assert report.by_country["korea"]["total_rub"].changed == 0
+    assert "**japan:**" in report.format()
+    assert "**korea:**" not in report.format()
+
+
+def test_pool_matches_in_process(monkeypatch):
+    monkeypatch.setattr(config_impact, "IMPACT_MIN_POOL_REQUESTS", 0)
+    old, new = _sides(rates=_cheaper_yen())
+    requests = sample_requests(get_configs(), 60)
+    try:
+        pooled = analyze_impact(old, new, requests, workers=2)
+    finally:
+        impact_pool.shutdown()
+    inline = analyze_impact(old, new, requests, workers=0)
+
+    assert pooled.workers == 2
+    assert pooled.by_country == inline.by_country
+
+
+def test_report_format():
+    report = ImpactReport(
+        quotes=10,
+        changed=4,
+        errors=1,
+        by_country={"uae": {"freight_rub": ComponentImpact(4, 12.5, 0.0, 45000)}},
+        elapsed_ms=12.3,
+        workers=0,
+    )
+    text = report.format()
+    assert "Impact on 10 quotes:** 4 changed" in text
+    assert "1 quote(s) fail" in text
+    assert "`freight_rub`: max +12.50% (+45,000 ₽), median +0.00%, changed 4" in text
+
+
+def _upload_message(config_type: ConfigFile, data: dict) -> MagicMock:
+    # Ключи, которые требует download_and_validate_config
+    for key in CONFIG_METADATA[config_type]["required_keys"]:
+        data.setdefault(key, {})
+    content = yaml.safe_dump(data, allow_unicode=True)
+    document = MagicMock()
+    document.file_name = CONFIG_METADATA[config_type]["filename"]
+    document.file_size = len(content)
+    document.file_unique_id = "impact_test"
+
+    async def download(doc, destination):
+        await anyio.Path(destination).write_text(content, encoding="utf-8")
+
+    message = MagicMock()
+    message.document = document
+    message.answer = AsyncMock()
+    message.bot = MagicMock()
+    message.bot.download = AsyncMock(side_effect=download)
+    return message
+
+
+async def _upload(message: MagicMock, config_type: ConfigFile, tmp_path) -> list[str]:
+    events: list[str] = []
+    message.answer.side_effect = lambda text, **_: events.append(text)
+    state = MagicMock()
+    state.clear = AsyncMock()
+    state.set_state = AsyncMock()
+    state.update_data = AsyncMock()
+    with (
+        patch("app.bot.handlers.config.get_config_path", return_value=tmp_path / "target.yml"),
+        patch("app.bot.handlers.config.backup_config_file", return_value=None),
+        patch("app.bot.handlers.config.shutil.move", side_effect=lambda *a: events.append("moved")),
+    ):
+        await process_config_upload(message, state, config_type)
+        events.append("confirmed")  # файл не заменён до /confirm
+        state.get_state = AsyncMock(return_value=ConfigUploadStates.waiting_for_confirm.state)
+        state.get_data = AsyncMock(return_value=state.update_data.call_args.kwargs)
+        await cmd_confirm_upload(message, state)
+    await anyio.Path(f"/tmp/{config_type.value}_impact_test.yml").unlink(missing_ok=True)
+    return events
+
+
+@pytest.mark.anyio
+async def test_upload_reports_impact_before_replacing(monkeypatch, tmp_path):
+    monkeypatch.setattr(get_settings(), "config_impact_sample_size", 100)
+    message = _upload_message(ConfigFile.RATES, _cheaper_yen())
+
+    events = await _upload(message, ConfigFile.RATES, tmp_path)
+
+    summary = next(i for i, text in enumerate(events) if "Impact on" in text)
+    assert "**japan:**" in events[summary]
+    assert summary < events.index("confirmed") < events.index("moved")
+    assert "updated successfully" in events[-1]
+
+
+@pytest.mark.anyio
+async def test_schema_error_warns_but_does_not_block(tmp_path):
+    duties = copy.deepcopy(get_configs().duties)
+    duties["age_categories"]["3_5"]["bands"].reverse()
+    message = _upload_message(ConfigFile.DUTIES, duties)
+
+    events = await _upload(message, ConfigFile.DUTIES, tmp_path)
+
+    assert any("Schema check failed" in text for text in events)
+    assert "moved" in events
+
+
+@pytest.mark.anyio
+async def test_impact_error_is_html_escaped(tmp_path):
+    path = tmp_path / "rates.yml"
+    path.write_text(yaml.safe_dump(get_configs().rates), encoding="utf-8")
+    failing = AsyncMock(side_effect=ValueError("<b>broken</b> & more"))
+
+    with patch("app.bot.handlers.config.analyze_config_change", failing):
+        text = await summarize_config_impact(ConfigFile.RATES, path)
+
+    assert "&lt;b&gt;broken&lt;/b&gt; &amp; more" in text
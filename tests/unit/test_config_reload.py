@@ -11,7 +11,15 @@ from aiogram.types import Message
 import pytest
 
 from app.bot.handlers.config import cmd_config_diff, cmd_config_status, cmd_reload_configs
-from app.core.settings import ConfigRegistry, get_configs, reload_configs
+from app.core.settings import (
+    ConfigRegistry,
+    get_configs,
+    refresh_configs,
+    reload_configs,
+    reset_configs,
+    swap_configs,
+)
+from app.services.cbr import _load_currency_codes
 
 
 if TYPE_CHECKING:
@@ -27,7 +35,7 @@ def anyio_backend():
 def test_reload_configs_success():
     """Тест успешной перезагрузки конфигов."""
     # Очистить кэш перед тестом
-    get_configs.cache_clear()  # type: ignore[attr-defined]
+    reset_configs()
 
     success, message, metrics = reload_configs()
 
@@ -40,20 +48,17 @@ def test_reload_configs_success():
 
 def test_reload_configs_with_hash_change(tmp_path: Path):
     """Тест reload с изменением hash."""
-    # Mock config files
-    with (
-        patch("app.core.settings.CONFIG_DIR", tmp_path),
-        patch("app.core.settings._read_yaml") as mock_read,
-    ):
+    # Hash считается по байтам файлов, поэтому пишем настоящие файлы
+    with patch("app.core.settings.CONFIG_DIR", tmp_path):
         # Первая загрузка
-        get_configs.cache_clear()  # type: ignore[attr-defined]
-        mock_read.return_value = {"test": "data1"}
+        reset_configs()
+        (tmp_path / "fees.yml").write_text("test: data1\n", encoding="utf-8")
 
         success1, msg1, metrics1 = reload_configs()
         old_hash = metrics1["new_hash"]
 
         # Изменить данные
-        mock_read.return_value = {"test": "data2"}
+        (tmp_path / "fees.yml").write_text("test: data2\n", encoding="utf-8")
 
         # Вторая загрузка
         success2, msg2, metrics2 = reload_configs()
@@ -67,7 +72,7 @@ def test_reload_configs_with_hash_change(tmp_path: Path):
 def test_reload_configs_failure():
     """Тест reload с ошибкой валидации."""
     # Очистить кэш
-    get_configs.cache_clear()  # type: ignore[attr-defined]
+    reset_configs()
 
     with patch("app.core.settings.ConfigRegistry.load") as mock_load:
         # Первая загрузка успешна (чтобы было old_hash)
@@ -94,7 +99,7 @@ def test_reload_configs_failure():
 
 def test_reload_configs_no_old_configs():
     """Тест reload когда старых конфигов нет в кэше."""
-    get_configs.cache_clear()  # type: ignore[attr-defined]
+    reset_configs()
 
     # Первый раз загрузка не проходила
     with patch("app.core.settings.ConfigRegistry.load") as mock_load:
@@ -200,7 +205,7 @@ async def test_cmd_config_diff_synchronized():
     message.answer = AsyncMock()
 
     # Убедимся что hash одинаковый
-    with patch("app.core.settings.get_configs") as mock_get:
+    with patch("app.bot.handlers.config.get_configs") as mock_get:
         mock_get.return_value = ConfigRegistry(
             fees={},
             commissions={},
@@ -210,7 +215,7 @@ async def test_cmd_config_diff_synchronized():
             loaded_at="2025-01-01T00:00:00",
         )
 
-        with patch("app.core.settings._dict_hash") as mock_hash:
+        with patch("app.bot.handlers.config.config_files_hash") as mock_hash:
             mock_hash.return_value = "test_hash"  # Тот же hash
 
             await cmd_config_diff(message)
@@ -237,7 +242,7 @@ async def test_cmd_config_diff_out_of_sync():
             loaded_at="2025-01-01T00:00:00",
         )
 
-        with patch("app.bot.handlers.config._dict_hash") as mock_hash:
+        with patch("app.bot.handlers.config.config_files_hash") as mock_hash:
             mock_hash.return_value = "disk_hash"  # Другой hash
 
             await cmd_config_diff(message)
@@ -267,7 +272,7 @@ async def test_cmd_config_diff_error():
 
 def test_reload_metrics_structure():
     """Тест структуры метрик reload."""
-    get_configs.cache_clear()  # type: ignore[attr-defined]
+    reset_configs()
 
     success, message, metrics = reload_configs()
 
@@ -282,3 +287,27 @@ def test_reload_metrics_structure():
         assert isinstance(metrics["config_count"], int)
         assert isinstance(metrics["load_time_ms"], int | float)
         assert isinstance(metrics["hash_changed"], bool)
+
+
+def test_refresh_swaps_in_new_registry():
+    """refresh_configs публикует новый реестр, не оставляя читателей без конфигов."""
+    live = get_configs()
+
+    fresh = refresh_configs()
+
+    assert get_configs() is fresh
+    assert fresh is not live
+    assert fresh.hash == live.hash
+
+
+def test_swap_resets_currency_codes():
+    """Список live-валют пересчитывается после подмены конфигов."""
+    live = get_configs()
+    assert "GBP" not in _load_currency_codes()
+    rates = {**live.rates, "live_currency_codes": ["USD", "GBP"]}
+    try:
+        swap_configs(live.model_copy(update={"rates": rates, "hash": "c" * 64}))
+        assert _load_currency_codes() == {"USD", "GBP"}
+    finally:
+        swap_configs(live)
+    assert "GBP" not in _load_currency_codes()
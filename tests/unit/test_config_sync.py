@@ -0,0 +1,195 @@
+"""Тесты межпроцессной синхронизации конфигов через файл поколений.
+
+Тестируемый модуль: app/services/config_sync.py (+ /reload_configs, /rollback_config, /api/health)
+
+Покрытие:
+- publish(): поколение растёт, запись атомарна, своя публикация не применяется повторно
+- check_once(): версия из памяти -> подмена ссылки, иначе перезагрузка с диска
+- Неудачное применение не повторяется на каждом опросе
+- Фоновый опрос подхватывает публикацию другого процесса
+- Бот публикует после /reload_configs и /rollback_config, /api/health показывает поколение
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+import copy
+import json
+import shutil
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogram.types import Message
+from fastapi.testclient import TestClient
+import pytest
+
+from app.bot.handlers.config import cmd_reload_configs, cmd_rollback_config
+from app.core import settings as settings_module
+from app.core.settings import (
+    ConfigRegistry,
+    config_files_hash,
+    get_configs,
+    get_settings,
+    swap_configs,
+)
+from app.main import create_app
+from app.services.config_sync import ConfigSync, config_sync
+
+
+@pytest.fixture
+def anyio_backend():
+    """Use only asyncio backend (not trio)."""
+    return "asyncio"
+
+
+@pytest.fixture
+def sync_path(tmp_path, monkeypatch):
+    """Файл поколений во временной папке; живой реестр и история восстанавливаются."""
+    path = tmp_path / "config_generation.json"
+    monkeypatch.setattr(get_settings(), "config_sync_path", str(path))
+    monkeypatch.setattr(get_settings(), "config_sync_interval_seconds", 0.02)
+    original = get_configs()
+    monkeypatch.setattr(
+        settings_module._LiveConfigs, "history", OrderedDict({original.hash: original})
+    )
+    monkeypatch.setattr(config_sync, "generation", 0)
+    yield path
+    swap_configs(original)
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    target = tmp_path / "config"
+    shutil.copytree(settings_module.CONFIG_DIR, target)
+    monkeypatch.setattr(settings_module, "CONFIG_DIR", target)
+    return target
+
+
+def _version(base: ConfigRegistry, config_hash: str) -> ConfigRegistry:
+    commissions = copy.deepcopy(base.commissions)
+    commissions["default_commission_usd"] = 1234
+    return ConfigRegistry(
+        fees=base.fees,
+        commissions=commissions,
+        rates=base.rates,
+        duties=base.duties,
+        hash=config_hash,
+        loaded_at=base.loaded_at,
+    )
+
+
+def test_publish_bumps_generation(sync_path):
+    bot, api = ConfigSync(), ConfigSync()
+
+    assert bot.publish("a" * 64) == 1
+    assert bot.publish("b" * 64) == 2
+
+    record = json.loads(sync_path.read_text(encoding="utf-8"))
+    assert record["generation"] == 2
+    assert record["hash"] == "b" * 64
+    assert api.read().generation == 2
+    assert bot.check_once() is False  # своя публикация
+    assert not list(sync_path.parent.glob("*.tmp"))
+
+
+def test_follower_swaps_kept_version(sync_path):
+    live = get_configs()
+    newer = _version(live, "c" * 64)
+    swap_configs(newer)
+    follower = ConfigSync()
+
+    ConfigSync().publish(live.hash)  # другой процесс откатился
+    assert follower.check_once() is True
+    assert get_configs() is live
+    assert follower.generation == 1
+    assert follower.check_once() is False
+
+
+def test_follower_reloads_from_disk(sync_path, config_dir):
+    path = config_dir / "rates.yml"
+    path.write_text(path.read_text(encoding="utf-8") + "\nsync_marker: 1\n", encoding="utf-8")
+    follower = ConfigSync()
+
+    ConfigSync().publish(config_files_hash())
+    assert follower.check_once() is True
+    assert get_configs().rates["sync_marker"] == 1
+    assert get_configs().hash == config_files_hash()
+    assert follower.get_stats()["applied"] == 1
+
+
+def test_failed_apply_is_not_retried(sync_path, config_dir, monkeypatch):
+    (config_dir / "fees.yml").write_text("japan: [unclosed", encoding="utf-8")
+    before = get_configs()
+    follower = ConfigSync()
+    reloads = []
+    real_reload = settings_module.reload_configs
+
+    def counting_reload(*args, **kwargs):
+        reloads.append(1)
+        return real_reload(*args, **kwargs)
+
+    monkeypatch.setattr("app.services.config_sync.reload_configs", counting_reload)
+
+    ConfigSync().publish("d" * 64)
+    assert follower.check_once() is False
+    assert follower.check_once() is False
+    assert len(reloads) == 1
+    assert get_configs() is before
+    assert follower.failures == 1
+    assert follower.generation == 0
+
+
+def test_disabled_sync(monkeypatch):
+    monkeypatch.setattr(get_settings(), "config_sync_path", "")
+    sync = ConfigSync()
+    assert sync.publish("e" * 64) is None
+    assert sync.check_once() is False
+    assert sync.get_stats()["enabled"] is False
+
+
+@pytest.mark.anyio
+async def test_poll_loop_follows_other_process(sync_path):
+    live = get_configs()
+    swap_configs(_version(live, "f" * 64))
+    follower = ConfigSync()
+
+    assert follower.start() is True
+    try:
+        ConfigSync().publish(live.hash)
+        for _ in range(250):
+            if follower.applied:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await follower.stop()
+
+    assert get_configs() is live
+    assert follower.running is False
+
+
+@pytest.mark.anyio
+async def test_bot_commands_publish(sync_path, config_dir):
+    live = get_configs()
+    message = MagicMock(spec=Message)
+    message.answer = AsyncMock()
+
+    swap_configs(_version(live, "9" * 64))
+    message.text = f"/rollback_config {live.hash[:12]}"
+    await cmd_rollback_config(message)
+    assert "generation `1`" in message.answer.call_args[0][0]
+
+    await cmd_reload_configs(message)
+    record = ConfigSync().read()
+    assert record.generation == 2
+    assert record.hash == get_configs().hash
+    assert config_sync.generation == 2
+
+
+def test_health_reports_generation(sync_path):
+    config_sync.publish(get_configs().hash)
+
+    stats = TestClient(create_app()).get("/api/health").json()["config_sync"]
+
+    assert stats["generation"] == 1
+    assert stats["published_generation"] == 1
+    assert stats["enabled"] is True
@@ -7,7 +7,7 @@
 - backup_config_file()
 - Command handlers: cmd_set_*_start
 - Document handlers: handle_*_upload
-- cmd_cancel
+- cmd_confirm_upload, cmd_cancel (файл заменяется только после /confirm)
 
 Changelog:
 - 2025-12-28: CONFIG-03 - Созданы тесты для загрузки конфигов с FSM
@@ -27,6 +27,7 @@ from app.bot.handlers.config import (
     _get_config_lock,
     backup_config_file,
     cmd_cancel,
+    cmd_confirm_upload,
     cmd_set_commissions_start,
     cmd_set_duties_start,
     cmd_set_fees_start,
@@ -430,6 +431,8 @@ class TestDocumentUploadHandlers:
 
         state = MagicMock()
         state.clear = AsyncMock()
+        state.set_state = AsyncMock()
+        state.update_data = AsyncMock()
 
         config_path = tmp_path / "fees.yml"
         backup_path = tmp_path / "fees.yml.backup.20251228_120000"
@@ -438,7 +441,7 @@ class TestDocumentUploadHandlers:
             patch("app.bot.handlers.config.get_config_path", return_value=config_path),
             patch("app.bot.handlers.config.backup_config_file", return_value=backup_path),
             patch("app.bot.handlers.config.Path") as mock_path_cls,
-            patch("app.bot.handlers.config.shutil.move"),
+            patch("app.bot.handlers.config.shutil.move") as mock_move,
         ):
             mock_temp_path = MagicMock()
             mock_temp_path.open = temp_file.open
@@ -447,6 +450,17 @@ class TestDocumentUploadHandlers:
 
             await handle_fees_upload(message, state)
 
+            # До /confirm файл не заменяется
+            mock_move.assert_not_called()
+            state.set_state.assert_called_once_with(ConfigUploadStates.waiting_for_confirm)
+            pending = state.update_data.call_args.kwargs
+            assert pending["config_type"] == "fees"
+
+            state.get_state = AsyncMock(return_value=ConfigUploadStates.waiting_for_confirm.state)
+            state.get_data = AsyncMock(return_value=pending)
+            await cmd_confirm_upload(message, state)
+
+        mock_move.assert_called_once()
         state.clear.assert_called_once()
         assert message.answer.call_count >= 2  # Multiple status messages
         # Find success message
@@ -455,6 +469,39 @@ class TestDocumentUploadHandlers:
         )
         assert success_found
 
+    async def test_cancel_discards_pending_upload(self, tmp_path):
+        """Тест: /cancel после сводки удаляет файл, конфиг не заменяется."""
+        temp_file = tmp_path / "fees_pending.yml"
+        temp_file.write_text("countries: {}\nfreight: {}\n")
+        message = MagicMock()
+        message.answer = AsyncMock()
+        state = MagicMock()
+        state.get_state = AsyncMock(return_value=ConfigUploadStates.waiting_for_confirm.state)
+        state.get_data = AsyncMock(
+            return_value={"config_type": "fees", "temp_path": str(temp_file)}
+        )
+        state.clear = AsyncMock()
+
+        with patch("app.bot.handlers.config.shutil.move") as mock_move:
+            await cmd_cancel(message, state)
+
+        assert not temp_file.exists()
+        mock_move.assert_not_called()
+        state.clear.assert_called_once()
+
+    async def test_confirm_without_pending_upload(self):
+        """Тест /confirm без загруженного файла."""
+        message = MagicMock()
+        message.answer = AsyncMock()
+        state = MagicMock()
+        state.get_state = AsyncMock(return_value=None)
+        state.clear = AsyncMock()
+
+        await cmd_confirm_upload(message, state)
+
+        assert "No upload waiting" in message.answer.call_args[0][0]
+        state.clear.assert_not_called()
+
     async def test_handle_upload_no_document(self):
         """Тест обработки сообщения без документа."""
         message = MagicMock()
@@ -0,0 +1,169 @@
+"""Тесты хранения нескольких версий конфигов в памяти.
+
+Тестируемый модуль: app/core/settings.py (swap_configs, rollback_configs, get_config_version)
+
+Покрытие:
+- История ограничена CONFIG_HISTORY, поиск версии по hash и префиксу
+- rollback_configs(): откат на предыдущую / указанную версию без чтения файлов
+- Каждая версия хранит свои скомпилированные тарифы
+- request.config_hash воспроизводит расчёт на старых конфигах (и 410 для неизвестной)
+- Команды бота /config_versions и /rollback_config
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import copy
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogram.types import Message
+from fastapi.testclient import TestClient
+import pytest
+
+from app.bot.handlers.config import cmd_config_versions, cmd_rollback_config
+from app.calculation import engine
+from app.calculation.compiled import get_compiled_tariffs
+from app.calculation.models import CalculationRequest
+from app.core import settings as settings_module
+from app.core.settings import (
+    ConfigRegistry,
+    config_versions,
+    get_config_version,
+    get_configs,
+    get_settings,
+    rollback_configs,
+    swap_configs,
+)
+from app.main import create_app
+
+
+@pytest.fixture
+def anyio_backend():
+    """Use only asyncio backend (not trio)."""
+    return "asyncio"
+
+
+@pytest.fixture
+def live(monkeypatch):
+    """Живой реестр и история восстанавливаются после теста."""
+    original = get_configs()
+    monkeypatch.setattr(
+        settings_module._LiveConfigs, "history", OrderedDict({original.hash: original})
+    )
+    yield original
+    swap_configs(original)
+
+
+def _version(base: ConfigRegistry, config_hash: str, commission_usd: int = 1000) -> ConfigRegistry:
+    commissions = copy.deepcopy(base.commissions)
+    commissions["default_commission_usd"] = commission_usd
+    commissions["by_country"] = {}
+    return ConfigRegistry(
+        fees=base.fees,
+        commissions=commissions,
+        rates=base.rates,
+        duties=base.duties,
+        hash=config_hash,
+        loaded_at=base.loaded_at,
+    )
+
+
+def test_history_is_bounded_and_searchable(live, monkeypatch):
+    monkeypatch.setattr(get_settings(), "config_history", 3)
+    for i in range(4):
+        swap_configs(_version(live, f"{i:08d}aa{i}"))
+
+    hashes = [c.hash for c in config_versions()]
+    assert hashes == ["00000003aa3", "00000002aa2", "00000001aa1"]
+    assert get_config_version("00000002aa2").hash == "00000002aa2"
+    assert get_config_version("00000001").hash == "00000001aa1"
+    assert get_config_version("0000000") is None  # слишком короткий префикс
+    assert get_config_version(live.hash) is None  # вытеснена
+
+
+def test_rollback_is_a_pointer_swap(live, monkeypatch):
+    newer = _version(live, "f" * 64, commission_usd=2000)
+    swap_configs(newer)
+    live_plan = get_compiled_tariffs(live)
+
+    monkeypatch.setattr(ConfigRegistry, "load", None)  # файлы не читаются
+    success, _, metrics = rollback_configs()
+
+    assert success is True
+    assert get_configs() is live
+    assert get_compiled_tariffs(live) is live_plan  # тарифы не перекомпилированы
+    assert metrics == {
+        "old_hash": newer.hash,
+        "new_hash": live.hash,
+        "loaded_at": live.loaded_at,
+        "hash_changed": True,
+    }
+
+    assert rollback_configs("ffffffff")[0] is True
+    assert get_configs() is newer
+
+
+def test_rollback_to_unknown_version_keeps_configs(live):
+    success, message, _ = rollback_configs("deadbeef")
+
+    assert success is False
+    assert "not kept in memory" in message
+    assert get_configs() is live
+    assert rollback_configs()[0] is False  # предыдущей версии нет
+
+
+def _request(**overrides) -> CalculationRequest:
+    data = {
+        "country": "japan",
+        "year": 2022,
+        "engine_cc": 1500,
+        "engine_power_hp": 110,
+        "purchase_price": Decimal("1500000"),
+        "currency": "JPY",
+    }
+    data.update(overrides)
+    return CalculationRequest(**data)
+
+
+def test_pinned_config_hash_reproduces_quote(live):
+    old = _version(live, "a" * 64, commission_usd=3000)
+    swap_configs(old)
+    swap_configs(live)
+    ctx = engine.resolve_context()
+
+    fresh = engine._calculate_cached(_request(), ctx)
+    pinned = engine._calculate_cached(_request(config_hash="aaaaaaaa"), ctx)
+
+    assert fresh.meta.config_hash == live.hash
+    assert pinned.meta.config_hash == old.hash
+    assert pinned.breakdown.company_commission_rub > fresh.breakdown.company_commission_rub
+    assert get_configs() is live
+
+
+def test_unknown_config_hash_is_rejected(live):
+    ctx = engine.resolve_context()
+    with pytest.raises(engine.ConfigVersionUnavailableError):
+        engine._calculate_cached(_request(config_hash="0123456789"), ctx)
+
+    payload = _request(config_hash="0123456789").model_dump(mode="json")
+    response = TestClient(create_app()).post("/api/calculate", json=payload)
+    assert response.status_code == 410
+
+
+@pytest.mark.anyio
+async def test_bot_commands(live):
+    newer = _version(live, "b" * 64)
+    swap_configs(newer)
+    message = MagicMock(spec=Message)
+    message.answer = AsyncMock()
+
+    await cmd_config_versions(message)
+    listing = message.answer.call_args[0][0]
+    assert f"▶️ `{'b' * 12}`" in listing
+    assert live.hash[:12] in listing
+
+    message.text = f"/rollback_config {live.hash[:10]}"
+    await cmd_rollback_config(message)
+    assert any("rolled back" in call[0][0] for call in message.answer.call_args_list)
+    assert get_configs() is live
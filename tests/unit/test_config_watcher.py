@@ -0,0 +1,198 @@
+"""Тесты автоматической перезагрузки конфигов при изменении файлов.
+
+Тестируемый модуль: app/services/config_watcher.py (+ атомарная подмена в app/core/settings.py)
+
+Покрытие:
+- check_once(): изменение файла -> новый реестр подменяет старый целиком
+- Битый YAML / невалидный тариф: перезагрузка отклонена, старые конфиги остаются
+- Нарушение схемы (неупорядоченные брэкеты): перезагрузка отклонена, в том числе refresh_configs()
+- Читатели get_configs() во время перезагрузок не видят пустого кэша и не грузят сами
+- Фоновый цикл в режиме опроса mtime; ошибка одной проверки не останавливает цикл
+"""
+
+from __future__ import annotations
+
+import asyncio
+import shutil
+import threading
+
+import pytest
+
+from app.core import settings as settings_module
+from app.core.settings import (
+    ConfigRefreshError,
+    ConfigRegistry,
+    get_configs,
+    get_settings,
+    refresh_configs,
+    swap_configs,
+)
+from app.services import config_watcher as watcher_module
+from app.services.config_watcher import ConfigWatcher
+
+
+@pytest.fixture
+def anyio_backend():
+    """Use only asyncio backend (not trio)."""
+    return "asyncio"
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    """Копия config/ во временной папке; исходный реестр восстанавливается после теста."""
+    original = get_configs()
+    target = tmp_path / "config"
+    shutil.copytree(settings_module.CONFIG_DIR, target)
+    monkeypatch.setattr(settings_module, "CONFIG_DIR", target)
+    yield target
+    swap_configs(original)
+
+
+def _touch_rates(config_dir, marker: int) -> None:
+    path = config_dir / "rates.yml"
+    text = path.read_text(encoding="utf-8")
+    path.write_text(f"{text}\nwatch_marker: {marker}\n", encoding="utf-8")
+
+
+def _watcher() -> ConfigWatcher:
+    watcher = ConfigWatcher()
+    watcher._signature = watcher.signature()
+    return watcher
+
+
+def test_change_swaps_registry(config_dir):
+    watcher = _watcher()
+    before = get_configs()
+
+    assert watcher.check_once() is False  # ничего не менялось
+    _touch_rates(config_dir, 1)
+    assert watcher.check_once() is True
+
+    after = get_configs()
+    assert after is not before
+    assert after.hash != before.hash
+    assert after.rates["watch_marker"] == 1
+    assert watcher.get_stats()["reloads"] == 1
+
+
+def test_broken_yaml_keeps_current_configs(config_dir):
+    watcher = _watcher()
+    before = get_configs()
+
+    (config_dir / "fees.yml").write_text("japan: [unclosed", encoding="utf-8")
+    assert watcher.check_once() is False
+    assert get_configs() is before
+
+    (config_dir / "fees.yml").write_text("japan: not-a-mapping\n", encoding="utf-8")
+    assert watcher.check_once() is False  # тарифы не компилируются
+    assert get_configs() is before
+    assert watcher.failures == 2
+    assert watcher.get_stats()["last_error"]
+
+
+def test_schema_violation_keeps_current_configs(config_dir):
+    watcher = _watcher()
+    before = get_configs()
+
+    (config_dir / "fees.yml").write_text(
+        "japan:\n  tiers:\n    - {max_price: 6000000}\n    - {max_price: 3000000}\n",
+        encoding="utf-8",
+    )
+    assert watcher.check_once() is False
+    assert get_configs() is before
+    assert "fees.japan.tiers" in watcher.get_stats()["last_error"]
+
+    with pytest.raises(ConfigRefreshError, match=r"fees\.japan\.tiers"):
+        refresh_configs()
+    assert get_configs() is before
+
+
+def test_readers_never_reload_during_swaps(config_dir, monkeypatch):
+    loads = 0
+    real_load = ConfigRegistry.load.__func__
+
+    def counting_load(cls):
+        nonlocal loads
+        loads += 1
+        return real_load(cls)
+
+    monkeypatch.setattr(ConfigRegistry, "load", classmethod(counting_load))
+    watcher = _watcher()
+    seen_empty = []
+    stop = threading.Event()
+
+    def reader() -> None:
+        while not stop.is_set():
+            if get_configs() is None:
+                seen_empty.append(True)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    try:
+        for marker in range(5):
+            _touch_rates(config_dir, marker)
+            watcher.check_once()
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    assert not seen_empty
+    assert loads == 5  # только перезагрузки, читатели ничего не грузили
+    assert watcher.reloads == 5
+
+
+@pytest.mark.anyio
+async def test_poll_loop_picks_up_changes(config_dir, monkeypatch):
+    monkeypatch.setattr(watcher_module, "awatch", None)
+    monkeypatch.setattr(get_settings(), "config_watch_enabled", True)
+    monkeypatch.setattr(get_settings(), "config_watch_interval_seconds", 0.02)
+    watcher = ConfigWatcher()
+
+    assert watcher.start() is True
+    assert watcher.get_stats()["mode"] == "poll"
+    try:
+        _touch_rates(config_dir, 42)
+        for _ in range(250):
+            if watcher.reloads:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await watcher.stop()
+
+    assert get_configs().rates["watch_marker"] == 42
+    assert watcher.running is False
+
+
+@pytest.mark.anyio
+async def test_poll_loop_survives_failed_check(config_dir, monkeypatch):
+    monkeypatch.setattr(watcher_module, "awatch", None)
+    monkeypatch.setattr(get_settings(), "config_watch_enabled", True)
+    monkeypatch.setattr(get_settings(), "config_watch_interval_seconds", 0.02)
+    watcher = ConfigWatcher()
+    check_once = watcher.check_once
+    calls = 0
+
+    def flaky() -> bool:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise OSError
+        return check_once()
+
+    monkeypatch.setattr(watcher, "check_once", flaky)
+
+    assert watcher.start() is True
+    try:
+        _touch_rates(config_dir, 7)
+        for _ in range(250):
+            if watcher.reloads:
+                break
+            await asyncio.sleep(0.02)
+        assert watcher.running is True
+    finally:
+        await watcher.stop()
+
+    assert calls > 1
+    assert get_configs().rates["watch_marker"] == 7
@@ -0,0 +1,128 @@
+"""Юнит-тесты версионируемых эффективных курсов.
+
+Тестируемый модуль: app/services/effective_rates.py (+ закрепление версии в engine)
+
+Покрытие:
+- RatesVersions.resolve(): пересборка только при изменении конфига или живых курсов
+- EffectiveRates: неизменяемость, совместимость с dict-интерфейсом rates_conf
+- История версий: ограниченный размер, get() закреплённой версии
+- Версия выводится из содержимого: одинакова в разных процессах, неизвестная отклоняется
+- calculate(): request.rates_version воспроизводит расчёт на старых курсах
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+import pytest
+
+from app.calculation import engine
+from app.calculation.models import CalculationRequest
+from app.core.settings import get_configs
+from app.main import create_app
+from app.services.cbr import merge_live_rates
+from app.services.effective_rates import RatesVersions, rates_versions
+
+
+BASE = {"currencies": {"USD_RUB": 90.0, "EUR_RUB": 100.0}, "era_glonass_rub": 6000}
+
+
+def test_rebuilt_only_when_inputs_change():
+    versions = RatesVersions()
+
+    first = versions.resolve(BASE, None, merge_live_rates)
+    assert versions.resolve(BASE, None, merge_live_rates) is first
+    assert first.live_source is None
+
+    live = versions.resolve(BASE, {"USD_RUB": 81.5}, merge_live_rates)
+    assert live.version != first.version
+    assert live["currencies"] == {"USD_RUB": 81.5, "EUR_RUB": 100.0}
+    assert live.get("live_source") == "cbr"
+    # Равные живые курсы (новый dict после fetch) не пересобирают снимок
+    assert versions.resolve(BASE, {"USD_RUB": 81.5}, merge_live_rates) is live
+
+    # Перезагруженный конфиг с тем же содержимым: снимок новый, версия та же
+    reloaded = versions.resolve(dict(BASE), {"USD_RUB": 81.5}, merge_live_rates)
+    assert reloaded is not live
+    assert reloaded.version == live.version
+    assert versions.rebuilds == 3
+
+
+def test_version_is_stable_across_processes():
+    # Другой воркер / перезапуск: своя история, но те же курсы - та же версия
+    worker_a, worker_b = RatesVersions(), RatesVersions()
+    worker_a.resolve(BASE, None, merge_live_rates)
+    a = worker_a.resolve(BASE, {"USD_RUB": 81.5}, merge_live_rates)
+    b = worker_b.resolve(dict(BASE), {"USD_RUB": 81.5}, merge_live_rates)
+
+    assert a.version == b.version
+    assert 1 <= a.version < 2**53
+    # Версия, которой процесс не строил, не подменяется текущими курсами
+    other = RatesVersions().resolve(BASE, {"USD_RUB": 99.0}, merge_live_rates)
+    assert worker_b.get(other.version) is None
+
+
+def test_snapshot_is_read_only():
+    snapshot = RatesVersions().resolve(BASE, None, merge_live_rates)
+
+    with pytest.raises(TypeError):
+        snapshot["currencies"]["USD_RUB"] = 1.0  # type: ignore[index]
+    with pytest.raises(TypeError):
+        snapshot.conf["era_glonass_rub"] = 0  # type: ignore[index]
+    assert BASE["currencies"]["USD_RUB"] == 90.0
+    assert snapshot.get("era_glonass_rub") == 6000
+
+
+def test_history_is_bounded():
+    versions = RatesVersions(history=2)
+    built = [
+        versions.resolve(BASE, {"USD_RUB": usd}, merge_live_rates) for usd in (80.0, 81.0, 82.0)
+    ]
+
+    assert versions.get(built[0].version) is None
+    assert versions.get(built[1].version)["currencies"]["USD_RUB"] == 81.0
+    stats = versions.get_stats()
+    assert stats["version"] == built[2].version
+    assert stats["versions_kept"] == 2
+    assert stats["oldest_version"] == built[1].version
+
+
+def _request(**overrides) -> CalculationRequest:
+    data = {
+        "country": "japan",
+        "year": 2022,
+        "engine_cc": 1500,
+        "engine_power_hp": 110,
+        "purchase_price": Decimal("1500000"),
+        "currency": "JPY",
+    }
+    data.update(overrides)
+    return CalculationRequest(**data)
+
+
+def test_pinned_version_reproduces_quote():
+    base = get_configs().rates
+    cheap_jpy = {**base, "currencies": {**base["currencies"], "JPY_RUB": 0.4}}
+    old = rates_versions.resolve(cheap_jpy, None, merge_live_rates)
+    current = rates_versions.resolve(base, None, merge_live_rates)
+    ctx = engine.resolve_context(rates_conf=current)
+
+    fresh = engine._calculate_cached(_request(), ctx)
+    pinned = engine._calculate_cached(_request(rates_version=old.version), ctx)
+
+    assert fresh.meta.rates_version == current.version
+    assert pinned.meta.rates_version == old.version
+    assert pinned.meta.rates_used["JPY_RUB"] == 0.4
+    assert pinned.breakdown.purchase_price_rub < fresh.breakdown.purchase_price_rub
+
+
+def test_unknown_version_is_rejected():
+    ctx = engine.resolve_context()
+    unknown = ctx.rates_version % (2**48 - 1) + 1
+    with pytest.raises(engine.RatesVersionUnavailableError):
+        engine._calculate_cached(_request(rates_version=unknown), ctx)
+
+    payload = _request(rates_version=unknown).model_dump(mode="json")
+    response = TestClient(create_app()).post("/api/calculate", json=payload)
+    assert response.status_code == 410
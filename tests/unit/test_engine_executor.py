@@ -0,0 +1,189 @@
+"""Тесты ограниченного исполнителя расчётов.
+
+Тестируемый модуль: app/calculation/executor.py (+ acalculate / acalculate_many, /api/calculate,
+/calc в боте)
+
+Покрытие:
+- Дедлайн: EngineDeadlineError; слот занят, пока брошенный расчёт не завершится
+- Расчёт, ждущий в очереди, при дедлайне отменяется и сразу освобождает слот
+- Очередь полна: EngineOverloadedError без ожидания
+- /api/calculate: 503 с Retry-After; /calc в боте: сообщение о перегрузке
+- ENGINE_EXECUTOR=process: тот же результат, контекст передаётся воркеру один раз
+"""
+
+from __future__ import annotations
+
+import asyncio
+from decimal import Decimal
+import threading
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogram.types import Message
+from fastapi.testclient import TestClient
+import pytest
+
+from app.bot.handlers.start import ENGINE_BUSY_TEXT, cmd_calc
+from app.calculation import engine
+from app.calculation.cache import result_cache
+from app.calculation.executor import (
+    EngineDeadlineError,
+    EngineExecutor,
+    EngineOverloadedError,
+    engine_executor,
+)
+from app.calculation.models import CalculationRequest
+from app.core.settings import CONFIG_SECTIONS, get_settings
+from app.main import create_app
+
+
+@pytest.fixture
+def anyio_backend():
+    """Use only asyncio backend (not trio)."""
+    return "asyncio"
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    s = get_settings()
+    monkeypatch.setattr(s, "engine_executor", "thread")
+    monkeypatch.setattr(s, "engine_workers", 1)
+    monkeypatch.setattr(s, "engine_max_pending", 2)
+    monkeypatch.setattr(s, "engine_deadline_seconds", 5.0)
+    return s
+
+
+@pytest.fixture
+def executor():
+    pool = EngineExecutor()
+    yield pool
+    pool.shutdown()
+
+
+def _request(price: int = 2500000) -> CalculationRequest:
+    return CalculationRequest(
+        country="japan",
+        year=2021,
+        engine_cc=1496,
+        engine_power_hp=110,
+        purchase_price=Decimal(price),
+        currency="JPY",
+    )
+
+
+async def _wait_idle(pool: EngineExecutor) -> None:
+    for _ in range(200):
+        if pool.pending == 0:
+            return
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.anyio
+async def test_deadline_keeps_slot_until_done(settings, executor):
+    release = threading.Event()
+
+    with pytest.raises(EngineDeadlineError):
+        await executor.run(release.wait, deadline=0.05)
+
+    assert executor.pending == 1  # поток ещё считает
+    release.set()
+    await _wait_idle(executor)
+    assert executor.pending == 0
+    assert executor.timed_out == 1
+
+
+@pytest.mark.anyio
+async def test_queued_call_dropped_on_deadline(settings, executor):
+    release = threading.Event()
+    ran = []
+    running = asyncio.ensure_future(executor.run(release.wait))
+    await asyncio.sleep(0.02)
+
+    with pytest.raises(EngineDeadlineError):
+        await executor.run(ran.append, 1, deadline=0.05)
+
+    assert executor.pending == 1  # только работающий расчёт
+    release.set()
+    assert await running is True
+    await _wait_idle(executor)
+    assert ran == []
+
+
+@pytest.mark.anyio
+async def test_full_queue_rejects(settings, executor):
+    release = threading.Event()
+    running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0.02)
+
+    started = time.perf_counter()
+    with pytest.raises(EngineOverloadedError):
+        await executor.run(time.sleep, 0)
+    assert time.perf_counter() - started < 0.5
+
+    release.set()
+    assert await asyncio.gather(*running) == [True, True]
+    assert executor.get_stats()["rejected"] == 1
+
+
+def test_api_returns_503_when_busy(settings, monkeypatch):
+    monkeypatch.setattr(settings, "engine_max_pending", 0)
+    result_cache.clear()
+    payload = _request(2500001).model_dump(mode="json")
+
+    response = TestClient(create_app()).post("/api/calculate", json=payload)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert "engine busy" in response.json()["detail"]
+
+
+@pytest.mark.anyio
+async def test_bot_reports_busy(settings, monkeypatch):
+    monkeypatch.setattr(settings, "engine_max_pending", 0)
+    result_cache.clear()
+    message = MagicMock(spec=Message)
+    message.answer = AsyncMock()
+
+    await cmd_calc(message)
+
+    message.answer.assert_called_once_with(ENGINE_BUSY_TEXT)
+
+
+def test_worker_context_sent_once():
+    ctx = engine.resolve_context()
+    key = engine._context_fingerprint(ctx)
+    source = (
+        {name: getattr(ctx.configs, name) for name in CONFIG_SECTIONS},
+        engine.thaw(ctx.rates_conf),
+        ctx.today,
+        ctx.rates_version,
+    )
+    engine._worker_contexts.pop(key, None)
+
+    with pytest.raises(engine._WorkerContextMissingError):
+        engine._worker_calculate_many(key, None, [_request()])
+    (first,) = engine._worker_calculate_many(key, source, [_request()])
+    (again,) = engine._worker_calculate_many(key, None, [_request()])
+
+    expected = engine.calculate_with_context(_request(), ctx)
+    assert first.breakdown == again.breakdown == expected.breakdown
+    assert first.meta.rates_version == ctx.rates_version
+    engine._worker_contexts.pop(key, None)
+
+
+@pytest.mark.anyio
+async def test_process_pool_matches_inline(settings, monkeypatch):
+    monkeypatch.setattr(settings, "engine_executor", "process")
+    monkeypatch.setattr(settings, "engine_deadline_seconds", 60.0)
+    result_cache.clear()
+    requests = [_request(2500000 + i) for i in range(3)]
+    try:
+        single = await engine.acalculate(requests[0])
+        batch = await engine.acalculate_many(requests)
+    finally:
+        engine_executor.shutdown()
+        result_cache.clear()
+
+    expected = [engine.calculate_with_context(r, engine.resolve_context()) for r in requests]
+    assert single.breakdown == expected[0].breakdown
+    assert [r.breakdown for r in batch] == [r.breakdown for r in expected]
@@ -0,0 +1,183 @@
+"""Тесты ограничителя запросов (token bucket).
+
+Тестируемый модуль: app/api/rate_limit.py (+ rate_limit_middleware в app/main.py)
+
+Покрытие:
+- Бюджет расходуется и восстанавливается непрерывно, Retry-After до следующего токена
+- Колесо времени: бакет, снова ставший полным, удаляется; число ключей ограничено
+- SharedBuckets: два «воркера» на одном файле делят один бюджет, таблица фиксированного размера;
+  файл другого размера не усекается
+- Клиент из X-Forwarded-For только за доверенным прокси (в т.ч. значение из docker-compose)
+- Middleware: 429 с Retry-After, у batch отдельный бюджет
+"""
+
+from __future__ import annotations
+
+import re
+
+from fastapi.testclient import TestClient
+import pytest
+from starlette.requests import Request
+
+from app.api.rate_limit import (
+    SHARED_HEADER,
+    SHARED_SLOT,
+    MemoryBuckets,
+    RateBudget,
+    RateLimiter,
+    SharedBuckets,
+    SharedTableMismatchError,
+    _parse_networks,
+)
+from app.core.settings import BASE_DIR, AppSettings, get_settings
+from app.main import create_app
+
+
+BUDGET = RateBudget("calculate", "/api/calculate", per_minute=3)
+PAYLOAD = {
+    "country": "japan",
+    "year": 2021,
+    "engine_cc": 1496,
+    "engine_power_hp": 110,
+    "purchase_price": "2500000",
+    "currency": "JPY",
+}
+
+
+def test_token_bucket_refills():
+    buckets = MemoryBuckets()
+    now = 1_000_000.0
+
+    decisions = [buckets.acquire("ip", BUDGET, now) for _ in range(4)]
+
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert decisions[2].remaining == 0
+    assert decisions[3].retry_after == 20  # 3 токена в минуту
+    assert not buckets.acquire("ip", BUDGET, now + 19).allowed
+    assert buckets.acquire("ip", BUDGET, now + 20).allowed
+
+
+def test_time_wheel_drops_full_buckets():
+    buckets = MemoryBuckets()
+    now = 1_000_000.0
+    for ip in ("a", "b"):
+        buckets.acquire(ip, BUDGET, now)
+    buckets.acquire("c", BUDGET, now + 10)
+
+    buckets.acquire("d", BUDGET, now + 15)
+    assert len(buckets) == 4
+    buckets.acquire("d", BUDGET, now + 25)  # один токен вернулся за 20 с: a, b полны
+    assert len(buckets) == 2
+    buckets.acquire("d", BUDGET, now + 3600)  # после долгого простоя
+    assert len(buckets) == 1
+
+
+def test_key_count_is_bounded():
+    buckets = MemoryBuckets(max_keys=3)
+
+    for i in range(10):
+        buckets.acquire(f"ip-{i}", BUDGET, 1_000_000.0 + i)
+
+    assert len(buckets) == 3
+    assert buckets.evictions == 7
+
+
+def test_shared_buckets_across_workers(tmp_path):
+    path = tmp_path / "rate_limit.bin"
+    first, second = SharedBuckets(path, slots=64), SharedBuckets(path, slots=64)
+    now = 1_000_000.0
+    try:
+        allowed = [
+            worker.acquire("ip", BUDGET, now).allowed for worker in (first, second, first, second)
+        ]
+        assert allowed == [True, True, True, False]
+        assert second.acquire("ip", BUDGET, now + 20).allowed
+        assert not first.acquire("ip", BUDGET, now + 20).allowed
+        # Память - фиксированная таблица, сколько бы клиентов ни было
+        for i in range(500):
+            first.acquire(f"ip-{i}", BUDGET, now + 30)
+        assert path.stat().st_size == SHARED_HEADER.size + 64 * SHARED_SLOT.size
+        assert first.evictions > 0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_shared_table_size_change_uses_own_file(tmp_path):
+    path = tmp_path / "rate_limit.bin"
+    old = SharedBuckets(path, slots=64)
+    new = SharedBuckets(path, slots=32)
+    try:
+        # Файл старой таблицы не усекается: у других воркеров он всё ещё в mmap
+        assert path.stat().st_size == SHARED_HEADER.size + 64 * SHARED_SLOT.size
+        assert new.path == tmp_path / "rate_limit.32.bin"
+        assert new.acquire("ip", BUDGET, 1_000_000.0).allowed
+    finally:
+        old.close()
+        new.close()
+
+    # Чужой файл и на запасном пути: отказ, а не перезапись
+    for name in ("other.bin", "other.16.bin"):
+        (tmp_path / name).write_bytes(b"not a table")
+    with pytest.raises(SharedTableMismatchError):
+        SharedBuckets(tmp_path / "other.bin", slots=16)
+
+
+def _request(peer: str, forwarded: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "path": "/api/calculate",
+            "headers": headers,
+            "client": (peer, 40000),
+        }
+    )
+
+
+def test_client_ip_behind_trusted_proxy():
+    limiter = RateLimiter((BUDGET,), MemoryBuckets(), _parse_networks("172.16.0.0/12,::1/128"))
+
+    assert limiter.client_ip(_request("172.18.0.5", "203.0.113.7")) == "203.0.113.7"
+    # Подделанный первый адрес не поможет: берётся ближайший недоверенный
+    assert limiter.client_ip(_request("172.18.0.5", "1.1.1.1, 203.0.113.7")) == "203.0.113.7"
+    assert limiter.client_ip(_request("172.18.0.5", "203.0.113.7, 172.18.0.9")) == "203.0.113.7"
+    assert limiter.client_ip(_request("198.51.100.1", "203.0.113.7")) == "198.51.100.1"
+    assert limiter.client_ip(_request("172.18.0.5")) == "172.18.0.5"
+
+
+def test_client_ip_behind_compose_proxy():
+    """Значение RATE_LIMIT_TRUSTED_PROXIES из docker-compose доверяет прокси из сети `web`."""
+    compose = (BASE_DIR / "docker-compose.yml").read_text(encoding="utf-8")
+    configured = re.search(r"RATE_LIMIT_TRUSTED_PROXIES:-([^}]*)\}", compose).group(1)
+    limiter = RateLimiter((BUDGET,), MemoryBuckets(), _parse_networks(configured))
+
+    assert limiter.client_ip(_request("172.28.0.3", "203.0.113.7")) == "203.0.113.7"
+    assert limiter.client_ip(_request("198.51.100.1", "203.0.113.7")) == "198.51.100.1"
+    # Значение по умолчанию вне compose: только loopback
+    loopback = AppSettings.model_fields["rate_limit_trusted_proxies"].default
+    default = RateLimiter((BUDGET,), MemoryBuckets(), _parse_networks(loopback))
+    assert default.client_ip(_request("172.28.0.3", "203.0.113.7")) == "172.28.0.3"
+
+
+@pytest.fixture
+def limited_client(monkeypatch) -> TestClient:
+    settings = get_settings()
+    monkeypatch.setattr(settings, "rate_limit_per_minute", 2)
+    monkeypatch.setattr(settings, "rate_limit_batch_per_minute", 1)
+    monkeypatch.setattr(settings, "rate_limit_shared_path", "")
+    return TestClient(create_app())
+
+
+def test_middleware_budgets(limited_client):
+    calc = [limited_client.post("/api/calculate", json=PAYLOAD) for _ in range(3)]
+    batch = [
+        limited_client.post("/api/calculate/batch", json={"items": [PAYLOAD]}) for _ in range(2)
+    ]
+
+    assert [r.status_code for r in calc] == [200, 200, 429]
+    assert calc[2].headers["retry-after"] == "30"
+    assert calc[2].json() == {"detail": "Rate limit exceeded", "limit_per_minute": 2}
+    assert [r.status_code for r in batch] == [200, 429]
+    assert limited_client.get("/api/meta").status_code == 200
@@ -0,0 +1,88 @@
+"""Тесты снимка курсов ЦБ РФ на диске.
+
+Тестируемый модуль: app/services/rates_snapshot.py (+ интеграция с CBRRatesService)
+
+Покрытие:
+- save_snapshot()/load_snapshot(): атомарная запись и чтение, битый файл
+- CBRRatesService: сохранение после загрузки, тёплый старт, работа при недоступности ЦБ
+"""
+
+from __future__ import annotations
+
+import json
+import time
+
+import pytest
+
+from app.core.settings import get_settings
+from app.services.cbr import CacheEntry, CBRFetchError, CBRRatesService
+from app.services.rates_snapshot import load_snapshot, save_snapshot
+
+
+RATES = {"USD_RUB": 81.5, "EUR_RUB": 95.4}
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = tmp_path / "nested" / "cbr_rates.json"
+
+    assert save_snapshot(path, RATES, fetched_at=1000.0, source="cbr") is True
+
+    snapshot = load_snapshot(path)
+    assert snapshot is not None
+    assert snapshot.rates == RATES
+    assert snapshot.fetched_at == 1000.0
+    assert snapshot.source == "cbr"
+    # Временные файлы не остаются рядом со снимком
+    assert [p.name for p in path.parent.iterdir()] == ["cbr_rates.json"]
+
+
+def test_load_missing_file(tmp_path):
+    assert load_snapshot(tmp_path / "absent.json") is None
+
+
+@pytest.mark.parametrize(
+    "content",
+    ["not json", json.dumps({"version": 999, "rates": {}}), json.dumps({"version": 1})],
+)
+def test_load_corrupt_file(tmp_path, content):
+    path = tmp_path / "cbr_rates.json"
+    path.write_text(content, encoding="utf-8")
+    assert load_snapshot(path) is None
+
+
+def test_service_persists_fetch_and_warm_starts(tmp_path, monkeypatch):
+    path = tmp_path / "cbr_rates.json"
+    service = CBRRatesService()
+    service.load_snapshot(path)  # файла ещё нет: только включает сохранение
+    monkeypatch.setattr(service, "_do_fetch", lambda url: dict(RATES))
+
+    assert service.fetch_rates(force=True) == RATES
+    assert path.exists()
+
+    restarted = CBRRatesService()
+    assert restarted.load_snapshot(path) is True
+    assert restarted.get_cached_rates() == RATES
+    info = restarted.get_snapshot_info()
+    assert info["enabled"] is True
+    assert info["served_from_snapshot"] is True
+    assert restarted.get_cache_info()["source"] == "snapshot"
+
+
+def test_last_good_rates_survive_outage(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "enable_live_cbr", True)
+    monkeypatch.setattr(settings, "cbr_cache_ttl_seconds", 100)
+    monkeypatch.setattr(settings, "cbr_max_stale_seconds", 1000)
+    monkeypatch.delenv("PYTEST_CURRENT_TEST", raising=False)
+
+    service = CBRRatesService()
+    service._cache = CacheEntry(rates=dict(RATES), fetched_at=time.time() - 500)
+
+    def outage(url: str) -> dict[str, float]:
+        raise CBRFetchError("unreachable")
+
+    monkeypatch.setattr(service, "_do_fetch", outage)
+
+    assert service.fetch_rates() == RATES
+    # Явное обновление сообщает о неудаче
+    assert service.fetch_rates(force=True) is None
@@ -0,0 +1,119 @@
+"""Юнит-тесты для кэша результатов расчёта.
+
+Тестируемый модуль: app/calculation/cache.py
+
+Покрытие:
+- ResultCache: LRU-вытеснение, TTL, статистика
+- Поколения хранятся рядом (закреплённые версии не сбрасывают кэш), старейшее вытесняется
+- calculate(): повторный расчёт берётся из кэша и возвращает запрос вызывающего
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from app.calculation import engine
+from app.calculation.cache import ResultCache, result_cache
+from app.calculation.models import CalculationRequest
+
+
+META = object()
+BREAKDOWN = object()
+
+
+def test_hit_and_miss_counters():
+    cache = ResultCache(maxsize=8, ttl_seconds=60)
+    assert cache.get("a", "gen") is None
+    cache.put("a", "gen", META, BREAKDOWN)
+    entry = cache.get("a", "gen")
+    assert entry is not None
+    assert entry.meta is META
+    assert entry.breakdown is BREAKDOWN
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+def test_lru_eviction():
+    cache = ResultCache(maxsize=2, ttl_seconds=60)
+    cache.put("a", "gen", META, BREAKDOWN)
+    cache.put("b", "gen", META, BREAKDOWN)
+    cache.get("a", "gen")  # "b" становится самым старым
+    cache.put("c", "gen", META, BREAKDOWN)
+    assert cache.get("b", "gen") is None
+    assert cache.get("a", "gen") is not None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = ResultCache(maxsize=8, ttl_seconds=0)
+    cache.put("a", "gen", META, BREAKDOWN)
+    assert cache.get("a", "gen") is None
+    assert cache.get_stats()["size"] == 0
+
+
+def test_generations_kept_side_by_side():
+    cache = ResultCache(maxsize=8, ttl_seconds=60, max_generations=2)
+    cache.put("a", "gen1", META, BREAKDOWN)
+    assert cache.get("a", "gen2") is None
+    cache.put("a", "gen2", META, BREAKDOWN)
+    # Чередование поколений (закреплённые запросы) не сбрасывает кэш
+    assert cache.get("a", "gen1") is not None
+    assert cache.get("a", "gen2") is not None
+    assert cache.get_stats()["invalidations"] == 0
+
+    cache.put("a", "gen3", META, BREAKDOWN)  # gen1 - самое давнее
+    assert cache.get("a", "gen1") is None
+    assert cache.get("a", "gen2") is not None
+    stats = cache.get_stats()
+    assert stats["invalidations"] == 1
+    assert stats["generations"] == 2
+    assert stats["size"] == 2
+
+
+def test_size_bound_spans_generations():
+    cache = ResultCache(maxsize=2, ttl_seconds=60)
+    cache.put("a", "old", META, BREAKDOWN)
+    cache.put("a", "new", META, BREAKDOWN)
+    cache.put("b", "new", META, BREAKDOWN)
+    assert cache.get("a", "old") is None  # давнее поколение уступает первым
+    assert cache.get("b", "new") is not None
+    assert cache.get_stats()["size"] == 2
+
+
+def test_disabled_cache():
+    cache = ResultCache(maxsize=0)
+    cache.put("a", "gen", META, BREAKDOWN)
+    assert cache.get("a", "gen") is None
+    assert cache.get_stats()["enabled"] is False
+
+
+@pytest.fixture
+def clean_result_cache():
+    result_cache.clear()
+    yield result_cache
+    result_cache.clear()
+
+
+def test_calculate_uses_cache(clean_result_cache):
+    req = CalculationRequest(
+        country="japan",
+        year=2022,
+        engine_cc=1500,
+        engine_power_hp=110,
+        purchase_price=Decimal("1500000"),
+        currency="JPY",
+    )
+    # Тот же автомобиль, цена в другой записи
+    same = req.model_copy(update={"purchase_price": Decimal("1500000.00")})
+
+    hits_before = clean_result_cache.hits
+    first = engine.calculate(req)
+    second = engine.calculate(same)
+
+    assert clean_result_cache.hits == hits_before + 1
+    assert second.request is same
+    assert second.breakdown == first.breakdown
+    assert second.meta == first.meta
+    assert second.model_dump() == {**first.model_dump(), "request": same.model_dump()}
@@ -0,0 +1,145 @@
+"""Тесты общего для процессов кэша курсов ЦБ РФ.
+
+Тестируемый модуль: app/services/shared_rates.py (+ интеграция с CBRRatesService)
+
+Покрытие:
+- SharedRatesStore.read(): повторное чтение без изменений файла не перечитывает его
+- publish(): монотонный номер поколения
+- fetch_lock(): межпроцессная блокировка эксклюзивна
+- CBRRatesService: второй процесс берёт курсы из общего файла и не ходит в ЦБ
+- Принудительное обновление (refresher) не идёт в ЦБ, если соседний процесс уже опубликовал курсы
+- Блокировка не получена за дедлайн: отдаётся снимок, запроса в ЦБ нет
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from app.core.settings import get_settings
+from app.services.cbr import CBRFetchError, CBRRatesService
+from app.services.shared_rates import SharedRatesStore
+
+
+RATES = {"USD_RUB": 81.5, "EUR_RUB": 95.4}
+
+
+def _no_fetch(url: str) -> dict[str, float]:
+    raise CBRFetchError(url)
+
+
+def _enable_live(monkeypatch) -> None:
+    settings = get_settings()
+    monkeypatch.setattr(settings, "enable_live_cbr", True)
+    monkeypatch.setattr(settings, "cbr_cache_ttl_seconds", 3600)
+    monkeypatch.delenv("PYTEST_CURRENT_TEST", raising=False)
+
+
+def test_read_is_cached_until_file_changes(tmp_path):
+    store = SharedRatesStore(tmp_path / "cbr_rates.json")
+    assert store.read() is None
+
+    assert store.publish(RATES, fetched_at=1000.0, source="cbr") == 1
+    first = store.read()
+    assert first.rates == RATES
+    assert store.read() is first  # файл не менялся: без повторного разбора
+
+    assert store.publish({"USD_RUB": 82.0}, fetched_at=2000.0, source="cbr") == 2
+    second = SharedRatesStore(store.path).read()
+    assert second.generation == 2
+    assert second.rates == {"USD_RUB": 82.0}
+
+
+def test_fetch_lock_is_exclusive(tmp_path):
+    path = tmp_path / "cbr_rates.json"
+    holder = SharedRatesStore(path)
+    other = SharedRatesStore(path)
+
+    with holder.fetch_lock(1.0) as held:
+        assert held is True
+        with other.fetch_lock(0.1) as acquired:
+            assert acquired is False
+    with other.fetch_lock(0.1) as acquired:
+        assert acquired is True
+
+
+def test_sibling_adopts_published_rates(tmp_path, monkeypatch):
+    _enable_live(monkeypatch)
+    path = tmp_path / "cbr_rates.json"
+    api = CBRRatesService()
+    api.load_snapshot(path)
+    monkeypatch.setattr(api, "_do_fetch", lambda url: dict(RATES))
+    assert api.fetch_rates(force=True) == RATES
+
+    bot = CBRRatesService()
+    bot.load_snapshot(path)
+    monkeypatch.setattr(bot, "_do_fetch", _no_fetch)
+
+    assert bot.fetch_rates() == RATES
+    assert bot.get_cache_info()["generation"] == api.get_cache_info()["generation"] == 1
+
+    # Новая публикация видна без перезапуска
+    monkeypatch.setattr(api, "_do_fetch", lambda url: {"USD_RUB": 90.0})
+    api.fetch_rates(force=True)
+    assert bot.fetch_rates() == {"USD_RUB": 90.0}
+    assert bot.get_snapshot_info()["generation"] == 2
+
+
+def test_waiting_leader_skips_fetch_after_sibling_published(tmp_path, monkeypatch):
+    _enable_live(monkeypatch)
+    path = tmp_path / "cbr_rates.json"
+    sibling = SharedRatesStore(path)
+    service = CBRRatesService()
+    service.load_snapshot(path)
+    monkeypatch.setattr(service, "_do_fetch", _no_fetch)
+
+    locked = threading.Event()
+
+    def other_process_fetch() -> None:
+        with sibling.fetch_lock(1.0):
+            locked.set()
+            time.sleep(0.2)
+            sibling.publish(RATES, fetched_at=time.time(), source="cbr")
+
+    worker = threading.Thread(target=other_process_fetch)
+    worker.start()
+    locked.wait()
+    try:
+        assert service.fetch_rates(force=True) == RATES
+    finally:
+        worker.join()
+    assert service.fetches_adopted == 1
+
+
+def test_forced_refresh_adopts_sibling_publish(tmp_path, monkeypatch):
+    _enable_live(monkeypatch)
+    path = tmp_path / "cbr_rates.json"
+    service = CBRRatesService()
+    service.load_snapshot(path)
+    monkeypatch.setattr(service, "_do_fetch", lambda url: {"USD_RUB": 80.0})
+    service.fetch_rates(force=True)
+
+    # Refresher соседнего процесса успел раньше; этот процесс файл ещё не читал
+    SharedRatesStore(path).publish(RATES, fetched_at=time.time(), source="cbr")
+    monkeypatch.setattr(service, "_do_fetch", _no_fetch)
+
+    assert service.fetch_rates(force=True) == RATES
+    assert service.fetches_adopted == 1
+    assert service.fetched_at() == service.get_snapshot_info()["rates_fetched_at"]
+
+
+def test_lock_timeout_serves_snapshot(tmp_path, monkeypatch):
+    _enable_live(monkeypatch)
+    monkeypatch.setattr(get_settings(), "cbr_fetch_deadline_seconds", 0.1)
+    path = tmp_path / "cbr_rates.json"
+    sibling = SharedRatesStore(path)
+    sibling.publish(RATES, fetched_at=time.time() - 7200, source="cbr")
+    service = CBRRatesService()
+    service.load_snapshot(path)
+    monkeypatch.setattr(service, "_do_fetch", _no_fetch)
+
+    with sibling.fetch_lock(1.0):
+        assert service.fetch_rates(force=True) == RATES
+
+    assert service.fetch_lock_timeouts == 1
+    assert service.fetches_adopted == 0
@@ -0,0 +1,126 @@
+"""Юнит-тесты для векторизованного движка.
+
+Тестируемый модуль: app/calculation/vectorized.py
+
+Покрытие:
+- calculate_grid(): совпадение со скалярным engine до рубля по всем полям breakdown
+- Граничные значения брэкетов (объём, мощность, таможенная стоимость, тиры Японии)
+- Банковская комиссия и курсы ЦБ с 4+ знаками после запятой
+- Broadcasting входных массивов
+"""
+
+from dataclasses import replace
+from decimal import Decimal
+
+import pytest
+
+
+np = pytest.importorskip("numpy")
+
+from app.calculation.engine import calculate_with_context, resolve_context  # noqa: E402
+from app.calculation.models import CalculationRequest, CostBreakdown  # noqa: E402
+from app.calculation.vectorized import calculate_grid  # noqa: E402
+
+
+def _assert_matches_scalar(ctx, country, currency, samples, *, freight_type=None):
+    years, ccs, hps, prices = samples
+    grid = calculate_grid(
+        country,
+        currency,
+        year=years,
+        engine_cc=ccs,
+        engine_power_hp=hps,
+        purchase_price=prices,
+        freight_type=freight_type,
+        ctx=ctx,
+    )
+    for i, (year, cc, hp, price) in enumerate(zip(years, ccs, hps, prices, strict=True)):
+        req = CalculationRequest(
+            country=country,
+            year=int(year),
+            engine_cc=int(cc),
+            engine_power_hp=int(hp),
+            purchase_price=Decimal(int(price)),
+            currency=currency,
+            freight_type=freight_type,
+        )
+        expected = calculate_with_context(req, ctx).breakdown
+        for field in CostBreakdown.model_fields:
+            assert int(getattr(grid, field)[i]) == getattr(expected, field), (field, req)
+
+
+@pytest.fixture
+def ctx():
+    return resolve_context()
+
+
+@pytest.fixture
+def samples():
+    rng = np.random.default_rng(42)
+    n = 300
+    today_year = resolve_context().today.year
+    years = rng.integers(today_year - 20, today_year + 1, n)
+    ccs = rng.choice([600, 999, 1000, 1001, 1500, 1800, 2000, 2001, 2300, 3000, 3500, 5500], n)
+    hps = rng.choice([50, 70, 100, 130, 160, 190, 220, 250, 400, 500, 700], n)
+    prices = rng.integers(1_000, 50_000_000, n)
+    return years, ccs, hps, prices
+
+
+@pytest.mark.parametrize(
+    ("country", "currency", "freight_type"),
+    [
+        ("japan", "JPY", None),
+        ("japan", "USD", None),
+        ("korea", "USD", "standard"),
+        ("uae", "USD", "container"),
+        ("china", "CNY", None),
+        ("georgia", "EUR", "open"),
+    ],
+)
+def test_matches_scalar_engine(ctx, samples, country, currency, freight_type):
+    _assert_matches_scalar(ctx, country, currency, samples, freight_type=freight_type)
+
+
+def test_matches_scalar_engine_with_bank_commission_and_live_rates(ctx, samples):
+    rates_conf = dict(ctx.rates_conf)
+    rates_conf["currencies"] = {
+        "USD_RUB": 78.9512,
+        "EUR_RUB": 91.3377,
+        "JPY_RUB": 0.518617,
+        "CNY_RUB": 10.98765,
+        "AED_RUB": 21.4977,
+    }
+    live_ctx = replace(ctx, rates_conf=rates_conf, bank_commission_percent=1.7)
+    _assert_matches_scalar(live_ctx, "japan", "JPY", samples)
+    _assert_matches_scalar(live_ctx, "korea", "USD", samples)
+
+
+def test_broadcasting_shape(ctx):
+    years = np.arange(ctx.today.year - 9, ctx.today.year + 1)[:, None, None]
+    ccs = np.arange(1000, 4001, 500)[None, :, None]
+    prices = np.array([1_000_000, 5_000_000])[None, None, :]
+    grid = calculate_grid(
+        "japan",
+        "JPY",
+        year=years,
+        engine_cc=ccs,
+        engine_power_hp=150,
+        purchase_price=prices,
+        ctx=ctx,
+    )
+    assert grid.total_rub.shape == (10, 7, 2)
+    assert (grid.total_rub > grid.purchase_price_rub).all()
+
+
+def test_non_m1_has_no_utilization_fee(ctx):
+    grid = calculate_grid(
+        "korea",
+        "USD",
+        year=[2020],
+        engine_cc=[2000],
+        engine_power_hp=[150],
+        purchase_price=[20000],
+        vehicle_type="bus",
+        ctx=ctx,
+    )
+    assert int(grid.utilization_fee_rub[0]) == 0